@@ -0,0 +1,439 @@
+__all__ = ('ASYNC_CACHES', 'AsyncCache')
+
+from collections import OrderedDict
+from time import monotonic
+
+from hata import KOKORO
+from scarletio import Future, RichAttributeErrorBaseType
+
+ASYNC_CACHES = {}
+
+
+class AsyncCacheStatistics(RichAttributeErrorBaseType):
+    """
+    Metrics of an async cache.
+    
+    Attributes
+    ----------
+    clear_count : `int`
+        How much times the whole cache was cleared.
+    eviction_count : `int`
+        How much entries were removed, because the cache was full.
+    expiration_count : `int`
+        How much entries were removed, because they expired.
+    hit_count : `int`
+        How much lookups found a value.
+    in_flight_hit_count : `int`
+        How much lookups joined an already running load.
+    invalidation_count : `int`
+        How much entries were removed, because they were invalidated.
+    miss_count : `int`
+        How much lookups had to load the value.
+    negative_hit_count : `int`
+        How much lookups found a cached missing value.
+    """
+    __slots__ = (
+        'clear_count', 'eviction_count', 'expiration_count', 'hit_count', 'in_flight_hit_count', 'invalidation_count',
+        'miss_count', 'negative_hit_count'
+    )
+    
+    def __new__(cls):
+        """
+        Creates a new async cache statistics.
+        """
+        self = object.__new__(cls)
+        self.clear_count = 0
+        self.eviction_count = 0
+        self.expiration_count = 0
+        self.hit_count = 0
+        self.in_flight_hit_count = 0
+        self.invalidation_count = 0
+        self.miss_count = 0
+        self.negative_hit_count = 0
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the statistics' representation."""
+        return (
+            f'<{self.__class__.__name__} hit_count = {self.hit_count!r}, miss_count = {self.miss_count!r}, '
+            f'hit_rate = {self.hit_rate:.4f}>'
+        )
+    
+    
+    @property
+    def hit_rate(self):
+        """
+        Returns the rate of the lookups which did not need to load.
+        
+        Returns
+        -------
+        hit_rate : `float`
+        """
+        hit_count = self.hit_count + self.negative_hit_count + self.in_flight_hit_count
+        total = hit_count + self.miss_count
+        if total:
+            return hit_count / total
+        
+        return 0.0
+
+
+class AsyncCache(RichAttributeErrorBaseType):
+    """
+    Least recently used cache with expiration, which loads the missing values itself.
+    
+    Concurrent lookups of the same key share one load. If the loader returns `None`, the key is cached as missing
+    for ``.negative_ttl`` seconds.
+    
+    Attributes
+    ----------
+    _entries : `OrderedDict` of (`object`, `tuple` (`object`, `float`, `int`)) items
+        Key - (value, expires at, weight) items in least recently used order.
+    _loads : `dict` of (`object`, ``Future``) items
+        The running loads by their key.
+    byte_limit : `int`
+        The maximal total weight of the entries. `0` if not limited.
+    byte_size : `int`
+        The total weight of the entries.
+    name : `str`
+        The cache's name.
+    negative_ttl : `float`
+        Seconds for how long missing values are cached. `0.0` to not cache them.
+    size_limit : `int`
+        The maximal amount of entries. `0` if not limited.
+    statistics : ``AsyncCacheStatistics``
+        The cache's metrics.
+    ttl : `float`
+        Seconds for how long values are cached. `0.0` if they do not expire.
+    weight_function : `None`, `FunctionType`
+        Returns the approximate size of a value in bytes. Required if ``.byte_limit`` is given.
+    """
+    __slots__ = (
+        '_entries', '_loads', 'byte_limit', 'byte_size', 'name', 'negative_ttl', 'size_limit', 'statistics', 'ttl',
+        'weight_function'
+    )
+    
+    def __new__(
+        cls, name, *, byte_limit = 0, negative_ttl = 0.0, size_limit = 1000, ttl = 0.0, weight_function = None
+    ):
+        """
+        Creates a new async cache and registers it into ``ASYNC_CACHES``. A cache created with the same name, for
+        example by a reloaded plugin, replaces the old one.
+        
+        Parameters
+        ----------
+        name : `str`
+            The cache's name.
+        byte_limit : `int` = `0`, Optional (Keyword only)
+            The maximal total weight of the entries. `0` if not limited.
+        negative_ttl : `float` = `0.0`, Optional (Keyword only)
+            Seconds for how long missing values are cached. `0.0` to not cache them.
+        size_limit : `int` = `1000`, Optional (Keyword only)
+            The maximal amount of entries. `0` if not limited.
+        ttl : `float` = `0.0`, Optional (Keyword only)
+            Seconds for how long values are cached. `0.0` if they do not expire.
+        weight_function : `None`, `FunctionType` = `None`, Optional (Keyword only)
+            Returns the approximate size of a value in bytes.
+        
+        Raises
+        ------
+        ValueError
+            - If `byte_limit` is given without `weight_function`.
+        """
+        if byte_limit and (weight_function is None):
+            raise ValueError(
+                f'`weight_function` is required if `byte_limit` is given, got byte_limit = {byte_limit!r}.'
+            )
+        
+        self = object.__new__(cls)
+        self._entries = OrderedDict()
+        self._loads = {}
+        self.byte_limit = byte_limit
+        self.byte_size = 0
+        self.name = name
+        self.negative_ttl = negative_ttl
+        self.size_limit = size_limit
+        self.statistics = AsyncCacheStatistics()
+        self.ttl = ttl
+        self.weight_function = weight_function
+        
+        ASYNC_CACHES[name] = self
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the cache's representation."""
+        return f'<{self.__class__.__name__} name = {self.name!r}, size = {len(self._entries)!r}>'
+    
+    
+    def __len__(self):
+        """Returns the cache's size."""
+        return len(self._entries)
+    
+    
+    def __contains__(self, key):
+        """Returns whether the key is cached and not expired."""
+        return self._get_entry(key) is not None
+    
+    
+    @property
+    def load_count(self):
+        """
+        Returns how much loads are running.
+        
+        Returns
+        -------
+        load_count : `int`
+        """
+        return len(self._loads)
+    
+    
+    def _get_entry(self, key):
+        """
+        Returns the entry for the given key. Removes it if expired.
+        
+        Parameters
+        ----------
+        key : `object`
+            The key to look up.
+        
+        Returns
+        -------
+        entry : `None`, `tuple` (`object`, `float`, `int`)
+        """
+        entries = self._entries
+        try:
+            entry = entries[key]
+        except KeyError:
+            return None
+        
+        expires_at = entry[1]
+        if expires_at and (expires_at <= monotonic()):
+            del entries[key]
+            self.byte_size -= entry[2]
+            self.statistics.expiration_count += 1
+            return None
+        
+        entries.move_to_end(key)
+        return entry
+    
+    
+    def get_cached(self, key, default = None):
+        """
+        Returns the cached value of the given key without loading it.
+        
+        Parameters
+        ----------
+        key : `object`
+            The key to look up.
+        default : `object` = `None`, Optional
+            Value to return if the key is not cached.
+        
+        Returns
+        -------
+        value : `object`
+        """
+        entry = self._get_entry(key)
+        if entry is None:
+            return default
+        
+        return entry[0]
+    
+    
+    def set(self, key, value):
+        """
+        Caches the given value.
+        
+        Parameters
+        ----------
+        key : `object`
+            The value's key.
+        value : `object`
+            The value to cache. `None` caches the key as missing.
+        """
+        if value is None:
+            ttl = self.negative_ttl
+            if not ttl:
+                self.discard(key)
+                return
+            
+            weight = 0
+        
+        else:
+            ttl = self.ttl
+            weight_function = self.weight_function
+            if weight_function is None:
+                weight = 0
+            else:
+                weight = weight_function(value)
+        
+        if ttl:
+            expires_at = monotonic() + ttl
+        else:
+            expires_at = 0.0
+        
+        entries = self._entries
+        old_entry = entries.pop(key, None)
+        if (old_entry is not None):
+            self.byte_size -= old_entry[2]
+        
+        entries[key] = (value, expires_at, weight)
+        self.byte_size += weight
+        self._evict()
+    
+    
+    def _evict(self):
+        """
+        Removes the least recently used entries while the cache is above its limits.
+        """
+        entries = self._entries
+        size_limit = self.size_limit
+        byte_limit = self.byte_limit
+        
+        while entries:
+            if not (
+                (size_limit and (len(entries) > size_limit)) or
+                (byte_limit and (self.byte_size > byte_limit))
+            ):
+                break
+            
+            key, entry = entries.popitem(last = False)
+            self.byte_size -= entry[2]
+            self.statistics.eviction_count += 1
+    
+    
+    def discard(self, key):
+        """
+        Removes the given key from the cache.
+        
+        Parameters
+        ----------
+        key : `object`
+            The key to remove.
+        """
+        entry = self._entries.pop(key, None)
+        if (entry is not None):
+            self.byte_size -= entry[2]
+    
+    
+    def invalidate(self, key):
+        """
+        Removes the given key from the cache. If its value is being loaded, the loaded value is not cached.
+        
+        Parameters
+        ----------
+        key : `object`
+            The key to invalidate.
+        
+        Returns
+        -------
+        invalidated : `bool`
+            Whether an entry was removed.
+        """
+        self._loads.pop(key, None)
+        
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        
+        self.byte_size -= entry[2]
+        self.statistics.invalidation_count += 1
+        return True
+    
+    
+    def clear(self):
+        """
+        Removes every entry from the cache. The values being loaded meanwhile are not cached.
+        """
+        self._entries.clear()
+        self._loads.clear()
+        self.byte_size = 0
+        self.statistics.clear_count += 1
+    
+    
+    def iter_items(self):
+        """
+        Iterates over the cached not missing key - value pairs. Expired entries are included.
+        
+        This method is an iterable generator.
+        
+        Yields
+        ------
+        item : `tuple` (`object`, `object`)
+        """
+        for key, entry in self._entries.items():
+            value = entry[0]
+            if (value is not None):
+                yield key, value
+    
+    
+    async def get(self, key, loader, *positional_parameters):
+        """
+        Returns the value of the given key. If not cached, loads it.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        key : `object`
+            The key to look up.
+        loader : `CoroutineFunctionType`
+            Loads the value. Called with the given positional parameters. Should return `None` if the value is
+            missing.
+        *positional_parameters : Positional parameters
+            Parameters to call `loader` with.
+        
+        Returns
+        -------
+        value : `None`, `object`
+            `None` if the value is missing.
+        
+        Raises
+        ------
+        BaseException
+            Any exception raised by the loader. Failed loads are not cached.
+        """
+        statistics = self.statistics
+        
+        entry = self._get_entry(key)
+        if (entry is not None):
+            value = entry[0]
+            if value is None:
+                statistics.negative_hit_count += 1
+            else:
+                statistics.hit_count += 1
+            
+            return value
+        
+        loads = self._loads
+        try:
+            load = loads[key]
+        except KeyError:
+            pass
+        else:
+            statistics.in_flight_hit_count += 1
+            return await load
+        
+        statistics.miss_count += 1
+        load = Future(KOKORO)
+        loads[key] = load
+        
+        try:
+            value = await loader(*positional_parameters)
+        except BaseException as err:
+            load.set_exception_if_pending(err)
+            # Retrieve the exception, so it is not reported as unhandled if no one else waited for it.
+            load.get_exception()
+            raise
+        
+        else:
+            # If the key was invalidated meanwhile, the load is not registered anymore, so the value is not cached.
+            if loads.get(key, None) is load:
+                self.set(key, value)
+            
+            load.set_result_if_pending(value)
+            return value
+        
+        finally:
+            if loads.get(key, None) is load:
+                del loads[key]
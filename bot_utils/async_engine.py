@@ -1,7 +1,13 @@
+import config
 from .models import DATABASE_NAME
 from sqlalchemy import create_engine
 
-from hata.ext.kokoro_sqlalchemy import KOKORO_STRATEGY
+from .engine_pool import KOKORO_POOL_STRATEGY
+
+DATABASE_WORKER_COUNT = getattr(config, 'DATABASE_WORKER_COUNT', 1)
+DATABASE_CONNECTIONS_PER_WORKER = getattr(config, 'DATABASE_CONNECTIONS_PER_WORKER', 0)
+DATABASE_QUEUE_LIMIT = getattr(config, 'DATABASE_QUEUE_LIMIT', 1000)
+DATABASE_SLOW_QUERY_THRESHOLD = getattr(config, 'DATABASE_SLOW_QUERY_THRESHOLD', 200)
 
 if (DATABASE_NAME is None):
     DB_ENGINE = None
@@ -10,7 +16,14 @@ else:
     from . import models as module_models
     if module_models.DB_ENGINE is not None:
         
-        DB_ENGINE = create_engine(DATABASE_NAME, strategy = KOKORO_STRATEGY, single_worker = True)
+        DB_ENGINE = create_engine(
+            DATABASE_NAME,
+            strategy = KOKORO_POOL_STRATEGY,
+            worker_count = DATABASE_WORKER_COUNT,
+            connections_per_worker = DATABASE_CONNECTIONS_PER_WORKER,
+            queue_limit = DATABASE_QUEUE_LIMIT,
+            slow_query_threshold = DATABASE_SLOW_QUERY_THRESHOLD / 1000.0,
+        )
         module_models.DB_ENGINE = DB_ENGINE
 
 from .bind_types import *
@@ -0,0 +1,374 @@
+__all__ = ('BATCH_WRITERS', 'BatchWriter',)
+
+from time import perf_counter
+
+from hata import KOKORO
+from scarletio import RichAttributeErrorBaseType, Task, TaskGroup, sleep
+from sqlalchemy.dialects.postgresql import insert
+
+from .models import DB_ENGINE
+
+
+FLUSH_INTERVAL_DEFAULT = 5.0
+FLUSH_SIZE_DEFAULT = 200
+RETRY_LIMIT_DEFAULT = 3
+RETRY_DELAY = 1.0
+
+BATCH_WRITERS = {}
+
+
+class BatchWriterStatistics(RichAttributeErrorBaseType):
+    """
+    Metrics collected by a ``BatchWriter``.
+    
+    Attributes
+    ----------
+    dropped_row_count : `int`
+        The amount of rows dropped after too much failed flushes.
+    failure_count : `int`
+        How much flushes failed.
+    flush_count : `int`
+        How much flushes were done.
+    flush_time_max : `float`
+        The longest flush in seconds.
+    flush_time_total : `float`
+        The total time spent on flushing in seconds.
+    row_count : `int`
+        The amount of flushed rows.
+    """
+    __slots__ = (
+        'dropped_row_count', 'failure_count', 'flush_count', 'flush_time_max', 'flush_time_total', 'row_count'
+    )
+    
+    def __new__(cls):
+        """
+        Creates a new batch writer statistics instance.
+        """
+        self = object.__new__(cls)
+        self.dropped_row_count = 0
+        self.failure_count = 0
+        self.flush_count = 0
+        self.flush_time_max = 0.0
+        self.flush_time_total = 0.0
+        self.row_count = 0
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the statistics' representation."""
+        return (
+            f'<{self.__class__.__name__} flush_count = {self.flush_count!r}, row_count = {self.row_count!r}, '
+            f'rows_per_flush = {self.rows_per_flush:.2f}, flush_time_average = {self.flush_time_average:.6f}, '
+            f'flush_time_max = {self.flush_time_max:.6f}, failure_count = {self.failure_count!r}, '
+            f'dropped_row_count = {self.dropped_row_count!r}>'
+        )
+    
+    
+    @property
+    def flush_time_average(self):
+        """
+        Returns the average time spent on a flush.
+        
+        Returns
+        -------
+        flush_time_average : `float`
+        """
+        flush_count = self.flush_count
+        if flush_count:
+            return self.flush_time_total / flush_count
+        
+        return 0.0
+    
+    
+    @property
+    def rows_per_flush(self):
+        """
+        Returns the average amount of rows written by a flush.
+        
+        Returns
+        -------
+        rows_per_flush : `float`
+        """
+        flush_count = self.flush_count
+        if flush_count:
+            return self.row_count / flush_count
+        
+        return 0.0
+    
+    
+    def feed_flush(self, row_count, flush_time):
+        """
+        Feeds a flush into the statistics.
+        
+        Parameters
+        ----------
+        row_count : `int`
+            The amount of written rows.
+        flush_time : `float`
+            The time spent on the flush in seconds.
+        """
+        self.flush_count += 1
+        self.row_count += row_count
+        self.flush_time_total += flush_time
+        if flush_time > self.flush_time_max:
+            self.flush_time_max = flush_time
+
+
+class BatchWriter(RichAttributeErrorBaseType):
+    """
+    Accumulates rows in memory and writes them into a table with a single multi-row insert.
+    
+    A flush happens when either `flush_size` rows are buffered or when the oldest buffered row waited `flush_interval`
+    seconds, whichever comes first.
+    
+    The rows of a failed flush are put back into the buffer. They are only dropped if `retry_limit` flushes failed
+    after each other.
+    
+    Attributes
+    ----------
+    flush_interval : `float`
+        The maximal amount of seconds a row can stay in the buffer.
+    flush_size : `int`
+        The amount of buffered rows triggering a flush.
+    name : `str`
+        The writer's name to show in stats.
+    retry_limit : `int`
+        How much times failed rows are put back into the buffer before dropping them. `0` to never drop them.
+    statistics : ``BatchWriterStatistics``
+        The writer's statistics.
+    table : `sqlalchemy.Table`
+        The table to write into.
+    _buffer : `list` of `dict` of (`str`, `object`) items
+        The buffered rows.
+    _flush_handle : `None`, ``TimerHandle``
+        Handle to flush the buffer when its oldest row waited enough.
+    _flush_tasks : `set` of ``Task``
+        The running flushes.
+    _retry_count : `int`
+        How much flushes failed after each other.
+    """
+    __slots__ = (
+        'flush_interval', 'flush_size', 'name', 'retry_limit', 'statistics', 'table', '_buffer', '_flush_handle',
+        '_flush_tasks', '_retry_count'
+    )
+    
+    def __new__(
+        cls,
+        name,
+        table,
+        *,
+        flush_interval = FLUSH_INTERVAL_DEFAULT,
+        flush_size = FLUSH_SIZE_DEFAULT,
+        retry_limit = RETRY_LIMIT_DEFAULT,
+    ):
+        """
+        Creates a new batch writer and registers it into ``BATCH_WRITERS``.
+        
+        Parameters
+        ----------
+        name : `str`
+            The writer's name to show in stats.
+        table : `sqlalchemy.Table`
+            The table to write into.
+        flush_interval : `float` = `FLUSH_INTERVAL_DEFAULT`, Optional (Keyword only)
+            The maximal amount of seconds a row can stay in the buffer.
+        flush_size : `int` = `FLUSH_SIZE_DEFAULT`, Optional (Keyword only)
+            The amount of buffered rows triggering a flush.
+        retry_limit : `int` = `RETRY_LIMIT_DEFAULT`, Optional (Keyword only)
+            How much times failed rows are put back into the buffer before dropping them. `0` to never drop them.
+        """
+        self = object.__new__(cls)
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.name = name
+        self.retry_limit = retry_limit
+        self.statistics = BatchWriterStatistics()
+        self.table = table
+        self._buffer = []
+        self._flush_handle = None
+        self._flush_tasks = set()
+        self._retry_count = 0
+        
+        BATCH_WRITERS[name] = self
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the batch writer's representation."""
+        return (
+            f'<{self.__class__.__name__} name = {self.name!r}, buffered = {len(self._buffer)!r}, '
+            f'flush_interval = {self.flush_interval!r}, flush_size = {self.flush_size!r}>'
+        )
+    
+    
+    @property
+    def buffered_count(self):
+        """
+        Returns how much rows are waiting to be flushed.
+        
+        Returns
+        -------
+        buffered_count : `int`
+        """
+        return len(self._buffer)
+    
+    
+    def extend(self, rows):
+        """
+        Buffers the given rows.
+        
+        Parameters
+        ----------
+        rows : `list` of `dict` of (`str`, `object`) items
+            The rows to buffer.
+        """
+        if not rows:
+            return
+        
+        buffer = self._buffer
+        buffer.extend(rows)
+        
+        if len(buffer) >= self.flush_size:
+            self._start_flush()
+            return
+        
+        self._flush_later()
+    
+    
+    def _flush_later(self):
+        """
+        Flushes the buffer after ``.flush_interval`` if not yet pending.
+        """
+        if self._flush_handle is None:
+            self._flush_handle = KOKORO.call_later(self.flush_interval, self._start_flush)
+    
+    
+    def _retry_later(self, rows):
+        """
+        Puts back the rows of a failed flush before the buffered ones.
+        
+        Parameters
+        ----------
+        rows : `list` of `dict` of (`str`, `object`) items
+            The rows to put back.
+        
+        Returns
+        -------
+        retried : `bool`
+            Whether the rows were put back. `False` if they were dropped, because the retry limit was reached.
+        """
+        retry_count = self._retry_count + 1
+        retry_limit = self.retry_limit
+        if retry_limit and (retry_count > retry_limit):
+            self._retry_count = 0
+            self._drop(rows)
+            return False
+        
+        self._retry_count = retry_count
+        self._buffer[:0] = rows
+        self._flush_later()
+        return True
+    
+    
+    def _drop(self, rows):
+        """
+        Called when the rows of a failed flush are dropped.
+        
+        Parameters
+        ----------
+        rows : `list` of `dict` of (`str`, `object`) items
+            The dropped rows.
+        """
+        self.statistics.dropped_row_count += len(rows)
+    
+    
+    def _start_flush(self):
+        """
+        Starts flushing the buffered rows in the background.
+        """
+        flush_handle = self._flush_handle
+        if (flush_handle is not None):
+            self._flush_handle = None
+            flush_handle.cancel()
+        
+        buffer = self._buffer
+        if not buffer:
+            return
+        
+        self._buffer = []
+        
+        task = Task(self.write(buffer), KOKORO)
+        flush_tasks = self._flush_tasks
+        flush_tasks.add(task)
+        task.add_done_callback(flush_tasks.discard)
+    
+    
+    async def write(self, rows):
+        """
+        Writes the given rows into the writer's table within a single transaction. On failure the rows are put back
+        into the buffer to be retried.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        rows : `list` of `dict` of (`str`, `object`) items
+            The rows to write.
+        """
+        start = perf_counter()
+        
+        try:
+            async with DB_ENGINE.begin() as connector:
+                await self._write_with(connector, rows)
+        
+        except Exception as err:
+            self.statistics.failure_count += 1
+            if self._retry_later(rows):
+                action = 'retrying them later'
+            else:
+                action = f'dropping them after {self.retry_limit!r} retries'
+            
+            await KOKORO.render_exception_async(
+                err,
+                before = f'Exception occurred while {self!r} was writing {len(rows)} rows, {action}:\n',
+            )
+            return
+        
+        self._retry_count = 0
+        self.statistics.feed_flush(len(rows), perf_counter() - start)
+    
+    
+    async def _write_with(self, connector, rows):
+        """
+        Writes the given rows with the given connector.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        connector : ``AsyncConnection``
+            Connector to execute the statements with.
+        rows : `list` of `dict` of (`str`, `object`) items
+            The rows to write.
+        """
+        await connector.execute(insert(self.table, rows))
+    
+    
+    async def flush(self):
+        """
+        Flushes every buffered row and waits till all the running flushes are finished. Failed rows are retried
+        till they are written or the retry limit is reached.
+        
+        This method is a coroutine.
+        """
+        while True:
+            self._start_flush()
+            
+            flush_tasks = self._flush_tasks
+            if flush_tasks:
+                await TaskGroup(KOKORO, [*flush_tasks]).wait_all()
+            
+            if (not self._retry_count) or (not self._buffer):
+                break
+            
+            await sleep(RETRY_DELAY, KOKORO)
@@ -5,6 +5,9 @@ from math import floor
 from bot_utils.models import DB_ENGINE, WAIFU_STATS_TABLE, waifu_stats_model
 from bot_utils.model_linker import ModelLink, Field
 
+# Stat upgrades come in bursts, so their saves are merged and written after this many seconds.
+WAIFU_STATS_SAVE_DELAY = 2.0
+
 STAT_MASKS = [
     219902325437,
     219902325439,
@@ -78,7 +81,13 @@ def get_default_user_stats(user_id):
 
 
 
-class WaifuStats(ModelLink, model = waifu_stats_model, table = WAIFU_STATS_TABLE, engine = DB_ENGINE):
+class WaifuStats(
+    ModelLink,
+    model = waifu_stats_model,
+    table = WAIFU_STATS_TABLE,
+    engine = DB_ENGINE,
+    save_delay = WAIFU_STATS_SAVE_DELAY,
+):
     __slots__ = ()
     
     def __new__(cls, user):
@@ -0,0 +1,115 @@
+__all__ = ('booru_post_parser_gel', 'booru_post_parser_generic', 'parse_booru_posts', 'parse_booru_posts_async')
+
+from io import BytesIO
+
+from hata import KOKORO
+from lxml.etree import XMLSyntaxError, iterparse
+from scarletio import alchemy_incendiary
+
+# Booru pages are parsed as a stream, only the post elements are built and each is dropped after it is read.
+# Pages above this size are parsed in an executor, so the event loop is not blocked meanwhile.
+PARSE_IN_EXECUTOR_SIZE = 1 << 15
+
+
+def booru_post_parser_generic(post):
+    """
+    Parses a generic booru post.
+    
+    Parameters
+    ----------
+    post : `lxml.etree._Element`
+        Response post.
+    
+    Returns
+    -------
+    file_url : `None`, `str`
+    tags : `None`, `str`
+    """
+    return post.get('file_url'), post.get('tags')
+
+
+def booru_post_parser_gel(post):
+    """
+    Parses a gebbooru post.
+    
+    Parameters
+    ----------
+    post : `lxml.etree._Element`
+        Response post.
+    
+    Returns
+    -------
+    file_url : `None`, `str`
+    tags : `None`, `str`
+    """
+    return post.findtext('file_url'), post.findtext('tags')
+
+
+def parse_booru_posts(data, post_parser):
+    """
+    Parses a booru page.
+    
+    Parameters
+    ----------
+    data : `bytes`
+        The received page.
+    post_parser : `FunctionType`
+        Function to parse a post with.
+    
+    Returns
+    -------
+    result : `None`, `tuple` (`int`, `list` of `tuple` (`str`, `str`))
+        The total amount of posts and the page's `file url` - `tags` pairs. `None` if the page has bad structure.
+    """
+    total = -1
+    posts = []
+    
+    try:
+        for event, element in iterparse(
+            BytesIO(data), events = ('start', 'end'), tag = ('posts', 'post'), recover = True
+        ):
+            if element.tag == 'posts':
+                if event == 'start':
+                    total = int(element.get('count', '0'))
+                continue
+            
+            if event == 'start':
+                continue
+            
+            url, tags = post_parser(element)
+            if (url is not None) and (tags is not None):
+                posts.append((url, tags))
+            
+            element.clear()
+    
+    except XMLSyntaxError:
+        return None
+    
+    if total == -1:
+        return None
+    
+    return total, posts
+
+
+async def parse_booru_posts_async(data, post_parser):
+    """
+    Parses a booru page. Large pages are parsed in an executor.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    data : `bytes`
+        The received page.
+    post_parser : `FunctionType`
+        Function to parse a post with.
+    
+    Returns
+    -------
+    result : `None`, `tuple` (`int`, `list` of `tuple` (`str`, `str`))
+        The total amount of posts and the page's `file url` - `tags` pairs. `None` if the page has bad structure.
+    """
+    if len(data) < PARSE_IN_EXECUTOR_SIZE:
+        return parse_booru_posts(data, post_parser)
+    
+    return await KOKORO.run_in_executor(alchemy_incendiary(parse_booru_posts, (data, post_parser)))
@@ -0,0 +1,215 @@
+__all__ = ('ChannelIndex',)
+
+from itertools import chain
+
+from scarletio import RichAttributeErrorBaseType
+
+# Features acting on a few tagged channels should not walk every cached channel of every guild. The index is built
+# once, then kept up to date from the channel events, so only the matching channels have to be visited later.
+
+
+class ChannelIndex(RichAttributeErrorBaseType):
+    """
+    Index of the channels matching a predicate.
+    
+    Attributes
+    ----------
+    channels : `dict` of (`int`, ``Channel``) items
+        Channel identifier - channel relation of the matching channels.
+    channel_ids_by_guild : `dict` of (`int`, `set` of `int`) items
+        Guild identifier - matching channel identifiers relation.
+    predicate : `FunctionType`
+        Returns whether the given channel should be indexed.
+    """
+    __slots__ = ('channels', 'channel_ids_by_guild', 'predicate')
+    
+    def __new__(cls, predicate):
+        """
+        Creates a new channel index.
+        
+        Parameters
+        ----------
+        predicate : `FunctionType`
+            Returns whether the given channel should be indexed.
+        """
+        self = object.__new__(cls)
+        self.channels = {}
+        self.channel_ids_by_guild = {}
+        self.predicate = predicate
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the channel index's representation."""
+        return f'<{self.__class__.__name__} size = {len(self.channels)!r}>'
+    
+    
+    def __len__(self):
+        """Returns how much channels are indexed."""
+        return len(self.channels)
+    
+    
+    def __contains__(self, channel_id):
+        """Returns whether the channel of the given identifier is indexed."""
+        return channel_id in self.channels
+    
+    
+    def update(self, channel):
+        """
+        Adds the given channel to the index if it matches the predicate, else removes it.
+        
+        Parameters
+        ----------
+        channel : ``Channel``
+            The channel to update.
+        
+        Returns
+        -------
+        matched : `bool`
+        """
+        if self.predicate(channel):
+            self._add(channel)
+            return True
+        
+        self.remove(channel)
+        return False
+    
+    
+    def _add(self, channel):
+        """
+        Adds the given channel to the index.
+        
+        Parameters
+        ----------
+        channel : ``Channel``
+            The channel to add.
+        """
+        channel_id = channel.id
+        self.channels[channel_id] = channel
+        
+        guild_id = channel.guild_id
+        try:
+            channel_ids = self.channel_ids_by_guild[guild_id]
+        except KeyError:
+            channel_ids = set()
+            self.channel_ids_by_guild[guild_id] = channel_ids
+        
+        channel_ids.add(channel_id)
+    
+    
+    def remove(self, channel):
+        """
+        Removes the given channel from the index.
+        
+        Parameters
+        ----------
+        channel : ``Channel``
+            The channel to remove.
+        """
+        channel_id = channel.id
+        if self.channels.pop(channel_id, None) is None:
+            return
+        
+        guild_id = channel.guild_id
+        channel_ids = self.channel_ids_by_guild.get(guild_id, None)
+        if (channel_ids is not None):
+            channel_ids.discard(channel_id)
+            if not channel_ids:
+                del self.channel_ids_by_guild[guild_id]
+    
+    
+    def add_guild(self, guild):
+        """
+        Indexes the channels and threads of the given guild.
+        
+        Parameters
+        ----------
+        guild : ``Guild``
+            The guild to index.
+        """
+        for channel in chain(guild.channels.values(), guild.threads.values()):
+            self.update(channel)
+    
+    
+    def remove_guild(self, guild_id):
+        """
+        Removes the channels of the given guild from the index.
+        
+        Parameters
+        ----------
+        guild_id : `int`
+            The guild's identifier.
+        
+        Returns
+        -------
+        channels : `list` of ``Channel``
+            The removed channels.
+        """
+        channel_ids = self.channel_ids_by_guild.pop(guild_id, None)
+        if channel_ids is None:
+            return []
+        
+        channels = self.channels
+        return [channels.pop(channel_id) for channel_id in channel_ids]
+    
+    
+    def build(self, guilds):
+        """
+        Rebuilds the index from the given guilds.
+        
+        Parameters
+        ----------
+        guilds : `iterable` of ``Guild``
+            The guilds to index.
+        """
+        self.clear()
+        
+        for guild in guilds:
+            self.add_guild(guild)
+    
+    
+    def iter_channels(self):
+        """
+        Iterates over the indexed channels. Updating the index meanwhile is allowed.
+        
+        This method is an iterable generator.
+        
+        Yields
+        ------
+        channel : ``Channel``
+        """
+        yield from [*self.channels.values()]
+    
+    
+    def iter_guild_channels(self, guild_id):
+        """
+        Iterates over the indexed channels of the given guild. Updating the index meanwhile is allowed.
+        
+        This method is an iterable generator.
+        
+        Parameters
+        ----------
+        guild_id : `int`
+            The guild's identifier.
+        
+        Yields
+        ------
+        channel : ``Channel``
+        """
+        channel_ids = self.channel_ids_by_guild.get(guild_id, None)
+        if channel_ids is None:
+            return
+        
+        channels = self.channels
+        for channel_id in [*channel_ids]:
+            channel = channels.get(channel_id, None)
+            if (channel is not None):
+                yield channel
+    
+    
+    def clear(self):
+        """
+        Removes every channel from the index.
+        """
+        self.channels.clear()
+        self.channel_ids_by_guild.clear()
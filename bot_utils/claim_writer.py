@@ -0,0 +1,232 @@
+__all__ = ('DailyClaimWriter', 'HeartClaimWriter',)
+
+import sys
+from datetime import datetime
+from time import perf_counter
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import select
+
+from .batch_writer import BATCH_WRITERS, BatchWriter
+from .daily import calculate_daily_new
+from .heart_leaderboard import HEART_LEADERBOARD
+from .models import USER_COMMON_TABLE, get_create_common_user_values, user_common_model
+
+# Giveaway events get hundreds of clicks in a few seconds, so claims are only buffered when clicked and are written as
+# a single upsert per tick.
+#
+# Claimers are told they received their reward when they click, so failed claims are retried for as long as the event
+# runs. When the event ends, they are retried `CLAIM_CLOSE_RETRY_LIMIT` more times, then the claimers are logged,
+# so they can be given their reward manually.
+
+CLAIM_FLUSH_INTERVAL = 1.0
+CLAIM_FLUSH_SIZE = 500
+CLAIM_CLOSE_RETRY_LIMIT = 30
+
+
+class ClaimWriter(BatchWriter):
+    """
+    Batch writer for the claims of a giveaway event. Each buffered row is a `{'user_id': user_id}` dictionary.
+    
+    Attributes
+    ----------
+    amount : `int`
+        The amount to give to each claimer.
+    claim_count : `int`
+        The amount of claims.
+    started_at : `float`
+        Performance counter value when the writer was created.
+    """
+    __slots__ = ('amount', 'claim_count', 'started_at')
+    
+    def __new__(cls, name, amount):
+        """
+        Creates a new claim writer.
+        
+        Parameters
+        ----------
+        name : `str`
+            The writer's name to show in stats.
+        amount : `int`
+            The amount to give to each claimer.
+        """
+        self = BatchWriter.__new__(
+            cls,
+            name,
+            USER_COMMON_TABLE,
+            flush_interval = CLAIM_FLUSH_INTERVAL,
+            flush_size = CLAIM_FLUSH_SIZE,
+            retry_limit = 0,
+        )
+        self.amount = amount
+        self.claim_count = 0
+        self.started_at = perf_counter()
+        return self
+    
+    
+    @property
+    def claims_per_second(self):
+        """
+        Returns the average amount of claims per second since the writer's creation.
+        
+        Returns
+        -------
+        claims_per_second : `float`
+        """
+        elapsed = perf_counter() - self.started_at
+        if elapsed > 0.0:
+            return self.claim_count / elapsed
+        
+        return 0.0
+    
+    
+    def claim(self, user_id):
+        """
+        Buffers a claim of the given user.
+        
+        Parameters
+        ----------
+        user_id : `int`
+            The claimer's identifier.
+        """
+        self.claim_count += 1
+        self.extend([{'user_id': user_id}])
+    
+    
+    def _drop(self, rows):
+        """
+        Called when the claims of a failed flush are dropped. Logs the claimers.
+        
+        Parameters
+        ----------
+        rows : `list` of `dict` of (`str`, `object`) items
+            The dropped claims.
+        """
+        BatchWriter._drop(self, rows)
+        
+        sys.stderr.write(
+            f'{self!r} dropped the claims ({self.amount!r} each) of: '
+            f'{", ".join(str(row["user_id"]) for row in rows)}\n'
+        )
+    
+    
+    async def close(self):
+        """
+        Flushes the buffered claims and removes the writer from ``BATCH_WRITERS``. Failed claims are retried
+        ``CLAIM_CLOSE_RETRY_LIMIT`` times before they are dropped.
+        
+        This method is a coroutine.
+        """
+        self.retry_limit = CLAIM_CLOSE_RETRY_LIMIT
+        self._retry_count = 0
+        
+        try:
+            await self.flush()
+        finally:
+            if BATCH_WRITERS.get(self.name, None) is self:
+                del BATCH_WRITERS[self.name]
+
+
+class HeartClaimWriter(ClaimWriter):
+    """
+    Claim writer giving hearts to each claimer.
+    """
+    __slots__ = ()
+    
+    async def _write_with(self, connector, rows):
+        """
+        Adds the hearts to every claimer with a single upsert.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        connector : ``AsyncConnection``
+            Connector to execute the statements with.
+        rows : `list` of `dict` of (`str`, `object`) items
+            The claims to write.
+        """
+        amount = self.amount
+        statement = insert(
+            USER_COMMON_TABLE,
+        ).values(
+            [get_create_common_user_values(row['user_id'], total_love = amount) for row in rows],
+        )
+        
+        await connector.execute(
+            statement.on_conflict_do_update(
+                index_elements = [user_common_model.user_id],
+                set_ = {'total_love': user_common_model.total_love + statement.excluded.total_love},
+            )
+        )
+        
+        HEART_LEADERBOARD.invalidate()
+
+
+class DailyClaimWriter(ClaimWriter):
+    """
+    Claim writer increasing each claimer's daily streak.
+    """
+    __slots__ = ()
+    
+    async def _write_with(self, connector, rows):
+        """
+        Increases the daily streak of every claimer. The claimers' entries are requested by one query and are written
+        with a single upsert.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        connector : ``AsyncConnection``
+            Connector to execute the statements with.
+        rows : `list` of `dict` of (`str`, `object`) items
+            The claims to write.
+        """
+        amount = self.amount
+        user_ids = [row['user_id'] for row in rows]
+        
+        response = await connector.execute(
+            select(
+                [
+                    user_common_model.user_id,
+                    user_common_model.daily_streak,
+                    user_common_model.daily_next,
+                ]
+            ).where(
+                user_common_model.user_id.in_(user_ids),
+            ).with_for_update()
+        )
+        results = await response.fetchall()
+        
+        now = datetime.utcnow()
+        existing = {}
+        for user_id, daily_streak, daily_next in results:
+            daily_streak, daily_next = calculate_daily_new(daily_streak, daily_next, now)
+            existing[user_id] = (daily_streak + amount, daily_next)
+        
+        values = []
+        for user_id in user_ids:
+            try:
+                daily_streak, daily_next = existing[user_id]
+            except KeyError:
+                daily_streak = amount
+                daily_next = None
+            
+            values.append(get_create_common_user_values(user_id, daily_streak = daily_streak, daily_next = daily_next))
+        
+        statement = insert(
+            USER_COMMON_TABLE,
+        ).values(
+            values,
+        )
+        
+        await connector.execute(
+            statement.on_conflict_do_update(
+                index_elements = [user_common_model.user_id],
+                set_ = {
+                    'daily_streak': statement.excluded.daily_streak,
+                    'daily_next': statement.excluded.daily_next,
+                },
+            )
+        )
@@ -0,0 +1,495 @@
+__all__ = (
+    'CounterCompaction', 'CounterRollupWriter', 'EMOJI_COUNTER_INSERT_PER_EVENT', 'EMOJI_COUNTER_WRITER', 'STICKER_COUNTER_WRITER',
+    'get_counter_totals_statement'
+)
+
+import config
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from hata import KOKORO
+from scarletio import Lock, RichAttributeErrorBaseType, copy_docs, sleep
+from sqlalchemy import BIGINT as Int64, and_, cast, func as alchemy_function, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.sql import desc, select
+
+from .batch_writer import BatchWriter
+from .models import (
+    DB_ENGINE, EMOJI_COUNTER_ROLLUP_TABLE, EMOJI_COUNTER_TABLE, STICKER_COUNTER_ROLLUP_TABLE, STICKER_COUNTER_TABLE
+)
+
+# Rollup tables hold one row for each day and key with the amount of raw rows matching them. Full days are read from
+# the rollups, while the current day is read from the raw rows, because that is exact and cheap.
+
+
+def get_day_start(day):
+    """
+    Returns the date time when the given day starts.
+    
+    Parameters
+    ----------
+    day : `date`
+        The day to get its start of.
+    
+    Returns
+    -------
+    day_start : `datetime`
+    """
+    return datetime(day.year, day.month, day.day)
+
+
+DAY = timedelta(days = 1)
+
+# Raw rows are deleted in batches of this size while compacting, so a busy day does not lock the table for long.
+COMPACTION_BATCH_SIZE = 5000
+
+# Pause between two deleted batches, so other statements can get to the tables.
+COMPACTION_PAUSE = 0.5
+
+
+class CounterCompaction(RichAttributeErrorBaseType):
+    """
+    Describes a compaction of a counter's raw rows.
+    
+    Attributes
+    ----------
+    cutoff : `datetime`
+        Raw rows older than this date time were compacted.
+    day_count : `int`
+        The amount of compacted days.
+    duration : `float`
+        The time spent on the compaction in seconds.
+    finished_at : `None`, `datetime`
+        When the compaction finished. `None` if it is still running.
+    row_count : `int`
+        The amount of deleted raw rows.
+    """
+    __slots__ = ('cutoff', 'day_count', 'duration', 'finished_at', 'row_count')
+    
+    def __new__(cls, cutoff):
+        """
+        Creates a new counter compaction.
+        
+        Parameters
+        ----------
+        cutoff : `datetime`
+            Raw rows older than this date time are compacted.
+        """
+        self = object.__new__(cls)
+        self.cutoff = cutoff
+        self.day_count = 0
+        self.duration = 0.0
+        self.finished_at = None
+        self.row_count = 0
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the compaction's representation."""
+        return (
+            f'<{self.__class__.__name__} cutoff = {self.cutoff:%Y-%m-%d}, day_count = {self.day_count!r}, '
+            f'row_count = {self.row_count!r}, duration = {self.duration:.3f}>'
+        )
+
+
+class CounterRollupWriter(BatchWriter):
+    """
+    Batch writer for counter tables, which also maintains the counter's daily rollup table.
+    
+    Attributes
+    ----------
+    key_names : `tuple` of `str`
+        The column names identifying a counter (besides the day), like `('user_id', 'emoji_id')`.
+    last_compaction : `None`, ``CounterCompaction``
+        The last compaction of the raw rows.
+    rollup_table : `sqlalchemy.Table`
+        The rollup table to maintain. Must have a `day` and a `count` column and a unique constraint on
+        `('day', *key_names)`.
+    _rollup_table_created : `bool`
+        Whether the rollup table is known to exist.
+    _write_lock : ``Lock``
+        Lock used to not write while the rollup is being rebuilt.
+    """
+    __slots__ = ('key_names', 'last_compaction', 'rollup_table', '_rollup_table_created', '_write_lock')
+    
+    def __new__(cls, name, table, rollup_table, key_names, **keyword_parameters):
+        """
+        Creates a new counter rollup writer.
+        
+        Parameters
+        ----------
+        name : `str`
+            The writer's name to show in stats.
+        table : `sqlalchemy.Table`
+            The raw counter table to write into. Must have a `timestamp` column.
+        rollup_table : `sqlalchemy.Table`
+            The rollup table to maintain.
+        key_names : `tuple` of `str`
+            The column names identifying a counter (besides the day).
+        **keyword_parameters : Keyword parameters
+            Additional keyword parameters passed to ``BatchWriter.__new__``.
+        """
+        self = BatchWriter.__new__(cls, name, table, **keyword_parameters)
+        self.key_names = key_names
+        self.last_compaction = None
+        self.rollup_table = rollup_table
+        self._rollup_table_created = False
+        self._write_lock = Lock(KOKORO)
+        return self
+    
+    
+    @copy_docs(BatchWriter.write)
+    async def write(self, rows):
+        # Acquire the lock before a connection, so rebuilding cannot wait for the connection held by us.
+        async with self._write_lock:
+            await self.ensure_rollup_table()
+            await BatchWriter.write(self, rows)
+    
+    
+    async def ensure_rollup_table(self):
+        """
+        Creates the rollup table if it is not known to exist yet.
+        
+        The table is created by the migrations. This covers a database which was not migrated yet, so writes, reads
+        and compactions do not fail on the missing table.
+        
+        This method is a coroutine.
+        """
+        if not self._rollup_table_created:
+            await self._create_rollup_table()
+    
+    
+    async def _create_rollup_table(self):
+        """
+        Creates the rollup table with its indexes if it does not exist yet.
+        
+        The raw rows are written in the same transaction as their rollups, so a missing rollup table would make every
+        write fail. If creating fails, the write is still attempted and is retried as any other failed write.
+        
+        This method is a coroutine.
+        """
+        rollup_table = self.rollup_table
+        
+        try:
+            if rollup_table.name not in await DB_ENGINE.table_names():
+                async with DB_ENGINE.begin() as connector:
+                    await connector.execute(CreateTable(rollup_table))
+                    for index in rollup_table.indexes:
+                        await connector.execute(CreateIndex(index))
+        
+        except Exception as err:
+            await KOKORO.render_exception_async(
+                err,
+                before = f'Exception occurred while {self!r} was creating {rollup_table.name!r}:\n',
+            )
+            return
+        
+        self._rollup_table_created = True
+    
+    
+    async def _write_with(self, connector, rows):
+        """
+        Writes the given rows and increments their rollups with the given connector.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        connector : ``AsyncConnection``
+            Connector to execute the statements with.
+        rows : `list` of `dict` of (`str`, `object`) items
+            The rows to write.
+        """
+        await BatchWriter._write_with(self, connector, rows)
+        await connector.execute(self.get_rollup_increment_expression(rows))
+    
+    
+    def get_rollup_increment_expression(self, rows):
+        """
+        Creates an upsert expression which increments the rollups of the given rows.
+        
+        Parameters
+        ----------
+        rows : `list` of `dict` of (`str`, `object`) items
+            Raw counter rows.
+        
+        Returns
+        -------
+        expression : `sqlalchemy.dialects.postgresql.Insert`
+        """
+        key_names = self.key_names
+        
+        # A single upsert cannot touch the same row twice, so count the rows by their key first.
+        counts = {}
+        for row in rows:
+            key = (row['timestamp'].date(), *(row[name] for name in key_names))
+            counts[key] = counts.get(key, 0) + 1
+        
+        rollup_rows = []
+        for key, count in counts.items():
+            rollup_row = dict(zip(key_names, key[1:]))
+            rollup_row['day'] = key[0]
+            rollup_row['count'] = count
+            rollup_rows.append(rollup_row)
+        
+        rollup_table = self.rollup_table
+        expression = insert(rollup_table).values(rollup_rows)
+        
+        return expression.on_conflict_do_update(
+            index_elements = [rollup_table.c.day, *(rollup_table.c[name] for name in key_names)],
+            set_ = {'count': rollup_table.c.count + expression.excluded.count},
+        )
+    
+    
+    def _get_rollup_fold_expression(self, after, before):
+        """
+        Creates an expression which inserts the rollups of the raw rows between the given date times.
+        
+        Parameters
+        ----------
+        after : `None`, `datetime`
+            Inclusive lower limit. `None` if not limited.
+        before : `None`, `datetime`
+            Exclusive upper limit. `None` if not limited.
+        
+        Returns
+        -------
+        expression : `sqlalchemy.sql.Insert`
+        """
+        table = self.table
+        key_columns = [table.c[name] for name in self.key_names]
+        day = alchemy_function.date(table.c.timestamp)
+        
+        conditions = []
+        if (after is not None):
+            conditions.append(table.c.timestamp >= after)
+        
+        if (before is not None):
+            conditions.append(table.c.timestamp < before)
+        
+        return self.rollup_table.insert().from_select(
+            ['day', *self.key_names, 'count'],
+            select(
+                [day, *key_columns, alchemy_function.count()],
+            ).where(
+                and_(*conditions),
+            ).group_by(
+                day,
+                *key_columns,
+            ),
+        )
+    
+    
+    async def compact(self, cutoff):
+        """
+        Deletes the raw rows older than the given date time's day. Their rollups are kept.
+        
+        The rollups already count every raw row, since they are incremented on write and the older history is folded
+        in by a migration, so the days are not folded again. That also means an interrupted compaction can be
+        continued safely. The rows of each day are deleted in batches of ``COMPACTION_BATCH_SIZE``, each in its own
+        transaction, so the tables are never locked for long.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        cutoff : `datetime`
+            Raw rows of the days before this date time's day are compacted.
+        
+        Returns
+        -------
+        compaction : ``CounterCompaction``
+        """
+        await self.ensure_rollup_table()
+        
+        cutoff = get_day_start(cutoff.date())
+        compaction = CounterCompaction(cutoff)
+        self.last_compaction = compaction
+        start = perf_counter()
+        
+        table = self.table
+        
+        while True:
+            async with DB_ENGINE.connect() as connector:
+                response = await connector.execute(
+                    select([alchemy_function.min(table.c.timestamp)]).where(table.c.timestamp < cutoff)
+                )
+                oldest = (await response.fetchone())[0]
+            
+            if oldest is None:
+                break
+            
+            day_start = get_day_start(oldest.date())
+            day_end = day_start + DAY
+            
+            batch_expression = table.delete().where(
+                table.c.id.in_(
+                    select([table.c.id]).where(
+                        and_(
+                            table.c.timestamp >= day_start,
+                            table.c.timestamp < day_end,
+                        )
+                    ).limit(COMPACTION_BATCH_SIZE)
+                )
+            )
+            
+            while True:
+                async with self._write_lock:
+                    async with DB_ENGINE.begin() as connector:
+                        response = await connector.execute(batch_expression)
+                        deleted_count = response.rowcount
+                
+                compaction.row_count += deleted_count
+                await sleep(COMPACTION_PAUSE, KOKORO)
+                
+                if deleted_count < COMPACTION_BATCH_SIZE:
+                    break
+            
+            compaction.day_count += 1
+        
+        compaction.duration = perf_counter() - start
+        compaction.finished_at = datetime.utcnow()
+        return compaction
+    
+    
+    async def rebuild_rollup(self):
+        """
+        Rebuilds the rollups of every day which has raw rows.
+        
+        Used to fold the raw rows written before the rollups were maintained. Rollups of days without raw rows are
+        left untouched.
+        
+        This method is a coroutine.
+        
+        Returns
+        -------
+        rollup_count : `int`
+            The amount of rebuilt rollup rows.
+        """
+        await self.flush()
+        await self.ensure_rollup_table()
+        
+        table = self.table
+        rollup_table = self.rollup_table
+        
+        async with self._write_lock:
+            async with DB_ENGINE.begin() as connector:
+                response = await connector.execute(select([alchemy_function.min(table.c.timestamp)]))
+                oldest = (await response.fetchone())[0]
+                if oldest is None:
+                    return 0
+                
+                await connector.execute(rollup_table.delete().where(rollup_table.c.day >= oldest.date()))
+                
+                response = await connector.execute(self._get_rollup_fold_expression(None, None))
+                return response.rowcount
+
+
+def get_counter_totals_statement(writer, group_name, filters, low_date_limit, *, by_month = False, limit = None):
+    """
+    Creates a statement which counts the rows of the given writer's counter grouped by the given column.
+    
+    Full days are counted from the rollups and only the current day from the raw rows. Call
+    ``CounterRollupWriter.ensure_rollup_table`` before executing it.
+    
+    Parameters
+    ----------
+    writer : ``CounterRollupWriter``
+        The writer of the counter.
+    group_name : `str`
+        The column's name to group by.
+    filters : `dict` of (`str`, (`object`, `list` of `object`)) items
+        Column name - value pairs to filter on. If a value is a list, the column must be in it.
+    low_date_limit : `datetime`
+        The oldest day to count is the day of this date time.
+    by_month : `bool` = `False`, Optional (Keyword only)
+        Whether the totals should be grouped by year and month as well. If given they are returned after the totals.
+    limit : `None`, `int` = `None`, Optional (Keyword only)
+        The maximal amount of results to return.
+    
+    Returns
+    -------
+    statement : `sqlalchemy.sql.Select`
+        Each result contains the grouped column's value and the total as `total`.
+    """
+    today = datetime.utcnow().date()
+    
+    raw_columns = writer.table.c
+    rollup_columns = writer.rollup_table.c
+    
+    raw_conditions = [raw_columns.timestamp >= get_day_start(today)]
+    rollup_conditions = [rollup_columns.day >= low_date_limit.date(), rollup_columns.day < today]
+    
+    for name, value in filters.items():
+        if isinstance(value, list):
+            raw_conditions.append(raw_columns[name].in_(value))
+            rollup_conditions.append(rollup_columns[name].in_(value))
+        else:
+            raw_conditions.append(raw_columns[name] == value)
+            rollup_conditions.append(rollup_columns[name] == value)
+    
+    raw_group_columns = [raw_columns[group_name].label('key')]
+    rollup_group_columns = [rollup_columns[group_name].label('key')]
+    
+    if by_month:
+        for part in ('year', 'month'):
+            raw_group_columns.append(alchemy_function.date_part(part, raw_columns.timestamp).label(part))
+            rollup_group_columns.append(alchemy_function.date_part(part, rollup_columns.day).label(part))
+    
+    parts = union_all(
+        select(
+            [*rollup_group_columns, rollup_columns.count.label('count')],
+        ).where(
+            and_(*rollup_conditions),
+        ),
+        select(
+            [*raw_group_columns, alchemy_function.count().label('count')],
+        ).where(
+            and_(*raw_conditions),
+        ).group_by(
+            *(column.element for column in raw_group_columns),
+        ),
+    ).alias('parts')
+    
+    group_columns = [parts.c.key]
+    if by_month:
+        group_columns.append(parts.c.year)
+        group_columns.append(parts.c.month)
+    
+    statement = select(
+        [parts.c.key, cast(alchemy_function.sum(parts.c.count), Int64).label('total'), *group_columns[1:]],
+    ).group_by(
+        *group_columns,
+    ).order_by(
+        desc('total'),
+    )
+    
+    if (limit is not None):
+        statement = statement.limit(limit)
+    
+    return statement
+
+
+# Rows are buffered and written in batches by default. Set it to `True` to insert them on every event instead.
+EMOJI_COUNTER_INSERT_PER_EVENT = getattr(config, 'EMOJI_COUNTER_INSERT_PER_EVENT', False)
+EMOJI_COUNTER_FLUSH_INTERVAL = getattr(config, 'EMOJI_COUNTER_FLUSH_INTERVAL', 5000) / 1000.0
+EMOJI_COUNTER_FLUSH_SIZE = getattr(config, 'EMOJI_COUNTER_FLUSH_SIZE', 200)
+
+EMOJI_COUNTER_WRITER = CounterRollupWriter(
+    'emoji counter',
+    EMOJI_COUNTER_TABLE,
+    EMOJI_COUNTER_ROLLUP_TABLE,
+    ('user_id', 'emoji_id', 'action_type'),
+    flush_interval = EMOJI_COUNTER_FLUSH_INTERVAL,
+    flush_size = EMOJI_COUNTER_FLUSH_SIZE,
+)
+
+STICKER_COUNTER_WRITER = CounterRollupWriter(
+    'sticker counter',
+    STICKER_COUNTER_TABLE,
+    STICKER_COUNTER_ROLLUP_TABLE,
+    ('user_id', 'sticker_id'),
+    flush_interval = EMOJI_COUNTER_FLUSH_INTERVAL,
+    flush_size = EMOJI_COUNTER_FLUSH_SIZE,
+)
@@ -0,0 +1,759 @@
+__all__ = ('KOKORO_POOL_STRATEGY', 'KOKOROPoolEngine',)
+
+from collections import deque as Deque
+from time import perf_counter
+
+from hata import KOKORO
+from hata.ext.kokoro_sqlalchemy.kokoro_sqlalchemy import (
+    AsyncConnection, AsyncResultProxy, AsyncResultProxyIterator, ConnectionContextManager,
+    EngineTransactionContextManager, KOKOROEngine
+)
+from scarletio import ExecutorThread, Future, RichAttributeErrorBaseType, alchemy_incendiary
+from sqlalchemy.engine.strategies import DefaultEngineStrategy
+
+from .query_stats import QueryStatistics, SLOW_QUERY_THRESHOLD_DEFAULT, get_call_site, get_statement_text
+
+
+KOKORO_POOL_STRATEGY = 'KOKORO_POOL'
+
+WORKER_COUNT_DEFAULT = 1
+# `0` means unlimited. A caller holding a connection while awaiting an other one would dead-lock on a capped worker,
+# so capping is opt-in.
+CONNECTIONS_PER_WORKER_DEFAULT = 0
+QUEUE_LIMIT_DEFAULT = 1000
+
+
+class DatabaseWorker(RichAttributeErrorBaseType):
+    """
+    A database worker thread with its bookkeeping.
+    
+    Attributes
+    ----------
+    connection_count : `int`
+        How much connections are bound to the worker right now.
+    executor : ``ExecutorThread``
+        The executor thread which runs every database call of the connections bound to it.
+    index : `int`
+        The worker's index inside of its engine.
+    use_count : `int`
+        How much times a connection was bound to the worker.
+    """
+    __slots__ = ('connection_count', 'executor', 'index', 'use_count')
+    
+    def __new__(cls, index):
+        """
+        Creates a new database worker.
+        
+        Parameters
+        ----------
+        index : `int`
+            The worker's index inside of its engine.
+        """
+        self = object.__new__(cls)
+        self.connection_count = 0
+        self.executor = ExecutorThread()
+        self.index = index
+        self.use_count = 0
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the database worker's representation."""
+        return (
+            f'<{self.__class__.__name__} index = {self.index!r}, connection_count = {self.connection_count!r}, '
+            f'queue_length = {self.get_queue_length()!r}>'
+        )
+    
+    
+    def get_queue_length(self):
+        """
+        Returns how much calls are waiting to be executed on the worker's thread.
+        
+        Returns
+        -------
+        queue_length : `int`
+        """
+        return len(self.executor.queue)
+
+
+class DatabasePoolStatistics(RichAttributeErrorBaseType):
+    """
+    Metrics collected by a ``KOKOROPoolEngine``.
+    
+    Attributes
+    ----------
+    acquire_count : `int`
+        How much times a worker was acquired.
+    queue_depth_peak : `int`
+        The highest queue depth measured.
+    rejected_count : `int`
+        How much acquire was rejected, because the queue was full.
+    wait_count : `int`
+        How much acquires had to wait in queue.
+    wait_time_max : `float`
+        The longest time an acquire spent in the queue in seconds.
+    wait_time_total : `float`
+        The total time spent in the queue by acquires in seconds.
+    """
+    __slots__ = (
+        'acquire_count', 'queue_depth_peak', 'rejected_count', 'wait_count', 'wait_time_max', 'wait_time_total'
+    )
+    
+    def __new__(cls):
+        """
+        Creates a new database pool statistics instance.
+        """
+        self = object.__new__(cls)
+        self.acquire_count = 0
+        self.queue_depth_peak = 0
+        self.rejected_count = 0
+        self.wait_count = 0
+        self.wait_time_max = 0.0
+        self.wait_time_total = 0.0
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the statistics' representation."""
+        return (
+            f'<{self.__class__.__name__} acquire_count = {self.acquire_count!r}, wait_count = {self.wait_count!r}, '
+            f'wait_time_average = {self.wait_time_average:.6f}, wait_time_max = {self.wait_time_max:.6f}, '
+            f'queue_depth_peak = {self.queue_depth_peak!r}, rejected_count = {self.rejected_count!r}>'
+        )
+    
+    
+    @property
+    def wait_time_average(self):
+        """
+        Returns the average time spent in the queue by the acquires which had to wait.
+        
+        Returns
+        -------
+        wait_time_average : `float`
+        """
+        wait_count = self.wait_count
+        if wait_count:
+            return self.wait_time_total / wait_count
+        
+        return 0.0
+    
+    
+    def feed_wait(self, wait_time):
+        """
+        Feeds a waited acquire.
+        
+        Parameters
+        ----------
+        wait_time : `float`
+            The time spent in queue.
+        """
+        self.wait_count += 1
+        self.wait_time_total += wait_time
+        if wait_time > self.wait_time_max:
+            self.wait_time_max = wait_time
+
+
+class CountingAsyncResultProxyIterator(AsyncResultProxyIterator):
+    """
+    Asynchronous result iterator which counts the fetched rows into a ``QueryShapeStatistics``.
+    
+    Attributes
+    ----------
+    _shape_statistics : ``QueryShapeStatistics``
+        The statistics to count the rows into.
+    """
+    __slots__ = ('_shape_statistics',)
+    
+    def __init__(self, result_proxy, executor, shape_statistics):
+        """
+        Creates a new counting result iterator.
+        
+        Parameters
+        ----------
+        result_proxy : `sqlalchemy.engine.ResultProxy`
+            The wrapped result proxy.
+        executor : ``ExecutorThread``
+            The executor to fetch the rows on.
+        shape_statistics : ``QueryShapeStatistics``
+            The statistics to count the rows into.
+        """
+        AsyncResultProxyIterator.__init__(self, result_proxy, executor)
+        self._shape_statistics = shape_statistics
+    
+    
+    async def __anext__(self):
+        row = await AsyncResultProxyIterator.__anext__(self)
+        self._shape_statistics.row_count += 1
+        return row
+
+
+class CountingAsyncResultProxy(AsyncResultProxy):
+    """
+    Asynchronous result proxy which counts the fetched rows into a ``QueryShapeStatistics``.
+    
+    Attributes
+    ----------
+    _shape_statistics : ``QueryShapeStatistics``
+        The statistics to count the rows into.
+    """
+    __slots__ = ('_shape_statistics',)
+    
+    def __init__(self, result_proxy, executor, shape_statistics):
+        """
+        Creates a new counting result proxy.
+        
+        Parameters
+        ----------
+        result_proxy : `sqlalchemy.engine.ResultProxy`
+            The wrapped result proxy.
+        executor : ``ExecutorThread``
+            The executor to fetch the rows on.
+        shape_statistics : ``QueryShapeStatistics``
+            The statistics to count the rows into.
+        """
+        AsyncResultProxy.__init__(self, result_proxy, executor)
+        self._shape_statistics = shape_statistics
+    
+    
+    def __aiter__(self):
+        return CountingAsyncResultProxyIterator(self._result_proxy, self.executor, self._shape_statistics)
+    
+    
+    async def fetchone(self):
+        row = await AsyncResultProxy.fetchone(self)
+        if (row is not None):
+            self._shape_statistics.row_count += 1
+        return row
+    
+    
+    async def fetchmany(self, size = None):
+        rows = await AsyncResultProxy.fetchmany(self, size)
+        self._shape_statistics.row_count += len(rows)
+        return rows
+    
+    
+    async def fetchall(self):
+        rows = await AsyncResultProxy.fetchall(self)
+        self._shape_statistics.row_count += len(rows)
+        return rows
+    
+    
+    async def scalar(self):
+        # `scalar` returns `None` for both no row and `NULL` value, so count by the first row instead.
+        row = await self.first()
+        if row is None:
+            return None
+        return row[0]
+    
+    
+    async def first(self):
+        row = await AsyncResultProxy.first(self)
+        if (row is not None):
+            self._shape_statistics.row_count += 1
+        return row
+
+
+async def execute_timed(query_statistics, executor, function, args, kwargs):
+    """
+    Executes a statement on the given executor, feeding its duration into the given query statistics.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    query_statistics : ``QueryStatistics``
+        The statistics to feed.
+    executor : ``ExecutorThread``
+        The executor to execute the statement on.
+    function : `callable`
+        The synchronous `execute` method to call.
+    args : `tuple` of `object`
+        Positional parameters to call `function` with. The first one is the statement.
+    kwargs : `dict` of (`str`, `object`) items
+        Keyword parameters to call `function` with.
+    
+    Returns
+    -------
+    result_proxy : ``CountingAsyncResultProxy``
+    """
+    call_site = get_call_site()
+    start = perf_counter()
+    
+    try:
+        result_proxy = await executor.execute(alchemy_incendiary(function, args, kwargs))
+    except:
+        query_statistics.feed_execution(
+            get_statement_text(args[0] if args else None), call_site, perf_counter() - start, True
+        )
+        raise
+    
+    # The context holds the statement as it was sent to the database, so we do not need to compile it again.
+    shape_statistics = query_statistics.feed_execution(
+        result_proxy.context.statement, call_site, perf_counter() - start, False
+    )
+    return CountingAsyncResultProxy(result_proxy, executor, shape_statistics)
+
+
+class TimedAsyncConnection(AsyncConnection):
+    """
+    Asynchronous connection which feeds the duration of its statements into a ``QueryStatistics``.
+    
+    Attributes
+    ----------
+    _query_statistics : ``QueryStatistics``
+        The statistics to feed.
+    """
+    __slots__ = ('_query_statistics',)
+    
+    def __init__(self, connection, executor, query_statistics):
+        """
+        Creates a new timed connection.
+        
+        Parameters
+        ----------
+        connection : `sqlalchemy.engine.Connection`
+            The wrapped connection.
+        executor : ``ExecutorThread``
+            The executor to execute the statements on.
+        query_statistics : ``QueryStatistics``
+            The statistics to feed.
+        """
+        AsyncConnection.__init__(self, connection, executor)
+        self._query_statistics = query_statistics
+    
+    
+    async def execute(self, *args, **kwargs):
+        return await execute_timed(self._query_statistics, self.executor, self._connection.execute, args, kwargs)
+    
+    
+    async def scalar(self, *args, **kwargs):
+        async_result_proxy = await self.execute(*args, **kwargs)
+        return await async_result_proxy.scalar()
+
+
+class PooledAsyncConnection(TimedAsyncConnection):
+    """
+    Asynchronous connection bound to a database worker of a ``KOKOROPoolEngine``.
+    
+    Every call of the connection, including its transactions, are executed on the same worker.
+    
+    Attributes
+    ----------
+    _engine : `None`, ``KOKOROPoolEngine``
+        The parent engine. Set as `None` after the worker was released.
+    _worker : ``DatabaseWorker``
+        The worker the connection is bound to.
+    """
+    __slots__ = ('_engine', '_worker')
+    
+    def __init__(self, connection, engine, worker):
+        """
+        Creates a new pooled connection.
+        
+        Parameters
+        ----------
+        connection : `sqlalchemy.engine.Connection`
+            The wrapped connection.
+        engine : ``KOKOROPoolEngine``
+            The parent engine.
+        worker : ``DatabaseWorker``
+            The worker the connection is bound to.
+        """
+        TimedAsyncConnection.__init__(self, connection, worker.executor, engine.query_statistics)
+        self._engine = engine
+        self._worker = worker
+    
+    
+    async def close(self, *args, **kwargs):
+        try:
+            await TimedAsyncConnection.close(self, *args, **kwargs)
+        finally:
+            self._release()
+    
+    
+    def _release(self):
+        """
+        Releases the connection's worker. Can be called multiple times.
+        """
+        engine = self._engine
+        if (engine is not None):
+            self._engine = None
+            engine._release_worker(self._worker)
+
+
+class PooledEngineTransactionContextManager(EngineTransactionContextManager):
+    """
+    Engine level transaction context manager which holds a worker of ``KOKOROPoolEngine`` while entered.
+    
+    Attributes
+    ----------
+    _worker : `None`, ``DatabaseWorker``
+        The acquired worker.
+    """
+    __slots__ = ('_worker',)
+    
+    def __init__(self, engine, close_with_result):
+        """
+        Creates a new transaction context manager.
+        
+        Parameters
+        ----------
+        engine : ``KOKOROPoolEngine``
+            The parent engine.
+        close_with_result : `bool`
+            Whether the connection should be closed when its result is exhausted.
+        """
+        EngineTransactionContextManager.__init__(self, engine, close_with_result, None)
+        self._worker = None
+    
+    
+    async def __aenter__(self):
+        worker = await self._engine._acquire_worker()
+        self._worker = worker
+        self.executor = worker.executor
+        
+        try:
+            self._context = await self.executor.execute(
+                alchemy_incendiary(self._engine._engine.begin, (self._close_with_result,))
+            )
+            return TimedAsyncConnection(self._context.__enter__(), self.executor, self._engine.query_statistics)
+        except:
+            self._release()
+            raise
+    
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            return await EngineTransactionContextManager.__aexit__(self, exc_type, exc_val, exc_tb)
+        finally:
+            self._release()
+    
+    
+    def _release(self):
+        """
+        Releases the acquired worker if any.
+        """
+        worker = self._worker
+        if (worker is not None):
+            self._worker = None
+            self._engine._release_worker(worker)
+
+
+class KOKOROPoolEngine(KOKOROEngine):
+    """
+    Kokoro engine which distributes its connections between multiple worker threads.
+    
+    A connection is bound to the least used worker when created and every statement and transaction of it is executed
+    on the same worker. If `connections_per_worker` is set, each worker holds up to that many connections; further
+    connection requests wait in a bounded queue.
+    
+    Attributes
+    ----------
+    connections_per_worker : `int`
+        How much connections a worker can hold at the same time. `0` means unlimited.
+    query_statistics : ``QueryStatistics``
+        Per statement shape metrics.
+    queue_limit : `int`
+        The maximal amount of connection requests waiting for a worker. Above it connection requests are rejected.
+    statistics : ``DatabasePoolStatistics``
+        Collected metrics.
+    _waiters : `Deque` of `tuple` (``Future``, `float`)
+        Queued connection requests with the time they were queued at.
+    _workers : `tuple` of ``DatabaseWorker``
+        The engine's workers.
+    """
+    __slots__ = ('connections_per_worker', 'query_statistics', 'queue_limit', 'statistics', '_waiters', '_workers')
+    
+    def __init__(
+        self,
+        pool,
+        dialect,
+        u,
+        worker_count = WORKER_COUNT_DEFAULT,
+        connections_per_worker = CONNECTIONS_PER_WORKER_DEFAULT,
+        queue_limit = QUEUE_LIMIT_DEFAULT,
+        slow_query_threshold = SLOW_QUERY_THRESHOLD_DEFAULT,
+        **kwargs,
+    ):
+        """
+        Creates a new pooled engine. Called by `sqlalchemy.create_engine` when using ``KOKORO_POOL_STRATEGY``.
+        
+        Parameters
+        ----------
+        pool : `sqlalchemy.pool.Pool`
+            Connection pool.
+        dialect : `sqlalchemy.engine.interfaces.Dialect`
+            Database dialect.
+        u : `sqlalchemy.engine.url.URL`
+            Database url.
+        worker_count : `int` = `WORKER_COUNT_DEFAULT`, Optional
+            The amount of worker threads to use.
+        connections_per_worker : `int` = `CONNECTIONS_PER_WORKER_DEFAULT`, Optional
+            How much connections a worker can hold at the same time. `0` means unlimited.
+            
+            When capped, code holding a connection must not wait for an other one, because it can dead-lock if every
+            connection slot is used up.
+        queue_limit : `int` = `QUEUE_LIMIT_DEFAULT`, Optional
+            The maximal amount of connection requests waiting for a worker.
+        slow_query_threshold : `float` = `SLOW_QUERY_THRESHOLD_DEFAULT`, Optional
+            Statements executing longer than this amount of seconds are logged as slow.
+        **kwargs : Keyword parameters
+            Additional keyword parameters passed to `sqlalchemy.engine.Engine`.
+        """
+        if worker_count < 1:
+            worker_count = 1
+        
+        if connections_per_worker < 0:
+            connections_per_worker = 0
+        
+        if queue_limit < 0:
+            queue_limit = 0
+        
+        KOKOROEngine.__init__(self, pool, dialect, u, single_worker = False, **kwargs)
+        
+        self.connections_per_worker = connections_per_worker
+        self.query_statistics = QueryStatistics(slow_query_threshold)
+        self.queue_limit = queue_limit
+        self.statistics = DatabasePoolStatistics()
+        self._waiters = Deque()
+        self._workers = tuple(DatabaseWorker(index) for index in range(worker_count))
+    
+    
+    def __repr__(self):
+        """Returns the engine's representation."""
+        return (
+            f'<{self.__class__.__name__} worker_count = {self.worker_count!r}, '
+            f'connections_per_worker = {self.connections_per_worker!r}, queue_depth = {self.queue_depth!r}>'
+        )
+    
+    
+    @property
+    def uses_single_worker(self):
+        """
+        Returns whether the engine uses a single worker.
+        
+        Returns
+        -------
+        uses_single_worker : `bool`
+        """
+        return len(self._workers) == 1
+    
+    
+    @property
+    def worker_count(self):
+        """
+        Returns how much worker threads the engine uses.
+        
+        Returns
+        -------
+        worker_count : `int`
+        """
+        return len(self._workers)
+    
+    
+    @property
+    def queue_depth(self):
+        """
+        Returns how much connection requests are waiting for a worker.
+        
+        Returns
+        -------
+        queue_depth : `int`
+        """
+        return len(self._waiters)
+    
+    
+    @property
+    def workers(self):
+        """
+        Returns the engine's workers.
+        
+        Returns
+        -------
+        workers : `tuple` of ``DatabaseWorker``
+        """
+        return self._workers
+    
+    
+    def _get_free_worker(self):
+        """
+        Returns the least used worker which can take a new connection.
+        
+        Returns
+        -------
+        worker : `None`, ``DatabaseWorker``
+        """
+        selected_worker = None
+        connections_per_worker = self.connections_per_worker
+        
+        for worker in self._workers:
+            connection_count = worker.connection_count
+            if connections_per_worker and (connection_count >= connections_per_worker):
+                continue
+            
+            if (selected_worker is None) or (connection_count < selected_worker.connection_count):
+                selected_worker = worker
+        
+        return selected_worker
+    
+    
+    def _bind_worker(self, worker):
+        """
+        Marks the given worker as used by a new connection.
+        
+        Parameters
+        ----------
+        worker : ``DatabaseWorker``
+            The worker to bind.
+        """
+        worker.connection_count += 1
+        worker.use_count += 1
+        self.statistics.acquire_count += 1
+    
+    
+    async def _acquire_worker(self):
+        """
+        Acquires a worker for a new connection. If every worker is fully used, waits in queue.
+        
+        This method is a coroutine.
+        
+        Returns
+        -------
+        worker : ``DatabaseWorker``
+        
+        Raises
+        ------
+        ConnectionError
+            - The queue is full.
+        """
+        waiters = self._waiters
+        if not waiters:
+            worker = self._get_free_worker()
+            if (worker is not None):
+                self._bind_worker(worker)
+                return worker
+        
+        statistics = self.statistics
+        if len(waiters) >= self.queue_limit:
+            statistics.rejected_count += 1
+            raise ConnectionError(
+                f'{self.__class__.__name__} queue is full; queue_limit = {self.queue_limit!r}.'
+            )
+        
+        waiter = Future(KOKORO)
+        waiters.append((waiter, perf_counter()))
+        
+        queue_depth = len(waiters)
+        if queue_depth > statistics.queue_depth_peak:
+            statistics.queue_depth_peak = queue_depth
+        
+        # `_release_worker` binds the worker before passing it, so we do not need to do anything else here.
+        try:
+            return await waiter
+        except:
+            # If we were cancelled after a worker was passed to us, pass it forward.
+            if waiter.is_done() and (not waiter.is_cancelled()) and (waiter.get_exception() is None):
+                self._release_worker(waiter.get_result())
+            raise
+    
+    
+    def _release_worker(self, worker):
+        """
+        Releases the worker of a closed connection, passing it to the next queued connection request if applicable.
+        
+        Parameters
+        ----------
+        worker : ``DatabaseWorker``
+            The worker to release.
+        """
+        worker.connection_count -= 1
+        
+        waiters = self._waiters
+        while waiters:
+            waiter, queued_at = waiters[0]
+            if not waiter.is_pending():
+                waiters.popleft()
+                continue
+            
+            worker = self._get_free_worker()
+            if worker is None:
+                break
+            
+            waiters.popleft()
+            self._bind_worker(worker)
+            self.statistics.feed_wait(perf_counter() - queued_at)
+            waiter.set_result(worker)
+            continue
+    
+    
+    def connect(self):
+        return ConnectionContextManager(self._connect())
+    
+    
+    async def _connect(self):
+        worker = await self._acquire_worker()
+        try:
+            connection = await worker.executor.execute(self._engine.connect)
+        except:
+            self._release_worker(worker)
+            raise
+        
+        return PooledAsyncConnection(connection, self, worker)
+    
+    
+    def begin(self, close_with_result = False):
+        return PooledEngineTransactionContextManager(self, close_with_result)
+    
+    
+    async def execute(self, *args, **kwargs):
+        worker = await self._acquire_worker()
+        try:
+            return await execute_timed(self.query_statistics, worker.executor, self._engine.execute, args, kwargs)
+        finally:
+            self._release_worker(worker)
+    
+    
+    async def scalar(self, *args, **kwargs):
+        async_result_proxy = await self.execute(*args, **kwargs)
+        return await async_result_proxy.scalar()
+    
+    
+    async def table_names(self, schema = None, connection = None):
+        worker = await self._acquire_worker()
+        try:
+            return await worker.executor.execute(
+                alchemy_incendiary(
+                    self._engine.table_names, (schema, None if connection is None else connection._connection)
+                )
+            )
+        finally:
+            self._release_worker(worker)
+    
+    
+    def dispose(self):
+        """
+        Disposes the engine's connection pool and stops its workers. The engine should not be used after.
+        """
+        self._engine.dispose()
+        self._cancel_workers()
+    
+    
+    def _cancel_workers(self):
+        """
+        Stops the engine's workers.
+        """
+        workers = self._workers
+        self._workers = ()
+        for worker in workers:
+            worker.executor.cancel()
+    
+    
+    def __del__(self):
+        self._cancel_workers()
+
+
+class KOKOROPoolEngineStrategy(DefaultEngineStrategy):
+    name = KOKORO_POOL_STRATEGY
+    engine_cls = KOKOROPoolEngine
+
+KOKOROPoolEngineStrategy()
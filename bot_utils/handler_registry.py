@@ -0,0 +1,280 @@
+__all__ = ('HANDLER_REGISTRIES', 'HandlerRegistry')
+
+from collections import OrderedDict
+
+from hata import KOKORO
+from scarletio import LOOP_TIME, RichAttributeErrorBaseType
+
+HANDLER_REGISTRIES = {}
+
+SWEEP_INTERVAL = 300.0
+
+
+class HandlerRegistryEntry(RichAttributeErrorBaseType):
+    """
+    A handler stored by a ``HandlerRegistry``.
+    
+    Attributes
+    ----------
+    handler : ``ImageHandlerBase``
+        The stored handler.
+    last_used_at : `float`
+        When the handler was last used in loop time.
+    use_count : `int`
+        How much times the handler was used.
+    """
+    __slots__ = ('handler', 'last_used_at', 'use_count')
+    
+    def __new__(cls, handler):
+        """
+        Creates a new handler registry entry.
+        
+        Parameters
+        ----------
+        handler : ``ImageHandlerBase``
+            The handler to store.
+        """
+        self = object.__new__(cls)
+        self.handler = handler
+        self.last_used_at = LOOP_TIME()
+        self.use_count = 0
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the entry's representation."""
+        return f'<{self.__class__.__name__} handler = {self.handler!r}, use_count = {self.use_count!r}>'
+
+
+class HandlerRegistry(RichAttributeErrorBaseType):
+    """
+    Registry of lazily created image handlers.
+    
+    If the registry is above its limits, the least recently used handlers are removed from it. Handlers not used for
+    ``.idle_timeout`` seconds are removed periodically. Pinned handlers are never removed.
+    
+    Attributes
+    ----------
+    _entries : `OrderedDict` of (`object`, ``HandlerRegistryEntry``) items
+        The stored handlers in least recently used order.
+    _sweep_handle : `None`, ``TimerHandle``
+        Handle of the next sweep. Only scheduled while there is any handler stored.
+    cached_image_limit : `int`
+        The maximal amount of images cached by the stored handlers. `0` if not limited.
+    eviction_count : `int`
+        How much handlers were removed.
+    idle_timeout : `float`
+        Seconds after an unused handler is removed.
+    name : `str`
+        The registry's name.
+    pin_check : `None`, `FunctionType`
+        Returns whether the handler of the given key can be pinned.
+    pin_use_count : `int`
+        The amount of uses after a pinnable handler is pinned.
+    size_limit : `int`
+        The maximal amount of stored handlers.
+    """
+    __slots__ = (
+        '_entries', '_sweep_handle', 'cached_image_limit', 'eviction_count', 'idle_timeout', 'name', 'pin_check',
+        'pin_use_count', 'size_limit'
+    )
+    
+    def __new__(
+        cls, name, *, cached_image_limit = 0, idle_timeout = 3600.0, pin_check = None, pin_use_count = 0,
+        size_limit = 256
+    ):
+        """
+        Creates a new handler registry and registers it into ``HANDLER_REGISTRIES``. A registry created with the
+        same name, for example by a reloaded plugin, replaces the old one, which is cleared.
+        
+        Parameters
+        ----------
+        name : `str`
+            The registry's name.
+        cached_image_limit : `int` = `0`, Optional (Keyword only)
+            The maximal amount of images cached by the stored handlers. `0` if not limited.
+        idle_timeout : `float` = `3600.0`, Optional (Keyword only)
+            Seconds after an unused handler is removed.
+        pin_check : `None`, `FunctionType` = `None`, Optional (Keyword only)
+            Returns whether the handler of the given key can be pinned.
+        pin_use_count : `int` = `0`, Optional (Keyword only)
+            The amount of uses after a pinnable handler is pinned.
+        size_limit : `int` = `256`, Optional (Keyword only)
+            The maximal amount of stored handlers.
+        """
+        self = object.__new__(cls)
+        self._entries = OrderedDict()
+        self._sweep_handle = None
+        self.cached_image_limit = cached_image_limit
+        self.eviction_count = 0
+        self.idle_timeout = idle_timeout
+        self.name = name
+        self.pin_check = pin_check
+        self.pin_use_count = pin_use_count
+        self.size_limit = size_limit
+        
+        old_registry = HANDLER_REGISTRIES.get(name, None)
+        if (old_registry is not None):
+            old_registry.clear()
+        
+        HANDLER_REGISTRIES[name] = self
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the registry's representation."""
+        return f'<{self.__class__.__name__} name = {self.name!r}, size = {len(self._entries)!r}>'
+    
+    
+    def __len__(self):
+        """Returns how much handlers are stored."""
+        return len(self._entries)
+    
+    
+    def __contains__(self, key):
+        """Returns whether the handler of the given key is stored."""
+        return key in self._entries
+    
+    
+    def get(self, key, factory):
+        """
+        Returns the handler of the given key. If not stored, creates it.
+        
+        Parameters
+        ----------
+        key : `object`
+            The handler's key.
+        factory : `FunctionType`
+            Creates the handler if required.
+        
+        Returns
+        -------
+        handler : ``ImageHandlerBase``
+        """
+        entries = self._entries
+        try:
+            entry = entries[key]
+        except KeyError:
+            entry = HandlerRegistryEntry(factory())
+            entries[key] = entry
+            self._evict()
+            
+            if self._sweep_handle is None:
+                self._sweep_handle = KOKORO.call_later(SWEEP_INTERVAL, self._sweep)
+        
+        else:
+            entries.move_to_end(key)
+        
+        entry.last_used_at = LOOP_TIME()
+        entry.use_count += 1
+        return entry.handler
+    
+    
+    def _is_pinned(self, key, entry):
+        """
+        Returns whether the given entry is pinned.
+        
+        Parameters
+        ----------
+        key : `object`
+            The handler's key.
+        entry : ``HandlerRegistryEntry``
+            The entry to check.
+        
+        Returns
+        -------
+        pinned : `bool`
+        """
+        pin_check = self.pin_check
+        if pin_check is None:
+            return False
+        
+        return (entry.use_count >= self.pin_use_count) and pin_check(key)
+    
+    
+    def get_pinned_count(self):
+        """
+        Returns how much handlers are pinned.
+        
+        Returns
+        -------
+        pinned_count : `int`
+        """
+        return sum(self._is_pinned(key, entry) for key, entry in self._entries.items())
+    
+    
+    def get_cached_image_count(self):
+        """
+        Returns how much images are cached by the stored handlers.
+        
+        Returns
+        -------
+        cached_image_count : `int`
+        """
+        return sum(entry.handler.get_cached_image_count() for entry in self._entries.values())
+    
+    
+    def _evict(self):
+        """
+        Removes the least recently used not pinned handlers while the registry is above its limits.
+        """
+        entries = self._entries
+        size_limit = self.size_limit
+        cached_image_limit = self.cached_image_limit
+        
+        if cached_image_limit:
+            cached_image_count = self.get_cached_image_count()
+        else:
+            cached_image_count = 0
+        
+        if not (
+            (size_limit and (len(entries) > size_limit)) or
+            (cached_image_limit and (cached_image_count > cached_image_limit))
+        ):
+            return
+        
+        for key, entry in [*entries.items()]:
+            if self._is_pinned(key, entry):
+                continue
+            
+            del entries[key]
+            self.eviction_count += 1
+            cached_image_count -= entry.handler.get_cached_image_count()
+            
+            if not (
+                (size_limit and (len(entries) > size_limit)) or
+                (cached_image_limit and (cached_image_count > cached_image_limit))
+            ):
+                break
+    
+    
+    def _sweep(self):
+        """
+        Removes the idle not pinned handlers. Reschedules itself while there is any handler left.
+        """
+        entries = self._entries
+        idle_before = LOOP_TIME() - self.idle_timeout
+        
+        for key, entry in [*entries.items()]:
+            if (entry.last_used_at < idle_before) and (not self._is_pinned(key, entry)):
+                del entries[key]
+                self.eviction_count += 1
+        
+        self._evict()
+        
+        if entries:
+            self._sweep_handle = KOKORO.call_later(SWEEP_INTERVAL, self._sweep)
+        else:
+            self._sweep_handle = None
+    
+    
+    def clear(self):
+        """
+        Removes every handler.
+        """
+        self._entries.clear()
+        
+        sweep_handle = self._sweep_handle
+        if (sweep_handle is not None):
+            self._sweep_handle = None
+            sweep_handle.cancel()
@@ -0,0 +1,447 @@
+__all__ = ('HEART_LEADERBOARD', 'resolve_users')
+
+from time import monotonic
+
+from hata import DiscordException, ERROR_CODES, KOKORO, USERS, ZEROUSER
+from scarletio import RichAttributeErrorBaseType, Task, TaskGroup
+from sqlalchemy import and_, func, tuple_
+from sqlalchemy.sql import desc, select
+
+from .models import DB_ENGINE, user_common_model
+from .user_getter import get_user
+
+# Users are ranked by their `total_love` descending, ties by their identifier descending. The order is total, so the
+# last shown entry can be used as the key of the next page. Both columns are sorted in the same direction, so the
+# keys are compared as row values and the `(total_love, user_id)` index is scanned backwards for both the pages and
+# the rank counts.
+
+SNAPSHOT_SIZE = 10000
+SNAPSHOT_REFRESH_INTERVAL = 60.0
+
+# Hearts change on almost every message, so an invalidated snapshot is still used for a few seconds instead of
+# requesting a new one on every access.
+SNAPSHOT_INVALIDATED_REFRESH_INTERVAL = 5.0
+
+
+class LeaderboardSnapshot(RichAttributeErrorBaseType):
+    """
+    The top of the heart leaderboard at a given time.
+    
+    Attributes
+    ----------
+    complete : `bool`
+        Whether every ranked user is in the snapshot.
+    created_at : `float`
+        Monotonic time when the snapshot was created.
+    ranks : `list` of `tuple` (`int`, `int`)
+        `user id` - `total love` pairs by rank. The first element is the first rank.
+    rank_by_user_id : `dict` of (`int`, `int`) items
+        User identifier - index in ``.ranks`` relation.
+    requested_ranks : `dict` of (`int`, `tuple` (`int`, `int`)) items
+        User identifier - (rank, total love) relation of the already requested users outside of the snapshot.
+    """
+    __slots__ = ('complete', 'created_at', 'ranks', 'rank_by_user_id', 'requested_ranks')
+    
+    def __new__(cls, ranks, complete):
+        """
+        Creates a new leaderboard snapshot.
+        
+        Parameters
+        ----------
+        ranks : `list` of `tuple` (`int`, `int`)
+            `user id` - `total love` pairs by rank.
+        complete : `bool`
+            Whether every ranked user is in the snapshot.
+        """
+        self = object.__new__(cls)
+        self.complete = complete
+        self.created_at = monotonic()
+        self.ranks = ranks
+        self.rank_by_user_id = {user_id: index for index, (user_id, total_love) in enumerate(ranks)}
+        self.requested_ranks = {}
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the snapshot's representation."""
+        return f'<{self.__class__.__name__} size = {len(self.ranks)!r}, complete = {self.complete!r}>'
+
+
+def _get_ranked_condition():
+    """
+    Returns the where clause matching the ranked users.
+    
+    Returns
+    -------
+    where_clause : `sqlalchemy.sql.ClauseElement`
+    """
+    return user_common_model.total_love != 0
+
+
+def _get_after_condition(total_love, user_id):
+    """
+    Returns the where clause matching the users ranked after the given key.
+    
+    Parameters
+    ----------
+    total_love : `int`
+        The key's total love.
+    user_id : `int`
+        The key's user identifier.
+    
+    Returns
+    -------
+    where_clause : `sqlalchemy.sql.ClauseElement`
+    """
+    return tuple_(user_common_model.total_love, user_common_model.user_id) < tuple_(total_love, user_id)
+
+
+def _get_before_condition(total_love, user_id):
+    """
+    Returns the where clause matching the users ranked before the given key.
+    
+    Parameters
+    ----------
+    total_love : `int`
+        The key's total love.
+    user_id : `int`
+        The key's user identifier.
+    
+    Returns
+    -------
+    where_clause : `sqlalchemy.sql.ClauseElement`
+    """
+    return tuple_(user_common_model.total_love, user_common_model.user_id) > tuple_(total_love, user_id)
+
+
+async def _request_ranks(after, offset, limit):
+    """
+    Requests ranked users after the given key.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    after : `None`, `tuple` (`int`, `int`)
+        `user id` - `total love` pair to request the users after. `None` to start from the first rank.
+    offset : `int`
+        The amount of users to skip after the key.
+    limit : `int`
+        The maximal amount of users to request.
+    
+    Returns
+    -------
+    ranks : `list` of `tuple` (`int`, `int`)
+        `user id` - `total love` pairs by rank.
+    """
+    where_clause = _get_ranked_condition()
+    if (after is not None):
+        user_id, total_love = after
+        where_clause = and_(where_clause, _get_after_condition(total_love, user_id))
+    
+    statement = select(
+        [
+            user_common_model.user_id,
+            user_common_model.total_love,
+        ]
+    ).where(
+        where_clause,
+    ).order_by(
+        desc(user_common_model.total_love),
+        desc(user_common_model.user_id),
+    ).limit(
+        limit,
+    )
+    
+    if offset:
+        statement = statement.offset(offset)
+    
+    async with DB_ENGINE.connect() as connector:
+        response = await connector.execute(statement)
+        results = await response.fetchall()
+    
+    return [(user_id, total_love) for user_id, total_love in results]
+
+
+class HeartLeaderboard(RichAttributeErrorBaseType):
+    """
+    Heart leaderboard serving its pages from a periodically refreshed snapshot.
+    
+    Pages past the snapshot are requested from the database starting from the snapshot's last entry.
+    
+    Attributes
+    ----------
+    snapshot : `None`, ``LeaderboardSnapshot``
+        The last snapshot.
+    snapshot_task : `None`, ``Task``
+        The running snapshot request.
+    """
+    __slots__ = ('snapshot', 'snapshot_task')
+    
+    def __new__(cls):
+        """
+        Creates a new heart leaderboard.
+        """
+        self = object.__new__(cls)
+        self.snapshot = None
+        self.snapshot_task = None
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the leaderboard's representation."""
+        return f'<{self.__class__.__name__} snapshot = {self.snapshot!r}>'
+    
+    
+    async def get_snapshot(self):
+        """
+        Returns the leaderboard's snapshot.
+        
+        A stale snapshot is returned as-is while a new one is requested in the background. Only the first call waits
+        for the database.
+        
+        This method is a coroutine.
+        
+        Returns
+        -------
+        snapshot : ``LeaderboardSnapshot``
+        """
+        snapshot = self.snapshot
+        if (snapshot is not None) and (monotonic() - snapshot.created_at < SNAPSHOT_REFRESH_INTERVAL):
+            return snapshot
+        
+        snapshot_task = self.snapshot_task
+        if snapshot_task is None:
+            snapshot_task = Task(self._request_snapshot(), KOKORO)
+            self.snapshot_task = snapshot_task
+        
+        if snapshot is None:
+            return await snapshot_task
+        
+        return snapshot
+    
+    
+    async def _request_snapshot(self):
+        """
+        Requests a new snapshot.
+        
+        This method is a coroutine.
+        
+        Returns
+        -------
+        snapshot : ``LeaderboardSnapshot``
+        """
+        try:
+            ranks = await _request_ranks(None, 0, SNAPSHOT_SIZE)
+            snapshot = LeaderboardSnapshot(ranks, len(ranks) < SNAPSHOT_SIZE)
+            self.snapshot = snapshot
+        finally:
+            self.snapshot_task = None
+        
+        return snapshot
+    
+    
+    def invalidate(self):
+        """
+        Marks the snapshot as stale, so an access after ``SNAPSHOT_INVALIDATED_REFRESH_INTERVAL`` requests a new one.
+        """
+        snapshot = self.snapshot
+        if (snapshot is not None):
+            created_at = monotonic() - SNAPSHOT_REFRESH_INTERVAL + SNAPSHOT_INVALIDATED_REFRESH_INTERVAL
+            if created_at < snapshot.created_at:
+                snapshot.created_at = created_at
+    
+    
+    async def get_page(self, page, page_size):
+        """
+        Returns the ranked users of the given page.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        page : `int`
+            The page's number starting from `1`.
+        page_size : `int`
+            The amount of users on a page.
+        
+        Returns
+        -------
+        ranks : `list` of `tuple` (`int`, `int`)
+            `user id` - `total love` pairs by rank.
+        """
+        snapshot = await self.get_snapshot()
+        ranks = snapshot.ranks
+        start = (page - 1) * page_size
+        end = start + page_size
+        
+        if snapshot.complete or (end <= len(ranks)):
+            return ranks[start : end]
+        
+        page_ranks = ranks[start : end]
+        if ranks:
+            after = page_ranks[-1] if page_ranks else ranks[-1]
+        else:
+            after = None
+        
+        offset = max(start - len(ranks), 0)
+        page_ranks.extend(await _request_ranks(after, offset, page_size - len(page_ranks)))
+        return page_ranks
+    
+    
+    async def get_rank(self, user_id):
+        """
+        Returns the given user's rank.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        user_id : `int`
+            The user's identifier.
+        
+        Returns
+        -------
+        rank : `int`
+            The user's rank starting from `1`. `0` if the user is not ranked.
+        total_love : `int`
+            The user's total love.
+        """
+        snapshot = await self.get_snapshot()
+        
+        index = snapshot.rank_by_user_id.get(user_id, -1)
+        if index != -1:
+            return index + 1, snapshot.ranks[index][1]
+        
+        if snapshot.complete:
+            return 0, 0
+        
+        # The rank of users outside of the snapshot is counted once for each snapshot.
+        requested_ranks = snapshot.requested_ranks
+        try:
+            return requested_ranks[user_id]
+        except KeyError:
+            pass
+        
+        rank = await self._request_rank(user_id)
+        requested_ranks[user_id] = rank
+        return rank
+    
+    
+    async def _request_rank(self, user_id):
+        """
+        Requests the given user's rank.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        user_id : `int`
+            The user's identifier.
+        
+        Returns
+        -------
+        rank : `int`
+            The user's rank starting from `1`. `0` if the user is not ranked.
+        total_love : `int`
+            The user's total love.
+        """
+        async with DB_ENGINE.connect() as connector:
+            response = await connector.execute(
+                select(
+                    [
+                        user_common_model.total_love,
+                    ]
+                ).where(
+                    user_common_model.user_id == user_id,
+                )
+            )
+            result = await response.fetchone()
+            if (result is None) or (not result[0]):
+                return 0, 0
+            
+            total_love = result[0]
+            
+            response = await connector.execute(
+                select(
+                    [
+                        func.count(),
+                    ]
+                ).where(
+                    and_(_get_ranked_condition(), _get_before_condition(total_love, user_id)),
+                )
+            )
+            result = await response.fetchone()
+        
+        return result[0] + 1, total_love
+
+
+HEART_LEADERBOARD = HeartLeaderboard()
+
+
+async def _get_user(user_id):
+    """
+    Requests the given user. Deleted users are returned as `ZEROUSER`.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    
+    Returns
+    -------
+    user : ``ClientUserBase``
+    """
+    try:
+        return await get_user(user_id)
+    except DiscordException as err:
+        if err.code == ERROR_CODES.unknown_user:
+            return ZEROUSER
+        
+        raise
+
+
+async def resolve_users(user_ids):
+    """
+    Returns the users of the given identifiers. The not cached ones are requested concurrently.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    user_ids : `iterable` of `int`
+        The users' identifiers.
+    
+    Returns
+    -------
+    users : `dict` of (`int`, ``ClientUserBase``) items
+        User identifier - user relation.
+    
+    Raises
+    ------
+    ConnectionError
+    DiscordException
+    """
+    users = {}
+    tasks = {}
+    
+    for user_id in user_ids:
+        try:
+            users[user_id] = USERS[user_id]
+        except KeyError:
+            if user_id not in tasks:
+                tasks[user_id] = Task(_get_user(user_id), KOKORO)
+    
+    if tasks:
+        task_group = TaskGroup(KOKORO, tasks.values())
+        failed_task = await task_group.wait_exception()
+        if (failed_task is not None):
+            task_group.cancel_all()
+            failed_task.get_result()
+        
+        for user_id, task in tasks.items():
+            users[user_id] = task.get_result()
+    
+    return users
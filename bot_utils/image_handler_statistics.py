@@ -0,0 +1,113 @@
+__all__ = ('IMAGE_HANDLER_STATISTICS', 'ImageHandlerStatistics')
+
+from scarletio import RichAttributeErrorBaseType, WeakSet
+
+# Image handlers are created on demand, so their statistics are only weakly referenced and disappear with them.
+IMAGE_HANDLER_STATISTICS = WeakSet()
+
+
+class ImageHandlerStatistics(RichAttributeErrorBaseType):
+    """
+    Metrics of a request based image handler.
+    
+    Attributes
+    ----------
+    hit_count : `int`
+        How much images were served from the handler's cache.
+    hit_time_total : `float`
+        The total time spent serving images from the cache.
+    miss_count : `int`
+        How much images had to be waited for.
+    miss_time_total : `float`
+        The total time spent waiting for images.
+    name : `str`
+        The handler's name.
+    prefetch_count : `int`
+        How much requests were done without anyone waiting.
+    prefetch_skip_count : `int`
+        How much prefetches were skipped, because too much handlers were prefetching already.
+    request_count : `int`
+        How much requests were done.
+    """
+    __slots__ = (
+        '__weakref__', 'hit_count', 'hit_time_total', 'miss_count', 'miss_time_total', 'name', 'prefetch_count',
+        'prefetch_skip_count', 'request_count'
+    )
+    
+    def __new__(cls, name):
+        """
+        Creates a new image handler statistics and registers it.
+        
+        Parameters
+        ----------
+        name : `str`
+            The handler's name.
+        """
+        self = object.__new__(cls)
+        self.hit_count = 0
+        self.hit_time_total = 0.0
+        self.miss_count = 0
+        self.miss_time_total = 0.0
+        self.name = name
+        self.prefetch_count = 0
+        self.prefetch_skip_count = 0
+        self.request_count = 0
+        
+        IMAGE_HANDLER_STATISTICS.add(self)
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the statistics' representation."""
+        return (
+            f'<{self.__class__.__name__} name = {self.name!r}, hit_count = {self.hit_count!r}, '
+            f'miss_count = {self.miss_count!r}>'
+        )
+    
+    
+    @property
+    def hit_time_average(self):
+        """
+        Returns the average time of serving an image from the cache.
+        
+        Returns
+        -------
+        hit_time_average : `float`
+        """
+        hit_count = self.hit_count
+        if hit_count:
+            return self.hit_time_total / hit_count
+        
+        return 0.0
+    
+    
+    @property
+    def miss_time_average(self):
+        """
+        Returns the average time of waiting for an image.
+        
+        Returns
+        -------
+        miss_time_average : `float`
+        """
+        miss_count = self.miss_count
+        if miss_count:
+            return self.miss_time_total / miss_count
+        
+        return 0.0
+    
+    
+    @property
+    def hit_rate(self):
+        """
+        Returns the rate of the images served from the cache.
+        
+        Returns
+        -------
+        hit_rate : `float`
+        """
+        total = self.hit_count + self.miss_count
+        if total:
+            return self.hit_count / total
+        
+        return 0.0
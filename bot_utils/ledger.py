@@ -0,0 +1,392 @@
+__all__ = (
+    'add_love', 'allocate_love', 'get_add_love_expression', 'get_allocate_love_expression',
+    'get_increase_love_expression', 'get_release_love_expression', 'get_spend_love_expression', 'increase_love',
+    'release_love', 'spend_love'
+)
+
+from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import insert
+
+from .models import DB_ENGINE, USER_COMMON_TABLE, get_create_common_user_values, user_common_model
+
+# Every expression in this file is a single statement returning the user's new `total_love`, so a mutation costs one
+# round trip and cannot race with an other one. Mutations changing `total_love` mark the heart leaderboard stale.
+
+
+def _extend_update_values(update_values, counters, values):
+    """
+    Extends the given update values with the counters' increments and with the absolute values.
+    
+    Parameters
+    ----------
+    update_values : `dict` of (`str`, `object`) items
+        Update values to extend.
+    counters : `dict` of (`str`, `int`) items
+        Column name - increment pairs.
+    values : `None`, `dict` of (`str`, `object`) items
+        Column name - value pairs to set.
+    """
+    columns = USER_COMMON_TABLE.c
+    
+    for name, increment in counters.items():
+        update_values[name] = columns[name] + increment
+    
+    if (values is not None):
+        update_values.update(values)
+
+
+def _get_available_love_condition(user_id, amount, condition):
+    """
+    Creates a where clause matching the user's entry if it has at least the given amount of not allocated love.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    amount : `int`
+        The required amount of available love.
+    condition : `None`, `sqlalchemy.sql.ClauseElement`
+        Additional condition.
+    
+    Returns
+    -------
+    where_clause : `sqlalchemy.sql.ClauseElement`
+    """
+    where_clause = and_(
+        user_common_model.user_id == user_id,
+        user_common_model.total_love - user_common_model.total_allocated >= amount,
+    )
+    
+    if (condition is not None):
+        where_clause = and_(where_clause, condition)
+    
+    return where_clause
+
+
+def get_add_love_expression(user_id, delta, *, condition = None, values = None, **counters):
+    """
+    Creates an upsert expression which adds the given amount of love to the user, creating its entry if required.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    delta : `int`
+        The amount of love to add.
+    condition : `None`, `sqlalchemy.sql.ClauseElement` = `None`, Optional (Keyword only)
+        Condition the user's existing entry must match to be updated.
+    values : `None`, `dict` of (`str`, `object`) items = `None`, Optional (Keyword only)
+        Column name - value pairs to set.
+    **counters : Keyword parameters
+        Column name - increment pairs, like `count_daily_self = 1`.
+    
+    Returns
+    -------
+    expression : `sqlalchemy.dialects.postgresql.Insert`
+    """
+    insert_values = get_create_common_user_values(user_id, total_love = delta)
+    for name, increment in counters.items():
+        insert_values[name] += increment
+    
+    if (values is not None):
+        insert_values.update(values)
+    
+    update_values = {'total_love': user_common_model.total_love + delta}
+    _extend_update_values(update_values, counters, values)
+    
+    return insert(
+        USER_COMMON_TABLE,
+    ).values(
+        **insert_values,
+    ).on_conflict_do_update(
+        index_elements = [user_common_model.user_id],
+        set_ = update_values,
+        where = condition,
+    ).returning(
+        user_common_model.total_love,
+    )
+
+
+def get_increase_love_expression(user_id, delta):
+    """
+    Creates an update expression which adds the given amount of love to the user if it has an entry.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    delta : `int`
+        The amount of love to add.
+    
+    Returns
+    -------
+    expression : `sqlalchemy.sql.Update`
+    """
+    return USER_COMMON_TABLE.update(
+        user_common_model.user_id == user_id,
+    ).values(
+        total_love = user_common_model.total_love + delta,
+    ).returning(
+        user_common_model.total_love,
+    )
+
+
+def get_spend_love_expression(user_id, amount, *, condition = None, values = None, **counters):
+    """
+    Creates an update expression which removes the given amount of love from the user, if it has enough not allocated
+    love.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    amount : `int`
+        The amount of love to spend.
+    condition : `None`, `sqlalchemy.sql.ClauseElement` = `None`, Optional (Keyword only)
+        Additional condition the user's entry must match.
+    values : `None`, `dict` of (`str`, `object`) items = `None`, Optional (Keyword only)
+        Column name - value pairs to set.
+    **counters : Keyword parameters
+        Column name - increment pairs.
+    
+    Returns
+    -------
+    expression : `sqlalchemy.sql.Update`
+    """
+    update_values = {'total_love': user_common_model.total_love - amount}
+    _extend_update_values(update_values, counters, values)
+    
+    return USER_COMMON_TABLE.update(
+        _get_available_love_condition(user_id, amount, condition),
+    ).values(
+        **update_values,
+    ).returning(
+        user_common_model.total_love,
+    )
+
+
+def get_allocate_love_expression(user_id, amount):
+    """
+    Creates an update expression which allocates the given amount of love of the user, if it has enough not allocated
+    love.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    amount : `int`
+        The amount of love to allocate.
+    
+    Returns
+    -------
+    expression : `sqlalchemy.sql.Update`
+    """
+    return USER_COMMON_TABLE.update(
+        _get_available_love_condition(user_id, amount, None),
+    ).values(
+        total_allocated = user_common_model.total_allocated + amount,
+    ).returning(
+        user_common_model.total_love,
+    )
+
+
+def get_release_love_expression(user_id, amount, delta = 0):
+    """
+    Creates an update expression which releases the given amount of allocated love of the user, while also
+    adding `delta` to its love.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    amount : `int`
+        The amount of love to release.
+    delta : `int` = `0`, Optional
+        The amount of love to add (or to remove if negative) at the same time, like the result of a bet.
+    
+    Returns
+    -------
+    expression : `sqlalchemy.sql.Update`
+    """
+    update_values = {'total_allocated': user_common_model.total_allocated - amount}
+    if delta:
+        update_values['total_love'] = user_common_model.total_love + delta
+    
+    return USER_COMMON_TABLE.update(
+        user_common_model.user_id == user_id,
+    ).values(
+        **update_values,
+    ).returning(
+        user_common_model.total_love,
+    )
+
+
+async def _execute_returning_total_love(expression, connector, changes_total_love = True):
+    """
+    Executes the given ledger expression.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    expression : `sqlalchemy.sql.ClauseElement`
+        The expression to execute.
+    connector : `None`, ``AsyncConnection``
+        Connector to execute the expression with. If not given, a new connection is used.
+    changes_total_love : `bool` = `True`, Optional
+        Whether the expression changes `total_love`.
+    
+    Returns
+    -------
+    total_love : `None`, `int`
+        The user's new `total_love`. `None` if the expression did not modify any entry.
+    """
+    if connector is None:
+        async with DB_ENGINE.connect() as connector:
+            return await _execute_returning_total_love(expression, connector, changes_total_love)
+    
+    response = await connector.execute(expression)
+    result = await response.fetchone()
+    if result is None:
+        return None
+    
+    if changes_total_love:
+        # Imported here, so using the expressions alone does not load the leaderboard and the user getter.
+        from .heart_leaderboard import HEART_LEADERBOARD
+        HEART_LEADERBOARD.invalidate()
+    
+    return result[0]
+
+
+async def add_love(user_id, delta, *, condition = None, connector = None, values = None, **counters):
+    """
+    Adds the given amount of love to the user, creating its entry if required.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    delta : `int`
+        The amount of love to add.
+    condition : `None`, `sqlalchemy.sql.ClauseElement` = `None`, Optional (Keyword only)
+        Condition the user's existing entry must match to be updated.
+    connector : `None`, ``AsyncConnection`` = `None`, Optional (Keyword only)
+        Connector to use. If not given, a new connection is used.
+    values : `None`, `dict` of (`str`, `object`) items = `None`, Optional (Keyword only)
+        Column name - value pairs to set.
+    **counters : Keyword parameters
+        Column name - increment pairs, like `count_daily_self = 1`.
+    
+    Returns
+    -------
+    total_love : `None`, `int`
+        The user's new `total_love`. `None` if `condition` was not matched.
+    """
+    expression = get_add_love_expression(user_id, delta, condition = condition, values = values, **counters)
+    return await _execute_returning_total_love(expression, connector)
+
+
+async def increase_love(user_id, delta, *, connector = None):
+    """
+    Adds the given amount of love to the user if it has an entry. Unlike ``add_love`` it does not create one.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    delta : `int`
+        The amount of love to add.
+    connector : `None`, ``AsyncConnection`` = `None`, Optional (Keyword only)
+        Connector to use. If not given, a new connection is used.
+    
+    Returns
+    -------
+    total_love : `None`, `int`
+        The user's new `total_love`. `None` if the user has no entry.
+    """
+    expression = get_increase_love_expression(user_id, delta)
+    return await _execute_returning_total_love(expression, connector)
+
+
+async def spend_love(user_id, amount, *, condition = None, connector = None, values = None, **counters):
+    """
+    Removes the given amount of love from the user, if it has enough not allocated love.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    amount : `int`
+        The amount of love to spend.
+    condition : `None`, `sqlalchemy.sql.ClauseElement` = `None`, Optional (Keyword only)
+        Additional condition the user's entry must match.
+    connector : `None`, ``AsyncConnection`` = `None`, Optional (Keyword only)
+        Connector to use. If not given, a new connection is used.
+    values : `None`, `dict` of (`str`, `object`) items = `None`, Optional (Keyword only)
+        Column name - value pairs to set.
+    **counters : Keyword parameters
+        Column name - increment pairs, like `waifu_divorces = -1`.
+    
+    Returns
+    -------
+    total_love : `None`, `int`
+        The user's new `total_love`. `None` if the user has not enough love or `condition` was not matched.
+    """
+    expression = get_spend_love_expression(user_id, amount, condition = condition, values = values, **counters)
+    return await _execute_returning_total_love(expression, connector)
+
+
+async def allocate_love(user_id, amount, *, connector = None):
+    """
+    Allocates the given amount of love of the user, if it has enough not allocated love.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    amount : `int`
+        The amount of love to allocate.
+    connector : `None`, ``AsyncConnection`` = `None`, Optional (Keyword only)
+        Connector to use. If not given, a new connection is used.
+    
+    Returns
+    -------
+    total_love : `None`, `int`
+        The user's `total_love`. `None` if the user has not enough love.
+    """
+    expression = get_allocate_love_expression(user_id, amount)
+    return await _execute_returning_total_love(expression, connector, False)
+
+
+async def release_love(user_id, amount, delta = 0, *, connector = None):
+    """
+    Releases the given amount of allocated love of the user, while also adding `delta` to its love.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    amount : `int`
+        The amount of love to release.
+    delta : `int` = `0`, Optional
+        The amount of love to add (or to remove if negative) at the same time.
+    connector : `None`, ``AsyncConnection`` = `None`, Optional (Keyword only)
+        Connector to use. If not given, a new connection is used.
+    
+    Returns
+    -------
+    total_love : `None`, `int`
+        The user's new `total_love`. `None` if the user has no entry.
+    """
+    expression = get_release_love_expression(user_id, amount, delta)
+    return await _execute_returning_total_love(expression, connector, bool(delta))
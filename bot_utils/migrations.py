@@ -0,0 +1,492 @@
+__all__ = ('MIGRATIONS', 'check_hot_queries', 'create_indexes', 'create_tables', 'get_missing_indexes', 'run_migrations',)
+
+from datetime import datetime, timedelta
+
+from scarletio import RichAttributeErrorBaseType
+from sqlalchemy import Column, DateTime, Integer as Int32, MetaData, Table, and_, func, inspect, tuple_
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.sql import select
+
+from . import models as module_models
+
+# Migrations are applied in order of their version and each applied version is stored in the `SCHEMA_VERSION` table.
+# Every migration must be idempotent, so running it on a database which already has its changes is harmless.
+# A migration creates only its own objects, so the same version means the same schema on every database.
+# New tables and indexes are created by new migrations, never by extending an applied one.
+
+MIGRATION_METADATA = MetaData()
+
+SCHEMA_VERSION_TABLE = Table(
+    'SCHEMA_VERSION',
+    MIGRATION_METADATA,
+    Column('version', Int32, primary_key = True),
+    Column('applied_at', DateTime),
+)
+
+
+class Migration(RichAttributeErrorBaseType):
+    """
+    A database migration.
+    
+    Attributes
+    ----------
+    description : `str`
+        The migration's description.
+    function : `FunctionType`
+        The function applying the migration. Accepts a connection as its only parameter.
+    version : `int`
+        The migration's version.
+    """
+    __slots__ = ('description', 'function', 'version')
+    
+    def __new__(cls, version, description, function):
+        """
+        Creates a new migration.
+        
+        Parameters
+        ----------
+        version : `int`
+            The migration's version.
+        description : `str`
+            The migration's description.
+        function : `FunctionType`
+            The function applying the migration.
+        """
+        self = object.__new__(cls)
+        self.description = description
+        self.function = function
+        self.version = version
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the migration's representation."""
+        return f'<{self.__class__.__name__} version = {self.version!r}, description = {self.description!r}>'
+
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """
+    Registers the decorated function as a migration.
+    
+    Parameters
+    ----------
+    version : `int`
+        The migration's version. Must be greater than the last registered one's.
+    description : `str`
+        The migration's description.
+    
+    Returns
+    -------
+    decorator : `FunctionType`
+    """
+    def decorator(function):
+        if MIGRATIONS and (MIGRATIONS[-1].version >= version):
+            raise RuntimeError(f'Migration versions must increase, got {version!r} after {MIGRATIONS[-1]!r}.')
+        
+        MIGRATIONS.append(Migration(version, description, function))
+        return function
+    
+    return decorator
+
+
+def get_missing_indexes(connection):
+    """
+    Returns the indexes declared on the models, which are not present in the database.
+    
+    Parameters
+    ----------
+    connection : `sqlalchemy.engine.Connection`
+        Connection to inspect the database with.
+    
+    Returns
+    -------
+    missing_indexes : `list` of `sqlalchemy.Index`
+    """
+    inspector = inspect(connection)
+    table_names = set(inspector.get_table_names())
+    
+    missing_indexes = []
+    
+    for table in module_models.BASE.metadata.sorted_tables:
+        if table.name in table_names:
+            index_names = {index['name'] for index in inspector.get_indexes(table.name)}
+        else:
+            index_names = set()
+        
+        for index in table.indexes:
+            if index.name not in index_names:
+                missing_indexes.append(index)
+    
+    return missing_indexes
+
+
+def create_indexes(connection, index_names):
+    """
+    Creates the indexes with the given names declared on the models, if they are not present in the database.
+    
+    Parameters
+    ----------
+    connection : `sqlalchemy.engine.Connection`
+        Connection to create the indexes with.
+    index_names : `tuple` of `str`
+        The indexes' names.
+    
+    Raises
+    ------
+    RuntimeError
+        - If an index is not declared on the models.
+    """
+    missing_indexes = {index.name: index for index in get_missing_indexes(connection)}
+    declared_index_names = {
+        index.name for table in module_models.BASE.metadata.sorted_tables for index in table.indexes
+    }
+    
+    for index_name in index_names:
+        if index_name not in declared_index_names:
+            raise RuntimeError(f'Index {index_name!r} is not declared on the models.')
+        
+        index = missing_indexes.get(index_name, None)
+        if (index is not None):
+            index.create(connection)
+
+
+def create_tables(connection, table_names):
+    """
+    Creates the tables with the given names declared on the models, if they are not present in the database.
+    
+    Only the tables are created; their indexes are created by the migrations introducing them.
+    
+    Parameters
+    ----------
+    connection : `sqlalchemy.engine.Connection`
+        Connection to create the tables with.
+    table_names : `tuple` of `str`
+        The tables' names.
+    
+    Raises
+    ------
+    RuntimeError
+        - If a table is not declared on the models.
+    """
+    declared_tables = module_models.BASE.metadata.tables
+    
+    for table_name in table_names:
+        if table_name not in declared_tables:
+            raise RuntimeError(f'Table {table_name!r} is not declared on the models.')
+    
+    present_table_names = set(inspect(connection).get_table_names())
+    
+    # Sorted, so referenced tables are created first.
+    for table in module_models.BASE.metadata.sorted_tables:
+        if (table.name in table_names) and (table.name not in present_table_names):
+            connection.execute(CreateTable(table))
+
+
+@migration(1, 'Create missing tables')
+def create_missing_tables(connection):
+    create_tables(
+        connection,
+        (
+            'AUTO_REACT_ROLE',
+            'CURRENCY',
+            'DS_V2',
+            'DS_V2_RESULT',
+            'EMOJI_COUNTER',
+            'EMOJI_COUNTER_ROLLUP',
+            'ITEM',
+            'STICKER_COUNTER',
+            'STICKER_COUNTER_ROLLUP',
+            'TODO',
+            'WAIFU_LIST',
+            'WAIFU_PROPOSAL',
+            'WAIFU_STATS',
+        ),
+    )
+
+
+@migration(2, 'Create secondary indexes')
+def create_secondary_indexes(connection):
+    create_indexes(
+        connection,
+        (
+            'ix_DS_V2_RESULT_user_id',
+            'ix_EMOJI_COUNTER_emoji_id_timestamp',
+            'ix_EMOJI_COUNTER_timestamp',
+            'ix_EMOJI_COUNTER_user_id_timestamp',
+            'ix_EMOJI_COUNTER_ROLLUP_emoji_id_day',
+            'ix_EMOJI_COUNTER_ROLLUP_user_id_day',
+            'ix_STICKER_COUNTER_sticker_id_timestamp',
+            'ix_STICKER_COUNTER_timestamp',
+            'ix_STICKER_COUNTER_user_id_timestamp',
+            'ix_STICKER_COUNTER_ROLLUP_sticker_id_day',
+            'ix_STICKER_COUNTER_ROLLUP_user_id_day',
+            'ix_WAIFU_LIST_user_id',
+            'ix_WAIFU_LIST_waifu_id',
+            'ix_WAIFU_PROPOSAL_source_id',
+            'ix_WAIFU_PROPOSAL_target_id',
+        ),
+    )
+
+
+@migration(3, 'Create heart leaderboard index')
+def create_heart_leaderboard_index(connection):
+    create_indexes(connection, ('ix_CURRENCY_total_love_user_id',))
+
+
+@migration(4, 'Fold counter history into rollups')
+def fold_counter_history(connection):
+    # The leaderboards read full days from the rollups, so the raw rows written before they were maintained are
+    # folded in once. Days are folded again from their raw rows, so the rollups incremented since are not counted
+    # twice.
+    create_tables(connection, ('EMOJI_COUNTER_ROLLUP', 'STICKER_COUNTER_ROLLUP'))
+    
+    for table, rollup_table, key_names in (
+        (
+            module_models.EMOJI_COUNTER_TABLE,
+            module_models.EMOJI_COUNTER_ROLLUP_TABLE,
+            ('user_id', 'emoji_id', 'action_type'),
+        ),
+        (
+            module_models.STICKER_COUNTER_TABLE,
+            module_models.STICKER_COUNTER_ROLLUP_TABLE,
+            ('user_id', 'sticker_id'),
+        ),
+    ):
+        oldest = connection.execute(select([func.min(table.c.timestamp)])).scalar()
+        if oldest is None:
+            continue
+        
+        connection.execute(rollup_table.delete().where(rollup_table.c.day >= oldest.date()))
+        
+        key_columns = [table.c[name] for name in key_names]
+        day = func.date(table.c.timestamp)
+        
+        connection.execute(
+            rollup_table.insert().from_select(
+                ['day', *key_names, 'count'],
+                select([day, *key_columns, func.count()]).group_by(day, *key_columns),
+            )
+        )
+
+
+def run_migrations(engine):
+    """
+    Applies every not yet applied migration to the given engine's database.
+    
+    Parameters
+    ----------
+    engine : `sqlalchemy.engine.Engine`
+        Synchronous engine of the database to migrate.
+    
+    Returns
+    -------
+    applied : `list` of ``Migration``
+        The migrations applied now.
+    """
+    MIGRATION_METADATA.create_all(engine, checkfirst = True)
+    
+    with engine.connect() as connection:
+        applied_versions = {
+            result[0] for result in connection.execute(select([SCHEMA_VERSION_TABLE.c.version])).fetchall()
+        }
+    
+    applied = []
+    
+    for migration_ in MIGRATIONS:
+        if migration_.version in applied_versions:
+            continue
+        
+        # Each migration with its version in one transaction, so a failing migration can simply be retried.
+        with engine.begin() as connection:
+            migration_.function(connection)
+            connection.execute(
+                SCHEMA_VERSION_TABLE.insert().values(
+                    version = migration_.version,
+                    applied_at = datetime.utcnow(),
+                )
+            )
+        
+        applied.append(migration_)
+    
+    return applied
+
+
+def get_hot_queries():
+    """
+    Returns the hot queries to check with `EXPLAIN`.
+    
+    Returns
+    -------
+    hot_queries : `list` of `tuple` (`str`, `sqlalchemy.sql.Select`, `bool`)
+        The query's name, the query and whether its ordering should be served by an index.
+    """
+    now = datetime.utcnow()
+    today_start = datetime(now.year, now.month, now.day)
+    month_ago = now - timedelta(days = 30)
+    
+    emoji_counter_model = module_models.emoji_counter_model
+    emoji_counter_rollup_model = module_models.emoji_counter_rollup_model
+    sticker_counter_model = module_models.sticker_counter_model
+    waifu_list_model = module_models.waifu_list_model
+    waifu_proposal_model = module_models.waifu_proposal_model
+    ds_v2_result_model = module_models.ds_v2_result_model
+    user_common_model = module_models.user_common_model
+    
+    return [
+        (
+            'heart leaderboard page',
+            select([user_common_model.user_id, user_common_model.total_love]).where(
+                and_(
+                    user_common_model.total_love != 0,
+                    tuple_(user_common_model.total_love, user_common_model.user_id) < tuple_(0, 0),
+                ),
+            ).order_by(
+                user_common_model.total_love.desc(), user_common_model.user_id.desc(),
+            ).limit(20),
+            True,
+        ),
+        (
+            'heart leaderboard rank',
+            select([func.count()]).where(
+                and_(
+                    user_common_model.total_love != 0,
+                    tuple_(user_common_model.total_love, user_common_model.user_id) > tuple_(0, 0),
+                ),
+            ),
+            False,
+        ),
+        (
+            'emoji usages of a user today',
+            select([emoji_counter_model.emoji_id]).where(
+                and_(emoji_counter_model.user_id == 0, emoji_counter_model.timestamp >= today_start),
+            ),
+            False,
+        ),
+        (
+            'emoji users today',
+            select([emoji_counter_model.user_id]).where(
+                and_(emoji_counter_model.emoji_id == 0, emoji_counter_model.timestamp >= today_start),
+            ),
+            False,
+        ),
+        (
+            'emoji usages of a user by day',
+            select([emoji_counter_rollup_model.emoji_id]).where(
+                and_(emoji_counter_rollup_model.user_id == 0, emoji_counter_rollup_model.day >= month_ago.date()),
+            ),
+            False,
+        ),
+        (
+            'sticker usages of a user today',
+            select([sticker_counter_model.sticker_id]).where(
+                and_(sticker_counter_model.user_id == 0, sticker_counter_model.timestamp >= today_start),
+            ),
+            False,
+        ),
+        (
+            'waifus of a user',
+            select([waifu_list_model.waifu_id]).where(waifu_list_model.user_id == 0),
+            False,
+        ),
+        (
+            'owners of a waifu',
+            select([waifu_list_model.user_id]).where(waifu_list_model.waifu_id == 0),
+            False,
+        ),
+        (
+            'proposals by a user',
+            select([waifu_proposal_model.target_id]).where(waifu_proposal_model.source_id == 0),
+            False,
+        ),
+        (
+            'proposals to a user',
+            select([waifu_proposal_model.source_id]).where(waifu_proposal_model.target_id == 0),
+            False,
+        ),
+        (
+            'dungeon sweeper results of a user',
+            select([ds_v2_result_model.stage_id]).where(ds_v2_result_model.user_id == 0),
+            False,
+        ),
+    ]
+
+
+def _is_scanning_plan(dialect_name, plan_lines, ordered):
+    """
+    Returns whether the given query plan scans a whole table, or sorts the rows instead of reading them in index
+    order.
+    
+    Parameters
+    ----------
+    dialect_name : `str`
+        The database's dialect's name.
+    plan_lines : `list` of `str`
+        The query plan's lines.
+    ordered : `bool`
+        Whether the query's ordering should be served by an index.
+    
+    Returns
+    -------
+    is_scanning : `bool`
+    """
+    for line in plan_lines:
+        if dialect_name == 'postgresql':
+            if 'Seq Scan' in line:
+                return True
+            
+            if ordered and ('Sort' in line) and ('Sort Key' not in line):
+                return True
+        
+        elif dialect_name == 'sqlite':
+            if line.startswith('SCAN') and ('USING' not in line):
+                return True
+            
+            if ordered and ('TEMP B-TREE' in line):
+                return True
+    
+    return False
+
+
+def check_hot_queries(engine):
+    """
+    Runs `EXPLAIN` on the hot queries and collects which of them still scan a whole table or sort their rows.
+    
+    Note that PostgreSQL prefers sequential scans on small tables even if an index is present.
+    
+    Parameters
+    ----------
+    engine : `sqlalchemy.engine.Engine`
+        Synchronous engine of the database to check.
+    
+    Returns
+    -------
+    results : `list` of `tuple` (`str`, `bool`, `list` of `str`)
+        The query's name, whether it scans and its query plan.
+    """
+    dialect = engine.dialect
+    dialect_name = dialect.name
+    
+    if dialect_name == 'sqlite':
+        explain_prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        explain_prefix = 'EXPLAIN '
+    
+    results = []
+    
+    with engine.connect() as connection:
+        for name, statement, ordered in get_hot_queries():
+            compiled = statement.compile(dialect = dialect)
+            parameters = compiled.construct_params()
+            if dialect.positional:
+                parameters = tuple(parameters[key] for key in compiled.positiontup)
+            
+            response = connection.execute(explain_prefix + str(compiled), parameters)
+            
+            # SQLite returns the plan's detail as the last column, PostgreSQL as the only one.
+            plan_lines = [str(result[-1]) for result in response.fetchall()]
+            results.append((name, _is_scanning_plan(dialect_name, plan_lines, ordered), plan_lines))
+    
+    return results
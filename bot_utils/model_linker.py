@@ -1,6 +1,8 @@
-__all__ = ('ModelLink', 'Field',)
+__all__ = ('ModelLink', 'Field', 'flush_model_links',)
 
-from scarletio import RichAttributeErrorBaseType, to_coroutine, Task, shield
+from weakref import WeakValueDictionary
+
+from scarletio import RichAttributeErrorBaseType, to_coroutine, Task, TaskGroup, shield
 from hata import KOKORO
 
 COMPILATION_FILE_NAME = '<model_linker>'
@@ -8,6 +10,10 @@ SLOT_NAME_PREFIX = '_slot_'
 DISPLAY_DEFAULT_PREFIX = 'DEFAULT_'
 ENTRY_ID_NOT_LOADED = -1
 ENTRY_ID_MISSING = -2
+LOAD_MANY_CHUNK_SIZE = 500
+
+WRITE_BEHIND_BUFFERS = []
+WRITE_BEHIND_RETRY_LIMIT = 3
 
 
 class CodeBuilder(RichAttributeErrorBaseType):
@@ -186,20 +192,25 @@ def get_save_method_string(fields, engine):
     
     code = CodeBuilder()
     
-    with code('async def __save__(self):'):
+    with code('async def __save__(self, connector = None):'):
         if (engine is None):
             code.add_line('pass')
         
         else:
-            with code('try:'):
+            with code('if connector is None:'):
                 with code('async with ENGINE.connect() as connector:'):
-                    with code('while True:'):
-                        code('fields_modified = self._fields_modified')
-                        with code('if (fields_modified is None):'):
-                            code('break')
-                        
-                        code('self._fields_modified = None')
-                        
+                    code('return await self.__save__(connector)')
+            
+            with code('try:'):
+                with code('while True:'):
+                    code('fields_modified = self._fields_modified')
+                    with code('if (fields_modified is None):'):
+                        code('break')
+                    
+                    code('self._fields_modified = None')
+                    
+                    # Put back the fields on failure, so a retry writes them.
+                    with code('try:'):
                         code('entry_id = self.', primary_key_field.attribute_name)
                         with code('if entry_id > 0:'):
                             with code('await connector.execute('):
@@ -223,7 +234,7 @@ def get_save_method_string(fields, engine):
                                             else:
                                                 attribute_name = field.attribute_name
                                             code(field.field_name, ' = self.', attribute_name, ',')
-                                        
+                                
                                 with code(').returning('):
                                     code('MODEL.', primary_key_field.field_name, ',')
                                 
@@ -235,6 +246,10 @@ def get_save_method_string(fields, engine):
                             code('continue')
                         
                         code('return')
+                    
+                    with code('except:'):
+                        code('self._fields_restore(fields_modified)')
+                        code('raise')
             
             with code('finally:'):
                 code('self._saving = False')
@@ -252,6 +267,27 @@ def get_loaded_method_string(fields, engine):
     return code.build()
 
 
+def _add_result_assignment(code, fields, instance_name):
+    query_key_field = _get_query_key_field(fields)
+    primary_key_field = _get_primary_key_field(fields)
+    
+    with code('if result is None:'):
+        code(instance_name, '.', primary_key_field.attribute_name, ' = ', str(ENTRY_ID_MISSING))
+        code(instance_name, '.__set_initial_values__()')
+    
+    with code('else:'):
+        for field in fields:
+            if (field is query_key_field):
+                continue
+            
+            if field.primary_key:
+                attribute_name = field.attribute_name
+            else:
+                attribute_name = field.slot_name
+            
+            code(instance_name, '.', attribute_name, ' = result.', field.field_name)
+
+
 def get_load_method_string(fields, engine):
     query_key_field = _get_query_key_field(fields)
     primary_key_field = _get_primary_key_field(fields)
@@ -273,21 +309,7 @@ def get_load_method_string(fields, engine):
                     
                     code('result = await response.fetchone()')
                 
-                with code('if result is None:'):
-                    code('self.', primary_key_field.attribute_name, ' = ', str(ENTRY_ID_MISSING))
-                    code('self.__set_initial_values__()')
-                
-                with code('else:'):
-                    for field in fields:
-                        if (field is query_key_field):
-                            continue
-                        
-                        if field.primary_key:
-                            attribute_name = field.attribute_name
-                        else:
-                            attribute_name = field.slot_name
-                        
-                        code('self.', attribute_name, ' = result.', field.field_name)
+                _add_result_assignment(code, fields, 'self')
             
             
             with code('finally:'):
@@ -296,6 +318,48 @@ def get_load_method_string(fields, engine):
     return code.build()
 
 
+def get_load_many_method_string(fields, engine):
+    query_key_field = _get_query_key_field(fields)
+    primary_key_field = _get_primary_key_field(fields)
+    
+    code = CodeBuilder()
+    with code('async def __load_many__(instances):'):
+        if engine is None:
+            with code('for instance in instances:'):
+                code('instance.', primary_key_field.attribute_name, ' = ', str(ENTRY_ID_MISSING))
+                code('instance.__set_initial_values__()')
+        
+        else:
+            with code('try:'):
+                code('results_by_key = {}')
+                
+                with code('async with ENGINE.connect() as connector:'):
+                    with code('for index in range(0, len(instances), LOAD_MANY_CHUNK_SIZE):'):
+                        with code('response = await connector.execute('):
+                            with code('TABLE.select('):
+                                with code('MODEL.', query_key_field.field_name, '.in_('):
+                                    code(
+                                        '[instance.', query_key_field.query_key,
+                                        ' for instance in instances[index : index + LOAD_MANY_CHUNK_SIZE]]',
+                                    )
+                                code('),')
+                            code(')')
+                        code(')')
+                        
+                        with code('for result in await response.fetchall():'):
+                            code('results_by_key[result.', query_key_field.field_name, '] = result')
+                
+                with code('for instance in instances:'):
+                    code('result = results_by_key.get(instance.', query_key_field.query_key, ', None)')
+                    _add_result_assignment(code, fields, 'instance')
+            
+            with code('finally:'):
+                with code('for instance in instances:'):
+                    code('instance._load_task = None')
+    
+    return code.build()
+
+
 def _get_require_internal_field(primary_key, query_key):
     if primary_key:
         return False
@@ -363,8 +427,201 @@ class FieldDescriptor(RichAttributeErrorBaseType):
         return _get_require_internal_field(self.primary_key, self.query_key)
 
 
+class WriteBehindBuffer(RichAttributeErrorBaseType):
+    """
+    Collects the saved instances of a model link type and saves them together after a short delay.
+    
+    The modified fields of an instance are merged till it is flushed, so every instance is written with one update.
+    
+    Instances failing to be written are added back to the buffer up to ``WRITE_BEHIND_RETRY_LIMIT`` times after each
+    other. Their modified fields are kept either way, so the next save writes them too.
+    
+    Attributes
+    ----------
+    delay : `float`
+        How much seconds a saved instance waits before written.
+    _flush_handle : `None`, ``TimerHandle``
+        Handle to flush the pending instances.
+    _flush_tasks : `set` of ``Task``
+        The running flushes.
+    _pending : `set` of ``ModelLink``
+        The instances waiting to be written.
+    _retry_counts : `dict` of (``ModelLink``, `int`) items
+        How much times the failed instances were added back.
+    """
+    __slots__ = ('delay', '_flush_handle', '_flush_tasks', '_pending', '_retry_counts')
+    
+    def __new__(cls, delay):
+        """
+        Creates a new write behind buffer and registers it into ``WRITE_BEHIND_BUFFERS``.
+        
+        Parameters
+        ----------
+        delay : `float`
+            How much seconds a saved instance waits before written.
+        """
+        self = object.__new__(cls)
+        self.delay = delay
+        self._flush_handle = None
+        self._flush_tasks = set()
+        self._pending = set()
+        self._retry_counts = {}
+        
+        WRITE_BEHIND_BUFFERS.append(self)
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the buffer's representation."""
+        return f'<{self.__class__.__name__} delay = {self.delay!r}, pending = {len(self._pending)!r}>'
+    
+    
+    def add(self, instance):
+        """
+        Adds the given instance to be written.
+        
+        Parameters
+        ----------
+        instance : ``ModelLink``
+            The saved instance.
+        """
+        # A running save picks up the new modifications by itself.
+        if instance._saving:
+            return
+        
+        self._pending.add(instance)
+        
+        if self._flush_handle is None:
+            self._flush_handle = KOKORO.call_later(self.delay, self._start_flush)
+    
+    
+    def _start_flush(self):
+        """
+        Starts writing the pending instances in the background.
+        """
+        flush_handle = self._flush_handle
+        if (flush_handle is not None):
+            self._flush_handle = None
+            flush_handle.cancel()
+        
+        pending = self._pending
+        if not pending:
+            return
+        
+        self._pending = set()
+        
+        for instance in pending:
+            instance._saving = True
+        
+        task = Task(self._write(pending), KOKORO)
+        flush_tasks = self._flush_tasks
+        flush_tasks.add(task)
+        task.add_done_callback(flush_tasks.discard)
+    
+    
+    async def _write(self, instances):
+        """
+        Writes the given instances through one connection. Each instance is saved separately, so one failing does not
+        affect the others.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        instances : `set` of ``ModelLink``
+            The instances to write.
+        """
+        instances = [*instances]
+        failed = set()
+        
+        try:
+            async with instances[0].__engine__.connect() as connector:
+                for instance in instances:
+                    try:
+                        await instance.__save__(connector)
+                    except Exception as err:
+                        failed.add(instance)
+                        await KOKORO.render_exception_async(
+                            err,
+                            before = f'Exception occurred while {self!r} was writing {instance!r}:\n',
+                        )
+        
+        except Exception as err:
+            # The connection failed, so every not yet attempted instance failed as well.
+            failed = set(instances)
+            await KOKORO.render_exception_async(
+                err,
+                before = f'Exception occurred while {self!r} was writing {len(instances)} instances:\n',
+            )
+        
+        finally:
+            for instance in instances:
+                instance._saving = False
+        
+        retry_counts = self._retry_counts
+        for instance in instances:
+            if instance not in failed:
+                retry_counts.pop(instance, None)
+                continue
+            
+            retry_count = retry_counts.get(instance, 0) + 1
+            if retry_count > WRITE_BEHIND_RETRY_LIMIT:
+                del retry_counts[instance]
+                continue
+            
+            retry_counts[instance] = retry_count
+            self.add(instance)
+    
+    
+    async def flush_instance(self, instance):
+        """
+        Writes the given instance if it is pending and waits till it is written.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        instance : ``ModelLink``
+            The instance to flush.
+        """
+        pending = self._pending
+        if instance in pending:
+            pending.discard(instance)
+            instance._saving = True
+            await instance.__save__()
+            return
+        
+        if instance._saving:
+            await self.flush()
+    
+    
+    async def flush(self):
+        """
+        Writes every pending instance and waits till all the running flushes are finished.
+        
+        This method is a coroutine.
+        """
+        self._start_flush()
+        
+        flush_tasks = self._flush_tasks
+        if flush_tasks:
+            await TaskGroup(KOKORO, [*flush_tasks]).wait_all()
+
+
+async def flush_model_links():
+    """
+    Writes out every pending model link instance. Should be called on shutdown.
+    
+    This function is a coroutine.
+    """
+    for write_behind_buffer in WRITE_BEHIND_BUFFERS:
+        await write_behind_buffer.flush()
+
+
 class ModelLinkType(type):
-    def __new__(cls, class_name, class_parents, class_attributes, *, model, table, engine, is_base = False):
+    def __new__(
+        cls, class_name, class_parents, class_attributes, *, model, table, engine, is_base = False, save_delay = None
+    ):
         
         if not is_base:
             collected_fields = []
@@ -396,16 +653,30 @@ class ModelLinkType(type):
             globals['ENGINE'] = engine
             globals['TABLE'] = table
             globals['MODEL'] = model
-
+            globals['LOAD_MANY_CHUNK_SIZE'] = LOAD_MANY_CHUNK_SIZE
+            
             new_method_string = get_new_method_string(fields, globals, added_initializer)
             save_method_string = get_save_method_string(fields, engine)
             loaded_method_string = get_loaded_method_string(fields, engine)
             load_method_string = get_load_method_string(fields, engine)
+            load_many_method_string = get_load_many_method_string(fields, engine)
             
             class_attributes['__new__'] = compile_and_get('__new__', new_method_string, globals)
             class_attributes['__save__'] = compile_and_get('__save__', save_method_string, globals)
             class_attributes['__loaded__'] = compile_and_get('__loaded__', loaded_method_string, globals)
             class_attributes['__load__'] = compile_and_get('__load__', load_method_string, globals)
+            class_attributes['__load_many__'] = staticmethod(
+                compile_and_get('__load_many__', load_many_method_string, globals)
+            )
+            class_attributes['__identity_map__'] = WeakValueDictionary()
+            class_attributes['__identity_key__'] = _get_query_key_field(fields).attribute_name
+            class_attributes['__engine__'] = engine
+            
+            if (save_delay is None) or (engine is None):
+                write_behind_buffer = None
+            else:
+                write_behind_buffer = WriteBehindBuffer(save_delay)
+            class_attributes['__write_behind__'] = write_behind_buffer
             
             extra_slots = tuple(
                 field.slot_name if field.is_require_internal_field() else field.attribute_name for field in fields
@@ -421,6 +692,22 @@ class ModelLinkType(type):
             class_attributes['__slots__'] = new_slots
         
         return type.__new__(cls, class_name, class_parents, class_attributes)
+    
+    
+    def __call__(cls, parent):
+        # Instances are shared by query key, so every instance of the same entry shares its state and its load.
+        self = type.__call__(cls, parent)
+        
+        identity_map = cls.__dict__.get('__identity_map__', None)
+        if (identity_map is not None):
+            key = getattr(self, cls.__identity_key__)
+            existing = identity_map.get(key, None)
+            if (existing is not None):
+                return existing
+            
+            identity_map[key] = self
+        
+        return self
 
 
 class ModelLink(
@@ -428,6 +715,8 @@ class ModelLink(
 ):
     __slots__ = ('__weakref__', '_load_task', '_fields_modified', '_saving')
     
+    __engine__ = None
+    __write_behind__ = None
     
     def __new__(cls, parent):
         self = object.__new__(cls)
@@ -453,6 +742,14 @@ class ModelLink(
         fields_modified.add(field)
     
     
+    def _fields_restore(self, fields):
+        fields_modified = self._fields_modified
+        if (fields_modified is not None):
+            fields.update(fields_modified)
+        
+        self._fields_modified = fields
+    
+    
     def __loaded__(self):
         return True
     
@@ -484,7 +781,7 @@ class ModelLink(
         
         for field in self.__fields__:
             key = field.attribute_name
-                
+            
             if field.is_require_internal_field():
                 attribute_name = field.slot_name
             else:
@@ -504,7 +801,7 @@ class ModelLink(
         
         for field in self.__fields__:
             key = field.attribute_name
-                
+            
             if field.is_require_internal_field():
                 attribute_name = field.slot_name
             else:
@@ -513,7 +810,65 @@ class ModelLink(
             setattr(self, attribute_name, state[key])
     
     
+    @classmethod
+    async def load_many(cls, instances):
+        """
+        Loads the given instances. The not yet loaded ones are loaded with one query per model.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        instances : `iterable` of ``ModelLink``
+            The instances to load.
+        """
+        pending_by_type = {}
+        load_tasks = set()
+        
+        for instance in instances:
+            if instance.__loaded__():
+                continue
+            
+            load_task = instance._load_task
+            if (load_task is None):
+                pending_by_type.setdefault(type(instance), []).append(instance)
+            else:
+                load_tasks.add(load_task)
+        
+        for instance_type, pending in pending_by_type.items():
+            load_task = Task(instance_type.__load_many__(pending), KOKORO)
+            for instance in pending:
+                instance._load_task = load_task
+            
+            load_tasks.add(load_task)
+        
+        if load_tasks:
+            await shield(TaskGroup(KOKORO, load_tasks).wait_all(), KOKORO)
+            
+            for load_task in load_tasks:
+                load_task.get_result()
+    
+    
     def save(self):
+        write_behind_buffer = self.__write_behind__
+        if (write_behind_buffer is not None):
+            write_behind_buffer.add(self)
+            return
+        
         if not self._saving:
             self._saving = True
             Task(self.__save__(), KOKORO)
+    
+    
+    async def flush(self):
+        """
+        Writes out the instance if its save is delayed and waits till it is written.
+        
+        Pending instances are kept alive, so creating an instance for the same entry meanwhile returns the pending
+        one instead of reading the not yet written row.
+        
+        This method is a coroutine.
+        """
+        write_behind_buffer = self.__write_behind__
+        if (write_behind_buffer is not None):
+            await write_behind_buffer.flush_instance(self)
@@ -18,6 +18,9 @@ AUTO_REACT_ROLE_TABLE = None
 emoji_counter_model = None
 EMOJI_COUNTER_TABLE = None
 
+emoji_counter_rollup_model = None
+EMOJI_COUNTER_ROLLUP_TABLE = None
+
 ds_v2_model = None
 DS_V2_TABLE = None
 
@@ -27,9 +30,13 @@ DS_V2_RESULT_TABLE = None
 sticker_counter_model = None
 STICKER_COUNTER_TABLE = None
 
+sticker_counter_rollup_model = None
+STICKER_COUNTER_ROLLUP_TABLE = None
+
 DB_ENGINE = None
 
 get_create_common_user_expression = None
+get_create_common_user_values = None
 
 waifu_stats_model = None
 WAIFU_STATS_TABLE = None
@@ -43,7 +50,7 @@ ITEM_TABLE = None
 if (DATABASE_NAME is not None):
     from sqlalchemy.ext.declarative import declarative_base
     from sqlalchemy import Column, Integer as Int32, BIGINT as Int64, LargeBinary as Binary, create_engine, DateTime, \
-        String, Boolean, Unicode, SmallInteger as Int16
+        String, Boolean, Unicode, SmallInteger as Int16, Date, UniqueConstraint, Index
     from sqlalchemy.sql.expression import func
     
     try:
@@ -53,8 +60,8 @@ if (DATABASE_NAME is not None):
             f'Could not create database engine: {err!r}.'
         )
         DB_ENGINE = None
-        
-    
+
+
 if (DB_ENGINE is not None):
     BASE = declarative_base()
     
@@ -92,14 +99,18 @@ if (DB_ENGINE is not None):
         # voted before
         top_gg_last_vote = Column(DateTime, default = func.utc_timestamp())
         
+        __table_args__ = (
+            Index('ix_CURRENCY_total_love_user_id', 'total_love', 'user_id'),
+        )
+    
     
     USER_COMMON_TABLE = user_common_model.__table__
     
     class waifu_list_model(BASE):
         __tablename__   = 'WAIFU_LIST'
         id              = Column(Int64, primary_key = True)
-        user_id         = Column(Int64)
-        waifu_id        = Column(Int64)
+        user_id         = Column(Int64, index = True)
+        waifu_id        = Column(Int64, index = True)
     
     WAIFU_LIST_TABLE = waifu_list_model.__table__
     
@@ -107,8 +118,8 @@ if (DB_ENGINE is not None):
     class waifu_proposal_model(BASE):
         __tablename__   = 'WAIFU_PROPOSAL'
         id              = Column(Int64, primary_key = True)
-        source_id       = Column(Int64)
-        target_id       = Column(Int64)
+        source_id       = Column(Int64, index = True)
+        target_id       = Column(Int64, index = True)
         investment      = Column(Int64)
     
     WAIFU_PROPOSAL_TABLE = waifu_proposal_model.__table__
@@ -141,22 +152,67 @@ if (DB_ENGINE is not None):
         id              = Column(Int64, primary_key = True)
         user_id         = Column(Int64)
         emoji_id        = Column(Int64)
-        timestamp       = Column(DateTime)
+        timestamp       = Column(DateTime, index = True)
         action_type     = Column(Int32)
+        
+        __table_args__ = (
+            Index('ix_EMOJI_COUNTER_user_id_timestamp', 'user_id', 'timestamp'),
+            Index('ix_EMOJI_COUNTER_emoji_id_timestamp', 'emoji_id', 'timestamp'),
+        )
     
     EMOJI_COUNTER_TABLE = emoji_counter_model.__table__
     
     
+    class emoji_counter_rollup_model(BASE):
+        __tablename__   = 'EMOJI_COUNTER_ROLLUP'
+        id              = Column(Int64, primary_key = True)
+        day             = Column(Date)
+        user_id         = Column(Int64)
+        emoji_id        = Column(Int64)
+        action_type     = Column(Int32)
+        count           = Column(Int64, default = 0)
+        
+        __table_args__ = (
+            UniqueConstraint('day', 'user_id', 'emoji_id', 'action_type'),
+            Index('ix_EMOJI_COUNTER_ROLLUP_user_id_day', 'user_id', 'day'),
+            Index('ix_EMOJI_COUNTER_ROLLUP_emoji_id_day', 'emoji_id', 'day'),
+        )
+    
+    EMOJI_COUNTER_ROLLUP_TABLE = emoji_counter_rollup_model.__table__
+    
+    
     class sticker_counter_model(BASE):
         __tablename__   = 'STICKER_COUNTER'
         id              = Column(Int64, primary_key = True)
         user_id         = Column(Int64)
         sticker_id      = Column(Int64)
-        timestamp       = Column(DateTime)
+        timestamp       = Column(DateTime, index = True)
+        
+        __table_args__ = (
+            Index('ix_STICKER_COUNTER_user_id_timestamp', 'user_id', 'timestamp'),
+            Index('ix_STICKER_COUNTER_sticker_id_timestamp', 'sticker_id', 'timestamp'),
+        )
     
     STICKER_COUNTER_TABLE = sticker_counter_model.__table__
     
     
+    class sticker_counter_rollup_model(BASE):
+        __tablename__   = 'STICKER_COUNTER_ROLLUP'
+        id              = Column(Int64, primary_key = True)
+        day             = Column(Date)
+        user_id         = Column(Int64)
+        sticker_id      = Column(Int64)
+        count           = Column(Int64, default = 0)
+        
+        __table_args__ = (
+            UniqueConstraint('day', 'user_id', 'sticker_id'),
+            Index('ix_STICKER_COUNTER_ROLLUP_user_id_day', 'user_id', 'day'),
+            Index('ix_STICKER_COUNTER_ROLLUP_sticker_id_day', 'sticker_id', 'day'),
+        )
+    
+    STICKER_COUNTER_ROLLUP_TABLE = sticker_counter_rollup_model.__table__
+    
+    
     class ds_v2_model(BASE):
         __tablename__   = 'DS_V2'
         id              = Column(Int64, primary_key = True)
@@ -170,7 +226,7 @@ if (DB_ENGINE is not None):
     class ds_v2_result_model(BASE):
         __tablename__   = 'DS_V2_RESULT'
         id              = Column(Int64, primary_key = True)
-        user_id         = Column(Int64)
+        user_id         = Column(Int64, index = True)
         stage_id        = Column(Int64)
         best            = Column(Int32)
     
@@ -214,7 +270,7 @@ if (DB_ENGINE is not None):
     DB_ENGINE.dispose()
     # BASE.metadata.create_all(DB_ENGINE)
     
-    def get_create_common_user_expression(
+    def get_create_common_user_values(
         user_id,
         total_love = 0,
         daily_next = None,
@@ -237,7 +293,7 @@ if (DB_ENGINE is not None):
         if daily_next is None:
             if now is None:
                 now = datetime.utcnow()
-
+            
             daily_next = now
         
         if top_gg_last_vote is None:
@@ -246,7 +302,7 @@ if (DB_ENGINE is not None):
             
             top_gg_last_vote = now
         
-        return USER_COMMON_TABLE.insert().values(
+        return dict(
             user_id         = user_id,
             total_love      = total_love,
             daily_next      = daily_next,
@@ -264,3 +320,9 @@ if (DB_ENGINE is not None):
             top_gg_last_vote = top_gg_last_vote,
             waifu_owner_id = waifu_owner_id,
         )
+    
+    
+    def get_create_common_user_expression(*positional_parameters, **keyword_parameters):
+        return USER_COMMON_TABLE.insert().values(
+            **get_create_common_user_values(*positional_parameters, **keyword_parameters)
+        )
@@ -0,0 +1,194 @@
+__all__ = ('MultiIndexHashTable', 'compute_difference_hash', 'get_hamming_distance')
+
+from io import BytesIO
+
+from PIL import Image as PIL
+from PIL.Image import DecompressionBombError, Resampling
+from scarletio import RichAttributeErrorBaseType
+
+# The difference hash of an image is built from its 9 x 8 gray-scale thumbnail: every bit tells whether a pixel is
+# brighter than its right neighbour. Re-uploaded, recompressed and resized copies of an image have the same or
+# a close hash, so near duplicates are found by the hashes' hamming distance.
+HASH_WIDTH = 8
+HASH_HEIGHT = 8
+
+CHUNK_COUNT = 8
+CHUNK_SIZE = (HASH_WIDTH * HASH_HEIGHT) // CHUNK_COUNT
+CHUNK_MASK = (1 << CHUNK_SIZE) - 1
+
+
+def compute_difference_hash(data):
+    """
+    Computes the 64 bit difference hash of the given image.
+    
+    Parameters
+    ----------
+    data : `bytes`
+        The image's data.
+    
+    Returns
+    -------
+    difference_hash : `None`, `int`
+        `None` if the data is not an image.
+    """
+    try:
+        with PIL.open(BytesIO(data)) as image:
+            image.draft('L', (HASH_WIDTH + 1, HASH_HEIGHT))
+            pixels = image.convert('L').resize((HASH_WIDTH + 1, HASH_HEIGHT), Resampling.BILINEAR).tobytes()
+    except (OSError, ValueError, DecompressionBombError):
+        return None
+    
+    difference_hash = 0
+    for row_start in range(0, len(pixels), HASH_WIDTH + 1):
+        for index in range(row_start, row_start + HASH_WIDTH):
+            difference_hash = (difference_hash << 1) | (pixels[index] > pixels[index + 1])
+    
+    return difference_hash
+
+
+def get_hamming_distance(hash_0, hash_1):
+    """
+    Returns the amount of different bits of the two hashes.
+    
+    Parameters
+    ----------
+    hash_0 : `int`
+        The first hash.
+    hash_1 : `int`
+        The second hash.
+    
+    Returns
+    -------
+    distance : `int`
+    """
+    return (hash_0 ^ hash_1).bit_count()
+
+
+class MultiIndexHashTable(RichAttributeErrorBaseType):
+    """
+    Finds hashes within a hamming distance.
+    
+    Hashes are split into `CHUNK_COUNT` chunks and each chunk is indexed in a separate table. If two hashes differ in
+    less bits than the amount of chunks, at least one of their chunks is equal, so only the hashes sharing a chunk
+    with the searched one have to be compared.
+    
+    Attributes
+    ----------
+    max_distance : `int`
+        The maximal hamming distance of the matched hashes.
+    size : `int`
+        The amount of hashes in the table.
+    tables : `list` of `dict` of (`int`, `list` of `tuple` (`int`, `object`)) items
+        Chunk value - hash, item pairs relations for each chunk.
+    """
+    __slots__ = ('max_distance', 'size', 'tables')
+    
+    def __new__(cls, max_distance):
+        """
+        Creates a new multi index hash table.
+        
+        Parameters
+        ----------
+        max_distance : `int`
+            The maximal hamming distance of the matched hashes.
+        
+        Raises
+        ------
+        ValueError
+            - If `max_distance` is negative or is not less than the amount of chunks.
+        """
+        if (max_distance < 0) or (max_distance >= CHUNK_COUNT):
+            raise ValueError(
+                f'`max_distance` must be in range [0, {CHUNK_COUNT}), got {max_distance!r}.'
+            )
+        
+        self = object.__new__(cls)
+        self.max_distance = max_distance
+        self.size = 0
+        self.tables = [{} for index in range(CHUNK_COUNT)]
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the table's representation."""
+        return f'<{self.__class__.__name__} size = {self.size!r}, max_distance = {self.max_distance!r}>'
+    
+    
+    def __len__(self):
+        """Returns how much hashes are in the table."""
+        return self.size
+    
+    
+    def add(self, hash_, item):
+        """
+        Adds a hash to the table.
+        
+        Parameters
+        ----------
+        hash_ : `int`
+            The hash to add.
+        item : `object`
+            Object stored with the hash.
+        """
+        self.size += 1
+        entry = (hash_, item)
+        
+        for table in self.tables:
+            chunk = hash_ & CHUNK_MASK
+            hash_ >>= CHUNK_SIZE
+            
+            try:
+                entries = table[chunk]
+            except KeyError:
+                table[chunk] = [entry]
+            else:
+                entries.append(entry)
+    
+    
+    def find(self, hash_):
+        """
+        Returns the first found item, which hash is within the maximal distance.
+        
+        Parameters
+        ----------
+        hash_ : `int`
+            The hash to search for.
+        
+        Returns
+        -------
+        item : `None`, `object`
+        """
+        for item in self.iter_matches(hash_):
+            return item
+        
+        return None
+    
+    
+    def iter_matches(self, hash_):
+        """
+        Iterates over the items, which hash is within the maximal distance. An item may be yielded more times.
+        
+        This method is an iterable generator.
+        
+        Parameters
+        ----------
+        hash_ : `int`
+            The hash to search for.
+        
+        Yields
+        ------
+        item : `object`
+        """
+        max_distance = self.max_distance
+        shifted = hash_
+        
+        for table in self.tables:
+            entries = table.get(shifted & CHUNK_MASK, None)
+            shifted >>= CHUNK_SIZE
+            
+            if entries is None:
+                continue
+            
+            for entry_hash, item in entries:
+                if (entry_hash ^ hash_).bit_count() <= max_distance:
+                    yield item
@@ -0,0 +1,420 @@
+__all__ = ('QueryStatistics',)
+
+import re
+import sys
+from collections import deque as Deque
+from datetime import datetime
+
+from scarletio import RichAttributeErrorBaseType
+
+
+SLOW_QUERY_THRESHOLD_DEFAULT = 0.2
+SLOW_QUERY_LOG_SIZE = 50
+SHAPE_LIMIT = 500
+
+# Upper limits of the latency histogram's buckets in seconds. The last bucket catches everything above.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+OTHER_SHAPE = '<other>'
+UNKNOWN_MODULE = '<unknown>'
+
+# Modules between the caller and the executed statement. Frames of these are skipped when looking for the caller.
+INTERNAL_MODULE_PREFIXES = (
+    'bot_utils.batch_writer',
+    'bot_utils.claim_writer',
+    'bot_utils.counter_rollup',
+    'bot_utils.engine_pool',
+    'bot_utils.ledger',
+    'bot_utils.query_stats',
+    'hata.ext.kokoro_sqlalchemy',
+    'scarletio',
+    'sqlalchemy',
+)
+
+NORMALIZATION_CACHE_SIZE = 2000
+NORMALIZATION_CACHE = {}
+
+WHITESPACE_RP = re.compile(r'\s+')
+STRING_LITERAL_RP = re.compile(r"'(?:[^']|'')*'")
+BIND_PARAMETER_RP = re.compile(r'%\(\w+\)s|(?<![:\w]):\w+|\$\d+')
+NUMBER_LITERAL_RP = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RP = re.compile(r'\bIN \(\?(?:, \?)*\)', re.I)
+VALUES_LIST_RP = re.compile(r'(\(\?(?:, \?)*\))(?:, \(\?(?:, \?)*\))+')
+
+
+def normalize_statement(statement):
+    """
+    Normalizes the given sql statement, so statements with the same shape but with different parameters are equal.
+    
+    Parameters
+    ----------
+    statement : `str`
+        The statement to normalize.
+    
+    Returns
+    -------
+    normalized : `str`
+    """
+    try:
+        return NORMALIZATION_CACHE[statement]
+    except KeyError:
+        pass
+    
+    normalized = WHITESPACE_RP.sub(' ', statement).strip()
+    normalized = STRING_LITERAL_RP.sub('?', normalized)
+    normalized = BIND_PARAMETER_RP.sub('?', normalized)
+    normalized = NUMBER_LITERAL_RP.sub('?', normalized)
+    normalized = IN_LIST_RP.sub('IN (...)', normalized)
+    normalized = VALUES_LIST_RP.sub(r'\1, ...', normalized)
+    
+    if len(NORMALIZATION_CACHE) >= NORMALIZATION_CACHE_SIZE:
+        NORMALIZATION_CACHE.clear()
+    
+    NORMALIZATION_CACHE[statement] = normalized
+    return normalized
+
+
+def get_call_site():
+    """
+    Returns the call site executing a statement. Frames of the database layer are skipped.
+    
+    Returns
+    -------
+    module_name : `str`
+        The caller's module's name.
+    call_site : `str`
+        The caller's module, line and function.
+    """
+    frame = sys._getframe(1)
+    while (frame is not None):
+        module_name = frame.f_globals.get('__name__', None)
+        if (module_name is not None) and (not module_name.startswith(INTERNAL_MODULE_PREFIXES)):
+            return module_name, f'{module_name}:{frame.f_lineno} ({frame.f_code.co_name})'
+        
+        frame = frame.f_back
+    
+    return UNKNOWN_MODULE, UNKNOWN_MODULE
+
+
+def get_statement_text(statement):
+    """
+    Returns the given statement as text. Used when the statement failed and the executed text is not available.
+    
+    Parameters
+    ----------
+    statement : `object`
+        The executed statement.
+    
+    Returns
+    -------
+    statement_text : `str`
+    """
+    try:
+        return str(statement)
+    except Exception:
+        return statement.__class__.__name__
+
+
+class QueryShapeStatistics(RichAttributeErrorBaseType):
+    """
+    Metrics of a statement shape executed by a module.
+    
+    Attributes
+    ----------
+    buckets : `list` of `int`
+        Latency histogram. Each element is the amount of executions within the respective ``LATENCY_BUCKETS`` element.
+        The last element counts the executions above every bucket.
+    count : `int`
+        How much times the statement shape was executed.
+    failure_count : `int`
+        How much executions failed.
+    module_name : `str`
+        The executing module's name.
+    row_count : `int`
+        How much rows were fetched from the statement's results.
+    shape : `str`
+        The normalized statement.
+    time_max : `float`
+        The longest execution in seconds.
+    time_total : `float`
+        The total execution time in seconds.
+    """
+    __slots__ = (
+        'buckets', 'count', 'failure_count', 'module_name', 'row_count', 'shape', 'time_max', 'time_total'
+    )
+    
+    def __new__(cls, shape, module_name):
+        """
+        Creates a new query shape statistics instance.
+        
+        Parameters
+        ----------
+        shape : `str`
+            The normalized statement.
+        module_name : `str`
+            The executing module's name.
+        """
+        self = object.__new__(cls)
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.failure_count = 0
+        self.module_name = module_name
+        self.row_count = 0
+        self.shape = shape
+        self.time_max = 0.0
+        self.time_total = 0.0
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the statistics' representation."""
+        return (
+            f'<{self.__class__.__name__} module_name = {self.module_name!r}, shape = {self.shape!r}, '
+            f'count = {self.count!r}, time_average = {self.time_average:.6f}, time_max = {self.time_max:.6f}>'
+        )
+    
+    
+    @property
+    def time_average(self):
+        """
+        Returns the average execution time.
+        
+        Returns
+        -------
+        time_average : `float`
+        """
+        count = self.count
+        if count:
+            return self.time_total / count
+        
+        return 0.0
+    
+    
+    def get_percentile(self, percentile):
+        """
+        Returns the upper limit of the histogram bucket which contains the given percentile.
+        
+        Parameters
+        ----------
+        percentile : `float`
+            The percentile to get in range [0.0:1.0].
+        
+        Returns
+        -------
+        limit : `float`
+            Returns ``.time_max`` if the percentile is above every bucket.
+        """
+        required = self.count * percentile
+        total = 0
+        
+        for limit, count in zip(LATENCY_BUCKETS, self.buckets):
+            total += count
+            if total >= required:
+                return limit
+        
+        return self.time_max
+    
+    
+    def feed(self, duration):
+        """
+        Feeds an execution.
+        
+        Parameters
+        ----------
+        duration : `float`
+            The execution's duration in seconds.
+        """
+        self.count += 1
+        self.time_total += duration
+        if duration > self.time_max:
+            self.time_max = duration
+        
+        buckets = self.buckets
+        for index, limit in enumerate(LATENCY_BUCKETS):
+            if duration <= limit:
+                buckets[index] += 1
+                break
+        else:
+            buckets[-1] += 1
+
+
+class SlowQuery(RichAttributeErrorBaseType):
+    """
+    An execution which took longer than the slow query threshold.
+    
+    Attributes
+    ----------
+    call_site : `str`
+        The executing module, line and function.
+    duration : `float`
+        The execution's duration in seconds.
+    executed_at : `datetime`
+        When the execution finished.
+    shape : `str`
+        The normalized statement.
+    """
+    __slots__ = ('call_site', 'duration', 'executed_at', 'shape')
+    
+    def __new__(cls, shape, call_site, duration):
+        """
+        Creates a new slow query.
+        
+        Parameters
+        ----------
+        shape : `str`
+            The normalized statement.
+        call_site : `str`
+            The executing module, line and function.
+        duration : `float`
+            The execution's duration in seconds.
+        """
+        self = object.__new__(cls)
+        self.call_site = call_site
+        self.duration = duration
+        self.executed_at = datetime.utcnow()
+        self.shape = shape
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the slow query's representation."""
+        return (
+            f'<{self.__class__.__name__} call_site = {self.call_site!r}, duration = {self.duration:.6f}, '
+            f'shape = {self.shape!r}>'
+        )
+
+
+class QueryStatistics(RichAttributeErrorBaseType):
+    """
+    Per statement shape metrics collected by a ``KOKOROPoolEngine``.
+    
+    Attributes
+    ----------
+    shapes : `dict` of (`tuple` (`str`, `str`), ``QueryShapeStatistics``) items
+        Statistics by normalized statement - module name pairs.
+    slow_queries : `Deque` of ``SlowQuery``
+        The last slow queries.
+    slow_query_threshold : `float`
+        Executions above this amount of seconds are logged as slow.
+    """
+    __slots__ = ('shapes', 'slow_queries', 'slow_query_threshold')
+    
+    def __new__(cls, slow_query_threshold = SLOW_QUERY_THRESHOLD_DEFAULT):
+        """
+        Creates a new query statistics instance.
+        
+        Parameters
+        ----------
+        slow_query_threshold : `float` = `SLOW_QUERY_THRESHOLD_DEFAULT`, Optional
+            Executions above this amount of seconds are logged as slow.
+        """
+        self = object.__new__(cls)
+        self.shapes = {}
+        self.slow_queries = Deque(maxlen = SLOW_QUERY_LOG_SIZE)
+        self.slow_query_threshold = slow_query_threshold
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the statistics' representation."""
+        return (
+            f'<{self.__class__.__name__} shape_count = {len(self.shapes)!r}, '
+            f'slow_query_count = {len(self.slow_queries)!r}>'
+        )
+    
+    
+    def _get_shape_statistics(self, statement_text, module_name):
+        """
+        Returns the statistics of the given statement executed by the given module, creating it if required.
+        
+        Above ``SHAPE_LIMIT`` new shapes are merged into an ``OTHER_SHAPE`` entry of their module.
+        
+        Parameters
+        ----------
+        statement_text : `str`
+            The executed statement.
+        module_name : `str`
+            The executing module's name.
+        
+        Returns
+        -------
+        shape_statistics : ``QueryShapeStatistics``
+        """
+        shape = normalize_statement(statement_text)
+        shapes = self.shapes
+        key = (shape, module_name)
+        
+        try:
+            return shapes[key]
+        except KeyError:
+            pass
+        
+        if len(shapes) >= SHAPE_LIMIT:
+            shape = OTHER_SHAPE
+            key = (shape, module_name)
+            try:
+                return shapes[key]
+            except KeyError:
+                pass
+        
+        shape_statistics = QueryShapeStatistics(shape, module_name)
+        shapes[key] = shape_statistics
+        return shape_statistics
+    
+    
+    def feed_execution(self, statement_text, call_site, duration, failed):
+        """
+        Feeds an execution.
+        
+        Parameters
+        ----------
+        statement_text : `str`
+            The executed statement.
+        call_site : `tuple` (`str`, `str`)
+            The executing module's name and the full call site.
+        duration : `float`
+            The execution's duration in seconds.
+        failed : `bool`
+            Whether the execution failed.
+        
+        Returns
+        -------
+        shape_statistics : ``QueryShapeStatistics``
+        """
+        module_name, call_site_text = call_site
+        shape_statistics = self._get_shape_statistics(statement_text, module_name)
+        shape_statistics.feed(duration)
+        if failed:
+            shape_statistics.failure_count += 1
+        
+        if duration >= self.slow_query_threshold:
+            self.slow_queries.append(SlowQuery(shape_statistics.shape, call_site_text, duration))
+            sys.stderr.write(f'Slow query ({duration * 1000.0:.0f} ms) at {call_site_text}: {shape_statistics.shape}\n')
+        
+        return shape_statistics
+    
+    
+    def get_top_shapes(self, key, limit):
+        """
+        Returns the top statement shapes by the given key.
+        
+        Parameters
+        ----------
+        key : `FunctionType`
+            Key function receiving a ``QueryShapeStatistics``.
+        limit : `int`
+            The maximal amount of shapes to return.
+        
+        Returns
+        -------
+        shapes : `list` of ``QueryShapeStatistics``
+        """
+        return sorted(self.shapes.values(), key = key, reverse = True)[:limit]
+    
+    
+    def reset(self):
+        """
+        Clears the collected metrics.
+        """
+        self.shapes.clear()
+        self.slow_queries.clear()
@@ -0,0 +1,183 @@
+__all__ = ('RateLimiter',)
+
+from hata import KOKORO
+from scarletio import LOOP_TIME, RichAttributeErrorBaseType
+
+# The limiter uses the generic cell rate algorithm (GCRA). Instead of a counter and a timer per key, only the
+# theoretical arrival time of the next request is stored. A key whose arrival time passed is equivalent to a missing
+# key, so expired keys are ignored on access and are removed by a single periodic sweep.
+
+SWEEP_INTERVAL = 60.0
+
+
+class RateLimiter(RichAttributeErrorBaseType):
+    """
+    Allows `limit` uses within `reset` seconds for each key. Used up uses regenerate one by one.
+    
+    Attributes
+    ----------
+    _sweep_handle : `None`, ``TimerHandle``
+        Handle of the next sweep. Only scheduled while there is any key stored.
+    arrival_times : `dict` of (`object`, `float`) items
+        Key - theoretical arrival time relation.
+    emission_interval : `float`
+        The time required to regenerate one use.
+    limit : `int`
+        The amount of uses within `reset` seconds.
+    reset : `float`
+        The duration in seconds in which `limit` uses are allowed.
+    sweep_interval : `float`
+        How often the expired keys are removed.
+    """
+    __slots__ = ('_sweep_handle', 'arrival_times', 'emission_interval', 'limit', 'reset', 'sweep_interval')
+    
+    def __new__(cls, reset, limit = 1):
+        """
+        Creates a new rate limiter.
+        
+        Parameters
+        ----------
+        reset : `float`
+            The duration in seconds in which `limit` uses are allowed.
+        limit : `int` = `1`, Optional
+            The amount of uses within `reset` seconds.
+        
+        Raises
+        ------
+        ValueError
+            - If `reset` or `limit` is not positive.
+        """
+        if (reset <= 0.0) or (limit <= 0):
+            raise ValueError(f'`reset` and `limit` must be positive, got reset = {reset!r}, limit = {limit!r}.')
+        
+        self = object.__new__(cls)
+        self._sweep_handle = None
+        self.arrival_times = {}
+        self.emission_interval = reset / limit
+        self.limit = limit
+        self.reset = reset
+        self.sweep_interval = SWEEP_INTERVAL
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the rate limiter's representation."""
+        return (
+            f'<{self.__class__.__name__} reset = {self.reset!r}, limit = {self.limit!r}, '
+            f'key_count = {len(self.arrival_times)!r}>'
+        )
+    
+    
+    def __len__(self):
+        """Returns how much keys are stored. Can include expired keys not yet swept."""
+        return len(self.arrival_times)
+    
+    
+    def _get_increment(self, weight):
+        """
+        Returns how much the given weight moves the arrival time.
+        
+        Parameters
+        ----------
+        weight : `int`
+            The use's weight. Weights above the limit are treated as the limit.
+        
+        Returns
+        -------
+        increment : `float`
+        """
+        if weight > self.limit:
+            weight = self.limit
+        
+        return self.emission_interval * weight
+    
+    
+    def get_retry_after(self, key, weight = 1):
+        """
+        Returns after how much seconds the given key could use the given weight. Does not consume.
+        
+        Parameters
+        ----------
+        key : `object`
+            The key to check.
+        weight : `int` = `1`, Optional
+            The use's weight.
+        
+        Returns
+        -------
+        retry_after : `float`
+            `0.0` if the key is not limited.
+        """
+        now = LOOP_TIME()
+        arrival_time = self.arrival_times.get(key, now)
+        if arrival_time < now:
+            arrival_time = now
+        
+        retry_after = arrival_time + self._get_increment(weight) - self.reset - now
+        if retry_after > 0.0:
+            return retry_after
+        
+        return 0.0
+    
+    
+    def consume(self, key, weight = 1):
+        """
+        Uses the given weight on the given key if it is not limited.
+        
+        Parameters
+        ----------
+        key : `object`
+            The key to use.
+        weight : `int` = `1`, Optional
+            The use's weight.
+        
+        Returns
+        -------
+        retry_after : `float`
+            `0.0` if the use was allowed. Else after how much seconds it would be allowed.
+        """
+        now = LOOP_TIME()
+        arrival_times = self.arrival_times
+        arrival_time = arrival_times.get(key, now)
+        if arrival_time < now:
+            arrival_time = now
+        
+        arrival_time += self._get_increment(weight)
+        retry_after = arrival_time - self.reset - now
+        if retry_after > 0.0:
+            return retry_after
+        
+        arrival_times[key] = arrival_time
+        
+        if self._sweep_handle is None:
+            self._sweep_handle = KOKORO.call_later(self.sweep_interval, self._sweep)
+        
+        return 0.0
+    
+    
+    def _sweep(self):
+        """
+        Removes the expired keys. Reschedules itself while there is any key left.
+        """
+        now = LOOP_TIME()
+        arrival_times = self.arrival_times
+        
+        for key in [key for key, arrival_time in arrival_times.items() if arrival_time <= now]:
+            del arrival_times[key]
+        
+        if arrival_times:
+            self._sweep_handle = KOKORO.call_later(self.sweep_interval, self._sweep)
+        else:
+            self._sweep_handle = None
+    
+    
+    def clear(self):
+        """
+        Removes every key.
+        """
+        self.arrival_times.clear()
+        
+        sweep_handle = self._sweep_handle
+        if (sweep_handle is not None):
+            self._sweep_handle = None
+            sweep_handle.cancel()
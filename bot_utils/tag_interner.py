@@ -0,0 +1,134 @@
+__all__ = ('TAG_INTERNER', 'TagInterner', 'iter_tag_names')
+
+from array import array
+
+from scarletio import RichAttributeErrorBaseType
+
+# Cached images carry dozens of tags each, mostly the same ones. Each tag name is stored once and images only store
+# the tags' identifiers.
+#
+# Tags cannot be removed while an image may still refer to them, so when the table is full, a new one is started
+# instead. Images keep the table they were interned with, and an old table is freed with its last image.
+TAG_ID_TYPE_CODE = 'I'
+
+TAG_INTERNER_SIZE_LIMIT = 100000
+
+
+class TagInterner(RichAttributeErrorBaseType):
+    """
+    Process-wide tag name - identifier table.
+    
+    Attributes
+    ----------
+    generation : `int`
+        How much times the table was replaced, because it was full.
+    ids : `dict` of (`str`, `int`) items
+        Tag name - identifier relation of the current table.
+    names : `list` of `str`
+        The tag names by their identifier of the current table.
+    size_limit : `int`
+        The amount of tags after a new table is started.
+    """
+    __slots__ = ('generation', 'ids', 'names', 'size_limit')
+    
+    def __new__(cls, size_limit = TAG_INTERNER_SIZE_LIMIT):
+        """
+        Creates a new tag interner.
+        
+        Parameters
+        ----------
+        size_limit : `int` = `TAG_INTERNER_SIZE_LIMIT`, Optional
+            The amount of tags after a new table is started.
+        """
+        self = object.__new__(cls)
+        self.generation = 0
+        self.ids = {}
+        self.names = []
+        self.size_limit = size_limit
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the tag interner's representation."""
+        return f'<{self.__class__.__name__} size = {len(self.names)!r}, generation = {self.generation!r}>'
+    
+    
+    def __len__(self):
+        """Returns how much tags are interned."""
+        return len(self.names)
+    
+    
+    def get_id(self, name):
+        """
+        Returns the identifier of the given tag in the current table. Interns it if required.
+        
+        Parameters
+        ----------
+        name : `str`
+            The tag's name.
+        
+        Returns
+        -------
+        tag_id : `int`
+        """
+        ids = self.ids
+        try:
+            return ids[name]
+        except KeyError:
+            pass
+        
+        names = self.names
+        tag_id = len(names)
+        names.append(name)
+        ids[name] = tag_id
+        return tag_id
+    
+    
+    def intern_tags(self, names):
+        """
+        Interns the given tags. If the current table is full, starts a new one first.
+        
+        Parameters
+        ----------
+        names : `iterable` of `str`
+            The tags' names.
+        
+        Returns
+        -------
+        table : `list` of `str`
+            The table the identifiers refer to, the tag names by their identifier.
+        tag_ids : `array` of `int`
+            The tags' identifiers sorted and deduplicated.
+        """
+        if len(self.names) >= self.size_limit:
+            self.generation += 1
+            self.ids = {}
+            self.names = []
+        
+        get_id = self.get_id
+        tag_ids = array(TAG_ID_TYPE_CODE, sorted({get_id(name) for name in names}))
+        return self.names, tag_ids
+
+
+def iter_tag_names(table, tag_ids):
+    """
+    Iterates over the names of the given tags.
+    
+    This function is an iterable generator.
+    
+    Parameters
+    ----------
+    table : `list` of `str`
+        The tag names by their identifier, returned by ``TagInterner.intern_tags``.
+    tag_ids : `array` of `int`
+        The tags' identifiers.
+    
+    Yields
+    ------
+    name : `str`
+    """
+    for tag_id in tag_ids:
+        yield table[tag_id]
+
+
+TAG_INTERNER = TagInterner()
@@ -0,0 +1,439 @@
+__all__ = ('USER_COMMON_CACHE', 'get_user_common_row',)
+
+import config
+from hata import KOKORO
+from scarletio import copy_docs
+from sqlalchemy import event
+from sqlalchemy.sql import operators, select
+from sqlalchemy.sql.dml import Insert, UpdateBase
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList, ClauseList, Grouping
+
+from .async_cache import AsyncCache
+from .models import DB_ENGINE, USER_COMMON_TABLE, user_common_model
+
+# Rows are cached per process. Writes made by an other process (like the web api) are only seen after the ttl expires.
+
+USER_COMMON_CACHE_SIZE = getattr(config, 'USER_COMMON_CACHE_SIZE', 10000)
+USER_COMMON_CACHE_TTL = getattr(config, 'USER_COMMON_CACHE_TTL', 60000) / 1000.0
+
+CONNECTION_INFO_KEY = 'user_common_invalidations'
+
+# Returned by `_get_invalidation` if the written entries cannot be determined, so everything should be dropped.
+INVALIDATE_ALL = object()
+
+
+class UserCommonCache(AsyncCache):
+    """
+    Read-through cache of `user_common` rows by `user_id`.
+    
+    Every write to the table executed through ``DB_ENGINE`` invalidates the written users' entries, see
+    ``_get_invalidation``. Users without entry are cached as well.
+    
+    Attributes
+    ----------
+    _entry_ids : `dict` of (`int`, `int`) items
+        User identifiers by the cached rows' entry identifier. Can contain already removed rows, but is rebuilt when
+        it grows above the double of the cache's size.
+    """
+    __slots__ = ('_entry_ids',)
+    
+    def __new__(cls, size, ttl):
+        """
+        Creates a new user common cache.
+        
+        Parameters
+        ----------
+        size : `int`
+            The maximal amount of cached rows.
+        ttl : `float`
+            How much seconds a row is cached for.
+        """
+        self = AsyncCache.__new__(cls, 'user common rows', negative_ttl = ttl, size_limit = size, ttl = ttl)
+        self._entry_ids = {}
+        return self
+    
+    
+    @copy_docs(AsyncCache.set)
+    def set(self, key, value):
+        AsyncCache.set(self, key, value)
+        
+        if (value is not None):
+            entry_ids = self._entry_ids
+            entry_ids[value.id] = key
+            
+            if len(entry_ids) > (self.size_limit << 1):
+                self._entry_ids = {row.id: user_id for user_id, row in self.iter_items()}
+    
+    
+    def invalidate_users(self, user_ids, entry_ids):
+        """
+        Drops the given users' rows and running loads.
+        
+        Parameters
+        ----------
+        user_ids : `set` of `int`
+            User identifiers.
+        entry_ids : `None`, `set` of `int`
+            Entry identifiers.
+        """
+        if (entry_ids is not None):
+            entry_id_map = self._entry_ids
+            mapped_user_ids = set()
+            all_mapped = True
+            for entry_id in entry_ids:
+                try:
+                    mapped_user_ids.add(entry_id_map[entry_id])
+                except KeyError:
+                    all_mapped = False
+            
+            # We do not know whose row is being loaded right now, so drop every running load.
+            if not all_mapped:
+                self._loads.clear()
+            
+            user_ids = {*user_ids, *mapped_user_ids}
+        
+        for user_id in user_ids:
+            self.invalidate(user_id)
+    
+    
+    @copy_docs(AsyncCache.clear)
+    def clear(self):
+        AsyncCache.clear(self)
+        self._entry_ids.clear()
+    
+    
+    def _apply_invalidation(self, invalidation):
+        """
+        Applies an invalidation returned by ``_get_invalidation``.
+        
+        Parameters
+        ----------
+        invalidation : `object`
+            Either ``INVALIDATE_ALL`` or a `tuple` (`set` of `int`, (`None`, `set` of `int`)) of user and entry
+            identifiers.
+        """
+        if invalidation is INVALIDATE_ALL:
+            self.clear()
+        else:
+            self.invalidate_users(*invalidation)
+
+
+def _get_column_name(element):
+    """
+    Returns the name of the given element if it is a column of the `user_common` table.
+    
+    Parameters
+    ----------
+    element : `sqlalchemy.sql.ClauseElement`
+        The element to check.
+    
+    Returns
+    -------
+    column_name : `None`, `str`
+    """
+    if getattr(element, 'table', None) is USER_COMMON_TABLE:
+        return getattr(element, 'name', None)
+    
+    return None
+
+
+def _get_bound_values(element):
+    """
+    Returns the values of the given right side of a binary expression.
+    
+    Parameters
+    ----------
+    element : `sqlalchemy.sql.ClauseElement`
+        The element to get the values of.
+    
+    Returns
+    -------
+    values : `None`, `list` of `object`
+        `None` if the element has non bound values.
+    """
+    if isinstance(element, Grouping):
+        element = element.element
+    
+    if isinstance(element, BindParameter):
+        value = element.value
+        if isinstance(value, (list, tuple)):
+            return [*value]
+        
+        return [value]
+    
+    if isinstance(element, ClauseList):
+        values = []
+        for clause in element.clauses:
+            if not isinstance(clause, BindParameter):
+                return None
+            
+            values.append(clause.value)
+        
+        return values
+    
+    return None
+
+
+def _get_constrained_ids(clause):
+    """
+    Returns the user and entry identifiers the given where clause is limited to.
+    
+    Parameters
+    ----------
+    clause : `sqlalchemy.sql.ClauseElement`
+        The where clause.
+    
+    Returns
+    -------
+    constrained_ids : `None`, `tuple` (`set` of `int`, `set` of `int`)
+        `None` if the clause is not limited by user or entry identifiers.
+    """
+    if isinstance(clause, Grouping):
+        return _get_constrained_ids(clause.element)
+    
+    if isinstance(clause, BinaryExpression):
+        if clause.operator not in (operators.eq, operators.in_op):
+            return None
+        
+        column_name = _get_column_name(clause.left)
+        if column_name not in ('user_id', 'id'):
+            return None
+        
+        values = _get_bound_values(clause.right)
+        if values is None:
+            return None
+        
+        if column_name == 'user_id':
+            return set(values), set()
+        
+        return set(), set(values)
+    
+    if isinstance(clause, BooleanClauseList):
+        if clause.operator is operators.and_:
+            # Any limited part of a conjunction limits the whole clause.
+            for sub_clause in clause.clauses:
+                constrained_ids = _get_constrained_ids(sub_clause)
+                if (constrained_ids is not None):
+                    return constrained_ids
+            
+            return None
+        
+        if clause.operator is operators.or_:
+            user_ids = set()
+            entry_ids = set()
+            for sub_clause in clause.clauses:
+                constrained_ids = _get_constrained_ids(sub_clause)
+                if constrained_ids is None:
+                    return None
+                
+                user_ids.update(constrained_ids[0])
+                entry_ids.update(constrained_ids[1])
+            
+            return user_ids, entry_ids
+    
+    return None
+
+
+def _iter_parameters(multiparams, params):
+    """
+    Iterates over the parameter dictionaries passed to an execution.
+    
+    Parameters
+    ----------
+    multiparams : `tuple` of `object`
+        Positional parameters passed to `execute`.
+    params : `dict` of (`str`, `object`) items
+        Keyword parameters passed to `execute`.
+    
+    Yields
+    ------
+    parameters : `dict` of (`str`, `object`) items
+    """
+    if params:
+        yield params
+    
+    for element in multiparams:
+        if isinstance(element, dict):
+            yield element
+        elif isinstance(element, (list, tuple)):
+            for sub_element in element:
+                if isinstance(sub_element, dict):
+                    yield sub_element
+
+
+def _get_insert_user_ids(statement, multiparams, params):
+    """
+    Returns the user identifiers inserted by the given statement.
+    
+    Parameters
+    ----------
+    statement : `sqlalchemy.sql.Insert`
+        The insert statement.
+    multiparams : `tuple` of `object`
+        Positional parameters passed to `execute`.
+    params : `dict` of (`str`, `object`) items
+        Keyword parameters passed to `execute`.
+    
+    Returns
+    -------
+    user_ids : `None`, `set` of `int`
+        `None` if any of the inserted rows' user identifier is unknown.
+    """
+    parameter_sets = []
+    
+    statement_parameters = statement.parameters
+    if isinstance(statement_parameters, dict):
+        parameter_sets.append(statement_parameters)
+    elif isinstance(statement_parameters, list):
+        parameter_sets.extend(statement_parameters)
+    
+    parameter_sets.extend(_iter_parameters(multiparams, params))
+    
+    user_ids = set()
+    
+    for parameters in parameter_sets:
+        for key, value in parameters.items():
+            if (key == 'user_id') or (_get_column_name(key) == 'user_id'):
+                if isinstance(value, BindParameter):
+                    value = value.value
+                
+                user_ids.add(value)
+                break
+        else:
+            return None
+    
+    if not user_ids:
+        return None
+    
+    return user_ids
+
+
+def _get_invalidation(statement, multiparams, params):
+    """
+    Returns which cached rows the given statement invalidates.
+    
+    Parameters
+    ----------
+    statement : `object`
+        The executed statement.
+    multiparams : `tuple` of `object`
+        Positional parameters passed to `execute`.
+    params : `dict` of (`str`, `object`) items
+        Keyword parameters passed to `execute`.
+    
+    Returns
+    -------
+    invalidation : `None`, `object`
+        `None` if nothing is invalidated. ``INVALIDATE_ALL`` if the written entries cannot be determined. Else a
+        `tuple` (`set` of `int`, (`None`, `set` of `int`)) of user and entry identifiers.
+    """
+    if isinstance(statement, str):
+        normalized = statement.lstrip().lower()
+        if normalized.startswith(('select', 'explain', 'pragma')) or (USER_COMMON_TABLE.name.lower() not in normalized):
+            return None
+        
+        return INVALIDATE_ALL
+    
+    if not isinstance(statement, UpdateBase):
+        return None
+    
+    if statement.table is not USER_COMMON_TABLE:
+        return None
+    
+    if isinstance(statement, Insert):
+        if statement.select is not None:
+            return INVALIDATE_ALL
+        
+        user_ids = _get_insert_user_ids(statement, multiparams, params)
+        if user_ids is None:
+            return INVALIDATE_ALL
+        
+        return user_ids, None
+    
+    where_clause = getattr(statement, '_whereclause', None)
+    if where_clause is None:
+        return INVALIDATE_ALL
+    
+    constrained_ids = _get_constrained_ids(where_clause)
+    if constrained_ids is None:
+        return INVALIDATE_ALL
+    
+    return constrained_ids
+
+
+USER_COMMON_CACHE = UserCommonCache(USER_COMMON_CACHE_SIZE, USER_COMMON_CACHE_TTL)
+
+
+async def query_user_common_row(user_id):
+    """
+    Requests the `user_common` row of the given user.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    
+    Returns
+    -------
+    row : `None`, `RowProxy`
+        `None` if the user has no entry.
+    """
+    async with DB_ENGINE.connect() as connector:
+        response = await connector.execute(
+            select([USER_COMMON_TABLE]).where(user_common_model.user_id == user_id)
+        )
+        return await response.fetchone()
+
+
+async def get_user_common_row(user_id):
+    """
+    Returns the `user_common` row of the given user, using ``USER_COMMON_CACHE``.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    
+    Returns
+    -------
+    row : `None`, `RowProxy`
+        `None` if the user has no entry.
+    """
+    return await USER_COMMON_CACHE.get(user_id, query_user_common_row, user_id)
+
+
+# Listeners are called on the database worker's thread, so the invalidations are passed to the event loop. They are
+# queued before the execution's result, so the cache is updated before the writer continues.
+# Writes inside of transactions are invalidated again on commit, because other connections could have cached the old
+# row meanwhile.
+
+def after_execute(connection, statement, multiparams, params, result):
+    invalidation = _get_invalidation(statement, multiparams, params)
+    if invalidation is None:
+        return
+    
+    KOKORO.call_soon_thread_safe(USER_COMMON_CACHE._apply_invalidation, invalidation)
+    
+    if connection.in_transaction():
+        connection.info.setdefault(CONNECTION_INFO_KEY, []).append(invalidation)
+
+
+def after_commit(connection):
+    invalidations = connection.info.pop(CONNECTION_INFO_KEY, None)
+    if (invalidations is not None):
+        for invalidation in invalidations:
+            KOKORO.call_soon_thread_safe(USER_COMMON_CACHE._apply_invalidation, invalidation)
+
+
+def after_rollback(connection):
+    connection.info.pop(CONNECTION_INFO_KEY, None)
+
+
+if (DB_ENGINE is not None):
+    event.listen(DB_ENGINE._engine, 'after_execute', after_execute)
+    event.listen(DB_ENGINE._engine, 'commit', after_commit)
+    event.listen(DB_ENGINE._engine, 'rollback', after_rollback)
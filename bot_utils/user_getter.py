@@ -1,6 +1,7 @@
-from collections import deque
 from hata import CLIENTS, USERS, KOKORO
-from scarletio import Task
+from scarletio import ScarletLock, Task
+
+from .async_cache import AsyncCache
 
 
 # Base cache implementation for repeated user requests
@@ -18,28 +19,89 @@ def _client_repeater():
 _CLIENT_ITERATOR = iter(_client_repeater())
 
 USER_CACHE_SIZE = 1000
-USER_CACHE = deque(maxlen=USER_CACHE_SIZE)
+USER_CACHE_TTL = 600.0
+
+# Bulk resolution requests at most this many users at the same time, so a long list does not burst the rate limits.
+USER_REQUEST_CONCURRENCY = 8
+
+USER_CACHE = AsyncCache('users', size_limit = USER_CACHE_SIZE, ttl = USER_CACHE_TTL)
+
+USER_REQUEST_LOCK = ScarletLock(KOKORO, USER_REQUEST_CONCURRENCY)
+
 
 def _get_client():
     return next(_CLIENT_ITERATOR)
 
 
+def _get_cached_user(user_id):
+    """
+    Returns the user from `USERS` or from the cache.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    
+    Returns
+    -------
+    user : `None`, ``ClientUserBase``
+    """
+    user = USERS.get(user_id, None)
+    if user is None:
+        user = USER_CACHE.get_cached(user_id)
+    
+    return user
+
+
 async def get_user(user_id):
-    try:
-        user = USERS[user_id]
-    except KeyError:
-        pass
-    else:
+    user = _get_cached_user(user_id)
+    if (user is not None):
         return user
     
     return await _get_user_async(user_id)
 
 
 async def _get_user_async(user_id):
-    client = _get_client()
-    user = await client.user_get(user_id)
-    USER_CACHE.append(user)
-    return user
+    """
+    Requests the given user. Concurrent calls for the same user share one request.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    
+    Returns
+    -------
+    user : ``ClientUserBase``
+    
+    Raises
+    ------
+    ConnectionError
+    DiscordException
+    """
+    return await USER_CACHE.get(user_id, _request_user, user_id)
+
+
+async def _request_user(user_id):
+    """
+    Requests the given user. Limited by ``USER_REQUEST_LOCK``.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    user_id : `int`
+        The user's identifier.
+    
+    Returns
+    -------
+    user : ``ClientUserBase``
+    """
+    async with USER_REQUEST_LOCK:
+        client = _get_client()
+        return await client.user_get(user_id)
 
 
 async def get_users_unordered(user_ids):
@@ -47,10 +109,8 @@ async def get_users_unordered(user_ids):
     users = []
     
     for user_id in user_ids:
-        try:
-            user = USERS[user_id]
-        
-        except KeyError:
+        user = _get_cached_user(user_id)
+        if user is None:
             if tasks is None:
                 tasks = []
             
@@ -52,7 +52,100 @@ def run_webapp():
     """
     from web import WEBAPP
     WEBAPP.run()
+
+
+def _create_migration_engine(database_url):
+    """
+    Creates a synchronous engine for migrating the database.
     
+    Parameters
+    ----------
+    database_url : `None`, `str`
+        Database url to connect to. Defaults to the configured database.
+    
+    Returns
+    -------
+    engine : `None`, `sqlalchemy.engine.Engine`
+    """
+    from sqlalchemy import create_engine
+    from bot_utils import models
+    
+    if (models.DB_ENGINE is None):
+        return None
+    
+    if database_url is None:
+        database_url = config.DATABASE_NAME
+    
+    return create_engine(database_url)
+
+
+@hata.main.register
+def migrate_database(
+    database_url : str = None,
+):
+    """
+    Applies the not yet applied database migrations, then verifies the declared indexes.
+    """
+    from bot_utils.migrations import get_missing_indexes, run_migrations
+    
+    engine = _create_migration_engine(database_url)
+    if engine is None:
+        return 'No database is configured.\n'
+    
+    output_parts = []
+    
+    try:
+        applied = run_migrations(engine)
+        if applied:
+            for migration in applied:
+                output_parts.append(f'Applied migration {migration.version}: {migration.description}\n')
+        else:
+            output_parts.append('The database is up to date.\n')
+        
+        with engine.connect() as connection:
+            missing_indexes = get_missing_indexes(connection)
+    finally:
+        engine.dispose()
+    
+    for index in missing_indexes:
+        output_parts.append(f'Missing index: {index.name}\n')
+    
+    return ''.join(output_parts)
+
+
+@hata.main.register
+def check_database_queries(
+    database_url : str = None,
+):
+    """
+    Explains the hot database queries and reports which of them still scan a whole table or sort their rows.
+    """
+    from bot_utils.migrations import check_hot_queries
+    
+    engine = _create_migration_engine(database_url)
+    if engine is None:
+        return 'No database is configured.\n'
+    
+    try:
+        results = check_hot_queries(engine)
+    finally:
+        engine.dispose()
+    
+    output_parts = []
+    
+    for name, is_scanning, plan_lines in results:
+        output_parts.append('SCAN  ' if is_scanning else 'INDEX ')
+        output_parts.append(name)
+        output_parts.append('\n')
+        
+        if is_scanning:
+            for line in plan_lines:
+                output_parts.append('    ')
+                output_parts.append(line)
+                output_parts.append('\n')
+    
+    return ''.join(output_parts)
+
 
 if __name__ == '__main__':
     from hata import KOKORO
@@ -12,6 +12,7 @@ from hata import (
 )
 from hata.ext.slash import Button, InteractionResponse, Row, abort
 
+from bot_utils.async_cache import ASYNC_CACHES
 from bot_utils.constants import (
     COLOR__KOISHI_HELP, GUILD__ORIN_PARTY_HOUSE, INVITE__SUPPORT, KOISHI_HEADER, KOISHI_HEADER_EASTER_EGG,
     LINK__KOISHI_TOP_GG, PATH__KOISHI, STARTUP
@@ -510,9 +511,39 @@ async def render_about_cache(client, event):
         inline = True,
     )
     
+    if ASYNC_CACHES:
+        embed.add_field(
+            'Bot caches (size, hit rate)',
+            (
+                f'```\n'
+                f'{render_async_caches()}\n'
+                f'```'
+            ),
+        )
+    
     return embed
 
 
+def render_async_caches():
+    """
+    Renders the registered async caches' size and hit rate.
+    
+    Returns
+    -------
+    rendered : `str`
+    """
+    caches = sorted(ASYNC_CACHES.values(), key = lambda cache: cache.name)
+    name_adjust = max(len(cache.name) for cache in caches)
+    
+    lines = []
+    for cache in caches:
+        lines.append(
+            f'{cache.name.ljust(name_adjust)} {len(cache):>5} {cache.statistics.hit_rate * 100.0:>6.2f}%'
+        )
+    
+    return '\n'.join(lines)
+
+
 ABOUT_FIELD_NAME_GENERIC = 'generic'
 ABOUT_FIELD_NAME_CACHE = 'cache'
 
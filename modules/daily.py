@@ -13,9 +13,8 @@ from bot_utils.daily import (
     DAILY_INTERVAL, DAILY_STREAK_BREAK, TOP_GG_VOTE_DELAY_MAX, TOP_GG_VOTE_DELAY_MIN, calculate_daily_for,
     calculate_daily_new_only
 )
-from bot_utils.models import (
-    DB_ENGINE, USER_COMMON_TABLE, get_create_common_user_expression, user_common_model, waifu_list_model
-)
+from bot_utils.ledger import add_love
+from bot_utils.models import DB_ENGINE, USER_COMMON_TABLE, user_common_model, waifu_list_model
 from bot_utils.user_getter import get_users_unordered
 from bot_utils.utils import send_embed_to
 
@@ -23,6 +22,13 @@ from bot_utils.utils import send_embed_to
 SLASH_CLIENT: Client
 
 
+EMBED_DAILY_ALREADY_CLAIMED = Embed(
+    'You already claimed your daily love for today~',
+    'Come back tomorrow.',
+    color = COLOR__GAMBLING,
+)
+
+
 async def claim_daily_for_yourself(client, event):
     user = event.user
     
@@ -63,20 +69,23 @@ async def claim_daily_for_yourself(client, event):
                 streak_text = f'You are in a {daily_streak + 1} day streak! Keep up the good work!'
             
             received = calculate_daily_for(user, daily_streak)
-            total_love = total_love + received
             
             daily_streak += 1
             
-            await connector.execute(
-                USER_COMMON_TABLE.update(
-                    user_common_model.id == entry_id,
-                ).values(
-                    total_love = total_love,
-                    daily_next = now + DAILY_INTERVAL,
-                    daily_streak = daily_streak,
-                    count_daily_self = user_common_model.count_daily_self + 1,
-                )
+            # Claim only if no other claim moved `daily_next` since we read it.
+            total_love = await add_love(
+                user.id,
+                received,
+                condition = user_common_model.daily_next <= now,
+                connector = connector,
+                values = {
+                    'daily_next': now + DAILY_INTERVAL,
+                    'daily_streak': daily_streak,
+                },
+                count_daily_self = 1,
             )
+            if total_love is None:
+                return EMBED_DAILY_ALREADY_CLAIMED
             
             if (count_top_gg_vote > 0):
                 vote_difference = now - top_gg_last_vote
@@ -104,20 +113,24 @@ async def claim_daily_for_yourself(client, event):
             )
         
         received = calculate_daily_for(user, 0)
-        await connector.execute(
-            get_create_common_user_expression(
-                user.id,
-                total_love = received,
-                daily_next = now + DAILY_INTERVAL,
-                daily_streak = 1,
-                count_daily_self = 1,
-            )
+        total_love = await add_love(
+            user.id,
+            received,
+            condition = user_common_model.daily_next <= now,
+            connector = connector,
+            values = {
+                'daily_next': now + DAILY_INTERVAL,
+                'daily_streak': 1,
+            },
+            count_daily_self = 1,
         )
+        if total_love is None:
+            return EMBED_DAILY_ALREADY_CLAIMED
         
         return Embed(
             'Here, some love for you~\nCome back tomorrow !',
             (
-                f'You received {received} {EMOJI__HEART_CURRENCY} and now have {received} {EMOJI__HEART_CURRENCY}'
+                f'You received {received} {EMOJI__HEART_CURRENCY} and now have {total_love} {EMOJI__HEART_CURRENCY}'
             ),
             color = COLOR__GAMBLING,
         )
@@ -179,7 +192,7 @@ async def claim_daily_for_waifu(client, event, target_user):
             results = await response.fetchall()
             if results[0][1] == source_user.id:
                 source_entry, target_entry = results
-                
+            
             else:
                 target_entry, source_entry = results
             
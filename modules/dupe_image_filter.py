@@ -1,22 +1,58 @@
 __all__ = ()
 
-from scarletio import Task, IgnoreCaseString, LOOP_TIME, sleep, CancelledError, TaskGroup
+import os
+from json import JSONDecodeError, dump as dump_json, load as load_json
+
+from scarletio import Task, IgnoreCaseString, LOOP_TIME, sleep, CancelledError, TaskGroup, alchemy_incendiary, Lock
 from scarletio.web_common.headers import CONTENT_LENGTH
 from hata import Embed, KOKORO, seconds_to_elapsed_time, Client, Message, DiscordException, ERROR_CODES, now_as_id, \
     seconds_to_id_difference, format_loop_time, TIMESTAMP_STYLES, Permission
 from hata.ext.slash import Button, abort, ButtonStyle, Row, wait_for_component_interaction
 
+from bot_utils.constants import PATH__KOISHI
+from bot_utils.perceptual_hash import MultiIndexHashTable, compute_difference_hash
+
 SLASH_CLIENT: Client
 
 E_TAG = IgnoreCaseString('ETag')
 
 DAY_IN_SECONDS = 60 * 60 * 24
 
+# In perceptual mode a small thumbnail of every image is requested from the media proxy and hashed in the executor.
+# Images with hashes within the distance are duplicates, so re-uploaded, recompressed and resized copies match too.
+PERCEPTUAL_HASH_MAX_DISTANCE = 6
+THUMBNAIL_SIZE = 64
+
+
+def get_thumbnail_url(proxy_url):
+    if '?' in proxy_url:
+        separator = '&'
+    else:
+        separator = '?'
+    
+    return f'{proxy_url}{separator}width={THUMBNAIL_SIZE}&height={THUMBNAIL_SIZE}'
+
+
+# The processed urls and the newest scanned message of each channel are saved, so a later run scans only the new
+# messages. Live indexes are also updated from the created messages.
+#
+# Each url is stored with the newest message it was seen in, so a resumed run matches only the urls seen within its
+# own look back. When saved, live indexes drop the urls older than `LIVE_DUPE_INDEX_MAX_AGE` and the oldest ones above
+# `LIVE_DUPE_INDEX_MAX_URL_COUNT`, while other indexes drop the urls older than the look back of their last run.
+DUPE_INDEX_DIRECTORY = os.path.join(PATH__KOISHI, 'modules', 'dupe_image_filter_indexes')
+DUPE_INDEX_SAVE_DELAY = 60.0
+DUPE_INDEX_LOCK = Lock(KOKORO)
+
+LIVE_DUPE_INDEX_MAX_AGE = DAY_IN_SECONDS * 30
+LIVE_DUPE_INDEX_MAX_URL_COUNT = 50000
+
+LIVE_DUPE_INDEXES = {}
+
 
 class ProcessedUrl:
-    __slots__ = ('_hash', 'is_attachment', 'url', 'identifier')
+    __slots__ = ('_hash', 'is_attachment', 'url', 'identifier', 'message_id', 'perceptual_hash')
     
-    def __init__(self, is_attachment, url, identifier):
+    def __init__(self, is_attachment, url, identifier, message_id):
         if is_attachment:
             hash_ = hash(identifier)
         else:
@@ -26,6 +62,27 @@ class ProcessedUrl:
         self.is_attachment = is_attachment
         self.url = url
         self.identifier = identifier
+        self.message_id = message_id
+        self.perceptual_hash = None
+    
+    @classmethod
+    def from_data(cls, data):
+        is_attachment, url, identifier, perceptual_hash = data[:4]
+        if (identifier is not None):
+            identifier = tuple(identifier)
+        
+        # Urls saved without their message are handled as if they were seen before any look back.
+        if len(data) > 4:
+            message_id = data[4]
+        else:
+            message_id = 0
+        
+        self = cls(is_attachment, url, identifier, message_id)
+        self.perceptual_hash = perceptual_hash
+        return self
+    
+    def to_data(self):
+        return [self.is_attachment, self.url, self.identifier, self.perceptual_hash, self.message_id]
     
     def __hash__(self):
         return self._hash
@@ -82,6 +139,404 @@ class ProcessedMessage:
 def is_attachment_url(url):
     return url.startswith('https://cdn.discordapp.com/attachments')
 
+
+async def get_processed_urls_of(client, message, perceptual):
+    urls = None
+    
+    for embed in message.iter_embeds():
+        if embed.type in ('image', 'video'):
+            thumbnail = embed.thumbnail
+            if (thumbnail is not None):
+                url = thumbnail.url
+                if (url is not None):
+                    if urls is None:
+                        urls = {}
+                    
+                    urls[url] = thumbnail.proxy_url
+        
+        else:
+            image = embed.image
+            if (image is not None):
+                url = image.url
+                if (url is not None):
+                    if urls is None:
+                        urls = {}
+                    
+                    urls[url] = image.proxy_url
+    
+    for attachment in message.iter_attachments():
+        content_type = attachment.content_type
+        if (content_type is None) or (content_type.startswith('image')):
+            if urls is None:
+                urls = {}
+            
+            urls[attachment.url] = attachment.proxy_url
+    
+    if (urls is None):
+        return None
+    
+    processed_urls = set()
+    attachment_urls = None
+    
+    for url in urls:
+        if is_attachment_url(url):
+            if attachment_urls is None:
+                attachment_urls = set()
+            
+            attachment_urls.add(url)
+        
+        else:
+            processed_url = ProcessedUrl(False, url, None, message.id)
+            processed_urls.add(processed_url)
+    
+    if attachment_urls is not None:
+        for attachment_url in attachment_urls:
+            
+            retries = 5
+            while True:
+                try:
+                    response = await client.http.head(attachment_url)
+                except ConnectionError:
+                    if retries <= 0:
+                        raise
+                    
+                    retries -= 1
+                    continue
+                
+                else:
+                    break
+            
+            if response.status != 200:
+                # Message probably deleted meanwhile or something
+                return None
+            
+            headers = response.headers
+            
+            identifier = headers.get(CONTENT_LENGTH), headers.get(E_TAG)
+            
+            processed_url = ProcessedUrl(True, attachment_url, identifier, message.id)
+            processed_urls.add(processed_url)
+    
+    if perceptual:
+        for processed_url in processed_urls:
+            processed_url.perceptual_hash = await get_perceptual_hash_of(client, urls[processed_url.url])
+    
+    return processed_urls
+
+
+async def get_perceptual_hash_of(client, proxy_url):
+    if proxy_url is None:
+        return None
+    
+    try:
+        async with client.http.get(get_thumbnail_url(proxy_url)) as response:
+            if response.status != 200:
+                return None
+            
+            data = await response.read()
+    except ConnectionError:
+        return None
+    
+    return await KOKORO.run_in_executor(alchemy_incendiary(compute_difference_hash, (data,)))
+
+
+async def process_message(client, message, perceptual):
+    # referenced message
+    referenced_message = message.referenced_message
+    if referenced_message is None:
+        replied_message_id = 0
+    elif isinstance(referenced_message, Message):
+        replied_message_id = referenced_message.id
+    else:
+        replied_message_id = referenced_message.message_id
+    
+    processed_urls = await get_processed_urls_of(client, message, perceptual)
+    
+    return ProcessedMessage(message.id, replied_message_id, processed_urls)
+
+
+def get_dupe_index_file_path(channel_id):
+    return os.path.join(DUPE_INDEX_DIRECTORY, f'{channel_id}.json')
+
+
+def read_dupe_index_task(channel_id):
+    file_path = get_dupe_index_file_path(channel_id)
+    if not os.path.exists(file_path):
+        return None
+    
+    try:
+        with open(file_path, 'r') as file:
+            return load_json(file)
+    except (OSError, JSONDecodeError):
+        return None
+
+
+def write_dupe_index_task(channel_id, data):
+    os.makedirs(DUPE_INDEX_DIRECTORY, exist_ok = True)
+    
+    file_path = get_dupe_index_file_path(channel_id)
+    temporary_file_path = file_path + '.tmp'
+    with open(temporary_file_path, 'w') as file:
+        dump_json(data, file)
+    
+    os.replace(temporary_file_path, file_path)
+
+
+def read_live_dupe_indexes_task():
+    if not os.path.isdir(DUPE_INDEX_DIRECTORY):
+        return []
+    
+    datas = []
+    
+    for file_name in os.listdir(DUPE_INDEX_DIRECTORY):
+        channel_id, extension = os.path.splitext(file_name)
+        if (extension != '.json') or (not channel_id.isdecimal()):
+            continue
+        
+        channel_id = int(channel_id)
+        data = read_dupe_index_task(channel_id)
+        if (data is not None) and data.get('live', False):
+            datas.append((channel_id, data))
+    
+    return datas
+
+
+async def get_dupe_index(channel_id):
+    try:
+        return LIVE_DUPE_INDEXES[channel_id]
+    except KeyError:
+        pass
+    
+    async with DUPE_INDEX_LOCK:
+        data = await KOKORO.run_in_executor(alchemy_incendiary(read_dupe_index_task, (channel_id,)))
+    
+    if data is None:
+        return None
+    
+    return DupeIndex.from_data(channel_id, data)
+
+
+async def save_dupe_index(dupe_index):
+    if dupe_index.live and (not dupe_index.scanning):
+        dupe_index.trim_live()
+    
+    data = dupe_index.to_data()
+    
+    async with DUPE_INDEX_LOCK:
+        await KOKORO.run_in_executor(alchemy_incendiary(write_dupe_index_task, (dupe_index.channel_id, data)))
+
+
+async def load_live_dupe_indexes():
+    async with DUPE_INDEX_LOCK:
+        datas = await KOKORO.run_in_executor(read_live_dupe_indexes_task)
+    
+    for channel_id, data in datas:
+        LIVE_DUPE_INDEXES.setdefault(channel_id, DupeIndex.from_data(channel_id, data))
+
+
+class DupeIndex:
+    __slots__ = (
+        'channel_id', 'first_message_id', 'last_message_id', 'live', 'pending_message_ids', 'perceptual_hashes',
+        'queued_messages', 'save_handle', 'scanning', 'urls',
+    )
+    
+    def __init__(self, channel_id, first_message_id, perceptual):
+        if perceptual:
+            perceptual_hashes = MultiIndexHashTable(PERCEPTUAL_HASH_MAX_DISTANCE)
+        else:
+            perceptual_hashes = None
+        
+        self.channel_id = channel_id
+        self.first_message_id = first_message_id
+        self.last_message_id = first_message_id
+        self.live = False
+        self.pending_message_ids = set()
+        self.perceptual_hashes = perceptual_hashes
+        self.queued_messages = None
+        self.save_handle = None
+        self.scanning = False
+        self.urls = {}
+    
+    
+    @classmethod
+    def from_data(cls, channel_id, data):
+        self = cls(channel_id, data['first_message_id'], data['perceptual'])
+        self.last_message_id = data['last_message_id']
+        self.live = data['live']
+        self.pending_message_ids.update(data['pending_message_ids'])
+        self.add_urls([ProcessedUrl.from_data(url_data) for url_data in data['urls']])
+        return self
+    
+    
+    def to_data(self):
+        return {
+            'first_message_id': self.first_message_id,
+            'last_message_id': self.last_message_id,
+            'live': self.live,
+            'pending_message_ids': [*self.pending_message_ids],
+            'perceptual': self.is_perceptual(),
+            'urls': [url.to_data() for url in self.urls.values()],
+        }
+    
+    
+    def __repr__(self):
+        return f'<{self.__class__.__name__} channel_id = {self.channel_id!r}, url count: {len(self.urls)}>'
+    
+    
+    def is_perceptual(self):
+        return (self.perceptual_hashes is not None)
+    
+    
+    def can_resume(self, after_id, perceptual):
+        if self.first_message_id > after_id:
+            return False
+        
+        # Urls added by a non-perceptual run have no hashes, so a perceptual index could not near-match them.
+        if perceptual != self.is_perceptual():
+            return False
+        
+        return True
+    
+    
+    def get_pending_message_ids(self, after_id):
+        return [message_id for message_id in self.pending_message_ids if message_id > after_id]
+    
+    
+    def is_url_present(self, url, after_id):
+        stored_url = self.urls.get(url, None)
+        if (stored_url is not None) and (stored_url.message_id > after_id):
+            return True
+        
+        perceptual_hash = url.perceptual_hash
+        perceptual_hashes = self.perceptual_hashes
+        if (perceptual_hash is not None) and (perceptual_hashes is not None):
+            for stored_url in perceptual_hashes.iter_matches(perceptual_hash):
+                if stored_url.message_id > after_id:
+                    return True
+        
+        return False
+    
+    
+    def decide_about_message(self, processed_message, after_id):
+        replied_message_id = processed_message.replied_message_id
+        processed_urls = processed_message.urls
+        
+        message_id = processed_message.message_id
+        if message_id > self.last_message_id:
+            self.last_message_id = message_id
+        
+        if replied_message_id:
+            self.pending_message_ids.discard(replied_message_id)
+            
+            if (processed_urls is not None):
+                self.add_urls(processed_urls)
+        
+        else:
+            if (processed_urls is not None):
+                for url in processed_urls:
+                    if not self.is_url_present(url, after_id):
+                        is_present = False
+                        break
+                
+                else:
+                    is_present = True
+                
+                if is_present:
+                    self.pending_message_ids.add(message_id)
+                else:
+                    self.add_urls(processed_urls)
+    
+    
+    def add_urls(self, processed_urls):
+        urls = self.urls
+        perceptual_hashes = self.perceptual_hashes
+        
+        for url in processed_urls:
+            stored_url = urls.get(url, None)
+            if (stored_url is not None):
+                if stored_url.message_id < url.message_id:
+                    stored_url.message_id = url.message_id
+                
+                continue
+            
+            urls[url] = url
+            
+            perceptual_hash = url.perceptual_hash
+            if (perceptual_hash is not None):
+                perceptual_hashes.add(perceptual_hash, url)
+    
+    
+    def trim_live(self):
+        first_message_id = now_as_id() - seconds_to_id_difference(LIVE_DUPE_INDEX_MAX_AGE)
+        
+        urls = self.urls
+        over_count = len(urls) - LIVE_DUPE_INDEX_MAX_URL_COUNT
+        if over_count > 0:
+            message_ids = sorted(url.message_id for url in urls.values())
+            first_message_id = max(first_message_id, message_ids[over_count - 1])
+        
+        self.trim(first_message_id)
+    
+    
+    def trim(self, first_message_id):
+        first_message_id = min(first_message_id, self.last_message_id)
+        if first_message_id <= self.first_message_id:
+            return
+        
+        self.first_message_id = first_message_id
+        
+        pending_message_ids = self.pending_message_ids
+        pending_message_ids.difference_update(
+            [message_id for message_id in pending_message_ids if message_id <= first_message_id]
+        )
+        
+        urls = self.urls
+        kept_urls = [url for url in urls.values() if url.message_id > first_message_id]
+        if len(kept_urls) == len(urls):
+            return
+        
+        self.urls = {}
+        if self.is_perceptual():
+            self.perceptual_hashes = MultiIndexHashTable(PERCEPTUAL_HASH_MAX_DISTANCE)
+        
+        self.add_urls(kept_urls)
+    
+    
+    async def process_live_message(self, client, message):
+        if self.scanning:
+            queued_messages = self.queued_messages
+            if queued_messages is None:
+                queued_messages = []
+                self.queued_messages = queued_messages
+            
+            queued_messages.append(message)
+            return
+        
+        if message.id <= self.last_message_id:
+            return
+        
+        processed_message = await process_message(client, message, self.is_perceptual())
+        self.decide_about_message(processed_message, self.first_message_id)
+        self.save_later()
+    
+    
+    def save_later(self):
+        if self.save_handle is None:
+            self.save_handle = KOKORO.call_later(DUPE_INDEX_SAVE_DELAY, self.save)
+    
+    
+    def save(self):
+        self.cancel_save()
+        Task(save_dupe_index(self), KOKORO)
+    
+    
+    def cancel_save(self):
+        save_handle = self.save_handle
+        if (save_handle is not None):
+            self.save_handle = None
+            save_handle.cancel()
+
+
 FILTERERS = {}
 
 UPDATE_INTERVAL = 5.0
@@ -119,12 +574,12 @@ BUTTON_CLOSE = Button(
 
 class DupeImageFilter:
     __slots__ = (
-        'after_id', 'channel_id', 'client', 'request_more', 'urls', 'message_ids_to_delete', 'total_scanned_messages',
-        'total_deleted_messages', 'runner', 'message_delete_task', 'started_at', 'update_waiter', 'message',
-        'all_delete_message_id', 'task',
+        'after_id', 'channel_id', 'client', 'request_more', 'index', 'total_scanned_messages', 'total_deleted_messages',
+        'runner', 'message_delete_task', 'started_at', 'update_waiter', 'message', 'all_delete_message_id', 'task',
+        'perceptual', 'live', 'resumed', 'total_scanned_images', 'total_hashed_images', 'look_back_after_id',
     )
     
-    def __init__(self, client, event, look_back):
+    def __init__(self, client, event, look_back, perceptual, live):
         after_id = now_as_id() - seconds_to_id_difference(DAY_IN_SECONDS * look_back)
         if after_id < 0:
             after_id = 0
@@ -133,14 +588,19 @@ class DupeImageFilter:
         self.message = None
         self.request_more = True
         self.after_id = after_id
+        self.look_back_after_id = after_id
         self.client = client
         self.channel_id = event.channel_id
-        self.urls = set()
+        self.index = DupeIndex(event.channel_id, after_id, perceptual)
+        self.perceptual = perceptual
+        self.live = live
+        self.resumed = False
         self.total_deleted_messages = 0
-        self.message_ids_to_delete = set()
         self.started_at = LOOP_TIME()
         
         self.total_scanned_messages = 0
+        self.total_scanned_images = 0
+        self.total_hashed_images = 0
         
         self.update_waiter = sleep(UPDATE_INTERVAL, KOKORO)
         
@@ -149,11 +609,67 @@ class DupeImageFilter:
         FILTERERS[self.channel_id] = self
     
     
+    async def load_index(self):
+        channel_id = self.channel_id
+        index = await get_dupe_index(channel_id)
+        
+        if (index is not None) and index.can_resume(self.after_id, self.perceptual):
+            self.after_id = index.last_message_id
+            self.resumed = True
+        else:
+            index = self.index
+        
+        if self.live or (channel_id in LIVE_DUPE_INDEXES):
+            LIVE_DUPE_INDEXES[channel_id] = index
+        
+        index.scanning = True
+        self.index = index
+    
+    
+    async def finish_index(self):
+        index = self.index
+        
+        queued_messages = index.queued_messages
+        index.queued_messages = None
+        index.scanning = False
+        
+        if (queued_messages is not None):
+            for message in queued_messages:
+                if message.id > index.last_message_id:
+                    index.decide_about_message(await self.scan_message(message), self.look_back_after_id)
+        
+        index.live = self.live
+        if not index.live:
+            if LIVE_DUPE_INDEXES.get(self.channel_id, None) is index:
+                del LIVE_DUPE_INDEXES[self.channel_id]
+            
+            # Older urls are never matched by this run, and a run with a longer look back does not resume the index.
+            index.trim(self.look_back_after_id)
+        
+        index.cancel_save()
+        await save_dupe_index(index)
+    
+    
+    def abort_index(self):
+        index = self.index
+        if not index.scanning:
+            return
+        
+        index.queued_messages = None
+        index.scanning = False
+        index.cancel_save()
+        
+        if LIVE_DUPE_INDEXES.get(self.channel_id, None) is index:
+            del LIVE_DUPE_INDEXES[self.channel_id]
+    
+    
     async def message_request_loop(self):
         try:
             task = None
             
             try:
+                await self.load_index()
+                
                 while self.request_more:
                     messages = await self.client.message_get_chunk(self.channel_id, after=self.after_id)
                     if len(messages) < 100:
@@ -163,8 +679,17 @@ class DupeImageFilter:
                     
                     task = Task(self.scan_messages(messages, task), KOKORO)
                     continue
+                
+                if (task is not None):
+                    await task
+                
+                await self.finish_index()
+            
             except:
-                task.cancel()
+                if (task is not None):
+                    task.cancel()
+                
+                self.abort_index()
                 raise
             
             finally:
@@ -178,99 +703,25 @@ class DupeImageFilter:
     
     async def message_delete_loop(self):
         try:
-            message_ids_to_delete = self.message_ids_to_delete
-            while message_ids_to_delete:
-                message_id = message_ids_to_delete.pop()
-                
-                try:
-                    await self.client.message_delete((self.channel_id, message_id))
-                except DiscordException as err:
-                    if err.code != ERROR_CODES.unknown_message:
-                        raise
-                
-                self.total_deleted_messages += 1
-        finally:
-            self.update_waiter.cancel()
-    
-    
-    async def get_processed_urls_of(self, message):
-        urls = None
-        
-        for embed in message.iter_embeds():
-            if embed.type in ('image', 'video'):
-                thumbnail = embed.thumbnail
-                if (thumbnail is not None):
-                    url = thumbnail.url
-                    if (url is not None):
-                        if urls is None:
-                            urls = set()
-                        
-                        urls.add(url)
-            
-            else:
-                image = embed.image
-                if (image is not None):
-                    url = image.url
-                    if (url is not None):
-                        if urls is None:
-                            urls = set()
-                        
-                        urls.add(url)
-        
-        for attachment in message.iter_attachments():
-            content_type = attachment.content_type
-            if (content_type is None) or (content_type.startswith('image')):
-                if urls is None:
-                    urls = set()
+            index = self.index
+            while True:
+                # Only the messages within the look back are deleted, even if the index is older.
+                message_ids_to_delete = index.get_pending_message_ids(self.look_back_after_id)
+                if not message_ids_to_delete:
+                    break
                 
-                urls.add(attachment.url)
-        
-        if (urls is None):
-            return None
-        
-        processed_urls = set()
-        attachment_urls = None
-        
-        for url in urls:
-            if is_attachment_url(url):
-                if attachment_urls is None:
-                    attachment_urls = set()
-                
-                attachment_urls.add(url)
-            
-            else:
-                processed_url = ProcessedUrl(False, url, None)
-                processed_urls.add(processed_url)
-        
-        if attachment_urls is not None:
-            for attachment_url in attachment_urls:
-                
-                retries = 5
-                while True:
+                for message_id in message_ids_to_delete:
+                    index.pending_message_ids.discard(message_id)
+                    
                     try:
-                        response = await self.client.http.head(attachment_url)
-                    except ConnectionError:
-                        if retries <= 0:
+                        await self.client.message_delete((self.channel_id, message_id))
+                    except DiscordException as err:
+                        if err.code != ERROR_CODES.unknown_message:
                             raise
-                        
-                        retries -= 1
-                        continue
                     
-                    else:
-                        break
-                
-                if response.status != 200:
-                    # Message probably deleted meanwhile or something
-                    return None
-                
-                headers = response.headers
-                
-                identifier = headers.get(CONTENT_LENGTH), headers.get(E_TAG)
-                
-                processed_url = ProcessedUrl(True, attachment_url, identifier)
-                processed_urls.add(processed_url)
-        
-        return processed_urls
+                    self.total_deleted_messages += 1
+        finally:
+            self.update_waiter.cancel()
     
     
     async def scan_messages(self, messages, previous_task):
@@ -285,8 +736,9 @@ class DupeImageFilter:
                 await previous_task.wait_for_completion()
                 previous_task = None
             
+            index = self.index
             for processed_message in processed_messages:
-                self.decide_about_message(processed_message)
+                index.decide_about_message(processed_message, self.look_back_after_id)
         
         except CancelledError:
             if (previous_task is not None):
@@ -302,50 +754,25 @@ class DupeImageFilter:
             raise
     
     async def scan_message(self, message):
-        # referenced message
-        referenced_message = message.referenced_message
-        if referenced_message is None:
-            replied_message_id = 0
-        elif isinstance(referenced_message, Message):
-            replied_message_id = referenced_message.id
-        else:
-            replied_message_id = referenced_message.message_id
+        processed_message = await process_message(self.client, message, self.perceptual)
         
-        processed_urls = await self.get_processed_urls_of(message)
-        
-        return ProcessedMessage(message.id, replied_message_id, processed_urls)
-    
-    
-    def decide_about_message(self, processed_message):
-        replied_message_id = processed_message.replied_message_id
         processed_urls = processed_message.urls
-        
-        urls = self.urls
-        if replied_message_id:
-            self.message_ids_to_delete.discard(replied_message_id)
+        if (processed_urls is not None):
+            self.total_scanned_images += len(processed_urls)
             
-            if (processed_urls is not None):
-                urls.update(processed_urls)
-                
-        else:
-            if (processed_urls is not None):
-                for url in processed_urls:
-                    if url not in urls:
-                        is_present = False
-                        break
-                
-                else:
-                    is_present = True
-                
-                if is_present:
-                    self.message_ids_to_delete.add(processed_message.message_id)
-                else:
-                    urls.update(processed_urls)
+            for processed_url in processed_urls:
+                if (processed_url.perceptual_hash is not None):
+                    self.total_hashed_images += 1
+        
+        return processed_message
     
     
     def get_embed(self):
         embed = Embed('Filtering out dupe images')
         
+        if self.resumed:
+            embed.description = 'Continuing from the previous scan of the channel.'
+        
         embed.add_field(
             'Messages scanned',
             (
@@ -360,7 +787,7 @@ class DupeImageFilter:
             'Unique images',
             (
                 f'```\n'
-                f'{len(self.urls)}\n'
+                f'{len(self.index.urls)}\n'
                 f'```'
             ),
             inline = True,
@@ -390,12 +817,39 @@ class DupeImageFilter:
             'Messages ensured for deletion',
             (
                 f'```\n'
-                f'{len(self.message_ids_to_delete)}\n'
+                f'{len(self.index.get_pending_message_ids(self.look_back_after_id))}\n'
                 f'```'
             ),
             inline = True,
         )
         
+        if self.perceptual:
+            elapsed = LOOP_TIME() - self.started_at
+            if elapsed > 0.0:
+                images_per_second = self.total_scanned_images / elapsed
+            else:
+                images_per_second = 0.0
+            
+            embed.add_field(
+                'Images scanned',
+                (
+                    f'```\n'
+                    f'{self.total_scanned_images} ({images_per_second:.2f} / s)\n'
+                    f'```'
+                ),
+                inline = True,
+            )
+            
+            embed.add_field(
+                'Images hashed',
+                (
+                    f'```\n'
+                    f'{self.total_hashed_images}\n'
+                    f'```'
+                ),
+                inline = True,
+            )
+        
         
         return embed
     
@@ -419,7 +873,7 @@ class DupeImageFilter:
         except ConnectionError:
             return
         
-        dupe_count = len(self.message_ids_to_delete)
+        dupe_count = len(self.index.get_pending_message_ids(self.look_back_after_id))
         if dupe_count:
             description = f'Please confirm to remove **{dupe_count}** messages with dupe images.'
         else:
@@ -460,7 +914,7 @@ class DupeImageFilter:
             
             await self.try_message_user(user_id, message)
             
-            if self.message_ids_to_delete:
+            if self.index.get_pending_message_ids(self.look_back_after_id):
                 embed = self.get_embed()
                 embed.description = (
                     f'**Please confirm the deletion**\n\n'
@@ -499,6 +953,7 @@ class DupeImageFilter:
                 await client.interaction_component_message_edit(event, embed = embed, components = None)
                 
                 await self.message_update_loop(client, message, 'Deleting dupes')
+                await save_dupe_index(self.index)
                 
             await client.message_edit(message, embed = self.get_embed(), components = BUTTON_CLOSE)
         
@@ -552,7 +1007,9 @@ def has_manage_messages_permission(event):
 async def dupe_image_filter(
     client,
     event,
-    look_back: ('int', 'For how much days it should look back for?')
+    look_back: ('int', 'For how much days it should look back for?'),
+    perceptual: ('bool', 'Match re-uploaded, recompressed and resized images too? (slower)') = False,
+    live: ('bool', 'Keep the channel\'s index up to date from new messages?') = False,
 ):
     """Deletes duplicated images (and other files) | You must have manage messages permission."""
     guild = event.guild
@@ -574,7 +1031,7 @@ async def dupe_image_filter(
     if look_back <= 0:
         abort('look-back cannot be non-positive')
     
-    DupeImageFilter(client, event, look_back)
+    DupeImageFilter(client, event, look_back, perceptual, live)
 
 
 @SLASH_CLIENT.interactions(custom_id = CUSTOM_ID_CLOSE)
@@ -595,4 +1052,27 @@ async def shutdown(client):
     
     cancel_task = None
     
+    for dupe_index in LIVE_DUPE_INDEXES.values():
+        if (not dupe_index.scanning) and (dupe_index.save_handle is not None):
+            dupe_index.cancel_save()
+            cancel_tasks.append(Task(save_dupe_index(dupe_index), KOKORO))
+    
     await TaskGroup(KOKORO, cancel_tasks).wait_all()
+
+
+@SLASH_CLIENT.events
+async def message_create(client, message):
+    dupe_index = LIVE_DUPE_INDEXES.get(message.channel_id, None)
+    if (dupe_index is not None):
+        await dupe_index.process_live_message(client, message)
+
+
+def setup(lib):
+    Task(load_live_dupe_indexes(), KOKORO)
+
+
+def teardown(lib):
+    for dupe_index in LIVE_DUPE_INDEXES.values():
+        if (not dupe_index.scanning) and (dupe_index.save_handle is not None):
+            dupe_index.cancel_save()
+            write_dupe_index_task(dupe_index.channel_id, dupe_index.to_data())
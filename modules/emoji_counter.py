@@ -4,15 +4,18 @@ from datetime import datetime, timedelta
 from math import floor, log
 
 from dateutil.relativedelta import relativedelta
-from hata import EMOJIS, Embed, USERS, parse_custom_emojis, parse_emoji
+from hata import EMOJIS, Embed, KOKORO, USERS, parse_custom_emojis, parse_emoji
 from hata.ext.slash import abort
-from sqlalchemy import and_, func as alchemy_function
-from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.sql import desc, select
+from scarletio import Task
+from sqlalchemy.sql import select
 
 from bot_utils.constants import GUILD__SUPPORT, ROLE__SUPPORT__EMOJI_MANAGER
+from bot_utils.counter_rollup import (
+    EMOJI_COUNTER_INSERT_PER_EVENT, EMOJI_COUNTER_WRITER, STICKER_COUNTER_WRITER, get_counter_totals_statement
+)
 from bot_utils.models import (
-    DB_ENGINE, EMOJI_COUNTER_TABLE, STICKER_COUNTER_TABLE, emoji_counter_model, sticker_counter_model
+    DB_ENGINE, EMOJI_COUNTER_ROLLUP_TABLE, EMOJI_COUNTER_TABLE, STICKER_COUNTER_ROLLUP_TABLE, STICKER_COUNTER_TABLE,
+    emoji_counter_model, emoji_counter_rollup_model, sticker_counter_model, sticker_counter_rollup_model
 )
 from bots import Koishi, Satori
 
@@ -26,6 +29,123 @@ MONTH = timedelta(days = 367, hours = 6) / 12
 
 MOST_USED_PER_PAGE = 90
 
+# Commands query at most 12 months. Raw rows older than that are deleted, their daily rollups are kept.
+COUNTER_RETENTION = RELATIVE_MONTH * 12
+COUNTER_COMPACTION_INTERVAL = 86400.0
+# The first compaction runs shortly after loading, so restarting more often than the interval does not skip it.
+COUNTER_COMPACTION_FIRST_DELAY = 300.0
+
+COUNTER_COMPACTION_HANDLE = None
+COUNTER_COMPACTION_TASK = None
+
+
+def setup(lib):
+    schedule_counter_compaction(COUNTER_COMPACTION_FIRST_DELAY)
+
+
+async def teardown(lib):
+    global COUNTER_COMPACTION_HANDLE
+    
+    compaction_handle = COUNTER_COMPACTION_HANDLE
+    if (compaction_handle is not None):
+        COUNTER_COMPACTION_HANDLE = None
+        compaction_handle.cancel()
+    
+    compaction_task = COUNTER_COMPACTION_TASK
+    if (compaction_task is not None):
+        compaction_task.cancel()
+    
+    await EMOJI_COUNTER_WRITER.flush()
+    await STICKER_COUNTER_WRITER.flush()
+
+
+def schedule_counter_compaction(delay = COUNTER_COMPACTION_INTERVAL):
+    """
+    Schedules the next compaction of the counters' raw rows.
+    
+    Parameters
+    ----------
+    delay : `float` = `COUNTER_COMPACTION_INTERVAL`, Optional
+        After how much seconds the compaction should run.
+    """
+    global COUNTER_COMPACTION_HANDLE
+    
+    compaction_handle = COUNTER_COMPACTION_HANDLE
+    if (compaction_handle is not None):
+        compaction_handle.cancel()
+    
+    COUNTER_COMPACTION_HANDLE = KOKORO.call_later(delay, start_counter_compaction)
+
+
+def start_counter_compaction():
+    """
+    Starts compacting the counters' raw rows if not yet compacting and schedules the next compaction.
+    
+    Returns
+    -------
+    compaction_task : ``Task``
+        The running compaction.
+    """
+    global COUNTER_COMPACTION_TASK
+    
+    schedule_counter_compaction()
+    
+    compaction_task = COUNTER_COMPACTION_TASK
+    if (compaction_task is None):
+        compaction_task = Task(compact_counters(), KOKORO)
+        COUNTER_COMPACTION_TASK = compaction_task
+    
+    return compaction_task
+
+
+async def compact_counters():
+    """
+    Compacts the counters' raw rows older than the retention.
+    
+    This function is a coroutine.
+    
+    Returns
+    -------
+    compactions : `list` of ``CounterCompaction``
+    """
+    global COUNTER_COMPACTION_TASK
+    
+    try:
+        cutoff = datetime.utcnow() - COUNTER_RETENTION
+        return [await writer.compact(cutoff) for writer in (EMOJI_COUNTER_WRITER, STICKER_COUNTER_WRITER)]
+    finally:
+        COUNTER_COMPACTION_TASK = None
+
+
+@Satori.events
+async def shutdown(client):
+    """
+    Called when the client is shutting down. Writes out the buffered counter rows.
+    
+    This function is a coroutine.
+    """
+    await EMOJI_COUNTER_WRITER.flush()
+    await STICKER_COUNTER_WRITER.flush()
+
+
+async def store_counter_rows(writer, rows):
+    """
+    Stores the given counter rows with the given writer.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    writer : ``BatchWriter``
+        The writer to store the rows with.
+    rows : `list` of `dict` of (`str`, `object`) items
+        The rows to store.
+    """
+    if EMOJI_COUNTER_INSERT_PER_EVENT:
+        await writer.write(rows)
+    else:
+        writer.extend(rows)
+
 
 @Satori.events
 async def message_create(client, message):
@@ -111,8 +231,7 @@ async def upload_emojis(emojis, user_id, timestamp):
         })
     
     if (data is not None):
-        async with DB_ENGINE.connect() as connector:
-            await connector.execute(insert(EMOJI_COUNTER_TABLE, data))
+        await store_counter_rows(EMOJI_COUNTER_WRITER, data)
 
 
 async def upload_stickers(stickers, user_id, timestamp):
@@ -131,8 +250,8 @@ async def upload_stickers(stickers, user_id, timestamp):
             'timestamp': timestamp,
         })
     
-    async with DB_ENGINE.connect() as connector:
-        await connector.execute(insert(STICKER_COUNTER_TABLE, data))
+    if (data is not None):
+        await store_counter_rows(STICKER_COUNTER_WRITER, data)
 
 
 @Satori.events
@@ -140,24 +259,41 @@ async def emoji_delete(client, emoji):
     if emoji.guild is not GUILD__SUPPORT:
         return
     
+    # Write out the buffered rows first, so they are deleted as well.
+    await EMOJI_COUNTER_WRITER.flush()
+    
     async with DB_ENGINE.connect() as connector:
         await connector.execute(
             EMOJI_COUNTER_TABLE.delete().where(
                 emoji_counter_model.emoji_id == emoji.id,
             )
         )
+        
+        await connector.execute(
+            EMOJI_COUNTER_ROLLUP_TABLE.delete().where(
+                emoji_counter_rollup_model.emoji_id == emoji.id,
+            )
+        )
 
 @Satori.events
 async def sticker_delete(client, sticker):
     if sticker.guild is not GUILD__SUPPORT:
         return
     
+    await STICKER_COUNTER_WRITER.flush()
+    
     async with DB_ENGINE.connect() as connector:
         await connector.execute(
             STICKER_COUNTER_TABLE.delete().where(
                 sticker_counter_model.sticker_id == sticker.id,
             )
         )
+        
+        await connector.execute(
+            STICKER_COUNTER_ROLLUP_TABLE.delete().where(
+                sticker_counter_rollup_model.sticker_id == sticker.id,
+            )
+        )
 
 
 @Satori.events
@@ -170,18 +306,17 @@ async def reaction_add(client, event):
     if emoji.guild is not GUILD__SUPPORT:
         return
     
-    user_id = user.id
-    timestamp = datetime.utcnow()
-    
-    async with DB_ENGINE.connect() as connector:
-        await connector.execute(
-            EMOJI_COUNTER_TABLE.insert().values(
-                user_id = user_id,
-                emoji_id = emoji.id,
-                timestamp = timestamp,
-                action_type = EMOJI_ACTION_TYPE_REACTION,
-            )
-        )
+    await store_counter_rows(
+        EMOJI_COUNTER_WRITER,
+        [
+            {
+                'user_id': user.id,
+                'emoji_id': emoji.id,
+                'timestamp': datetime.utcnow(),
+                'action_type': EMOJI_ACTION_TYPE_REACTION,
+            },
+        ],
+    )
 
 
 ORDER_DECREASING = 1
@@ -189,7 +324,7 @@ ORDER_INCREASING = 0
 ORDERS = [
     ('decreasing', ORDER_DECREASING),
     ('increasing', ORDER_INCREASING),
-    
+
 ]
 
 EMOJI_COMMANDS = Koishi.interactions(
@@ -241,31 +376,21 @@ async def user_top(event,
     if user is None:
         user = event.user
     
+    filters = {'user_id': user.id}
+    if (action_type != EMOJI_COMMAND_ACTION_TYPE_ALL):
+        filters['action_type'] = action_type
+    
+    await EMOJI_COUNTER_WRITER.ensure_rollup_table()
     async with DB_ENGINE.connect() as connector:
-        statement = (
-            select(
-                [
-                    emoji_counter_model.emoji_id,
-                    alchemy_function.count(emoji_counter_model.emoji_id).label('total'),
-                ]
-            ).where(
-                and_(
-                    emoji_counter_model.user_id == user.id,
-                    emoji_counter_model.timestamp > datetime.utcnow() - RELATIVE_MONTH * months,
-                )
-            ).limit(
-                count,
-            ).group_by(
-                emoji_counter_model.emoji_id,
-            ).order_by(
-                desc('total'),
+        response = await connector.execute(
+            get_counter_totals_statement(
+                EMOJI_COUNTER_WRITER,
+                'emoji_id',
+                filters,
+                datetime.utcnow() - RELATIVE_MONTH * months,
+                limit = count,
             )
         )
-        
-        if (action_type != EMOJI_COMMAND_ACTION_TYPE_ALL):
-            statement = statement.where(emoji_counter_model.action_type==action_type)
-        
-        response = await connector.execute(statement)
         results = await response.fetchall()
     
     embed = Embed(
@@ -299,31 +424,21 @@ async def emoji_top(
         if emoji.guild is not GUILD__SUPPORT:
             abort(f'{emoji} is bound to an other guild.')
     
+    filters = {'emoji_id': emoji.id}
+    if (action_type != EMOJI_COMMAND_ACTION_TYPE_ALL):
+        filters['action_type'] = action_type
+    
+    await EMOJI_COUNTER_WRITER.ensure_rollup_table()
     async with DB_ENGINE.connect() as connector:
-        statement = (
-            select(
-                [
-                    emoji_counter_model.user_id,
-                    alchemy_function.count(emoji_counter_model.user_id).label('total'),
-                ],
-            ).where(
-                and_(
-                    emoji_counter_model.emoji_id == emoji.id,
-                    emoji_counter_model.timestamp > datetime.utcnow() - RELATIVE_MONTH * months,
-                ),
-            ).limit(
-                30,
-            ).group_by(
-                emoji_counter_model.user_id,
-            ).order_by(
-                desc('total'),
+        response = await connector.execute(
+            get_counter_totals_statement(
+                EMOJI_COUNTER_WRITER,
+                'user_id',
+                filters,
+                datetime.utcnow() - RELATIVE_MONTH * months,
+                limit = 30,
             )
         )
-        
-        if (action_type != EMOJI_COMMAND_ACTION_TYPE_ALL):
-            statement = statement.where(emoji_counter_model.action_type==action_type)
-        
-        response = await connector.execute(statement)
         results = await response.fetchall()
     
     
@@ -407,6 +522,12 @@ async def sync_emojis_(event):
                     emoji_counter_model.emoji_id.in_(emoji_ids_to_remove)
                 )
             )
+            
+            await connector.execute(
+                EMOJI_COUNTER_ROLLUP_TABLE.delete().where(
+                    emoji_counter_rollup_model.emoji_id.in_(emoji_ids_to_remove)
+                )
+            )
     
     return f'Unused emoji entries removed: {len(emoji_ids_to_remove)}'
 
@@ -435,10 +556,45 @@ async def sync_users_(event):
                     emoji_counter_model.user_id.in_(user_ids_to_remove)
                 )
             )
+            
+            await connector.execute(
+                EMOJI_COUNTER_ROLLUP_TABLE.delete().where(
+                    emoji_counter_rollup_model.user_id.in_(user_ids_to_remove)
+                )
+            )
     
     return f'Unused user entries removed: {len(user_ids_to_remove)}'
 
 
+@EMOJI_SYNC_COMMANDS.interactions
+async def sync_rollups_(event):
+    """Rebuilds the daily emoji usage counts from the recorded usages. (You must have emoji-council role)"""
+    if not event.user.has_role(ROLE__SUPPORT__EMOJI_MANAGER):
+        abort(f'You must have {ROLE__SUPPORT__EMOJI_MANAGER:m} role to invoke this command.')
+    
+    yield
+    
+    rollup_count = await EMOJI_COUNTER_WRITER.rebuild_rollup()
+    yield f'Daily emoji usage entries rebuilt: {rollup_count}'
+
+
+@EMOJI_SYNC_COMMANDS.interactions
+async def compact_(event):
+    """Folds usages older than a year into the daily counts. (You must have emoji-council role)"""
+    if not event.user.has_role(ROLE__SUPPORT__EMOJI_MANAGER):
+        abort(f'You must have {ROLE__SUPPORT__EMOJI_MANAGER:m} role to invoke this command.')
+    
+    yield
+    
+    compactions = await start_counter_compaction()
+    
+    yield '\n'.join(
+        f'{writer.name}: {compaction.row_count} rows of {compaction.day_count} days reclaimed in '
+        f'{compaction.duration:.2f} seconds'
+        for writer, compaction in zip((EMOJI_COUNTER_WRITER, STICKER_COUNTER_WRITER), compactions)
+    )
+
+
 
 def item_sort_key(item):
     return item[1]
@@ -520,7 +676,7 @@ def _populate_embed_with_fields(embed, query_result, type_, order, page, page_si
         add_emoji_into(description_parts, emoji, index, count, adjust_length)
         if is_new:
             description_parts.append(' *[New!]*')
-
+        
         if (not index % 10) or (index == limit):
             description = ''.join(description_parts)
             description_parts.clear()
@@ -551,25 +707,15 @@ async def most_used(
     
     low_date_limit = datetime.utcnow() - RELATIVE_MONTH * months
     
+    filters = {}
+    if (action_type != EMOJI_COMMAND_ACTION_TYPE_ALL):
+        filters['action_type'] = action_type
+    
+    await EMOJI_COUNTER_WRITER.ensure_rollup_table()
     async with DB_ENGINE.connect() as connector:
-        
-        statement = (
-            select(
-                [
-                    emoji_counter_model.emoji_id,
-                    alchemy_function.count(emoji_counter_model.user_id).label('total'),
-                ],
-            ).where(
-                emoji_counter_model.timestamp > low_date_limit,
-            ).group_by(
-                emoji_counter_model.emoji_id,
-            )
+        response = await connector.execute(
+            get_counter_totals_statement(EMOJI_COUNTER_WRITER, 'emoji_id', filters, low_date_limit)
         )
-        
-        if (action_type != EMOJI_COMMAND_ACTION_TYPE_ALL):
-            statement = statement.where(emoji_counter_model.action_type==action_type)
-        
-        response = await connector.execute(statement)
         results = await response.fetchall()
     
     embed = Embed(
@@ -6,19 +6,22 @@ from math import floor, log10
 from random import random
 
 from hata import (
-    BUILTIN_EMOJIS, Client, DiscordException, ERROR_CODES, Embed, InteractionType, KOKORO, Permission, USERS, ZEROUSER,
-    parse_tdelta
+    BUILTIN_EMOJIS, Client, DiscordException, ERROR_CODES, Embed, InteractionType, KOKORO, Permission, parse_tdelta
 )
 from hata.ext.slash import Button, Row, abort, wait_for_component_interaction
 from scarletio import Future, Task
-from sqlalchemy.sql import desc, select
+from sqlalchemy.sql import select
 
 from bot_utils.constants import (
     COLOR__GAMBLING, EMOJI__HEART_CURRENCY, GUILD__SUPPORT, ROLE__SUPPORT__ADMIN, ROLE__SUPPORT__BOOSTER,
     ROLE__SUPPORT__ELEVATED
 )
+from bot_utils.claim_writer import DailyClaimWriter, HeartClaimWriter
 from bot_utils.daily import calculate_daily_new
+from bot_utils.heart_leaderboard import HEART_LEADERBOARD, resolve_users
+from bot_utils.ledger import add_love, increase_love, spend_love
 from bot_utils.models import DB_ENGINE, USER_COMMON_TABLE, get_create_common_user_expression, user_common_model
+from bot_utils.rate_limiter import RateLimiter
 
 
 SLASH_CLIENT: Client
@@ -36,6 +39,7 @@ EVENT_OK_BUTTON = Button(emoji = EVENT_OK_EMOJI)
 EVENT_ABORT_BUTTON = Button(emoji = EVENT_ABORT_EMOJI)
 EVENT_COMPONENTS = Row(EVENT_OK_BUTTON, EVENT_ABORT_BUTTON)
 EVENT_CURRENCY_BUTTON = Button(emoji = EMOJI__HEART_CURRENCY)
+TOP_LIST_PAGE_SIZE = 20
 
 
 
@@ -202,10 +206,10 @@ class HeartEventGUI:
     _update_time = 60.
     _update_delta = timedelta(seconds=_update_time)
     
-    __slots__=('amount', 'client', 'connector', 'duration', 'message', 'user_ids', 'user_limit', 'waiter',)
+    __slots__=('amount', 'client', 'duration', 'message', 'user_ids', 'user_limit', 'waiter', 'writer')
     async def __new__(cls, client, event, duration, amount, user_limit):
         self = object.__new__(cls)
-        self.connector = None
+        self.writer = None
         self.user_ids = set()
         self.user_limit = user_limit
         self.client = client
@@ -225,7 +229,7 @@ class HeartEventGUI:
             
             raise
         
-        self.connector = await DB_ENGINE.connect()
+        self.writer = HeartClaimWriter(f'heart event {message.id}', amount)
         client.slasher.add_component_interaction_waiter(message, self)
         Task(self.countdown(client, message), KOKORO)
         return
@@ -237,7 +241,7 @@ class HeartEventGUI:
         else:
             description = f'{convert_tdelta(self.duration)} left'
         return Embed(title, description, color = COLOR__GAMBLING)
-
+    
     async def __call__(self, event):
         if event.interaction != EVENT_CURRENCY_BUTTON:
             return
@@ -253,42 +257,15 @@ class HeartEventGUI:
         
         if new_ln == old_ln:
             return
-
+        
         if new_ln == self.user_limit:
             self.duration = timedelta()
             self.waiter.set_result(None)
         
-        connector = self.connector
-        
-        response = await connector.execute(
-            select(
-                [
-                    user_common_model.id,
-                ]
-            ).where(
-                user_common_model.user_id == user.id,
-            )
-        )
-        
-        results = await response.fetchall()
-        if results:
-            entry_id = results[0][0]
-            to_execute = USER_COMMON_TABLE.update(
-                user_common_model.id == entry_id,
-            ).values(
-                total_love=user_common_model.total_love + self.amount,
-            )
-        
-        else:
-            to_execute = get_create_common_user_expression(
-                user_id,
-                total_love = self.amount,
-            )
-        
-        await connector.execute(to_execute)
+        self.writer.claim(user_id)
         
         await self.client.interaction_component_acknowledge(event)
-        
+    
     async def countdown(self, client, message):
         update_delta = self._update_delta
         waiter = self.waiter
@@ -347,18 +324,7 @@ class HeartEventGUI:
             return
         
         finally:
-            connector = self.connector
-            if (connector is not None):
-                self.connector = None
-                await connector.close()
-    
-    def __del__(self):
-        connector = self.connector
-        if connector is None:
-            return
-        
-        self.connector = None
-        Task(connector.close(), KOKORO)
+            await self.writer.close()
 
 
 @SLASH_CLIENT.interactions(guild = GUILD__SUPPORT, required_permissions = Permission().update_by_keys(administrator = True))
@@ -490,10 +456,10 @@ class DailyEventGUI:
     _update_time = 60.
     _update_delta = timedelta(seconds=_update_time)
     
-    __slots__=('amount', 'client', 'connector', 'duration', 'message', 'user_ids', 'user_limit', 'waiter',)
+    __slots__=('amount', 'client', 'duration', 'message', 'user_ids', 'user_limit', 'waiter', 'writer')
     async def __new__(cls, client, event, duration, amount, user_limit):
         self = object.__new__(cls)
-        self.connector = None
+        self.writer = None
         self.user_ids = set()
         self.user_limit = user_limit
         self.client = client
@@ -513,9 +479,7 @@ class DailyEventGUI:
             
             raise
         
-        self.connector = await DB_ENGINE.connect()
-        
-        self.connector = await DB_ENGINE.connect()
+        self.writer = DailyClaimWriter(f'daily event {message.id}', amount)
         client.slasher.add_component_interaction_waiter(message, self)
         Task(self.countdown(client, message), KOKORO)
         return
@@ -548,43 +512,8 @@ class DailyEventGUI:
             self.duration = timedelta()
             self.waiter.set_result(None)
         
-        connector = self.connector
-        
-        response = await connector.execute(
-            select(
-                [
-                    user_common_model.id,
-                    user_common_model.daily_streak,
-                    user_common_model.daily_next,
-                ]
-            ).where(
-                user_common_model.user_id == user_id,
-            )
-        )
-        
-        results = await response.fetchall()
-        if results:
-            entry_id, daily_streak, daily_next = results[0]
-            now = datetime.utcnow()
-            
-            daily_streak, daily_next = calculate_daily_new(daily_streak, daily_next, now)
-            daily_streak = daily_streak + self.amount
-            
-            to_execute = USER_COMMON_TABLE.update(
-                user_common_model.id == entry_id,
-            ).values(
-                daily_streak = daily_streak,
-                daily_next = daily_next,
-            )
+        self.writer.claim(user_id)
         
-        else:
-            to_execute = get_create_common_user_expression(
-                user_id,
-                daily_streak = self.amount,
-            )
-        
-        await connector.execute(to_execute)
-    
         await self.client.interaction_component_acknowledge(event)
     
     async def countdown(self, client, message):
@@ -645,18 +574,7 @@ class DailyEventGUI:
             return
         
         finally:
-            connector = self.connector
-            if (connector is not None):
-                self.connector = None
-                await connector.close()
-    
-    def __del__(self):
-        connector = self.connector
-        if connector is None:
-            return
-        
-        self.connector = None
-        Task(connector.close(), KOKORO)
+            await self.writer.close()
 
 
 
@@ -713,57 +631,23 @@ async def gift(client, event,
             yield Embed('Like a flower', 'Whithering to the dust.', color = COLOR__GAMBLING)
             return
         
-        response = await connector.execute(
-            select(
-                [
-                    user_common_model.id,
-                    user_common_model.total_love,
-                ]
-            ).where(
-                user_common_model.user_id == target_user.id,
-            )
-        )
-        
-        results = await response.fetchall()
-        if results:
-            target_user_entry_id, target_user_total_love = results[0]
-        else:
-            target_user_entry_id = -1
-            target_user_total_love = 0
-        
         source_user_total_love -= source_user_total_allocated
         
         if amount > source_user_total_love:
-            amount = source_user_total_love - source_user_total_allocated
-            source_user_new_love = source_user_total_allocated
-        else:
-            source_user_new_love = source_user_total_love - amount
-        
-        target_user_new_total_love = target_user_total_love + amount
-        
-        await connector.execute(
-            USER_COMMON_TABLE.update(
-                user_common_model.id == source_user_entry_id
-            ).values(
-                total_love = user_common_model.total_love - amount,
-            )
-        )
+            amount = source_user_total_love
         
-        if target_user_entry_id != -1:
-            to_execute = USER_COMMON_TABLE.update(
-                user_common_model.id == target_user_entry_id
-            ).values(
-                total_love = user_common_model.total_love + amount,
-            )
-        
-        else:
-            to_execute = get_create_common_user_expression(
-                target_user.id,
-                total_love = target_user_new_total_love,
-            )
+        # The amount is spent only if the user still has it, so parallel gifts cannot overdraw.
+        source_user_new_total_love = await spend_love(source_user.id, amount, connector = connector)
+        if source_user_new_total_love is None:
+            yield Embed('Like a flower', 'Whithering to the dust.', color = COLOR__GAMBLING)
+            return
         
-        await connector.execute(to_execute)
+        source_user_new_love = source_user_new_total_love - source_user_total_allocated
+        source_user_total_love = source_user_new_love + amount
         
+        target_user_new_total_love = await add_love(target_user.id, amount, connector = connector)
+        target_user_total_love = target_user_new_total_love - amount
+    
     embed = Embed(
         'Aww, so lovely',
         f'You gifted {amount} {EMOJI__HEART_CURRENCY} to {target_user.full_name}',
@@ -840,35 +724,32 @@ async def award(client, event,
         message = message[:1000]+'...'
     
     async with DB_ENGINE.connect() as connector:
-        response = await connector.execute(
-            select(
-                [
-                    user_common_model.id,
-                    user_common_model.total_love,
-                    user_common_model.daily_streak,
-                    user_common_model.daily_next,
-                ]
-            ).where(
-                user_common_model.user_id == target_user.id
-            )
-        )
-        
-        results = await response.fetchall()
-        if results:
-            target_user_entry_id, target_user_total_love, target_user_daily_streak, target_user_daily_next = results[0]
-        else:
-            target_user_entry_id = -1
-            target_user_total_love = 0
-            target_user_daily_streak = 0
-            target_user_daily_next = datetime.utcnow()
-        
-        
         if with_ == 'hearts':
-            target_user_new_total_love = target_user_total_love + amount
-            target_user_new_daily_streak = target_user_daily_streak
+            target_user_new_total_love = await add_love(target_user.id, amount, connector = connector)
+            target_user_total_love = target_user_new_total_love - amount
+        
         else:
+            response = await connector.execute(
+                select(
+                    [
+                        user_common_model.id,
+                        user_common_model.daily_streak,
+                        user_common_model.daily_next,
+                    ]
+                ).where(
+                    user_common_model.user_id == target_user.id
+                )
+            )
+            
+            results = await response.fetchall()
+            if results:
+                target_user_entry_id, target_user_daily_streak, target_user_daily_next = results[0]
+            else:
+                target_user_entry_id = -1
+                target_user_daily_streak = 0
+                target_user_daily_next = datetime.utcnow()
+            
             now = datetime.utcnow()
-            target_user_new_total_love = target_user_total_love
             if target_user_daily_next < now:
                 target_user_daily_streak, target_user_daily_next = calculate_daily_new(
                     target_user_daily_streak, 
@@ -877,26 +758,23 @@ async def award(client, event,
                 )
             
             target_user_new_daily_streak = target_user_daily_streak + amount
-        
-        target_user_new_daily_next = target_user_daily_next
+            target_user_new_daily_next = target_user_daily_next
             
-        if (target_user_entry_id != -1):
-            to_execute = USER_COMMON_TABLE.update(
-                user_common_model.id == target_user_entry_id,
-            ).values(
-                total_love  = target_user_new_total_love,
-                daily_streak = target_user_new_daily_streak,
-                daily_next = target_user_new_daily_next,
-            )
-        else:
-            to_execute = get_create_common_user_expression(
-                target_user.id,
-                total_love = target_user_new_total_love,
-                daily_next = target_user_new_daily_next,
-                daily_streak = target_user_new_daily_streak,
-            )
-        
-        await connector.execute(to_execute)
+            if (target_user_entry_id != -1):
+                to_execute = USER_COMMON_TABLE.update(
+                    user_common_model.id == target_user_entry_id,
+                ).values(
+                    daily_streak = target_user_new_daily_streak,
+                    daily_next = target_user_new_daily_next,
+                )
+            else:
+                to_execute = get_create_common_user_expression(
+                    target_user.id,
+                    daily_next = target_user_new_daily_next,
+                    daily_streak = target_user_new_daily_streak,
+                )
+            
+            await connector.execute(to_execute)
     
     if with_ == 'hearts':
         awarded_with = EMOJI__HEART_CURRENCY.as_emoji
@@ -920,7 +798,7 @@ async def award(client, event,
     
     if target_user.bot:
         return
-
+    
     try:
         target_user_channel = await client.channel_private_create(target_user)
     except ConnectionError:
@@ -1015,51 +893,21 @@ async def top_list(client, event,
     if page < 1:
         page = 1
     
-    async with DB_ENGINE.connect() as connector:
-        response = await connector.execute(
-            select(
-                [
-                    user_common_model.user_id,
-                    user_common_model.total_love,
-                ]
-            ).where(
-                user_common_model.total_love != 0,
-            ).order_by(
-                desc(user_common_model.total_love),
-            ).limit(
-                20,
-            ).offset(
-                20 * (page - 1),
-            )
-        )
-        
-        results = await response.fetchall()
-        
-        parts = []
-        max_hearts = 0
-        
-        for index, (user_id, total_hearts) in enumerate(results, (page * 20) - 19):
-            try:
-                user = USERS[user_id]
-            except KeyError:
-                try:
-                    user = await client.user_get(user_id)
-                except BaseException as err:
-                    if isinstance(err, ConnectionError):
-                        return
-                    
-                    if isinstance(err, DiscordException):
-                        if err.code == ERROR_CODES.unknown_user:
-                            user = ZEROUSER
-                        else:
-                            raise
-                    
-                    else:
-                        raise
-            
-            if total_hearts > max_hearts:
-                max_hearts = total_hearts
-            parts.append((index, total_hearts, user.full_name))
+    page_ranks = await HEART_LEADERBOARD.get_page(page, TOP_LIST_PAGE_SIZE)
+    rank, total_love = await HEART_LEADERBOARD.get_rank(event.user.id)
+    
+    try:
+        users = await resolve_users([user_id for user_id, total_hearts in page_ranks])
+    except ConnectionError:
+        return
+    
+    parts = []
+    max_hearts = 0
+    
+    for index, (user_id, total_hearts) in enumerate(page_ranks, (page - 1) * TOP_LIST_PAGE_SIZE + 1):
+        if total_hearts > max_hearts:
+            max_hearts = total_hearts
+        parts.append((index, total_hearts, users[user_id].full_name))
     
     result_parts = [
         EMOJI__HEART_CURRENCY.as_emoji,
@@ -1076,7 +924,7 @@ async def top_list(client, event,
     
     if max_hearts:
         result_parts.append('cs\n')
-        index_adjust = floor(log10((page - 1) * 20 + len(parts))) + 1
+        index_adjust = floor(log10((page - 1) * TOP_LIST_PAGE_SIZE + len(parts))) + 1
         hearts_adjust = floor(log10(max_hearts)) + 1
         
         for index, total_hearts, full_name in parts:
@@ -1091,6 +939,14 @@ async def top_list(client, event,
     
     result_parts.append('```')
     
+    if rank:
+        result_parts.append('\nYou are **#')
+        result_parts.append(str(rank))
+        result_parts.append('** with ')
+        result_parts.append(str(total_love))
+        result_parts.append(' ')
+        result_parts.append(EMOJI__HEART_CURRENCY.as_emoji)
+    
     yield ''.join(result_parts)
     return
 
@@ -1098,8 +954,8 @@ async def top_list(client, event,
 
 
 
-HEART_GENERATOR_COOLDOWNS = set()
 HEART_GENERATOR_COOLDOWN = 3600.0
+HEART_GENERATOR_COOLDOWNS = RateLimiter(HEART_GENERATOR_COOLDOWN)
 HEART_GENERATION_AMOUNT = 10
 
 INTERACTION_TYPE_APPLICATION_COMMAND = InteractionType.application_command
@@ -1107,42 +963,15 @@ INTERACTION_TYPE_MESSAGE_COMPONENT = InteractionType.message_component
 INTERACTION_TYPE_APPLICATION_COMMAND_AUTOCOMPLETE = InteractionType.application_command_autocomplete
 
 async def increase_user_total_love(user_id, increase):
-    async with DB_ENGINE.connect() as connector:
-        response = await connector.execute(
-            select(
-                [
-                    user_common_model.id,
-                ]
-            ).where(
-                user_common_model.user_id == user_id,
-            )
-        )
-        results = await response.fetchall()
-        if not results:
-            # avoid race condition, do not add hearts if the user is not yet stored.
-            #
-            # to_execute = get_create_common_user_expression(
-            #     user_id,
-            #     total_love = increase,
-            # )
-            return
-            
-        entry_id = results[0][0]
-        to_execute = USER_COMMON_TABLE.update(
-            user_common_model.id == entry_id
-        ).values(
-            total_love = user_common_model.total_love + increase,
-        )
-        
-        await connector.execute(to_execute)
+    # Do not add hearts if the user is not yet stored.
+    await increase_love(user_id, increase)
 
-        
 
 # yup, we are generating hearts
 @SLASH_CLIENT.events(name = 'interaction_create')
 async def heart_generator(client, event):
     user_id = event.user.id
-    if user_id in HEART_GENERATOR_COOLDOWNS:
+    if HEART_GENERATOR_COOLDOWNS.get_retry_after(user_id):
         return
     
     event_type = event.type
@@ -1156,5 +985,5 @@ async def heart_generator(client, event):
         return
     
     if random() < chance:
-        KOKORO.call_later(HEART_GENERATOR_COOLDOWN, set.discard, HEART_GENERATOR_COOLDOWNS, user_id)
+        HEART_GENERATOR_COOLDOWNS.consume(user_id)
         await increase_user_total_love(user_id, HEART_GENERATION_AMOUNT)
@@ -8,9 +8,8 @@ from hata.ext.slash import Button, Row
 from hata.ext.slash.menus.menu import GUI_STATE_READY, GUI_STATE_EDITING, GUI_STATE_CANCELLING, \
     GUI_STATE_CANCELLED, GUI_STATE_SWITCHING_CONTEXT, Timeouter
 
-from sqlalchemy.sql import select
-
 from bot_utils.models import DB_ENGINE, user_common_model, USER_COMMON_TABLE
+from bot_utils.user_common_cache import get_user_common_row
 from bot_utils.constants import EMOJI__HEART_CURRENCY, IN_GAME_IDS, COLOR__GAMBLING
 
 SLASH_CLIENT: Client
@@ -659,31 +658,20 @@ def game_21_precheck(client, user, channel, amount, require_guild):
 
 
 async def game_21_postcheck(client, user, channel, amount):
-    async with DB_ENGINE.connect() as connector:
-        response = await connector.execute(
-            select(
-                [
-                    user_common_model.id,
-                    user_common_model.total_love,
-                    user_common_model.total_allocated,
-                ]
-            ).where(
-                user_common_model.user_id == user.id,
-            )
-        )
-        
-        results = await response.fetchall()
-        if results:
-            entry_id, total_love, total_allocated = results[0]
-        else:
-            total_love = 0
-            total_allocated = 0
-            entry_id = -1
-        
-        if total_love - total_allocated < amount:
-            error_message = f'You have just {total_love} {EMOJI__HEART_CURRENCY.as_emoji}'
-        else:
-            return entry_id, None
+    row = await get_user_common_row(user.id)
+    if (row is not None):
+        entry_id = row.id
+        total_love = row.total_love
+        total_allocated = row.total_allocated
+    else:
+        total_love = 0
+        total_allocated = 0
+        entry_id = -1
+    
+    if total_love - total_allocated < amount:
+        error_message = f'You have just {total_love} {EMOJI__HEART_CURRENCY.as_emoji}'
+    else:
+        return entry_id, None
     
     return entry_id, Embed('Ohoho', error_message, color = COLOR__GAMBLING)
 
@@ -4,6 +4,7 @@ from datetime import datetime
 
 from hata import Client, DiscordException, ERROR_CODES, Embed, Sticker
 from hata.ext.slash import Button, InteractionResponse, Row, abort
+from sqlalchemy import and_
 from sqlalchemy.sql import select
 
 from .marriage_slot import EMOJI_NO, EMOJI_YES, buy_waifu_slot_invoke
@@ -13,7 +14,8 @@ from bot_utils.constants import (
     ROLE__SUPPORT__NSFW_ACCESS
 )
 from bot_utils.daily import ELEVATED_COST, HEART_BOOST_COST, NSFW_ACCESS_COST, calculate_daily_new
-from bot_utils.models import DB_ENGINE, USER_COMMON_TABLE, user_common_model
+from bot_utils.ledger import add_love, spend_love
+from bot_utils.models import DB_ENGINE, user_common_model
 
 
 SLASH_CLIENT: Client
@@ -150,6 +152,18 @@ async def reduce_divorce_yes(event):
             available_love = total_love-total_allocated
             cost = get_divorce_reduction_cost(user.id, waifu_divorces)
             
+            if available_love >= cost:
+                # The cost depends on the divorce count, so only spend if it did not change since.
+                total_love = await spend_love(
+                    user.id,
+                    cost,
+                    condition = user_common_model.waifu_divorces == waifu_divorces,
+                    connector = connector,
+                    waifu_divorces = -1,
+                )
+                if total_love is None:
+                    available_love = 0
+            
             if available_love < cost:
                 text = (
                     f'Heart amount changed - sufficient amount of hearts\n'
@@ -160,15 +174,6 @@ async def reduce_divorce_yes(event):
                 thumbnail_image_url = None
                 break
             
-            await connector.execute(
-                USER_COMMON_TABLE.update(
-                    user_common_model.id == entry_id,
-                ).values(
-                    total_love = user_common_model.total_love - cost,
-                    waifu_divorces = user_common_model.waifu_divorces - 1,
-                )
-            )
-            
             text = (
                 'Divorce papers located and burned successfully!\n'
                 '\n'
@@ -247,7 +252,12 @@ async def roles(client, event,
             available_love = 0
         
         if available_love > cost:
-            can_buy = True
+            new_total_love = await spend_love(user_id, cost, connector = connector)
+            if new_total_love is None:
+                can_buy = False
+            else:
+                total_love = new_total_love + cost
+                can_buy = True
         else:
             can_buy = False
         
@@ -258,6 +268,9 @@ async def roles(client, event,
             try:
                 await client.user_role_add(user, role)
             except DiscordException as err:
+                # The hearts are already spent, give them back.
+                await add_love(user_id, cost, connector = connector)
+                
                 if err.code in (
                     ERROR_CODES.unknown_user,
                     ERROR_CODES.unknown_member,
@@ -269,14 +282,6 @@ async def roles(client, event,
             
             else:
                 buying_success = True
-            
-            await connector.execute(
-                USER_COMMON_TABLE.update(
-                    user_common_model.user_id == user_id,
-                ).values(
-                    total_love = user_common_model.total_love - cost,
-                )
-            )
     
     embed = Embed(
         f'Buying {role.name} for {cost} {EMOJI__HEART_CURRENCY}'
@@ -380,6 +385,8 @@ async def sell_daily(client, event,
         results = await response.fetchall()
         if results:
             entry_id, total_love, daily_streak, daily_next = results[0]
+            stored_daily_streak = daily_streak
+            stored_daily_next = daily_next
             now = datetime.utcnow()
             if daily_next < now:
                 daily_streak, daily_next = calculate_daily_new(daily_streak, daily_next, now)
@@ -392,17 +399,26 @@ async def sell_daily(client, event,
         if amount <= daily_streak:
             sell_price = calculate_sell_price(daily_streak, amount)
             
-            await connector.execute(
-                USER_COMMON_TABLE.update(
-                    user_common_model.id == entry_id
-                ).values(
-                    total_love = user_common_model.total_love + sell_price,
-                    daily_next = daily_next,
-                    daily_streak = daily_streak - amount,
-                )
+            # Sell only if the daily streak did not change since we read it.
+            new_total_love = await add_love(
+                user_id,
+                sell_price,
+                condition = and_(
+                    user_common_model.daily_streak == stored_daily_streak,
+                    user_common_model.daily_next == stored_daily_next,
+                ),
+                connector = connector,
+                values = {
+                    'daily_next': daily_next,
+                    'daily_streak': daily_streak - amount,
+                },
             )
             
-            sold = True
+            if new_total_love is None:
+                sold = False
+            else:
+                total_love = new_total_love - sell_price
+                sold = True
         else:
             sold = False
     
@@ -5,9 +5,9 @@ from datetime import datetime
 
 from hata import Client, Embed, Emoji
 from hata.ext.slash import abort, InteractionResponse
-from sqlalchemy.sql import select
 
 from bot_utils.models import DB_ENGINE, user_common_model, USER_COMMON_TABLE
+from bot_utils.user_common_cache import get_user_common_row
 
 from bot_utils.constants import ROLE__SUPPORT__ELEVATED, ROLE__SUPPORT__BOOSTER, GUILD__SUPPORT, \
     EMOJI__HEART_CURRENCY, ROLE__SUPPORT__HEART_BOOST, IN_GAME_IDS, COLOR__GAMBLING
@@ -64,48 +64,39 @@ def create_hearts_short_embed(event, target_user, total_love, daily_streak, read
     return Embed(title, description, color = COLOR__GAMBLING)
 
 
-async def get_generic_fields(target_user):
-    async with DB_ENGINE.connect() as connector:
-        response = await connector.execute(
-            select(
-                [
-                    user_common_model.id,
-                    user_common_model.total_love,
-                    user_common_model.daily_streak,
-                    user_common_model.daily_next,
-                    user_common_model.total_allocated,
-                ]
-            ).where(
-                user_common_model.user_id == target_user.id,
-            )
-        )
-        
-        results = await response.fetchall()
-    
-        if results:
-            entry_id, total_love, daily_streak, daily_next, total_allocated = results[0]
-            
-            now = datetime.utcnow()
-            if daily_next > now:
-                ready_to_claim = False
-            else:
-                ready_to_claim = True
-                
-                daily_streak = calculate_daily_new_only(daily_streak, daily_next, now)
-        
-            if total_allocated and (target_user.id not in IN_GAME_IDS):
-                await connector.execute(
-                    USER_COMMON_TABLE.update(
-                        user_common_model.id == entry_id,
-                    ).values(
-                        total_allocated = 0,
-                    )
+async def reset_total_allocated(target_user, row):
+    if row.total_allocated and (target_user.id not in IN_GAME_IDS):
+        async with DB_ENGINE.connect() as connector:
+            await connector.execute(
+                USER_COMMON_TABLE.update(
+                    user_common_model.id == row.id,
+                ).values(
+                    total_allocated = 0,
                 )
+            )
+
+
+async def get_generic_fields(target_user):
+    row = await get_user_common_row(target_user.id)
+    if (row is not None):
+        total_love = row.total_love
+        daily_streak = row.daily_streak
+        daily_next = row.daily_next
         
+        now = datetime.utcnow()
+        if daily_next > now:
+            ready_to_claim = False
         else:
-            total_love = 0
-            daily_streak = 0
             ready_to_claim = True
+            
+            daily_streak = calculate_daily_new_only(daily_streak, daily_next, now)
+        
+        await reset_total_allocated(target_user, row)
+    
+    else:
+        total_love = 0
+        daily_streak = 0
+        ready_to_claim = True
     
     return total_love, daily_streak, ready_to_claim
 
@@ -236,42 +227,21 @@ async def render_hearts_daily_extended(client, event, target_user):
 
 
 async def render_hearts_vote_extended(client, event, target_user):
-    async with DB_ENGINE.connect() as connector:
-        response = await connector.execute(
-            select(
-                [
-                    user_common_model.id,
-                    user_common_model.total_love,
-                    user_common_model.daily_streak,
-                    user_common_model.daily_next,
-                    user_common_model.total_allocated,
-                ]
-            ).where(
-                user_common_model.user_id == target_user.id,
-            )
-        )
+    row = await get_user_common_row(target_user.id)
+    if (row is not None):
+        total_love = row.total_love
+        daily_streak = row.daily_streak
+        daily_next = row.daily_next
         
-        results = await response.fetchall()
+        now = datetime.utcnow()
+        if daily_next > now:
+            daily_streak = calculate_daily_new_only(daily_streak, daily_next, now)
         
-        if results:
-            entry_id, total_love, daily_streak, daily_next, total_allocated = results[0]
-            
-            now = datetime.utcnow()
-            if daily_next > now:
-                daily_streak = calculate_daily_new_only(daily_streak, daily_next, now)
-        
-            if total_allocated and (target_user.id not in IN_GAME_IDS):
-                await connector.execute(
-                    USER_COMMON_TABLE.update(
-                        user_common_model.id == entry_id,
-                    ).values(
-                        total_allocated = 0,
-                    )
-                )
-        
-        else:
-            daily_streak = 0
-            total_love = 0
+        await reset_total_allocated(target_user, row)
+    
+    else:
+        daily_streak = 0
+        total_love = 0
     
     is_own = (event.user is target_user)
     
@@ -360,54 +330,31 @@ async def render_hearts_vote_extended(client, event, target_user):
 
 
 async def render_hearts_stats(client, event, target_user):
-    async with DB_ENGINE.connect() as connector:
-        response = await connector.execute(
-            select(
-                [
-                    user_common_model.id,
-                    user_common_model.total_love,
-                    user_common_model.daily_streak,
-                    user_common_model.daily_next,
-                    user_common_model.total_allocated,
-                    
-                    # Counts
-                    user_common_model.count_daily_self,
-                    user_common_model.count_daily_by_waifu,
-                    user_common_model.count_daily_for_waifu,
-                    user_common_model.count_top_gg_vote,
-                ]
-            ).where(
-                user_common_model.user_id == target_user.id,
-            )
-        )
+    row = await get_user_common_row(target_user.id)
+    if (row is not None):
+        total_love = row.total_love
+        daily_streak = row.daily_streak
+        daily_next = row.daily_next
         
-        results = await response.fetchall()
+        count_daily_self = row.count_daily_self
+        count_daily_by_waifu = row.count_daily_by_waifu
+        count_daily_for_waifu = row.count_daily_for_waifu
+        count_top_gg_vote = row.count_top_gg_vote
         
-        if results:
-            entry_id, total_love, daily_streak, daily_next, total_allocated, count_daily_self, \
-                count_daily_by_waifu, count_daily_for_waifu, count_top_gg_vote = results[0]
-            
-            now = datetime.utcnow()
-            if daily_next > now:
-                daily_streak = calculate_daily_new_only(daily_streak, daily_next, now)
-            
-            if total_allocated and (target_user.id not in IN_GAME_IDS):
-                await connector.execute(
-                    USER_COMMON_TABLE.update(
-                        user_common_model.id == entry_id,
-                    ).values(
-                        total_allocated = 0,
-                    )
-                )
+        now = datetime.utcnow()
+        if daily_next > now:
+            daily_streak = calculate_daily_new_only(daily_streak, daily_next, now)
         
-        else:
-            total_love = 0
-            daily_streak = 0
-            
-            count_daily_self = 0
-            count_daily_by_waifu = 0
-            count_daily_for_waifu = 0
-            count_top_gg_vote = 0
+        await reset_total_allocated(target_user, row)
+    
+    else:
+        total_love = 0
+        daily_streak = 0
+        
+        count_daily_self = 0
+        count_daily_by_waifu = 0
+        count_daily_for_waifu = 0
+        count_top_gg_vote = 0
     
     
     if random() < 0.01:
@@ -1,20 +1,366 @@
 __all__ = ()
 
-from collections import OrderedDict
+import os
+from bisect import bisect_left
+from heapq import nsmallest
+from sys import getsizeof
+from time import monotonic
+
+from hata import KOKORO
+from scarletio import RichAttributeErrorBaseType, Task, alchemy_incendiary, from_json
+
+from bot_utils.async_cache import AsyncCache
+from bot_utils.constants import PATH__KOISHI
 
 from ...constants import (
-    NSFW_BOORU_AUTOCOMPLETE_ENDPOINT, NSFW_BOORU_AUTOCOMPLETE_PARAMETERS, NSFW_BOORU_AUTOCOMPLETE_QUERY_KEY,
-    NSFW_TAGS_BANNED, SAFE_BOORU_AUTOCOMPLETE_ENDPOINT, SAFE_BOORU_AUTOCOMPLETE_PARAMETERS,
-    SAFE_BOORU_AUTOCOMPLETE_QUERY_KEY, SAFE_TAGS_BANNED
+    NSFW_BOORU_AUTOCOMPLETE_ENDPOINT, NSFW_BOORU_AUTOCOMPLETE_LIMIT, NSFW_BOORU_AUTOCOMPLETE_PARAMETERS,
+    NSFW_BOORU_AUTOCOMPLETE_QUERY_KEY, NSFW_TAGS_BANNED, SAFE_BOORU_AUTOCOMPLETE_ENDPOINT,
+    SAFE_BOORU_AUTOCOMPLETE_LIMIT, SAFE_BOORU_AUTOCOMPLETE_PARAMETERS, SAFE_BOORU_AUTOCOMPLETE_QUERY_KEY,
+    SAFE_TAGS_BANNED
 )
 
 from .helpers import build_tag_gel_booru, build_tag_safe_booru
 
 
 CACHE_MAX_SIZE = 1000
+CACHE_MAX_BYTES = 2 << 20
+CACHE_TTL = 21600.0
+
+# Optional local tag dumps. A dump is a json list of tag datas in the same format as the autocomplete responses,
+# ordered by popularity. If present, suggestions are looked up from it instead of requesting them.
+SAFE_BOORU_TAG_DUMP_PATH = os.path.join(PATH__KOISHI, 'library', 'safe_booru_tags.json')
+NSFW_BOORU_TAG_DUMP_PATH = os.path.join(PATH__KOISHI, 'library', 'gel_booru_tags.json')
+TAG_DUMP_CHECK_INTERVAL = 3600.0
+
+
+def get_tag_completions_size(tag_completions):
+    """
+    Returns the approximate size of the given autocomplete suggestions in bytes.
+    
+    Parameters
+    ----------
+    tag_completions : `tuple` (`list` of `tuple` (`str`, `str`), `bool`)
+        Autocomplete suggestions and whether they include every matching tag.
+    
+    Returns
+    -------
+    size : `int`
+    """
+    tag_name_value_pairs, complete = tag_completions
+    size = getsizeof(tag_completions) + getsizeof(tag_name_value_pairs)
+    for tag_name_value_pair in tag_name_value_pairs:
+        size += getsizeof(tag_name_value_pair) + getsizeof(tag_name_value_pair[0]) + getsizeof(tag_name_value_pair[1])
+    
+    return size
+
+
+SAFE_BOORU_TAG_CACHE = AsyncCache(
+    'safe-booru tags',
+    byte_limit = CACHE_MAX_BYTES,
+    size_limit = CACHE_MAX_SIZE,
+    ttl = CACHE_TTL,
+    weight_function = get_tag_completions_size,
+)
+
+NSFW_BOORU_TAG_CACHE = AsyncCache(
+    'gel-booru tags',
+    byte_limit = CACHE_MAX_BYTES,
+    size_limit = CACHE_MAX_SIZE,
+    ttl = CACHE_TTL,
+    weight_function = get_tag_completions_size,
+)
+
+
+class TagDump(RichAttributeErrorBaseType):
+    """
+    Locally stored tags searchable by prefix.
+    
+    Attributes
+    ----------
+    priorities : `list` of `int`
+        The tags' popularity rank in the order of ``.values``. Lower is more popular.
+    tag_name_value_pairs : `list` of `tuple` (`str`, `str`)
+        The tags' name - value pairs in the order of ``.values``.
+    values : `list` of `str`
+        The tags' values sorted.
+    """
+    __slots__ = ('priorities', 'tag_name_value_pairs', 'values')
+    
+    def __new__(cls, tag_name_value_pairs):
+        """
+        Creates a new tag dump.
+        
+        Parameters
+        ----------
+        tag_name_value_pairs : `list` of `tuple` (`str`, `str`)
+            Tag name - value pairs ordered by popularity.
+        """
+        order = sorted(range(len(tag_name_value_pairs)), key = lambda index: tag_name_value_pairs[index][1])
+        
+        self = object.__new__(cls)
+        self.priorities = order
+        self.tag_name_value_pairs = [tag_name_value_pairs[index] for index in order]
+        self.values = [tag_name_value_pairs[index][1] for index in order]
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the tag dump's representation."""
+        return f'<{self.__class__.__name__} size = {len(self.values)!r}>'
+    
+    
+    def __len__(self):
+        """Returns the tag dump's size."""
+        return len(self.values)
+    
+    
+    def get_completions(self, query, limit):
+        """
+        Returns the most popular tags starting with the given query.
+        
+        Parameters
+        ----------
+        query : `str`
+            The value to autocomplete.
+        limit : `int`
+            The maximal amount of tags to return.
+        
+        Returns
+        -------
+        tag_name_value_pairs : `list` of `tuple` (`str`, `str`)
+        """
+        values = self.values
+        start = bisect_left(values, query)
+        end = bisect_left(values, query + '\uffff', start)
+        
+        priorities = self.priorities
+        tag_name_value_pairs = self.tag_name_value_pairs
+        return [
+            tag_name_value_pairs[index] for index in
+            nsmallest(limit, range(start, end), key = lambda index: priorities[index])
+        ]
+
+
+def load_tag_dump(path, tag_builder, tags_banned):
+    """
+    Loads the tag dump from the given path.
+    
+    Parameters
+    ----------
+    path : `str`
+        The path of the dump.
+    tag_builder : `FunctionType`
+        Builds a tag name - value pair from a tag data.
+    tags_banned : `frozenset` of `str`
+        Tags to leave out.
+    
+    Returns
+    -------
+    tag_dump : `None`, ``TagDump``
+        `None` if the dump does not exist.
+    """
+    try:
+        with open(path, 'r') as file:
+            tag_datas = from_json(file.read())
+    except FileNotFoundError:
+        return None
+    
+    return TagDump([tag_builder(tag_data) for tag_data in tag_datas if tag_data['value'] not in tags_banned])
+
+
+class TagPrefixIndex(RichAttributeErrorBaseType):
+    """
+    Answers tag autocomplete queries from a local tag dump or from the already requested suggestions if possible.
+    
+    If the suggestions of a query had less tags than the service returns at most, they include every matching tag,
+    so the suggestions of any longer query starting with it can be filtered out of them.
+    
+    Attributes
+    ----------
+    cache : ``AsyncCache``
+        Query - (suggestions, complete) cache.
+    dump : `None`, ``TagDump``
+        The loaded tag dump.
+    dump_checked_at : `float`
+        When the dump's file was last checked for changes. Monotonic time.
+    dump_modified_at : `float`
+        The modification time of the loaded dump's file. `0.0` if not loaded.
+    dump_path : `str`
+        The path of the tag dump.
+    dump_task : `None`, ``Task``
+        The running dump load.
+    limit : `int`
+        The maximal amount of suggestions returned by the service.
+    safe : `bool`
+        Whether the index is for safe-booru.
+    """
+    __slots__ = (
+        'cache', 'dump', 'dump_checked_at', 'dump_modified_at', 'dump_path', 'dump_task', 'limit', 'safe'
+    )
+    
+    def __new__(cls, cache, dump_path, limit, safe):
+        """
+        Creates a new tag prefix index.
+        
+        Parameters
+        ----------
+        cache : ``AsyncCache``
+            Query - (suggestions, complete) cache.
+        dump_path : `str`
+            The path of the tag dump.
+        limit : `int`
+            The maximal amount of suggestions returned by the service.
+        safe : `bool`
+            Whether the index is for safe-booru.
+        """
+        self = object.__new__(cls)
+        self.cache = cache
+        self.dump = None
+        self.dump_checked_at = -TAG_DUMP_CHECK_INTERVAL
+        self.dump_modified_at = 0.0
+        self.dump_path = dump_path
+        self.dump_task = None
+        self.limit = limit
+        self.safe = safe
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the tag prefix index's representation."""
+        return f'<{self.__class__.__name__} safe = {self.safe!r}, dump = {self.dump!r}>'
+    
+    
+    def maybe_refresh_dump(self):
+        """
+        Reloads the tag dump in the background if its file changed. Checks the file at most once per
+        `TAG_DUMP_CHECK_INTERVAL`.
+        """
+        now = monotonic()
+        if (self.dump_task is not None) or (now - self.dump_checked_at < TAG_DUMP_CHECK_INTERVAL):
+            return
+        
+        self.dump_checked_at = now
+        
+        try:
+            modified_at = os.path.getmtime(self.dump_path)
+        except OSError:
+            self.dump = None
+            self.dump_modified_at = 0.0
+            return
+        
+        if modified_at != self.dump_modified_at:
+            self.dump_task = Task(self._load_dump(modified_at), KOKORO)
+    
+    
+    async def _load_dump(self, modified_at):
+        """
+        Loads the tag dump in an executor.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        modified_at : `float`
+            The modification time of the dump's file.
+        """
+        if self.safe:
+            tag_builder = build_tag_safe_booru
+            tags_banned = SAFE_TAGS_BANNED
+        else:
+            tag_builder = build_tag_gel_booru
+            tags_banned = NSFW_TAGS_BANNED
+        
+        try:
+            self.dump = await KOKORO.run_in_executor(
+                alchemy_incendiary(load_tag_dump, (self.dump_path, tag_builder, tags_banned))
+            )
+            self.dump_modified_at = modified_at
+        finally:
+            self.dump_task = None
+    
+    
+    def get_cached(self, query):
+        """
+        Returns the suggestions for the given query without requesting them.
+        
+        Parameters
+        ----------
+        query : `str`
+            The value to autocomplete.
+        
+        Returns
+        -------
+        tag_name_value_pairs : `None`, `list` of `tuple` (`str`, `str`)
+        """
+        cache = self.cache
+        tag_completions = cache.get_cached(query)
+        if (tag_completions is not None):
+            return tag_completions[0]
+        
+        # Wildcards do not match by prefix.
+        if '*' in query:
+            return None
+        
+        dump = self.dump
+        if (dump is not None):
+            return dump.get_completions(query, self.limit)
+        
+        for length in reversed(range(1, len(query))):
+            tag_completions = cache.get_cached(query[:length])
+            if (tag_completions is None) or (not tag_completions[1]):
+                continue
+            
+            tag_name_value_pairs = [
+                tag_name_value_pair for tag_name_value_pair in tag_completions[0]
+                if tag_name_value_pair[1].startswith(query)
+            ]
+            cache.set(query, (tag_name_value_pairs, True))
+            return tag_name_value_pairs
+        
+        return None
+    
+    
+    async def get(self, client, query):
+        """
+        Returns the suggestions for the given query. Requests them if they cannot be answered locally.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        client : ``Client``
+            The client to use to request the tags.
+        query : `str`
+            The value to autocomplete.
+        
+        Returns
+        -------
+        tag_name_value_pairs : `None`, `list` of `tuple` (`str`, `str`)
+        """
+        # Tags are lower case, so are the cache keys.
+        query = query.lower()
+        self.maybe_refresh_dump()
+        
+        tag_name_value_pairs = self.get_cached(query)
+        if (tag_name_value_pairs is not None):
+            self.cache.statistics.hit_count += 1
+            return tag_name_value_pairs
+        
+        # Failed requests return `None` and are not cached.
+        tag_completions = await self.cache.get(query, request_tag_auto_completion, client, query, self.safe)
+        if tag_completions is None:
+            return None
+        
+        return tag_completions[0]
+
+
+SAFE_BOORU_TAG_INDEX = TagPrefixIndex(
+    SAFE_BOORU_TAG_CACHE, SAFE_BOORU_TAG_DUMP_PATH, SAFE_BOORU_AUTOCOMPLETE_LIMIT, True
+)
 
-SAFE_BOORU_TAG_CACHE = OrderedDict()
-NSFW_BOORU_TAG_CACHE = OrderedDict()
+NSFW_BOORU_TAG_INDEX = TagPrefixIndex(
+    NSFW_BOORU_TAG_CACHE, NSFW_BOORU_TAG_DUMP_PATH, NSFW_BOORU_AUTOCOMPLETE_LIMIT, False
+)
 
 
 async def get_tag_auto_completion(client, query, safe, excluded_tags):
@@ -40,24 +386,13 @@ async def get_tag_auto_completion(client, query, safe, excluded_tags):
         Autocomplete suggestions.
     """
     if safe:
-        cache = SAFE_BOORU_TAG_CACHE
+        index = SAFE_BOORU_TAG_INDEX
     else:
-        cache = NSFW_BOORU_TAG_CACHE
-    
-    try:
-        tag_name_value_pairs = cache[query]
-    except KeyError:
-        tag_name_value_pairs = await request_tag_auto_completion(client, query, safe)
-        if tag_name_value_pairs is None:
-            return None
-        
-        if len(cache) == CACHE_MAX_SIZE:
-            del cache[next(iter(cache))]
-        
-        cache[query] = tag_name_value_pairs
+        index = NSFW_BOORU_TAG_INDEX
     
-    else:
-        cache.move_to_end(query)
+    tag_name_value_pairs = await index.get(client, query)
+    if tag_name_value_pairs is None:
+        return None
     
     return [
         tag_name_value_pair[0] for tag_name_value_pair in tag_name_value_pairs
@@ -80,8 +415,8 @@ async def request_tag_auto_completion(client, query, safe):
     
     Returns
     -------
-    tag_name_value_pairs : `None`, `list` of `tuple` (`str`, `str`)
-        Autocomplete suggestions.
+    tag_completions : `None`, `tuple` (`list` of `tuple` (`str`, `str`), `bool`)
+        Autocomplete suggestions and whether they include every matching tag.
     """
     if safe:
         tag_builder = build_tag_safe_booru
@@ -89,12 +424,14 @@ async def request_tag_auto_completion(client, query, safe):
         endpoint = SAFE_BOORU_AUTOCOMPLETE_ENDPOINT
         query_parameters = SAFE_BOORU_AUTOCOMPLETE_PARAMETERS.copy()
         query_key = SAFE_BOORU_AUTOCOMPLETE_QUERY_KEY
+        limit = SAFE_BOORU_AUTOCOMPLETE_LIMIT
     else:
         tag_builder = build_tag_gel_booru
         tags_banned = NSFW_TAGS_BANNED
         endpoint = NSFW_BOORU_AUTOCOMPLETE_ENDPOINT
         query_parameters = NSFW_BOORU_AUTOCOMPLETE_PARAMETERS.copy()
         query_key = NSFW_BOORU_AUTOCOMPLETE_QUERY_KEY
+        limit = NSFW_BOORU_AUTOCOMPLETE_LIMIT
     
     query_parameters[query_key] = query
     
@@ -104,4 +441,5 @@ async def request_tag_auto_completion(client, query, safe):
         
         tag_datas = await response.json()
     
-    return [tag_builder(tag_data) for tag_data in tag_datas if tag_data['value'] not in tags_banned]
+    tag_name_value_pairs = [tag_builder(tag_data) for tag_data in tag_datas if tag_data['value'] not in tags_banned]
+    return tag_name_value_pairs, len(tag_datas) < limit
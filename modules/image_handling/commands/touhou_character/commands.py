@@ -105,7 +105,7 @@ async def auto_complete_touhou_character_name(name):
 
 for touhou_character in TOUHOU_CHARACTERS_UNIQUE:
     SLASH_CLIENT.interactions(
-        NewTouhouCharacter(TouhouHandlerKey(touhou_character, solo = True).get_handler(), touhou_character),
+        NewTouhouCharacter(TouhouHandlerKey(touhou_character, solo = True), touhou_character),
         custom_id = make_custom_id_of_character(touhou_character),
     )
 
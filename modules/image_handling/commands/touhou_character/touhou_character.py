@@ -98,26 +98,26 @@ class NewTouhouCharacter:
     
     Attributes
     ----------
-    handler : ``ImageHandlerBase``
-        The handler to use.
+    handler_key : ``TouhouHandlerKey``
+        The key of the handler to use.
     touhou_character : ``TouhouCharacter``
         The respective touhou character.
     """
-    __slots__ = ('handler', 'touhou_character')
+    __slots__ = ('handler_key', 'touhou_character')
     
-    def __new__(cls, handler, touhou_character):
+    def __new__(cls, handler_key, touhou_character):
         """
         Creates a new touhou character renewer.
         
         Parameters
         ----------
-        handler : ``ImageHandlerBase``
-            The handler to use.
+        handler_key : ``TouhouHandlerKey``
+            The key of the handler to use.
         touhou_character : ``TouhouCharacter``
             The respective touhou character.
         """
         self = object.__new__(cls)
-        self.handler = handler
+        self.handler_key = handler_key
         self.touhou_character = touhou_character
         return self
     
@@ -138,7 +138,7 @@ class NewTouhouCharacter:
         if event.user is not event.message.interaction.user:
             return
          
-        image_detail = await self.handler.get_image(client, event)
+        image_detail = await self.handler_key.get_handler().get_image(client, event)
         
         embed = build_touhou_character_embed(self.touhou_character, image_detail)
         
@@ -1,163 +1,66 @@
 __all__ = ('CooldownHandler',)
 
-from hata import KOKORO, Message
-from scarletio import LOOP_TIME
+from hata import Message
 
-
-class CooldownUnit:
-    """
-    A cooldown unit stored by a ``CommandCooldownWrapper``-s.
-    
-    Attributes
-    ----------
-    expires_at : `float`
-        When the cooldown unit will expire in LOOP_TIME time.
-    uses_left : `int`
-        How much uses are left till the respective entity will be locked by cooldown.
-    """
-    __slots__ = ('expires_at', 'uses_left',)
-    
-    def __init__(self, expires_at, uses_left):
-        """
-        Creates a new ``CooldownUnit`` with the given parameters.
-        
-        Parameters
-        ----------
-        expires_at : `float`
-            When the cooldown unit will expire in LOOP_TIME time.
-        uses_left : `int`
-            How much uses are left till the respective entity will be locked by cooldown.
-        """
-        self.expires_at = expires_at
-        self.uses_left = uses_left
-    
-    def __repr__(self):
-        """Returns the object's representation."""
-        return f'{self.__class__.__name__}(expires_at={self.expires_at}, uses_left={self.uses_left})'
+from bot_utils.rate_limiter import RateLimiter
 
 
-def _check_user(cooldown_handler, event_or_message, weight):
+def _get_user_key(event_or_message):
     """
-    Executes user cooldown check.
+    Returns the user's identifier to limit.
     
-    Might be set as the ``Cooldown``'s ``.checker`` attribute.
+    Might be set as the ``CooldownHandler``'s ``.key_getter`` attribute.
     
     Parameters
     ----------
-    cooldown_handler : ``CooldownHandler``
-        The parent cooldown handler.
     event_or_message : ``InteractionEvent``, ``Message``
-        The event or message to get the cooldown for.
-    weight : `int`
-        The weight to use.
+        The event or message to get the key for.
     
     Returns
     -------
-    expires_at : `int`
-        When the cooldown for the given entity will expire.
+    key : `int`
     """
     if isinstance(event_or_message, Message):
-        user_id = event_or_message.author.id
-    else:
-        user_id = event_or_message.user.id
-    
-    cache = cooldown_handler.cache
-    try:
-        unit = cache[user_id]
-    except KeyError:
-        at_ = LOOP_TIME() + cooldown_handler.reset
-        cache[user_id] = CooldownUnit(at_, cooldown_handler.limit)
-        KOKORO.call_at(at_, dict.__delitem__, cache, user_id)
-        return 0.0
+        return event_or_message.author.id
     
-    left = unit.uses_left
-    if left > 0:
-        unit.uses_left = left - weight
-        return 0.0
-    
-    return unit.expires_at
+    return event_or_message.user.id
 
 
-def _check_channel(cooldown_handler, event_or_message, weight):
+def _get_channel_key(event_or_message):
     """
-    Executes channel cooldown check.
+    Returns the channel's identifier to limit.
     
-    Might be set as the ``Cooldown``'s ``.checker`` attribute.
+    Might be set as the ``CooldownHandler``'s ``.key_getter`` attribute.
     
     Parameters
     ----------
-    cooldown_handler : ``CooldownHandler``
-        The parent cooldown handler.
     event_or_message : ``InteractionEvent``, ``Message``
-        The event or message to get the cooldown for.
-    weight : `int`
-        The weight to use.
+        The event or message to get the key for.
     
     Returns
     -------
-    expires_at : `int`
-        When the cooldown for the given entity will expire.
+    key : `int`
     """
-    channel_id = event_or_message.channel_id
-    
-    cache = cooldown_handler.cache
-    try:
-        unit = cache[channel_id]
-    except KeyError:
-        at_ = LOOP_TIME() + cooldown_handler.reset
-        cache[channel_id] = CooldownUnit(at_, cooldown_handler.limit)
-        KOKORO.call_at(at_, dict.__delitem__, cache, channel_id)
-        return 0.
-    
-    left = unit.uses_left
-    if left > 0:
-        unit.uses_left = left - weight
-        return 0.0
-    
-    return unit.expires_at
+    return event_or_message.channel_id
 
 
-def _check_guild(cooldown_handler, event_or_message, weight):
+def _get_guild_key(event_or_message):
     """
-    Executes guild based cooldown check.
+    Returns the guild's identifier to limit.
     
-    Might be set as the ``Cooldown``'s ``.checker`` attribute.
+    Might be set as the ``CooldownHandler``'s ``.key_getter`` attribute.
     
     Parameters
     ----------
-    cooldown_handler : ``CooldownHandler``
-        The parent cooldown handler.
     event_or_message : ``InteractionEvent``, ``Message``
-        The event or message to get the cooldown for.
-    weight : `int`
-        The weight to use.
+        The event or message to get the key for.
     
     Returns
     -------
-    expires_at : `int`
-        When the cooldown for the given entity will expire.
-        
-        If the cooldown limitation is not applicable for the given entity, returns `-1.0`.
+    key : `int`
+        If the cooldown limitation is not applicable for the given entity, returns `0`.
     """
-    guild_id = event_or_message.guild_id
-    if not guild_id:
-        return -1.0
-    
-    cache = cooldown_handler.cache
-    try:
-        unit = cache[guild_id]
-    except KeyError:
-        at_ = LOOP_TIME() + cooldown_handler.reset
-        cache[guild_id] = CooldownUnit(at_, cooldown_handler.limit)
-        KOKORO.call_at(at_, dict.__delitem__, cache, guild_id)
-        return 0.0
-    
-    left = unit.uses_left
-    if left > 0:
-        unit.uses_left = left - weight
-        return 0.0
-    
-    return unit.expires_at
+    return event_or_message.guild_id
 
 
 class CooldownHandler:
@@ -166,18 +69,18 @@ class CooldownHandler:
     
     Attributes
     ----------
-    cache : `dict` of (``DiscordEntity``, ``CooldownUnit``) items
-        Cache to remember how much use of the given entity are exhausted already.
-    checker : `function`
-        Checks after how much time the given entity can use again the respective command.
+    key_getter : `function`
+        Returns the identifier of the entity to limit.
     limit : `int`
         The amount of how much times the command can be called within a set duration before going on cooldown.
+    rate_limiter : ``RateLimiter``
+        Rate limiter storing the entities' uses.
     reset : `float`
         The time after the cooldown resets.
     weight : `int`
         The weight of the command.
     """
-    __slots__ = ('cache', 'checker', 'limit', 'reset', 'weight',)
+    __slots__ = ('key_getter', 'limit', 'rate_limiter', 'reset', 'weight',)
     
     def __new__(cls, for_, reset, limit = 1, weight = 1):
         """
@@ -223,11 +126,11 @@ class CooldownHandler:
             )
         
         if 'user'.startswith(for_):
-            checker = _check_user
+            key_getter = _get_user_key
         elif 'channel'.startswith(for_):
-            checker = _check_channel
+            key_getter = _get_channel_key
         elif 'guild'.startswith(for_):
-            checker = _check_guild
+            key_getter = _get_guild_key
         else:
             raise ValueError(
                 f'\'for_\' can be \'user\', \'channel\' or \'guild\', got {for_!r}'
@@ -266,11 +169,11 @@ class CooldownHandler:
             ) from None
         
         self = object.__new__(cls)
-        self.checker = checker
+        self.key_getter = key_getter
         self.reset = reset
         self.weight = weight
-        self.limit = limit - weight
-        self.cache = {}
+        self.limit = limit
+        self.rate_limiter = RateLimiter(reset, limit)
         
         return self
     
@@ -292,11 +195,8 @@ class CooldownHandler:
         if weight < 0:
             weight = self.weight
         
-        expires_at = self.checker(self, event_or_message, weight)
-        if not expires_at:
-            return 0.0
-            
-        if expires_at == -1.0:
-            return - 1.0
+        key = self.key_getter(event_or_message)
+        if not key:
+            return -1.0
         
-        return expires_at - LOOP_TIME()
+        return self.rate_limiter.consume(key, weight)
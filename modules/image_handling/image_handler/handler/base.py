@@ -43,3 +43,14 @@ class ImageHandlerBase:
         weight : `float`
         """
         return 1.0
+    
+    
+    def get_cached_image_count(self):
+        """
+        Returns how much images the handler cached.
+        
+        Returns
+        -------
+        cached_image_count : `int`
+        """
+        return 0
@@ -6,7 +6,7 @@ from math import ceil, floor
 from scarletio import copy_docs
 from scarletio.web_common import quote
 
-from bot_utils.tools import BeautifulSoup
+from bot_utils.booru_parser import booru_post_parser_gel, booru_post_parser_generic, parse_booru_posts_async
 
 from ..image_detail import ImageDetail
 
@@ -66,41 +66,6 @@ def make_url(api_endpoint, required_tags, banned_tags, requested_tags):
     return ''.join(url_parts)
 
 
-def booru_post_parser_generic(post):
-    """
-    Parses a generic booru post.
-    
-    Parameters
-    ----------
-    post : ``BeautifulSoup``
-        Response post.
-    
-    Returns
-    -------
-    file_url : `str`
-    tags : `str`
-    """
-    return post.get('file_url'), post.get('tags')
-
-
-def booru_post_parser_gel(post):
-    """
-    Parses a gebbooru post.
-    
-    Parameters
-    ----------
-    post : ``BeautifulSoup``
-        Response post.
-    
-    Returns
-    -------
-    file_url : `str`
-    tags : `str`
-    """
-    return post.find('file_url').string, post.find('tags').string
-
-
-
 def get_post_parser(api_endpoint):
     """
     Gets the post parser of the given endpoint.
@@ -128,6 +93,8 @@ class ImageHandlerBooru(ImageHandlerRequestBase):
     ----------
     _cache : `list` of ``ImageDetail``
         Additional requested card details.
+    _low_watermark : `int`
+        The cache is refilled in the background if it has less images than this. `0` disables prefetching.
     _waiters : `Deque` of ``Future``
         Waiter futures for card detail.
     _request_task : `None`, ``Task`` of ``._request_loop``
@@ -142,6 +109,8 @@ class ImageHandlerBooru(ImageHandlerRequestBase):
         Whether images should be shown in random order.
     _url : `str`
         The url to do request towards.
+    statistics : ``ImageHandlerStatistics``
+        The handler's metrics.
     """
     __slots__ = ('_page', '_post_parser', '_provider', '_random_order', '_url',)
     
@@ -166,7 +135,7 @@ class ImageHandlerBooru(ImageHandlerRequestBase):
         """
         url = make_url(api_endpoint, required_tags, banned_tags, requested_tags)
         post_parser = get_post_parser(api_endpoint)
-        self = ImageHandlerRequestBase.__new__(cls)
+        self = ImageHandlerRequestBase.__new__(cls, url)
         self._page = 0
         self._post_parser = post_parser
         self._provider = provider
@@ -177,6 +146,28 @@ class ImageHandlerBooru(ImageHandlerRequestBase):
     
     @copy_docs(ImageHandlerRequestBase._request)
     async def _request(self, client):
+        data = await self._request_page(client)
+        if data is None:
+            return None
+        
+        return await parse_booru_posts_async(data, self._post_parser)
+    
+    
+    async def _request_page(self, client):
+        """
+        Requests the next page.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        client : ``Client``
+            The respective client who received the event.
+        
+        Returns
+        -------
+        data : `None`, `bytes`
+        """
         retries_left = RETRIES_MAX
         
         while True:
@@ -200,18 +191,10 @@ class ImageHandlerBooru(ImageHandlerRequestBase):
     
     @copy_docs(ImageHandlerRequestBase._process_data)
     def _process_data(self, data):
-        soup = BeautifulSoup(data, 'lxml')
-        
+        total, posts = data
         random_order = self._random_order
         
-        posts = soup.find('posts')
-        # Bad structure ?
-        if posts is None:
-            return None
-        
         # Increment page index
-        total = int(posts['count'])
-        
         page = self._page
         
         if random_order:
@@ -238,13 +221,9 @@ class ImageHandlerBooru(ImageHandlerRequestBase):
         
         self._page = page
         
-        image_details = []
         # Process data
-        post_parser = self._post_parser
-        for post in soup.find_all('post'):
-            url, tags = post_parser(post)
-            if (url is not None) and (tags is not None):
-                image_details.append(ImageDetail(url, frozenset(tags.split()), self._provider))
+        provider = self._provider
+        image_details = [ImageDetail(url, tags.split(), provider) for url, tags in posts]
         
         if random_order:
             shuffle(image_details)
@@ -48,3 +48,8 @@ class ImageHandlerGroup(ImageHandlerBase):
     async def get_image(self, client, event, **acknowledge_parameters):
         handler = choices(self._handlers, self._weights)[0]
         return await handler.get_image(client, event, **acknowledge_parameters)
+    
+    
+    @copy_docs(ImageHandlerBase.get_cached_image_count)
+    def get_cached_image_count(self):
+        return sum(handler.get_cached_image_count() for handler in self._handlers)
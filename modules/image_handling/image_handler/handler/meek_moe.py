@@ -19,10 +19,14 @@ class ImageHandlerMeekMoe(ImageHandlerRequestBase):
     ----------
     _cache : `list` of ``ImageDetail``
         Additional requested card details.
+    _low_watermark : `int`
+        The cache is refilled in the background if it has less images than this. `0` disables prefetching.
     _waiters : `Deque` of ``Future``
         Waiter futures for card detail.
     _request_task : `None`, ``Task`` of ``._request_loop``
         Active request loop.
+    statistics : ``ImageHandlerStatistics``
+        The handler's metrics.
     _url : `str`
         The url to do request towards.
     """
@@ -35,8 +39,9 @@ class ImageHandlerMeekMoe(ImageHandlerRequestBase):
         vocaloid_type : `str`
             The vocaloid's type.
         """
-        self = ImageHandlerRequestBase.__new__(cls)
-        self._url = f'{MEEK_API_BASE_URL}/{vocaloid_type}'
+        url = f'{MEEK_API_BASE_URL}/{vocaloid_type}'
+        self = ImageHandlerRequestBase.__new__(cls, url)
+        self._url = url
         return self
     
     
@@ -1,12 +1,23 @@
 __all__ = ('ImageHandlerRequestBase',)
 
 from collections import deque as Deque
+from time import perf_counter
 
 from hata import KOKORO, InteractionType
 from scarletio import copy_docs, Future, Task, TaskGroup
 
+from bot_utils.image_handler_statistics import ImageHandlerStatistics
+
 from .base import ImageHandlerBase
 
+# If a handler's cache drops below its low watermark, it is refilled in the background without waiting for a user.
+# A refill does at most `PREFETCH_DEPTH` requests and at most `PREFETCH_CONCURRENCY` handlers refill at the same time.
+# Refills over the limit are skipped, the next served image tries again.
+PREFETCH_LOW_WATERMARK = 10
+PREFETCH_DEPTH = 2
+PREFETCH_CONCURRENCY = 4
+
+PREFETCHING_HANDLERS = set()
 
 
 class ImageHandlerRequestBase(ImageHandlerBase):
@@ -17,28 +28,78 @@ class ImageHandlerRequestBase(ImageHandlerBase):
     ----------
     _cache : `list` of ``ImageDetail``
         Additional requested card details.
+    _low_watermark : `int`
+        The cache is refilled in the background if it has less images than this. `0` disables prefetching.
     _waiters : `Deque` of ``Future``
         Waiter futures for card detail.
     _request_task : `None`, ``Task`` of ``._request_loop``
         Active request loop.
+    statistics : ``ImageHandlerStatistics``
+        The handler's metrics.
     """
-    __slots__ = ('_cache', '_waiters', '_request_task')
+    __slots__ = ('_cache', '_low_watermark', '_waiters', '_request_task', 'statistics')
     
-    @copy_docs(ImageHandlerBase.__new__)
-    def __new__(cls):
+    def __new__(cls, name, *, low_watermark = PREFETCH_LOW_WATERMARK):
+        """
+        Creates a new request based image handler.
+        
+        Parameters
+        ----------
+        name : `str`
+            The handler's name shown in its metrics.
+        low_watermark : `int` = `PREFETCH_LOW_WATERMARK`, Optional (Keyword only)
+            The cache is refilled in the background if it has less images than this. `0` disables prefetching.
+        """
         self = object.__new__(cls)
         self._cache = []
+        self._low_watermark = low_watermark
         self._waiters = Deque()
         self._request_task = None
+        self.statistics = ImageHandlerStatistics(name)
         return self
     
     
     @copy_docs(ImageHandlerBase.get_image)
     async def get_image(self, client, event, **acknowledge_parameters):
+        started_at = perf_counter()
+        
         cache = self._cache
         if cache:
-            return cache.pop()
+            image_detail = cache.pop()
+            self._maybe_start_prefetch(client)
+            
+            statistics = self.statistics
+            statistics.hit_count += 1
+            statistics.hit_time_total += perf_counter() - started_at
+            return image_detail
+        
+        try:
+            return await self._wait_image(client, event, acknowledge_parameters)
+        finally:
+            statistics = self.statistics
+            statistics.miss_count += 1
+            statistics.miss_time_total += perf_counter() - started_at
+    
+    
+    async def _wait_image(self, client, event, acknowledge_parameters):
+        """
+        Waits for an image while acknowledging the event.
+        
+        This method is a coroutine.
         
+        Parameters
+        ----------
+        client : ``Client``
+            The respective client who received the event.
+        event : `None`, ``InteractionEvent``
+            The respective interaction event.
+        acknowledge_parameters : `dict` of (`str`, `object`) items
+            Additional parameter used when acknowledging.
+        
+        Returns
+        -------
+        image_detail : `None`, ``ImageDetail``
+        """
         waiter = Future(KOKORO)
         self._waiters.appendleft(waiter)
         
@@ -76,7 +137,12 @@ class ImageHandlerRequestBase(ImageHandlerBase):
             raise
         
         return waiter.get_result()
-
+    
+    
+    @copy_docs(ImageHandlerBase.get_cached_image_count)
+    def get_cached_image_count(self):
+        return len(self._cache)
+    
     
     def _maybe_start_request_loop(self, client):
         """
@@ -91,9 +157,41 @@ class ImageHandlerRequestBase(ImageHandlerBase):
             self._request_task = Task(self._request_loop(client), KOKORO)
     
     
+    def _should_prefetch(self):
+        """
+        Returns whether the cache is below the low watermark.
+        
+        Returns
+        -------
+        should_prefetch : `bool`
+        """
+        return len(self._cache) < self._low_watermark
+    
+    
+    def _maybe_start_prefetch(self, client):
+        """
+        Starts ``._request_loop`` if the cache is below the low watermark and the loop is not yet running.
+        
+        Parameters
+        ----------
+        client : ``Client``
+            The respective client who received the event.
+        """
+        if (self._request_task is not None) or (not self._should_prefetch()):
+            return
+        
+        if len(PREFETCHING_HANDLERS) >= PREFETCH_CONCURRENCY:
+            self.statistics.prefetch_skip_count += 1
+            return
+        
+        PREFETCHING_HANDLERS.add(self)
+        self._request_task = Task(self._request_loop(client), KOKORO)
+    
+    
     async def _request_loop(self, client):
         """
-        Keeps requesting new image details while required.
+        Keeps requesting new image details while anyone is waiting for them or while the cache is below the low
+        watermark. Requests without waiters are limited by the prefetch depth and concurrency.
         
         This method is a coroutine.
         
@@ -102,8 +200,30 @@ class ImageHandlerRequestBase(ImageHandlerBase):
         client : ``Client``
             The respective client who received the event.
         """
+        statistics = self.statistics
+        prefetch_left = PREFETCH_DEPTH
+        
         try:
-            while self._waiters:
+            while True:
+                if self._waiters:
+                    PREFETCHING_HANDLERS.discard(self)
+                
+                elif (
+                    prefetch_left and
+                    self._should_prefetch() and
+                    (
+                        (self in PREFETCHING_HANDLERS) or
+                        (len(PREFETCHING_HANDLERS) < PREFETCH_CONCURRENCY)
+                    )
+                ):
+                    PREFETCHING_HANDLERS.add(self)
+                    prefetch_left -= 1
+                    statistics.prefetch_count += 1
+                
+                else:
+                    break
+                
+                statistics.request_count += 1
                 data = await self._request(client)
                 if data is None:
                     self._abort_waiters()
@@ -118,6 +238,7 @@ class ImageHandlerRequestBase(ImageHandlerBase):
                 continue
         
         finally:
+            PREFETCHING_HANDLERS.discard(self)
             self._request_task = None
     
     
@@ -25,10 +25,14 @@ class ImageHandlerWaifuPics(ImageHandlerRequestBase):
     ----------
     _cache : `list` of ``ImageDetail``
         Additional requested card details.
+    _low_watermark : `int`
+        The cache is refilled in the background if it has less images than this. `0` disables prefetching.
     _waiters : `Deque` of ``Future``
         Waiter futures for card detail.
     _request_task : `None`, ``Task`` of ``._request_loop``
         Active request loop.
+    statistics : ``ImageHandlerStatistics``
+        The handler's metrics.
     _url : `str`
         The url to do request towards.
     """
@@ -43,8 +47,9 @@ class ImageHandlerWaifuPics(ImageHandlerRequestBase):
         nsfw : `bool`
             Ara ara.
         """
-        self = ImageHandlerRequestBase.__new__(cls)
-        self._url = f'{WAIFU_API_BASE_URL}/many/{"n" if nsfw else ""}sfw/{waifu_type}'
+        url = f'{WAIFU_API_BASE_URL}/many/{"n" if nsfw else ""}sfw/{waifu_type}'
+        self = ImageHandlerRequestBase.__new__(cls, url)
+        self._url = url
         return self
     
     
@@ -1,19 +1,24 @@
 __all__ = ('ImageDetail',)
 
+from bot_utils.tag_interner import TAG_INTERNER, iter_tag_names
+
+
 class ImageDetail:
     """
     Represents an image.
     
     Attributes
     ----------
+    _tag_ids : `None`, `array` of `int`
+        The identifiers of the image's tags in ``._tag_table`` sorted.
+    _tag_table : `None`, `list` of `str`
+        The ``TAG_INTERNER`` table the tag identifiers refer to.
     url : `str`
         Url to the image.
-    tags : `frozenset` of `str`
-        Additional tags for the image.
     provider : `None`, `str`
         The provider of the image.
     """
-    __slots__ = ('url', 'tags', 'provider')
+    __slots__ = ('_tag_ids', '_tag_table', 'url', 'provider')
     
     def __new__(cls, url, tags, provider=None):
         """
@@ -23,18 +28,56 @@ class ImageDetail:
         ----------
         url : `str`
             Url to the image.
-        tags : `frozenset` of `str`
+        tags : `None`, `iterable` of `str`
             Additional tags for the image.
         provider : `None, `str` = `None`, Optional
             Provider of the image.
         """
+        if (tags is None):
+            tag_table = None
+            tag_ids = None
+        else:
+            tag_table, tag_ids = TAG_INTERNER.intern_tags(tags)
+        
         self = object.__new__(cls)
+        self._tag_ids = tag_ids
+        self._tag_table = tag_table
         self.url = url
-        self.tags = tags
         self.provider = provider
         return self
     
     
+    @property
+    def tags(self):
+        """
+        Returns the image's tags.
+        
+        Returns
+        -------
+        tags : `None`, `frozenset` of `str`
+        """
+        tag_ids = self._tag_ids
+        if tag_ids is None:
+            return None
+        
+        return frozenset(iter_tag_names(self._tag_table, tag_ids))
+    
+    
+    def iter_tags(self):
+        """
+        Iterates over the image's tags.
+        
+        This method is an iterable generator.
+        
+        Yields
+        ------
+        tag : `str`
+        """
+        tag_ids = self._tag_ids
+        if (tag_ids is not None):
+            yield from iter_tag_names(self._tag_table, tag_ids)
+    
+    
     def __repr__(self):
         """Returns the image handler's representation."""
         repr_parts = [self.__class__.__name__, '(', repr(self.url), ', ', repr(self.tags)]
@@ -51,12 +94,9 @@ class ImageDetail:
     
     def __hash__(self):
         """Returns the image detail's hash value."""
+        # Tag identifiers depend on the tag table, so the tags are left out. The url is specific enough.
         hash_value = hash(self.url)
         
-        tags = self.tags
-        if (tags is not None):
-            hash_value ^= hash(tags)
-        
         provider = self.provider
         if (provider is not None):
             hash_value ^= hash(provider)
@@ -72,7 +112,11 @@ class ImageDetail:
         if self.url != other.url:
             return False
         
-        if self.tags != other.tags:
+        if self._tag_table is other._tag_table:
+            if self._tag_ids != other._tag_ids:
+                return False
+        
+        elif self.tags != other.tags:
             return False
         
         if self.provider != other.provider:
@@ -1,13 +1,85 @@
 __all__ = ('TouhouHandlerKey',)
 
+from random import choice
+
+from scarletio import copy_docs
+
+from bot_utils.handler_registry import HandlerRegistry
+
 from ..constants import SAFE_BOORU_ENDPOINT, SAFE_BOORU_PROVIDER, SOLO_REQUIRED_TAGS, TOUHOU_TAGS_BANNED
-from ..image_handler import ImageHandlerBooru, ImageHandlerGroup
+from ..image_handler import ImageHandlerBase, ImageHandlerBooru, ImageHandlerGroup
 
 from .character import TOUHOU_CHARACTERS_UNIQUE
 from .safe_booru_tags import TOUHOU_SAFE_BOORU_TAGS
 
 
-TOUHOU_IMAGE_HANDLERS = {}
+TOUHOU_IMAGE_HANDLER_LIMIT = 256
+TOUHOU_IMAGE_HANDLER_CACHED_IMAGE_LIMIT = 20000
+TOUHOU_IMAGE_HANDLER_IDLE_TIMEOUT = 3600.0
+TOUHOU_IMAGE_HANDLER_PIN_USE_COUNT = 20
+
+
+def is_touhou_handler_key_pinnable(key):
+    """
+    Returns whether the handler of the given key can be pinned. Only single character solo handlers can be.
+    
+    Parameters
+    ----------
+    key : ``TouhouHandlerKey``
+        The key to check.
+    
+    Returns
+    -------
+    pinnable : `bool`
+    """
+    return key.solo and (len(key.characters) == 1)
+
+
+# Users can request any combination of characters, so only the recently used handlers are kept with their caches.
+TOUHOU_IMAGE_HANDLERS = HandlerRegistry(
+    'touhou',
+    cached_image_limit = TOUHOU_IMAGE_HANDLER_CACHED_IMAGE_LIMIT,
+    idle_timeout = TOUHOU_IMAGE_HANDLER_IDLE_TIMEOUT,
+    pin_check = is_touhou_handler_key_pinnable,
+    pin_use_count = TOUHOU_IMAGE_HANDLER_PIN_USE_COUNT,
+    size_limit = TOUHOU_IMAGE_HANDLER_LIMIT,
+)
+
+
+class TouhouHandlerKeyGroup(ImageHandlerBase):
+    """
+    Handler group which chooses from the added handler keys and returns an image of the key's handler.
+    
+    The sub-handlers are looked up on each use, so they can be removed from ``TOUHOU_IMAGE_HANDLERS`` independently.
+    
+    Attributes
+    ----------
+    _keys : `tuple` of ``TouhouHandlerKey``
+        The keys to choose from.
+    """
+    __slots__ = ('_keys',)
+    
+    def __new__(cls, keys):
+        """
+        Creates a new handler key group.
+        
+        Parameters
+        ----------
+        keys : `tuple` of ``TouhouHandlerKey``
+            The keys to choose from.
+        """
+        if not keys:
+            return ImageHandlerBase()
+        
+        self = object.__new__(cls)
+        self._keys = keys
+        return self
+    
+    
+    @copy_docs(ImageHandlerBase.get_image)
+    async def get_image(self, client, event, **acknowledge_parameters):
+        handler = choice(self._keys).get_handler()
+        return await handler.get_image(client, event, **acknowledge_parameters)
 
 
 class TouhouHandlerKey:
@@ -87,13 +159,7 @@ class TouhouHandlerKey:
         -------
         handler : ``ImageHandlerBooru``
         """
-        try:
-            handler = TOUHOU_IMAGE_HANDLERS[self]
-        except KeyError:
-            handler = self.create_handler()
-            TOUHOU_IMAGE_HANDLERS[self] = handler
-        
-        return handler
+        return TOUHOU_IMAGE_HANDLERS.get(self, self.create_handler)
     
     
     def create_handler(self):
@@ -128,8 +194,8 @@ class TouhouHandlerKey:
         handler : ``HandlerBase``
         """
         solo = self.solo
-        return ImageHandlerGroup(*(
-            TouhouHandlerKey(character, solo = solo).get_handler() for character in TOUHOU_CHARACTERS_UNIQUE
+        return TouhouHandlerKeyGroup(tuple(
+            TouhouHandlerKey(character, solo = solo) for character in TOUHOU_CHARACTERS_UNIQUE
         ))
     
     
@@ -161,8 +227,8 @@ class TouhouHandlerKey:
         -------
         handler : ``HandlerBase``
         """
-        return ImageHandlerGroup(*(
-            TouhouHandlerKey(character, solo = True).get_handler() for character in self.characters
+        return TouhouHandlerKeyGroup(tuple(
+            TouhouHandlerKey(character, solo = True) for character in self.characters
         ))
     
     
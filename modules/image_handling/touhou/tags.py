@@ -24,14 +24,12 @@ def parse_touhou_characters_from_tags(image_detail):
     """
     characters = set()
     
-    tags = image_detail.tags
-    if (tags is not None):
-        for tag in tags:
-            try:
-                character = TAG_TO_CHARACTER[tag]
-            except KeyError:
-                pass
-            else:
-                characters.add(character)
+    for tag in image_detail.iter_tags():
+        try:
+            character = TAG_TO_CHARACTER[tag]
+        except KeyError:
+            pass
+        else:
+            characters.add(character)
     
     return characters
@@ -1,6 +1,5 @@
 __all__ = ()
 
-from itertools import chain
 from re import I as re_ignore_case, U as re_unicode, compile as re_compile, escape as re_escape
 
 from dateutil.relativedelta import relativedelta as RelativeDelta
@@ -8,7 +7,9 @@ from hata import AnsiForegroundColor, BUILTIN_EMOJIS, Client, Embed, Permission,
 from hata.ext.slash import Button, InteractionResponse, P, Row, abort
 
 from .constants import DEFAULT_INTERVAL, FEEDERS, MAX_INTERVAL, MIN_INTERVAL
-from .logic import get_interval_only, join_names_of_touhou_characters, should_auto_post_in_channel
+from .logic import (
+    FEED_CHANNEL_INDEX, can_auto_post_in_channel, get_interval_only, join_names_of_touhou_characters
+)
 
 
 SLASH_CLIENT: Client
@@ -140,8 +141,8 @@ def iter_channels(client, guild):
     ------
     channel : ``Channel``
     """
-    for channel in chain(guild.channels.values(), guild.threads.values()):
-        if should_auto_post_in_channel(client, channel):
+    for channel in FEED_CHANNEL_INDEX.iter_guild_channels(guild.id):
+        if can_auto_post_in_channel(client, channel):
             yield channel
 
 
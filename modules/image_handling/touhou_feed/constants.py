@@ -1,7 +1,10 @@
 __all__ = ()
 
+import os
 import re
 
+from bot_utils.constants import PATH__KOISHI
+
 FEEDERS = {}
 
 TAG_NAME_REQUIRED = 'touhou-feed'
@@ -11,6 +14,14 @@ DEFAULT_INTERVAL = 4 * 3600
 MIN_INTERVAL = 15 * 60
 MAX_INTERVAL = 24 * 3600
 
+# Every feeder is scheduled on one shared heap. First runs are spread within the interval by a per-channel offset,
+# and channels which missed their run while offline are spread within `CATCH_UP_SPREAD`.
+CATCH_UP_SPREAD = MIN_INTERVAL
+POSTS_PER_SECOND = 1
+
+SCHEDULE_FILE_PATH = os.path.join(PATH__KOISHI, 'modules', 'touhou_feed_schedule.json')
+SCHEDULE_SAVE_DELAY = 60.0
+
 TAG_REQUIRED_RP = re.compile(f'(?:\\s|^)#{TAG_NAME_REQUIRED}(?:\\s|$)', re.M | re.U)
 TAG_ITER_RP = re.compile(f'(?:\\s|^)#([\\w\\-\\_\\+\\:]+)', re.M | re.U)
 
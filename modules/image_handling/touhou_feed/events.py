@@ -1,11 +1,10 @@
 __all__ = ()
 
-from itertools import chain
-
 from hata import Client
 
 from .logic import (
-    reset_auto_posters, reset_channel, should_auto_post_in_channel, try_remove_channel, try_update_channel
+    FEED_CHANNEL_INDEX, add_guild, remove_channel, remove_guild, reset_auto_posters, reset_channel,
+    reset_channel_single
 )
 
 SLASH_CLIENT: Client
@@ -13,13 +12,12 @@ SLASH_CLIENT: Client
 
 @SLASH_CLIENT.events
 async def channel_create(client, channel):
-    if should_auto_post_in_channel(client, channel):
-        try_update_channel(channel)
+    reset_channel_single(client, channel)
 
 
 @SLASH_CLIENT.events
 async def channel_delete(client, channel):
-    try_remove_channel(channel)
+    remove_channel(channel)
 
 
 @SLASH_CLIENT.events
@@ -29,18 +27,16 @@ async def channel_edit(client, channel, old_parameters):
 
 @SLASH_CLIENT.events
 async def guild_create(client, guild):
-    for channel in chain(guild.channels.values(), guild.threads.values()):
-        if should_auto_post_in_channel(client, channel):
-            try_update_channel(channel)
+    add_guild(client, guild)
 
 
 @SLASH_CLIENT.events
 async def guild_delete(client, guild, guild_profile):
-    for channel in chain(guild.channels.values(), guild.threads.values()):
-         try_remove_channel(channel)
+    remove_guild(guild)
 
 
 @SLASH_CLIENT.events
 async def ready(client):
     client.events.remove(ready)
+    FEED_CHANNEL_INDEX.build(client.guilds)
     reset_auto_posters(client)
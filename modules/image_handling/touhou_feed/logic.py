@@ -1,17 +1,19 @@
 __all__ = ()
 
-from itertools import chain
 from random import choice
 
 from hata import Client, DiscordException, ERROR_CODES, Embed, KOKORO, now_as_id
 from scarletio import CancelledError, LOOP_TIME, Task
 
+from bot_utils.channel_index import ChannelIndex
+
 from ..touhou import TouhouHandlerKey, get_touhou_character_like, parse_touhou_characters_from_tags
 
 from .constants import (
     DEFAULT_INTERVAL, FEEDERS, INTERVAL_RP, INTERVAL_UNIT_RP, MAX_INTERVAL, MIN_INTERVAL, TAG_NAME_REQUIRED,
     TAG_NAME_SOLO, TAG_REQUIRED_RP, TAG_ITER_RP
 )
+from .scheduler import FEED_SCHEDULER
 
 
 SLASH_CLIENT: Client
@@ -253,29 +255,24 @@ def join_names_of_touhou_characters(characters, join_with):
     return ''.join(built)
 
 
-def should_auto_post_in_channel(client, channel):
+def is_feed_tagged_channel(channel):
     """
-    Returns whether the client should try to auto post in the given channel.
+    Returns whether the given channel is tagged for auto posting. Does not check permissions.
     
     Parameters
     ----------
-    client : ``Client``
-        The client who would post in the channel.
     channel : ``Channel``
         The channel to check.
     
     Returns
     -------
-    should : `bool`
+    tagged : `bool`
     """
     if channel.is_guild_text():
         topic = channel.topic
         if topic is None:
             return False
         
-        if not channel.cached_permissions_for(client).can_send_messages:
-            return False
-        
         if TAG_REQUIRED_RP.search(topic) is not None:
             return True
         
@@ -289,9 +286,6 @@ def should_auto_post_in_channel(client, channel):
         if not parent.is_guild_forum():
             return False
         
-        if not parent.cached_permissions_for(client).can_send_messages_in_threads:
-            return False
-        
         for tag in channel.iter_applied_tags():
             if tag.name == TAG_NAME_REQUIRED:
                 return True
@@ -301,6 +295,38 @@ def should_auto_post_in_channel(client, channel):
     return False
 
 
+def can_auto_post_in_channel(client, channel):
+    """
+    Returns whether the client has permissions to auto post in the given tagged channel.
+    
+    Parameters
+    ----------
+    client : ``Client``
+        The client who would post in the channel.
+    channel : ``Channel``
+        The channel to check.
+    
+    Returns
+    -------
+    can : `bool`
+    """
+    if channel.is_guild_text():
+        return channel.cached_permissions_for(client).can_send_messages
+    
+    if channel.is_guild_thread_public():
+        parent = channel.parent
+        if (parent is None):
+            return False
+        
+        return parent.cached_permissions_for(client).can_send_messages_in_threads
+    
+    return False
+
+
+# Only tagged channels are indexed, so resetting the auto posters does not walk every channel of every guild.
+FEED_CHANNEL_INDEX = ChannelIndex(is_feed_tagged_channel)
+
+
 def get_interval_only(channel):
     """
     Gets the channel interval only.
@@ -326,14 +352,12 @@ class Feeder:
     ----------
     channel : ``Channel``
         The channel to auto post at.
-    handle : `None`, ``TimerHandle``
-        The current handle of the auto poster.
     handler_keys : `tuple` ``TouhouHandlerKey``
         Handler keys which handle which characters should be posted.
     interval : `int`
         The interval between posting in seconds.
     """
-    __slots__ = ('channel', 'handle', 'handler_keys', 'interval')
+    __slots__ = ('channel', 'handler_keys', 'interval')
     
     def __new__(cls, channel):
         """
@@ -350,11 +374,11 @@ class Feeder:
         
         self = object.__new__(cls)
         self.channel = channel
-        self.handle = None
         self.handler_keys, self.interval = handler_keys_and_interval
         
-        self.schedule()
-        FEEDERS[channel.id] = self
+        channel_id = channel.id
+        FEED_SCHEDULER.schedule(channel_id, FEED_SCHEDULER.get_first_run_at(channel_id, self.interval))
+        FEEDERS[channel_id] = self
         
         return self
     
@@ -372,10 +396,10 @@ class Feeder:
         repr_parts.append(', interval = ')
         repr_parts.append(repr(self.interval))
         
-        handle = self.handle
-        if (handle is not None) and (not handle.cancelled):
+        run_at = FEED_SCHEDULER.get_run_at(self.channel.id)
+        if (run_at is not None):
             repr_parts.append(', till next call: ')
-            repr_parts.append(format(handle.when - LOOP_TIME(), '.0f'))
+            repr_parts.append(format(run_at - LOOP_TIME(), '.0f'))
             repr_parts.append(' seconds')
         
         repr_parts.append('>')
@@ -399,9 +423,9 @@ class Feeder:
         """
         Schedules the feeder.
         
-        If called while scheduled, it will break the scheduled.
+        If called while scheduled, it will overwrite the scheduled.
         """
-        self.handle = KOKORO.call_later(self.interval, self.invoke)
+        FEED_SCHEDULER.schedule(self.channel.id, LOOP_TIME() + self.interval)
     
     
     def re_schedule(self):
@@ -410,30 +434,24 @@ class Feeder:
         
         If the feeder is already scheduled, it might cancel the old scheduling.
         """
+        channel_id = self.channel.id
         call_at = LOOP_TIME() + self.interval
         
-        current_handle = self.handle
-        if (current_handle is not None) and (not current_handle.cancelled):
-            if current_handle.when >= call_at:
-                return
-            
-            current_handle.cancel()
+        current_call_at = FEED_SCHEDULER.get_run_at(channel_id)
+        if (current_call_at is not None) and (current_call_at >= call_at):
+            return
         
-        self.handle = KOKORO.call_at(call_at, self.invoke)
+        FEED_SCHEDULER.schedule(channel_id, call_at)
     
     
     def cancel(self):
         """
         Cancels the schedule.
         """
-        handle = self.handle
-        if (handle is not None):
-            handle.cancel()
-            self.handle = None
-        
         channel_id = self.channel.id
         if FEEDERS.get(channel_id, None) is self:
             del FEEDERS[channel_id]
+            FEED_SCHEDULER.unschedule(channel_id)
     
     
     def invoke(self):
@@ -529,14 +547,63 @@ def reset_auto_posters(client):
     """
     Resets all auto posters. Removing the old ones and adding the new ones.
     
+    Only the indexed channels are checked, so ``FEED_CHANNEL_INDEX`` should be built before.
+    
+    Parameters
+    ----------
+    client : ``Client``
+        The client who would post.
+    """
+    for channel in FEED_CHANNEL_INDEX.iter_channels():
+        reset_channel_single(client, channel)
+    
+    for feeder in [*FEEDERS.values()]:
+        if feeder.channel.id not in FEED_CHANNEL_INDEX:
+            feeder.cancel()
+
+
+def add_guild(client, guild):
+    """
+    Indexes the given guild's channels and starts auto posting in the applicable ones.
+    
     Parameters
     ----------
     client : ``Client``
         The client who would post.
+    guild : ``Guild``
+        The guild to add.
     """
-    for guild in SLASH_CLIENT.guilds:
-        for channel in chain(guild.channels.values(), guild.threads.values()):
-            reset_channel_single(client, channel)
+    FEED_CHANNEL_INDEX.add_guild(guild)
+    
+    for channel in FEED_CHANNEL_INDEX.iter_guild_channels(guild.id):
+        if can_auto_post_in_channel(client, channel):
+            try_update_channel(channel)
+
+
+def remove_guild(guild):
+    """
+    Removes the given guild's channels from the index and stops auto posting in them.
+    
+    Parameters
+    ----------
+    guild : ``Guild``
+        The guild to remove.
+    """
+    for channel in FEED_CHANNEL_INDEX.remove_guild(guild.id):
+        try_remove_channel(channel)
+
+
+def remove_channel(channel):
+    """
+    Removes the given channel from the index and stops auto posting in it.
+    
+    Parameters
+    ----------
+    channel : ``Channel``
+        The channel to remove.
+    """
+    FEED_CHANNEL_INDEX.remove(channel)
+    try_remove_channel(channel)
 
 
 def reset_channel(client, channel):
@@ -562,6 +629,8 @@ def reset_channel_single(client, channel):
     """
     Resets the given channel of auto posting. Not like ``reset_channel`` this does check only the channel.
     
+    Also updates the channel in ``FEED_CHANNEL_INDEX``.
+    
     Parameters
     ----------
     client : ``Client``
@@ -569,7 +638,7 @@ def reset_channel_single(client, channel):
     channel : ``Channel``
         The channel to reset.
     """
-    if should_auto_post_in_channel(client, channel):
+    if FEED_CHANNEL_INDEX.update(channel) and can_auto_post_in_channel(client, channel):
         try_update_channel(channel)
     else:
         try_remove_channel(channel)
@@ -584,6 +653,8 @@ def setup(lib):
     lib : `ModuleType`
         This module.
     """
+    FEED_SCHEDULER.load()
+    FEED_CHANNEL_INDEX.build(SLASH_CLIENT.guilds)
     reset_auto_posters(SLASH_CLIENT)
 
 
@@ -596,5 +667,8 @@ def teardown(lib):
     lib : `ModuleType`
         This module.
     """
+    FEED_SCHEDULER.close()
+    FEED_CHANNEL_INDEX.clear()
+    
     for feeder in [*FEEDERS.values()]:
         feeder.cancel()
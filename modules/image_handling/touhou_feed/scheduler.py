@@ -0,0 +1,401 @@
+__all__ = ()
+
+import os
+from heapq import heapify, heappop, heappush
+from json import JSONDecodeError, dump as dump_json, load as load_json
+from threading import Lock as SyncLock
+from time import time as time_now
+
+from hata import KOKORO
+from scarletio import LOOP_TIME, RichAttributeErrorBaseType, alchemy_incendiary
+
+from bot_utils.rate_limiter import RateLimiter
+
+from .constants import (
+    CATCH_UP_SPREAD, FEEDERS, MAX_INTERVAL, POSTS_PER_SECOND, SCHEDULE_FILE_PATH, SCHEDULE_SAVE_DELAY
+)
+
+# Multiplier of fibonacci hashing. Spreads channel identifiers evenly, so a channel's offset does not depend on when
+# its channel was created.
+JITTER_MULTIPLIER = 0x9e3779b97f4a7c15
+JITTER_MASK = (1 << 64) - 1
+JITTER_RANGE = 1 << 64
+
+# Outdated heap entries are dropped when reached. If they make up most of the heap, the heap is rebuilt.
+HEAP_COMPACT_THRESHOLD = 64
+
+
+def get_jitter(channel_id, duration):
+    """
+    Returns a deterministic offset for the given channel within the given duration.
+    
+    Parameters
+    ----------
+    channel_id : `int`
+        The channel's identifier.
+    duration : `float`
+        The duration to spread within.
+    
+    Returns
+    -------
+    jitter : `float`
+    """
+    return ((channel_id * JITTER_MULTIPLIER) & JITTER_MASK) * duration / JITTER_RANGE
+
+
+def read_schedule_task(file_path):
+    """
+    Reads the saved schedule.
+    
+    Parameters
+    ----------
+    file_path : `str`
+        Path to the schedule's file.
+    
+    Returns
+    -------
+    stored_run_ats : `dict` of (`int`, `float`) items
+        Channel identifier - next run in unix time relation.
+    """
+    if not os.path.exists(file_path):
+        return {}
+    
+    try:
+        with open(file_path, 'r') as file:
+            data = load_json(file)
+    except (OSError, JSONDecodeError):
+        return {}
+    
+    return {int(channel_id): float(run_at) for channel_id, run_at in data.items()}
+
+
+def write_schedule_task(file_path, stored_run_ats):
+    """
+    Writes the schedule.
+    
+    Parameters
+    ----------
+    file_path : `str`
+        Path to the schedule's file.
+    stored_run_ats : `dict` of (`int`, `float`) items
+        Channel identifier - next run in unix time relation.
+    """
+    temporary_file_path = file_path + '.tmp'
+    with open(temporary_file_path, 'w') as file:
+        dump_json({str(channel_id): run_at for channel_id, run_at in stored_run_ats.items()}, file)
+    
+    os.replace(temporary_file_path, file_path)
+
+
+class FeedScheduler(RichAttributeErrorBaseType):
+    """
+    Schedules every feeder on a single heap and a single timer.
+    
+    Attributes
+    ----------
+    _handle : `None`, ``TimerHandle``
+        Handle waking up the scheduler.
+    _heap : `list` of `tuple` (`float`, `int`)
+        Run at - channel identifier pairs. Entries not matching ``.run_ats`` are outdated.
+    _save_handle : `None`, ``TimerHandle``
+        Handle of the pending save.
+    _save_version : `int`
+        Incremented on every save, so an older save finishing later does not overwrite a newer one.
+    _write_lock : `SyncLock`
+        Serializes the writes from the executor and from ``.close``, so they do not share the temporary file.
+    _written_version : `int`
+        The version of the last written schedule.
+    deferred_count : `int`
+        How much times was the scheduler delayed, because the posting budget was used up.
+    file_path : `str`
+        Path to the schedule's file.
+    rate_limiter : ``RateLimiter``
+        Limits how much feeds can be triggered per second.
+    run_ats : `dict` of (`int`, `float`) items
+        Channel identifier - next run in loop time relation.
+    stored_run_ats : `dict` of (`int`, `float`) items
+        Channel identifier - next run in unix time relation of the loaded channels which are not yet scheduled.
+    """
+    __slots__ = (
+        '_handle', '_heap', '_save_handle', '_save_version', '_write_lock', '_written_version', 'deferred_count',
+        'file_path', 'rate_limiter', 'run_ats', 'stored_run_ats'
+    )
+    
+    def __new__(cls, file_path, posts_per_second):
+        """
+        Creates a new feed scheduler.
+        
+        Parameters
+        ----------
+        file_path : `str`
+            Path to the schedule's file.
+        posts_per_second : `int`
+            How much feeds can be triggered per second.
+        """
+        self = object.__new__(cls)
+        self._handle = None
+        self._heap = []
+        self._save_handle = None
+        self._save_version = 0
+        self._write_lock = SyncLock()
+        self._written_version = 0
+        self.deferred_count = 0
+        self.file_path = file_path
+        self.rate_limiter = RateLimiter(1.0, posts_per_second)
+        self.run_ats = {}
+        self.stored_run_ats = {}
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the feed scheduler's representation."""
+        return (
+            f'<{self.__class__.__name__} scheduled = {len(self.run_ats)!r}, '
+            f'deferred_count = {self.deferred_count!r}>'
+        )
+    
+    
+    def load(self):
+        """
+        Loads the saved schedule.
+        """
+        self.stored_run_ats = read_schedule_task(self.file_path)
+    
+    
+    def get_run_at(self, channel_id):
+        """
+        Returns when the feeder of the given channel runs next.
+        
+        Parameters
+        ----------
+        channel_id : `int`
+            The channel's identifier.
+        
+        Returns
+        -------
+        run_at : `None`, `float`
+            Loop time.
+        """
+        return self.run_ats.get(channel_id, None)
+    
+    
+    def get_first_run_at(self, channel_id, interval):
+        """
+        Returns when the newly created feeder of the given channel should run first.
+        
+        If the channel has a saved run, it is used. If the saved run was missed, the channel is run after an offset
+        within ``CATCH_UP_SPREAD``. Else after an offset within its interval.
+        
+        Parameters
+        ----------
+        channel_id : `int`
+            The channel's identifier.
+        interval : `int`
+            The interval between posting in seconds.
+        
+        Returns
+        -------
+        run_at : `float`
+            Loop time.
+        """
+        now = LOOP_TIME()
+        stored_run_at = self.stored_run_ats.pop(channel_id, None)
+        if stored_run_at is None:
+            return now + get_jitter(channel_id, interval)
+        
+        delay = stored_run_at - time_now()
+        if delay <= 0.0:
+            return now + get_jitter(channel_id, CATCH_UP_SPREAD)
+        
+        if delay > interval:
+            delay = interval
+        
+        return now + delay
+    
+    
+    def schedule(self, channel_id, run_at):
+        """
+        Schedules the feeder of the given channel. If it is already scheduled, overwrites it.
+        
+        Parameters
+        ----------
+        channel_id : `int`
+            The channel's identifier.
+        run_at : `float`
+            When the feeder should run in loop time.
+        """
+        run_ats = self.run_ats
+        run_ats[channel_id] = run_at
+        
+        heap = self._heap
+        heappush(heap, (run_at, channel_id))
+        if len(heap) > (len(run_ats) << 1) + HEAP_COMPACT_THRESHOLD:
+            self._compact()
+        
+        self._wake_up_at(run_at)
+        self._save_later()
+    
+    
+    def unschedule(self, channel_id):
+        """
+        Removes the feeder of the given channel from the schedule.
+        
+        Parameters
+        ----------
+        channel_id : `int`
+            The channel's identifier.
+        """
+        self.stored_run_ats.pop(channel_id, None)
+        
+        if self.run_ats.pop(channel_id, None) is not None:
+            self._save_later()
+    
+    
+    def _compact(self):
+        """
+        Rebuilds the heap without its outdated entries.
+        """
+        heap = [(run_at, channel_id) for channel_id, run_at in self.run_ats.items()]
+        heapify(heap)
+        self._heap = heap
+    
+    
+    def _wake_up_at(self, when):
+        """
+        Makes sure the scheduler wakes up not later than the given time.
+        
+        Parameters
+        ----------
+        when : `float`
+            Loop time.
+        """
+        handle = self._handle
+        if (handle is not None):
+            if handle.when <= when:
+                return
+            
+            handle.cancel()
+        
+        self._handle = KOKORO.call_at(when, self._run)
+    
+    
+    def _run(self):
+        """
+        Triggers the due feeders while the posting budget allows it, then goes to sleep till the next one.
+        """
+        self._handle = None
+        
+        heap = self._heap
+        run_ats = self.run_ats
+        rate_limiter = self.rate_limiter
+        now = LOOP_TIME()
+        
+        while heap:
+            run_at, channel_id = heap[0]
+            if run_ats.get(channel_id, None) != run_at:
+                heappop(heap)
+                continue
+            
+            if run_at > now:
+                self._wake_up_at(run_at)
+                break
+            
+            retry_after = rate_limiter.consume(self)
+            if retry_after:
+                self.deferred_count += 1
+                self._wake_up_at(now + retry_after)
+                break
+            
+            heappop(heap)
+            del run_ats[channel_id]
+            
+            feeder = FEEDERS.get(channel_id, None)
+            if (feeder is not None):
+                feeder.invoke()
+    
+    
+    def _get_stored_run_ats(self):
+        """
+        Returns the schedule to save.
+        
+        Returns
+        -------
+        stored_run_ats : `dict` of (`int`, `float`) items
+            Channel identifier - next run in unix time relation.
+        """
+        now = time_now()
+        loop_now = LOOP_TIME()
+        expire_before = now - MAX_INTERVAL
+        
+        stored_run_ats = {
+            channel_id: run_at for channel_id, run_at in self.stored_run_ats.items() if run_at > expire_before
+        }
+        
+        for channel_id, run_at in self.run_ats.items():
+            stored_run_ats[channel_id] = now + (run_at - loop_now)
+        
+        return stored_run_ats
+    
+    
+    def _save_later(self):
+        """
+        Saves the schedule after ``SCHEDULE_SAVE_DELAY`` if not yet pending.
+        """
+        if self._save_handle is None:
+            self._save_handle = KOKORO.call_later(SCHEDULE_SAVE_DELAY, self._save)
+    
+    
+    def _save(self):
+        """
+        Saves the schedule in an executor.
+        """
+        self._save_handle = None
+        self._save_version += 1
+        KOKORO.run_in_executor(alchemy_incendiary(self._write, (self._save_version, self._get_stored_run_ats())))
+    
+    
+    def _write(self, version, stored_run_ats):
+        """
+        Writes the schedule unless a newer version is already written. Called from an executor and from ``.close``.
+        
+        Parameters
+        ----------
+        version : `int`
+            The schedule's version.
+        stored_run_ats : `dict` of (`int`, `float`) items
+            Channel identifier - next run in unix time relation.
+        """
+        with self._write_lock:
+            if version <= self._written_version:
+                return
+            
+            write_schedule_task(self.file_path, stored_run_ats)
+            self._written_version = version
+    
+    
+    def close(self):
+        """
+        Saves the schedule and stops the scheduler.
+        """
+        save_handle = self._save_handle
+        if (save_handle is not None):
+            self._save_handle = None
+            save_handle.cancel()
+        
+        handle = self._handle
+        if (handle is not None):
+            self._handle = None
+            handle.cancel()
+        
+        self._save_version += 1
+        try:
+            self._write(self._save_version, self._get_stored_run_ats())
+        except OSError:
+            pass
+        
+        self._heap.clear()
+        self.run_ats.clear()
+        self.stored_run_ats.clear()
+
+
+FEED_SCHEDULER = FeedScheduler(SCHEDULE_FILE_PATH, POSTS_PER_SECOND)
@@ -10,6 +10,7 @@ from bot_utils.models import DB_ENGINE, user_common_model, USER_COMMON_TABLE, ge
     waifu_list_model, WAIFU_LIST_TABLE, waifu_proposal_model, WAIFU_PROPOSAL_TABLE
 from bot_utils.constants import EMOJI__HEART_CURRENCY, WAIFU_COST_DEFAULT
 from bot_utils.utils import send_embed_to
+from bot_utils.user_common_cache import get_user_common_row
 from bot_utils.user_getter import get_user, get_users_unordered
 
 from sqlalchemy import func as alchemy_function, and_, or_
@@ -44,24 +45,14 @@ async def waifu_info(event,
     
     user_id = user.id
     
-    async with DB_ENGINE.connect() as connector:
-        response = await connector.execute(
-            select(
-                [
-                    user_common_model.waifu_owner_id,
-                    user_common_model.waifu_cost,
-                    user_common_model.waifu_divorces,
-                    user_common_model.waifu_slots,
-                ]
-            ).where(
-                user_common_model.user_id == user_id,
-            )
-        )
+    row = await get_user_common_row(user_id)
+    if (row is not None):
+        waifu_owner_id = row.waifu_owner_id
+        waifu_cost = row.waifu_cost
+        waifu_divorces = row.waifu_divorces
+        waifu_slots = row.waifu_slots
         
-        results = await response.fetchall()
-        if results:
-            waifu_owner_id, waifu_cost, waifu_divorces, waifu_slots = results[0]
-            
+        async with DB_ENGINE.connect() as connector:
             response = await connector.execute(
                 select(
                     [
@@ -73,16 +64,17 @@ async def waifu_info(event,
             )
             
             results = await response.fetchall()
-            if results:
-                waifu_ids = sorted(result[0] for result in results)
-            else:
-                waifu_ids = None
+        
+        if results:
+            waifu_ids = sorted(result[0] for result in results)
         else:
-            waifu_owner_id = 0
-            waifu_cost = WAIFU_COST_DEFAULT
-            waifu_divorces = 0
-            waifu_slots = 1
             waifu_ids = None
+    else:
+        waifu_owner_id = 0
+        waifu_cost = WAIFU_COST_DEFAULT
+        waifu_divorces = 0
+        waifu_slots = 1
+        waifu_ids = None
     
     embed = Embed(
         f'{user:f}\'s waifu info',
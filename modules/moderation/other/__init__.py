@@ -40,8 +40,9 @@ from .mute import mute_command
 from .regret_un_ban import regret_un_ban_command
 from .regret_un_kick import regret_un_kick_command
 from .top_list import (
-    CUSTOM_ID_CLOSE as TOP_LIST_CUSTOM_ID_CLOSE, CUSTOM_ID_PAGE_RP as TOP_LIST_CUSTOM_ID_PAGE_RP, top_list_command,
-    top_list_command_component_close, top_list_command_component_page
+    CUSTOM_ID_CLOSE as TOP_LIST_CUSTOM_ID_CLOSE, CUSTOM_ID_PAGE_RP as TOP_LIST_CUSTOM_ID_PAGE_RP,
+    top_list_audit_log_entry_create, top_list_command, top_list_command_component_close,
+    top_list_command_component_page
 )
 from .un_ban import un_ban_command
 from .un_mute import un_mute_command
@@ -69,3 +70,5 @@ MAIN_COMMAND.interactions(un_mute_command, name = 'un-mute')
 
 SLASH_CLIENT.interactions(top_list_command_component_close, custom_id = TOP_LIST_CUSTOM_ID_CLOSE)
 SLASH_CLIENT.interactions(top_list_command_component_page, custom_id = TOP_LIST_CUSTOM_ID_PAGE_RP)
+
+SLASH_CLIENT.events(top_list_audit_log_entry_create, name = 'audit_log_entry_create')
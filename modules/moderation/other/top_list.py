@@ -1,15 +1,17 @@
 __all__ = ()
 
 import re
+from bisect import bisect_left, insort
 from datetime import datetime as DateTime, timedelta as TimeDelta
 from math import floor, log10
+from time import monotonic
 
 from hata import (
     AnsiForegroundColor, AnsiTextDecoration, AuditLogEvent, BUILTIN_EMOJIS, Client, Embed, KOKORO, Permission,
     create_ansi_format_code
 )
 from hata.ext.slash import Button, InteractionResponse, P, Row
-from scarletio import RichAttributeErrorBaseType, TaskGroup
+from scarletio import RichAttributeErrorBaseType, Task, TaskGroup, shield
 
 from ..shared_constants import REASON_RP
 
@@ -76,6 +78,10 @@ PAGE_MAX = 99
 DAYS_MIN = 1
 DAYS_MAX = 45
 
+# Page changes within this many seconds are served from memory. New actions meanwhile come from gateway events.
+ACTION_CACHE_REFRESH_INTERVAL = 60.0
+ACTION_CACHE_IDLE_TIMEOUT = 3600.0
+
 CUSTOM_ID_BACK_DISABLED = 'mod.top_list.page.min.disabled'
 CUSTOM_ID_NEXT_DISABLED = 'mod.top_list.page.max.disabled'
 CUSTOM_ID_CLOSE = 'mod.top_list.close'
@@ -215,142 +221,324 @@ async def get_source_user_from_client_entry(entry):
     return await get_user(user_id)
 
 
-async def request_bans(client, guild, after, actions):
+def get_audit_log_entry_action_type(entry):
     """
-    Requests all the bans after the given time.
-    
-    This function is a coroutine.
+    Returns the action type of the given audit log entry.
     
     Parameters
     ----------
-    client : ``Client``
-        The client to request the audit logs with.
-    guild : ``Guild``
-        The guild to request the actions at.
-    after : `DateTime`
-        The date to get the logs after.
-    actions : `set` of `tuple` (`int`, ``ClientUserBase``, ``ClientUserBase``)
-        The executed actions to extend.
+    entry : ``AuditLogEntry``
+        The entry to inspect.
+    
+    Returns
+    -------
+    action_type : `int`
+        Returns `0` if the entry is not a tracked action.
     """
-    async for audit_log_entry in (await client.audit_log_iterator(guild, event = AuditLogEvent.member_ban_add)):
-        if audit_log_entry.created_at < after:
-            break
-        
-        source_user = audit_log_entry.user
-        if source_user is None:
-            continue
-        
-        if source_user is client:
-            source_user = await get_source_user_from_client_entry(audit_log_entry)
-            if source_user is None:
-                continue
+    event = entry.type
+    if event is AuditLogEvent.member_ban_add:
+        return TYPE_BAN
+    
+    if event is AuditLogEvent.member_kick:
+        return TYPE_KICK
+    
+    if event is AuditLogEvent.member_update:
+        changes = entry.changes
+        if (changes is None):
+            return 0
         
-        elif source_user.bot:
-            continue
+        for change in changes:
+            if change.attribute_name == 'timed_out_until':
+                break
+        else:
+            return 0
         
-        target_user = audit_log_entry.target
-        if source_user is target_user:
-            continue
+        if change.after is None:
+            return 0
         
-        actions.add((TYPE_BAN, source_user, target_user))
+        return TYPE_MUTE
+    
+    return 0
 
 
-async def request_kicks(client, guild, after, actions):
+async def parse_audit_log_entry(client, entry):
     """
-    Requests all the kicks after the given time.
+    Parses the given audit log entry into an action.
     
     This function is a coroutine.
     
     Parameters
     ----------
     client : ``Client``
-        The client to request the audit logs with.
-    guild : ``Guild``
-        The guild to request the actions at.
-    after : `DateTime`
-        The date to get the logs after.
-    actions : `set` of `tuple` (`int`, ``ClientUserBase``, ``ClientUserBase``)
-        The executed actions to extend.
+        The client who requested or received the entry.
+    entry : ``AuditLogEntry``
+        The entry to parse.
+    
+    Returns
+    -------
+    action : `None`, `tuple` (`DateTime`, `int`, `int`, ``ClientUserBase``, ``ClientUserBase``)
+        `created at` - `entry id` - `action type` - `source user` - `target user` tuple. `None` if the entry is not a
+        tracked action.
     """
-    async for audit_log_entry in (await client.audit_log_iterator(guild, event = AuditLogEvent.member_kick)):
-        if audit_log_entry.created_at < after:
-            break
-        
-        source_user = audit_log_entry.user
+    action_type = get_audit_log_entry_action_type(entry)
+    if not action_type:
+        return None
+    
+    source_user = entry.user
+    if source_user is None:
+        return None
+    
+    if source_user is client:
+        source_user = await get_source_user_from_client_entry(entry)
         if source_user is None:
-            continue
-        
-        if source_user is client:
-            source_user = await get_source_user_from_client_entry(audit_log_entry)
-            if source_user is None:
-                continue
-        
-        elif source_user.bot:
-            continue
-        
-        target_user = audit_log_entry.target
-        if source_user is target_user:
-            continue
-        
-        actions.add((TYPE_KICK, source_user, target_user))
+            return None
+    
+    elif source_user.bot:
+        return None
+    
+    target_user = entry.target
+    if source_user is target_user:
+        return None
+    
+    return (entry.created_at, entry.id, action_type, source_user, target_user)
 
 
-async def request_mutes(client, guild, after, actions):
+class ActionCache(RichAttributeErrorBaseType):
     """
-    Requests all the mutes after the given time.
+    Parsed moderation actions of a guild.
     
-    This function is a coroutine.
+    The first request walks the last ``DAYS_MAX`` days of audit logs, after it only the entries newer than the newest
+    cached one of each event are requested. Meanwhile the cache is fed by the `audit_log_entry_create` event.
     
-    Parameters
+    Attributes
     ----------
-    client : ``Client``
-        The client to request the audit logs with.
-    guild : ``Guild``
-        The guild to request the actions at.
-    after : `DateTime`
-        The date to get the logs after.
-    actions : `set` of `tuple` (`int`, ``ClientUserBase``, ``ClientUserBase``)
-        The executed actions to extend.
+    actions : `list` of `tuple` (`DateTime`, `int`, `int`, ``ClientUserBase``, ``ClientUserBase``)
+        The cached actions sorted by their creation time.
+    entry_ids : `set` of `int`
+        The cached actions' entry identifiers.
+    last_used : `float`
+        When the cache was used last time.
+    newest_entry_ids : `dict` of (``AuditLogEvent``, `int`) items
+        The newest requested entry's identifier for each audit log event.
+    refreshed_at : `float`
+        When the cache was refreshed last time. Set as `-1.0` if it was never refreshed.
+    refresh_task : `None`, ``Task``
+        The running refresh.
     """
-    async for audit_log_entry in (await client.audit_log_iterator(guild, event = AuditLogEvent.member_update)):
-        if audit_log_entry.created_at < after:
-            break
+    __slots__ = ('actions', 'entry_ids', 'last_used', 'newest_entry_ids', 'refreshed_at', 'refresh_task')
+    
+    def __new__(cls):
+        """
+        Creates a new action cache.
+        """
+        self = object.__new__(cls)
+        self.actions = []
+        self.entry_ids = set()
+        self.last_used = monotonic()
+        self.newest_entry_ids = {}
+        self.refreshed_at = -1.0
+        self.refresh_task = None
+        return self
+    
+    
+    def __repr__(self):
+        """Returns the action cache's representation."""
+        return f'<{self.__class__.__name__} action_count = {len(self.actions)!r}>'
+    
+    
+    def add_actions(self, actions):
+        """
+        Adds the given actions to the cache. Already cached actions are ignored.
         
-        changes = audit_log_entry.changes
-        if (changes is None):
-            continue
+        Parameters
+        ----------
+        actions : `list` of `tuple` (`DateTime`, `int`, `int`, ``ClientUserBase``, ``ClientUserBase``)
+            The actions to add.
+        """
+        entry_ids = self.entry_ids
+        cached_actions = self.actions
+        
+        for action in actions:
+            entry_id = action[1]
+            if entry_id in entry_ids:
+                continue
             
-        for change in changes:
-            if change.attribute_name == 'timed_out_until':
-                break
-        else:
-            continue
+            entry_ids.add(entry_id)
+            insort(cached_actions, action)
+    
+    
+    def evict_old(self, now):
+        """
+        Removes the actions older than ``DAYS_MAX`` days.
         
-        if change.after is None:
-            continue
+        Parameters
+        ----------
+        now : `DateTime`
+            The current time.
+        """
+        cached_actions = self.actions
+        index = bisect_left(cached_actions, (now - DELTA_DAY * DAYS_MAX,))
+        if index:
+            entry_ids = self.entry_ids
+            for action in cached_actions[:index]:
+                entry_ids.discard(action[1])
+            
+            del cached_actions[:index]
+    
+    
+    async def refresh(self, client, guild):
+        """
+        Requests the actions newer than the cached ones. If the cache is fresh, does nothing.
         
-        source_user = audit_log_entry.user
-        if source_user is None:
-            continue
+        Concurrent refreshes share one request.
         
-        if source_user is client:
-            source_user = await get_source_user_from_client_entry(audit_log_entry)
-            if source_user is None:
-                continue
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        client : ``Client``
+            The client to request the audit logs with.
+        guild : ``Guild``
+            The guild to request the actions at.
+        """
+        self.last_used = monotonic()
+        
+        refresh_task = self.refresh_task
+        if refresh_task is None:
+            if monotonic() - self.refreshed_at < ACTION_CACHE_REFRESH_INTERVAL:
+                return
+            
+            refresh_task = Task(self._refresh(client, guild), KOKORO)
+            self.refresh_task = refresh_task
+        
+        await shield(refresh_task, KOKORO)
+    
+    
+    async def _refresh(self, client, guild):
+        """
+        Requests the actions newer than the cached ones.
+        
+        This method is a coroutine.
+        
+        Parameters
+        ----------
+        client : ``Client``
+            The client to request the audit logs with.
+        guild : ``Guild``
+            The guild to request the actions at.
+        """
+        try:
+            now = DateTime.utcnow()
+            after = now - DELTA_DAY * DAYS_MAX
+            
+            task_group = TaskGroup(KOKORO)
+            for event in (AuditLogEvent.member_ban_add, AuditLogEvent.member_kick, AuditLogEvent.member_update):
+                task_group.create_task(self._request_actions(client, guild, event, after))
+            
+            failed_task = await task_group.wait_exception()
+            if (failed_task is not None):
+                task_group.cancel_all()
+                failed_task.get_result()
+            
+            self.evict_old(now)
+            self.refreshed_at = monotonic()
+        
+        finally:
+            self.refresh_task = None
+    
+    
+    async def _request_actions(self, client, guild, event, after):
+        """
+        Requests the actions of the given event newer than the newest cached one and newer than `after`.
+        
+        This method is a coroutine.
         
-        elif source_user.bot:
-            continue
+        Parameters
+        ----------
+        client : ``Client``
+            The client to request the audit logs with.
+        guild : ``Guild``
+            The guild to request the actions at.
+        event : ``AuditLogEvent``
+            The audit log event to request.
+        after : `DateTime`
+            The date to get the logs after.
+        """
+        newest_entry_id = self.newest_entry_ids.get(event, 0)
+        newest_requested_entry_id = newest_entry_id
+        
+        actions = []
+        
+        async for audit_log_entry in (await client.audit_log_iterator(guild, event = event)):
+            entry_id = audit_log_entry.id
+            if (entry_id <= newest_entry_id) or (audit_log_entry.created_at < after):
+                break
+            
+            if entry_id > newest_requested_entry_id:
+                newest_requested_entry_id = entry_id
+            
+            action = await parse_audit_log_entry(client, audit_log_entry)
+            if (action is not None):
+                actions.append(action)
+        
+        # Add the actions only after all was requested, so a failing request is retried from the same entry.
+        self.add_actions(actions)
+        self.newest_entry_ids[event] = newest_requested_entry_id
+    
+    
+    def get_actions(self, after):
+        """
+        Returns the actions executed after the given date.
+        
+        Repeated actions with the same type between the same users are counted once.
         
-        target_user = audit_log_entry.target
-        if source_user is target_user:
-            continue
+        Parameters
+        ----------
+        after : `DateTime`
+            The date to get the actions after.
         
-        actions.add((TYPE_MUTE, source_user, target_user))
+        Returns
+        -------
+        actions : `set` of `tuple` (`int`, ``ClientUserBase``, ``ClientUserBase``)
+            A set of `action type` - `source user` - `target user` tuples.
+        """
+        cached_actions = self.actions
+        return {action[2:] for action in cached_actions[bisect_left(cached_actions, (after,)):]}
+
+
+ACTION_CACHES = {}
+
+
+def get_action_cache(guild_id):
+    """
+    Returns the action cache of the given guild, creating it if required. Drops the caches not used for a while.
+    
+    Parameters
+    ----------
+    guild_id : `int`
+        The guild's identifier.
+    
+    Returns
+    -------
+    action_cache : ``ActionCache``
+    """
+    now = monotonic()
+    for cached_guild_id, action_cache in [*ACTION_CACHES.items()]:
+        if (action_cache.refresh_task is None) and (now - action_cache.last_used > ACTION_CACHE_IDLE_TIMEOUT):
+            del ACTION_CACHES[cached_guild_id]
+    
+    try:
+        action_cache = ACTION_CACHES[guild_id]
+    except KeyError:
+        action_cache = ActionCache()
+        ACTION_CACHES[guild_id] = action_cache
+    
+    return action_cache
 
 
 async def request_actions(client, guild, after):
     """
-    Requests the actions for the given action type in the given interva
+    Requests the actions for the given action type in the given interval.
     
     This function is a coroutine.
     
@@ -368,20 +556,31 @@ async def request_actions(client, guild, after):
     actions : `set` of `tuple` (`int`, ``ClientUserBase``, ``ClientUserBase``)
         A set of `action type` - `source user` - `target user` tuples.
     """
-    actions = set()
+    action_cache = get_action_cache(guild.id)
+    await action_cache.refresh(client, guild)
+    return action_cache.get_actions(after)
+
+
+async def top_list_audit_log_entry_create(client, audit_log_entry):
+    """
+    Handles an audit log entry create event. Feeds the entry into its guild's action cache if the guild has any.
     
-    task_group = TaskGroup(KOKORO)
-    task_group.create_task(request_bans(client, guild, after, actions))
-    task_group.create_task(request_kicks(client, guild, after, actions))
-    task_group.create_task(request_mutes(client, guild, after, actions))
+    This function is a coroutine.
     
-    failed_task = await task_group.wait_exception()
-    if (failed_task is not None):
-        task_group.cancel_all()
-        failed_task.get_result()
+    Parameters
+    ----------
+    client : ``Client``
+        The client who received the event.
+    audit_log_entry : ``AuditLogEntry``
+        The created audit log entry.
+    """
+    action_cache = ACTION_CACHES.get(audit_log_entry.guild_id, None)
+    if action_cache is None:
+        return
     
-    return actions
-
+    action = await parse_audit_log_entry(client, audit_log_entry)
+    if (action is not None):
+        action_cache.add_actions([action])
 
 
 async def request_top_list(client, guild, sort_by, days, page):
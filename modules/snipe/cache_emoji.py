@@ -1,12 +1,14 @@
 __all__ = ()
 
-from collections import OrderedDict
-
 from hata import DiscordException, ERROR_CODES, ZEROUSER
 
+from bot_utils.async_cache import AsyncCache
+
 
-EMOJI_CACHE = OrderedDict()
 EMOJI_CACHE_MAX_SIZE = 1000
+EMOJI_CACHE_TTL = 3600.0
+
+EMOJI_CACHE = AsyncCache('snipe emojis', size_limit = EMOJI_CACHE_MAX_SIZE, ttl = EMOJI_CACHE_TTL)
 
 
 async def update_emoji_details(client, emoji):
@@ -25,16 +27,7 @@ async def update_emoji_details(client, emoji):
     if not emoji.is_custom_emoji():
         return
     
-    if emoji.id in EMOJI_CACHE:
-        EMOJI_CACHE.move_to_end(emoji.id)
-        return
-    
-    await request_emoji_details(client, emoji)
-    
-    if len(EMOJI_CACHE) == EMOJI_CACHE_MAX_SIZE:
-        del EMOJI_CACHE[next(iter(EMOJI_CACHE))]
-    
-    EMOJI_CACHE[emoji.id] = emoji
+    await EMOJI_CACHE.get(emoji.id, request_emoji_details, client, emoji)
 
 
 async def request_emoji_details(client, emoji):
@@ -49,6 +42,10 @@ async def request_emoji_details(client, emoji):
         The emoji to request the emoji with.
     emoji : ``Emoji``
         The emoji's to update.
+    
+    Returns
+    -------
+    emoji : ``Emoji``
     """
     guild = emoji.guild
     if (emoji.user is ZEROUSER) and (guild is not None) and (guild in client.guilds):
@@ -59,3 +56,5 @@ async def request_emoji_details(client, emoji):
                 ERROR_CODES.missing_access, # Client removed.
             ):
                 raise
+    
+    return emoji
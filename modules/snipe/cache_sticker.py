@@ -1,12 +1,21 @@
 __all__ = ()
 
-from collections import OrderedDict
-
 from hata import DiscordException, ERROR_CODES, STICKERS
 
+from bot_utils.async_cache import AsyncCache
+
 
-STICKER_CACHE = OrderedDict()
 STICKER_CACHE_MAX_SIZE = 1000
+STICKER_CACHE_TTL = 3600.0
+# Deleted stickers are remembered for a while, so they are not requested again on every lookup.
+STICKER_CACHE_NEGATIVE_TTL = 600.0
+
+STICKER_CACHE = AsyncCache(
+    'snipe stickers',
+    negative_ttl = STICKER_CACHE_NEGATIVE_TTL,
+    size_limit = STICKER_CACHE_MAX_SIZE,
+    ttl = STICKER_CACHE_TTL,
+)
 
 
 async def get_sticker(client, sticker_id):
@@ -27,21 +36,9 @@ async def get_sticker(client, sticker_id):
     sticker : `None`, ``Sticker``
     """
     try:
-        sticker = STICKER_CACHE[sticker_id]
-    except KeyError:
-        sticker = await request_sticker(client, sticker_id)
-        if sticker is None:
-            return None
-        
-        if len(STICKER_CACHE) == STICKER_CACHE_MAX_SIZE:
-            del STICKER_CACHE[next(iter(STICKER_CACHE))]
-        
-        STICKER_CACHE[sticker_id] = sticker
-    
-    else:
-        STICKER_CACHE.move_to_end(sticker_id)
-    
-    return sticker
+        return await STICKER_CACHE.get(sticker_id, request_sticker, client, sticker_id)
+    except ConnectionError:
+        return None
 
 
 async def request_sticker(client, sticker_id):
@@ -60,6 +57,12 @@ async def request_sticker(client, sticker_id):
     Returns
     -------
     sticker : `None`, ``Sticker``
+        Returns `None` if the sticker is deleted.
+    
+    Raises
+    ------
+    ConnectionError
+    DiscordException
     """
     sticker = STICKERS.get(sticker_id, None)
     
@@ -80,10 +83,7 @@ async def request_sticker(client, sticker_id):
         try:
             sticker = await client.sticker_get_guild(sticker, force_update = True)
         except BaseException as err:
-            if isinstance(err, ConnectionError):
-                return
-            
-            elif isinstance(err, DiscordException):
+            if isinstance(err, DiscordException):
                 # sticker deleted -> return `None`.
                 if err.code == ERROR_CODES.unknown_sticker: 
                     return None
@@ -104,9 +104,6 @@ async def request_sticker(client, sticker_id):
     try:
         sticker = await client.sticker_get(sticker_id, force_update = True)
     except BaseException as err:
-        if isinstance(err, ConnectionError):
-            return
-        
         if isinstance(err, DiscordException):
             # sticker deleted -> return `None`.
             if err.code == ERROR_CODES.unknown_sticker: 
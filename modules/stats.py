@@ -13,11 +13,29 @@ from scarletio import EventThread, ExecutorThread
 from hata import Client, Embed, Color, elapsed_time
 from hata.ext.commands_v2 import checks
 
+from bot_utils.async_cache import ASYNC_CACHES
+from bot_utils.batch_writer import BATCH_WRITERS
+from bot_utils.handler_registry import HANDLER_REGISTRIES
+from bot_utils.image_handler_statistics import IMAGE_HANDLER_STATISTICS
 from bot_utils.models import DB_ENGINE
+from bot_utils.user_common_cache import USER_COMMON_CACHE
 from bot_utils.cpu_info import CpuUsage, psutil, PROCESS, PROCESS_PID, CPU_MAX_FREQUENCY
 
 STAT_COLOR = Color.from_rgb(61, 255, 249)
 
+IMAGE_HANDLER_STATS_LIMIT = 10
+
+QUERY_STATS_SHAPE_LIMIT = 8
+QUERY_STATS_SHAPE_LENGTH = 300
+QUERY_STATS_SLOW_QUERY_LIMIT = 10
+QUERY_STATS_ORDERS = {
+    'total': lambda shape_statistics: shape_statistics.time_total,
+    'average': lambda shape_statistics: shape_statistics.time_average,
+    'max': lambda shape_statistics: shape_statistics.time_max,
+    'count': lambda shape_statistics: shape_statistics.count,
+    'rows': lambda shape_statistics: shape_statistics.row_count,
+}
+
 COMMAND_CLIENT: Client
 COMMAND_CLIENT.command_processor.create_category('STATS', checks=checks.owner_only())
 
@@ -86,9 +104,12 @@ class threads:
                 description.append(repr(event_loop_executor_count))
                 description.append('\n')
             
-            if DB_ENGINE.uses_single_worker:
-                other_executors -=1
-                description.append('Database engine worker: 1\n')
+            if (DB_ENGINE is not None):
+                database_worker_count = DB_ENGINE.worker_count
+                other_executors -= database_worker_count
+                description.append('Database engine workers: ')
+                description.append(repr(database_worker_count))
+                description.append('\n')
             
             if other_executors>0:
                 description.append('Other executors: ')
@@ -161,6 +182,295 @@ class threads:
             ), color = STAT_COLOR).add_footer(
                 'Owner only!')
 
+@COMMAND_CLIENT.commands.from_class
+class cache_stats:
+    aliases = ['caches']
+    
+    async def command(client, message):
+        description = []
+        
+        for cache in sorted(ASYNC_CACHES.values(), key = lambda cache: cache.name):
+            statistics = cache.statistics
+            
+            description.append(
+                f'**{cache.name}**:\n'
+                f'Cached: {len(cache)} / {cache.size_limit or "-"}'
+            )
+            
+            if cache.byte_limit:
+                description.append(f' ({cache.byte_size} / {cache.byte_limit} bytes)')
+            
+            description.append(
+                f'\n'
+                f'Loading: {cache.load_count}\n'
+                f'Hits: {statistics.hit_count} (missing: {statistics.negative_hit_count}, '
+                f'in flight: {statistics.in_flight_hit_count})\n'
+                f'Misses: {statistics.miss_count}\n'
+                f'Hit rate: {statistics.hit_rate * 100.0:.2f}%\n'
+                f'Evicted: {statistics.eviction_count} (expired: {statistics.expiration_count})\n'
+                f'Invalidated: {statistics.invalidation_count} (cleared: {statistics.clear_count})\n'
+                f'\n'
+            )
+        
+        embed = Embed('Cache stats', ''.join(description), color = STAT_COLOR)
+        
+        await client.message_create(message.channel, embed = embed)
+    
+    category = 'STATS'
+    
+    async def description(command_context):
+        return Embed('cache-stats',(
+            'Shows how the caches are doing.\n'
+            f'Usage: `{command_context.prefix}cache-stats`'
+            ), color = STAT_COLOR).add_footer(
+                'Owner only!')
+
+@COMMAND_CLIENT.commands.from_class
+class image_handler_stats:
+    aliases = ['image-handlers']
+    
+    async def command(client, message):
+        statistics_list = sorted(
+            IMAGE_HANDLER_STATISTICS,
+            key = lambda statistics: statistics.hit_count + statistics.miss_count,
+            reverse = True,
+        )
+        
+        description = []
+        
+        for registry in sorted(HANDLER_REGISTRIES.values(), key = lambda registry: registry.name):
+            description.append(
+                f'**{registry.name} registry**:\n'
+                f'Handlers: {len(registry)} / {registry.size_limit} (pinned: {registry.get_pinned_count()})\n'
+                f'Cached images: {registry.get_cached_image_count()} / {registry.cached_image_limit or "-"}\n'
+                f'Evicted: {registry.eviction_count}\n'
+                f'\n'
+            )
+        
+        for statistics in statistics_list[:IMAGE_HANDLER_STATS_LIMIT]:
+            description.append(
+                f'**{statistics.name}**:\n'
+                f'Hits: {statistics.hit_count} ({statistics.hit_time_average * 1000.0:.2f} ms average)\n'
+                f'Misses: {statistics.miss_count} ({statistics.miss_time_average * 1000.0:.2f} ms average)\n'
+                f'Hit rate: {statistics.hit_rate * 100.0:.2f}%\n'
+                f'Requests: {statistics.request_count} (prefetch: {statistics.prefetch_count}, '
+                f'skipped prefetch: {statistics.prefetch_skip_count})\n'
+                f'\n'
+            )
+        
+        if not description:
+            description.append('*No image handlers used*')
+        
+        embed = Embed('Image handler stats', ''.join(description), color = STAT_COLOR).add_footer(
+            f'Showing {min(len(statistics_list), IMAGE_HANDLER_STATS_LIMIT)} of {len(statistics_list)} handlers.'
+        )
+        
+        await client.message_create(message.channel, embed = embed)
+    
+    category = 'STATS'
+    
+    async def description(command_context):
+        return Embed('image-handler-stats',(
+            'Shows how fast the most used image handlers serve their images and how big the handler registries are.\n'
+            f'Usage: `{command_context.prefix}image-handler-stats`'
+            ), color = STAT_COLOR).add_footer(
+                'Owner only!')
+
+if (DB_ENGINE is not None):
+    @COMMAND_CLIENT.commands.from_class
+    class database_stats:
+        aliases = ['database', 'db-stats']
+        
+        async def command(client, message):
+            statistics = DB_ENGINE.statistics
+            
+            description = []
+            
+            description.append('**Workers**:\n')
+            for worker in DB_ENGINE.workers:
+                description.append('Worker ')
+                description.append(repr(worker.index))
+                description.append(': ')
+                description.append(repr(worker.connection_count))
+                description.append(' connections, ')
+                description.append(repr(worker.get_queue_length()))
+                description.append(' queued calls, used ')
+                description.append(repr(worker.use_count))
+                description.append(' times\n')
+            
+            description.append(
+                f'--------------------\n'
+                f'Total: {DB_ENGINE.worker_count}\n'
+                f'Connections per worker: {DB_ENGINE.connections_per_worker or "unlimited"}\n'
+                f'\n'
+                f'**Queue**:\n'
+                f'Depth: {DB_ENGINE.queue_depth} (peak: {statistics.queue_depth_peak})\n'
+                f'Limit: {DB_ENGINE.queue_limit}\n'
+                f'Rejected: {statistics.rejected_count}\n'
+                f'\n'
+                f'**Wait time**:\n'
+                f'Acquires: {statistics.acquire_count}\n'
+                f'Waited: {statistics.wait_count}\n'
+                f'Average: {statistics.wait_time_average * 1000.0:.2f} ms\n'
+                f'Max: {statistics.wait_time_max * 1000.0:.2f} ms\n'
+            )
+            
+            cache_statistics = USER_COMMON_CACHE.statistics
+            description.append(
+                f'\n'
+                f'**User cache**:\n'
+                f'Cached: {len(USER_COMMON_CACHE)} / {USER_COMMON_CACHE.size_limit}\n'
+                f'Hits: {cache_statistics.hit_count} (missing: {cache_statistics.negative_hit_count})\n'
+                f'Misses: {cache_statistics.miss_count}\n'
+                f'Hit rate: {cache_statistics.hit_rate * 100.0:.2f}%\n'
+                f'Invalidated: {cache_statistics.invalidation_count} (cleared: {cache_statistics.clear_count})\n'
+                f'Evicted: {cache_statistics.eviction_count} (expired: {cache_statistics.expiration_count})'
+            )
+            
+            embed = Embed('Database stats', ''.join(description), color = STAT_COLOR)
+            
+            await client.message_create(message.channel, embed = embed)
+        
+        category = 'STATS'
+        
+        async def description(command_context):
+            return Embed('database-stats',(
+                'Shows how the database engine\'s workers, queue and user cache are doing.\n'
+                f'Usage: `{command_context.prefix}database-stats`'
+                ), color = STAT_COLOR).add_footer(
+                    'Owner only!')
+    
+    
+    @COMMAND_CLIENT.commands.from_class
+    class query_stats:
+        aliases = ['queries', 'slow-queries']
+        
+        async def command(client, message, order = 'total'):
+            query_statistics = DB_ENGINE.query_statistics
+            
+            if order == 'reset':
+                query_statistics.reset()
+                await client.message_create(message.channel, 'Query stats cleared.')
+                return
+            
+            try:
+                key = QUERY_STATS_ORDERS[order]
+            except KeyError:
+                await client.message_create(
+                    message.channel,
+                    f'Unknown order: {order!r}; available: {", ".join(QUERY_STATS_ORDERS.keys())}, reset.',
+                )
+                return
+            
+            description = []
+            
+            for shape_statistics in query_statistics.get_top_shapes(key, QUERY_STATS_SHAPE_LIMIT):
+                description.append(
+                    f'**{shape_statistics.module_name}**: {shape_statistics.count} calls'
+                    f'{"" if not shape_statistics.failure_count else f" ({shape_statistics.failure_count} failed)"}, '
+                    f'{shape_statistics.row_count} rows\n'
+                    f'{shape_statistics.time_average * 1000.0:.2f} ms average, '
+                    f'p95 <= {shape_statistics.get_percentile(0.95) * 1000.0:.0f} ms, '
+                    f'{shape_statistics.time_max * 1000.0:.2f} ms max, '
+                    f'{shape_statistics.time_total:.2f} s total\n'
+                    f'```sql\n{shape_statistics.shape[:QUERY_STATS_SHAPE_LENGTH]}\n```'
+                )
+            
+            if not description:
+                description.append('*No queries recorded*')
+            
+            embed = Embed(
+                f'Query stats by {order}',
+                ''.join(description)[:4000],
+                color = STAT_COLOR,
+            )
+            
+            slow_queries = query_statistics.slow_queries
+            if slow_queries:
+                slow_query_lines = []
+                
+                for slow_query in reversed(slow_queries):
+                    slow_query_lines.append(
+                        f'{slow_query.duration * 1000.0:.0f} ms, {elapsed_time(slow_query.executed_at)} ago at '
+                        f'{slow_query.call_site}\n'
+                    )
+                    
+                    if len(slow_query_lines) == QUERY_STATS_SLOW_QUERY_LIMIT:
+                        break
+                
+                embed.add_field(
+                    f'Slow queries (>= {query_statistics.slow_query_threshold * 1000.0:.0f} ms)',
+                    ''.join(slow_query_lines)[:1024],
+                )
+            
+            await client.message_create(message.channel, embed = embed)
+        
+        category = 'STATS'
+        
+        async def description(command_context):
+            return Embed('query-stats',(
+                'Shows the database statements with their timings and the last slow ones.\n'
+                f'Usage: `{command_context.prefix}query-stats <order>`\n'
+                f'Order can be any of: {", ".join(QUERY_STATS_ORDERS.keys())}, defaults to `total`.\n'
+                f'Pass `reset` to clear the collected stats.'
+                ), color = STAT_COLOR).add_footer(
+                    'Owner only!')
+    
+    
+    @COMMAND_CLIENT.commands.from_class
+    class batch_writer_stats:
+        aliases = ['batch-writers']
+        
+        async def command(client, message):
+            description = []
+            
+            for writer in BATCH_WRITERS.values():
+                statistics = writer.statistics
+                description.append(
+                    f'**{writer.name}**:\n'
+                    f'Buffered: {writer.buffered_count}\n'
+                    f'Flushes: {statistics.flush_count} (failed: {statistics.failure_count})\n'
+                    f'Dropped rows: {statistics.dropped_row_count}\n'
+                    f'Rows: {statistics.row_count} ({statistics.rows_per_flush:.2f} / flush)\n'
+                    f'Flush time: {statistics.flush_time_average * 1000.0:.2f} ms average, '
+                    f'{statistics.flush_time_max * 1000.0:.2f} ms max\n'
+                )
+                
+                claim_count = getattr(writer, 'claim_count', None)
+                if (claim_count is not None):
+                    description.append(f'Claims: {claim_count} ({writer.claims_per_second:.2f} / second)\n')
+                
+                compaction = getattr(writer, 'last_compaction', None)
+                if (compaction is not None):
+                    if compaction.finished_at is None:
+                        state = 'running'
+                    else:
+                        state = f'finished {elapsed_time(compaction.finished_at)} ago'
+                    
+                    description.append(
+                        f'Last compaction: {state}, {compaction.row_count} rows of {compaction.day_count} days '
+                        f'reclaimed\n'
+                    )
+                
+                description.append('\n')
+            
+            if not description:
+                description.append('*No batch writers*')
+            
+            embed = Embed('Batch writer stats', ''.join(description), color = STAT_COLOR)
+            
+            await client.message_create(message.channel, embed = embed)
+        
+        category = 'STATS'
+        
+        async def description(command_context):
+            return Embed('batch-writer-stats',(
+                'Shows how much rows the batch writers flushed and how long it took.\n'
+                f'Usage: `{command_context.prefix}batch-writer-stats`'
+                ), color = STAT_COLOR).add_footer(
+                    'Owner only!')
+
+
 if IS_PYPY:
     @COMMAND_CLIENT.commands.from_class
     class gc_stats:
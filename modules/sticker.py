@@ -6,11 +6,13 @@ from scarletio import to_json
 from scarletio.web_common import quote
 from hata import Embed, parse_emoji, DiscordException, ERROR_CODES, Client, STICKERS, USERS, Color, Permission
 from hata.ext.slash import abort, InteractionResponse, Button, ButtonStyle, wait_for_component_interaction, Row
-from bot_utils.models import DB_ENGINE, sticker_counter_model, STICKER_COUNTER_TABLE
+from bot_utils.models import (
+    DB_ENGINE, sticker_counter_model, STICKER_COUNTER_TABLE, sticker_counter_rollup_model, STICKER_COUNTER_ROLLUP_TABLE
+)
 from bot_utils.constants import GUILD__SUPPORT, ROLE__SUPPORT__EMOJI_MANAGER
+from bot_utils.counter_rollup import STICKER_COUNTER_WRITER, get_counter_totals_statement
 from dateutil.relativedelta import relativedelta
-from sqlalchemy import func as alchemy_function, and_
-from sqlalchemy.sql import select, desc
+from sqlalchemy.sql import select
 
 RELATIVE_MONTH = relativedelta(months=1)
 MONTH = timedelta(days=367, hours=6) / 12
@@ -30,7 +32,7 @@ ORDER_INCREASING = 0
 ORDERS = [
     ('decreasing', ORDER_DECREASING),
     ('increasing', ORDER_INCREASING),
-    
+
 ]
 
 def item_sort_key(item):
@@ -47,24 +49,15 @@ async def user_top(event,
     if user is None:
         user = event.user
     
+    await STICKER_COUNTER_WRITER.ensure_rollup_table()
     async with DB_ENGINE.connect() as connector:
         response = await connector.execute(
-            select(
-                [
-                    sticker_counter_model.sticker_id,
-                    alchemy_function.count(sticker_counter_model.sticker_id).label('total'),
-                ],
-            ).where(
-                and_(
-                    sticker_counter_model.user_id == user.id,
-                    sticker_counter_model.timestamp > datetime.utcnow() - RELATIVE_MONTH * months,
-                ),
-            ).limit(
-                count,
-            ).group_by(
-                sticker_counter_model.sticker_id,
-            ).order_by(
-                desc('total'),
+            get_counter_totals_statement(
+                STICKER_COUNTER_WRITER,
+                'sticker_id',
+                {'user_id': user.id},
+                datetime.utcnow() - RELATIVE_MONTH * months,
+                limit = count,
             )
         )
         
@@ -131,24 +124,15 @@ async def sticker_top(
     if sticker is None:
         abort(f'There is not sticker with name `{raw_sticker}` in the guild.')
     
+    await STICKER_COUNTER_WRITER.ensure_rollup_table()
     async with DB_ENGINE.connect() as connector:
         response = await connector.execute(
-            select(
-                [
-                    sticker_counter_model.user_id,
-                    alchemy_function.count(sticker_counter_model.user_id).label('total'),
-                ],
-            ).where(
-                and_(
-                    sticker_counter_model.sticker_id == sticker.id,
-                    sticker_counter_model.timestamp > datetime.utcnow() - RELATIVE_MONTH * months,
-                )
-            ).limit(
-                30,
-            ).group_by(
-                sticker_counter_model.user_id,
-            ).order_by(
-                desc('total')
+            get_counter_totals_statement(
+                STICKER_COUNTER_WRITER,
+                'user_id',
+                {'sticker_id': sticker.id},
+                datetime.utcnow() - RELATIVE_MONTH * months,
+                limit = 30,
             )
         )
         
@@ -239,6 +223,12 @@ async def sync_stickers_(event):
                     sticker_counter_model.sticker_id.in_(sticker_ids_to_remove),
                 )
             )
+            
+            await connector.execute(
+                STICKER_COUNTER_ROLLUP_TABLE.delete().where(
+                    sticker_counter_rollup_model.sticker_id.in_(sticker_ids_to_remove),
+                )
+            )
     
     return f'Unused sticker entries removed: {len(sticker_ids_to_remove)}'
 
@@ -266,10 +256,27 @@ async def sync_users_(event):
                     sticker_counter_model.user_id.in_(user_ids_to_remove)
                 )
             )
+            
+            await connector.execute(
+                STICKER_COUNTER_ROLLUP_TABLE.delete().where(
+                    sticker_counter_rollup_model.user_id.in_(user_ids_to_remove)
+                )
+            )
     
     return f'Unused user entries removed: {len(user_ids_to_remove)}'
 
 
+@STICKER_SYNC_COMMANDS.interactions
+async def sync_rollups_(event):
+    """Rebuilds the daily sticker usage counts from the recorded usages. (You must have emoji-council role)"""
+    assert_user_permissions(event)
+    
+    yield
+    
+    rollup_count = await STICKER_COUNTER_WRITER.rebuild_rollup()
+    yield f'Daily sticker usage entries rebuilt: {rollup_count}'
+
+
 
 @STICKER_COMMANDS.interactions
 async def most_used(
@@ -284,19 +291,10 @@ async def most_used(
     low_date_limit = datetime.utcnow() - RELATIVE_MONTH * months
     is_new_limit = datetime.utcnow() - MONTH
     
+    await STICKER_COUNTER_WRITER.ensure_rollup_table()
     async with DB_ENGINE.connect() as connector:
-        
         response = await connector.execute(
-            select(
-                [
-                    sticker_counter_model.sticker_id,
-                    alchemy_function.count(sticker_counter_model.user_id).label('total'),
-                ],
-            ).where(
-                sticker_counter_model.timestamp > low_date_limit,
-            ).group_by(
-                sticker_counter_model.sticker_id,
-            )
+            get_counter_totals_statement(STICKER_COUNTER_WRITER, 'sticker_id', {}, low_date_limit)
         )
         
         results = await response.fetchall()
@@ -738,24 +736,15 @@ async def user_sticker_compare(
     
     stickers = sorted(stickers)
     
+    await STICKER_COUNTER_WRITER.ensure_rollup_table()
     async with DB_ENGINE.connect() as connector:
         response = await connector.execute(
-            select(
-                [
-                    sticker_counter_model.sticker_id,
-                    alchemy_function.count(sticker_counter_model.sticker_id),
-                    alchemy_function.date_part('year', sticker_counter_model.timestamp).label('year'),
-                    alchemy_function.date_part('month', sticker_counter_model.timestamp).label('month'),
-                ],
-            ).where(
-                and_(
-                    sticker_counter_model.sticker_id.in_([sticker.id for sticker in stickers]),
-                    sticker_counter_model.timestamp > datetime.utcnow() - RELATIVE_MONTH * 12,
-                )
-            ).group_by(
-                sticker_counter_model.sticker_id,
-                'month',
-                'year',
+            get_counter_totals_statement(
+                STICKER_COUNTER_WRITER,
+                'sticker_id',
+                {'sticker_id': [sticker.id for sticker in stickers]},
+                datetime.utcnow() - RELATIVE_MONTH * 12,
+                by_month = True,
             )
         )
         
@@ -4,6 +4,8 @@ import warnings
 
 from hata import Client
 
+from bot_utils.model_linker import flush_model_links
+
 from . import show
 from . import upgrade
 
@@ -27,7 +29,7 @@ for sub_module in (
     
     if sub_module_attribute_count == 0:
         warnings.warn(f'`sub_module.__spec__.name` has no elements in it\'s `__all__`.')
-        
+    
     elif sub_module_attribute_count == 1:
         command = getattr(sub_module, sub_module_attributes[0])
         STATS_COMMAND.interactions(command)
@@ -38,3 +40,13 @@ for sub_module in (
         for sub_module_attribute_name in sub_module_attributes[1:]:
             command = getattr(sub_module, sub_module_attribute_name)
             category.interactions(command)
+
+
+@SLASH_CLIENT.events
+async def shutdown(client):
+    """
+    Called when the client is shutting down. Writes out the delayed waifu stats saves.
+    
+    This function is a coroutine.
+    """
+    await flush_model_links()
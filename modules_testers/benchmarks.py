@@ -0,0 +1,820 @@
+__all__ = ()
+
+import os
+from itertools import chain
+from re import M as re_multi_line, U as re_unicode, compile as re_compile
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from tracemalloc import (
+    get_traced_memory as tracemalloc_get_traced_memory, start as tracemalloc_start, stop as tracemalloc_stop
+)
+
+from hata import Channel, ChannelType, Client, Embed, Guild, KOKORO, eventlist
+from hata.ext.commands_v2 import Command, checks
+from scarletio import LOOP_TIME, Task, TaskGroup, alchemy_incendiary
+from sqlalchemy import BIGINT as Int64, Column, Integer as Int32, MetaData, Table, create_engine, func
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.sql import select
+
+from bot_utils.booru_parser import booru_post_parser_gel, booru_post_parser_generic, parse_booru_posts
+from bot_utils.channel_index import ChannelIndex
+from bot_utils.engine_pool import KOKORO_POOL_STRATEGY
+from bot_utils.model_linker import Field, ModelLink
+from bot_utils.rate_limiter import RateLimiter
+from bot_utils.tag_interner import TagInterner
+from bot_utils.tools import BeautifulSoup
+
+
+MAIN_CLIENT: Client
+BENCHMARK_COMMANDS = eventlist(type_ = Command, category = 'BENCHMARKS')
+
+def setup(lib):
+    MAIN_CLIENT.command_processor.create_category('BENCHMARKS', checks = [checks.owner_only()])
+    MAIN_CLIENT.commands.extend(BENCHMARK_COMMANDS)
+
+def teardown(lib):
+    MAIN_CLIENT.command_processor.delete_category('BENCHMARKS')
+
+
+DATABASE_POOL_BENCHMARK_WORKER_COUNTS = (1, 2, 4, 8)
+DATABASE_POOL_BENCHMARK_TASK_COUNT = 400
+DATABASE_POOL_BENCHMARK_WRITE_EVERY = 4
+
+BENCHMARK_METADATA = MetaData()
+BENCHMARK_TABLE = Table(
+    'BENCHMARK',
+    BENCHMARK_METADATA,
+    Column('id', Int32, primary_key = True),
+    Column('user_id', Int64),
+    Column('value', Int64),
+)
+
+
+async def database_pool_benchmark_task(engine, index):
+    """
+    A single benchmark unit. Reads and (every few task) writes the benchmark table through a new connection.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    engine : ``KOKOROPoolEngine``
+        The engine to benchmark.
+    index : `int`
+        The task's index.
+    """
+    user_id = index % 50
+    
+    async with engine.connect() as connector:
+        if index % DATABASE_POOL_BENCHMARK_WRITE_EVERY == 0:
+            await connector.execute(BENCHMARK_TABLE.insert().values(user_id = user_id, value = index))
+        
+        response = await connector.execute(
+            select([func.count(), func.sum(BENCHMARK_TABLE.c.value)]).where(BENCHMARK_TABLE.c.user_id == user_id)
+        )
+        await response.fetchone()
+
+
+async def run_database_pool_benchmark(database_url, worker_count):
+    """
+    Runs the database pool benchmark with the given worker count.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    database_url : `str`
+        Database url to connect to.
+    worker_count : `int`
+        The amount of workers to use.
+    
+    Returns
+    -------
+    elapsed : `float`
+        The time spent on the benchmark tasks.
+    statistics : ``DatabasePoolStatistics``
+        The engine's statistics.
+    """
+    engine = create_engine(database_url, strategy = KOKORO_POOL_STRATEGY, worker_count = worker_count, connect_args = {"timeout": 30})
+    if engine.dialect.name == 'sqlite':
+        # Without write-ahead logging readers block writers, so every worker would be waiting for the other ones.
+        async with engine.connect() as connector:
+            await connector.execute('PRAGMA journal_mode=WAL')
+    
+    await KOKORO.run_in_executor(alchemy_incendiary(BENCHMARK_METADATA.create_all, (engine._engine,)))
+    
+    try:
+        start = perf_counter()
+        
+        tasks = [
+            Task(database_pool_benchmark_task(engine, index), KOKORO)
+            for index in range(DATABASE_POOL_BENCHMARK_TASK_COUNT)
+        ]
+        await TaskGroup(KOKORO, tasks).wait_all()
+        
+        elapsed = perf_counter() - start
+        
+        for task in tasks:
+            task.get_result()
+    
+    finally:
+        await KOKORO.run_in_executor(alchemy_incendiary(BENCHMARK_METADATA.drop_all, (engine._engine,)))
+        engine.dispose()
+    
+    return elapsed, engine.statistics
+
+
+@BENCHMARK_COMMANDS
+async def benchmark_database_pool(client, message, database_url = None):
+    """
+    Drives concurrent reads and writes through the database engine with different worker counts.
+    
+    Uses a temporary SQLite database by default. Pass a database url to benchmark against a PostgreSQL stand-in.
+    """
+    await client.typing(message.channel)
+    
+    with TemporaryDirectory() as directory_path:
+        if database_url is None:
+            database_url = 'sqlite:///' + os.path.join(directory_path, 'benchmark.db')
+        
+        description = []
+        
+        for worker_count in DATABASE_POOL_BENCHMARK_WORKER_COUNTS:
+            elapsed, statistics = await run_database_pool_benchmark(database_url, worker_count)
+            description.append(
+                f'**{worker_count} worker(s)**: {elapsed:.3f} s '
+                f'({DATABASE_POOL_BENCHMARK_TASK_COUNT / elapsed:.0f} tasks/s)\n'
+                f'Waited: {statistics.wait_count}, average wait: {statistics.wait_time_average * 1000.0:.2f} ms, '
+                f'max wait: {statistics.wait_time_max * 1000.0:.2f} ms, peak queue depth: '
+                f'{statistics.queue_depth_peak}\n'
+            )
+    
+    embed = Embed(
+        'Database pool benchmark',
+        ''.join(description),
+    ).add_footer(
+        f'{DATABASE_POOL_BENCHMARK_TASK_COUNT} tasks, every {DATABASE_POOL_BENCHMARK_WRITE_EVERY}. writes.'
+    )
+    
+    await client.message_create(message.channel, embed = embed)
+
+
+MODEL_LINK_BENCHMARK_INSTANCE_COUNT = 200
+
+MODEL_LINK_BENCHMARK_BASE = declarative_base()
+
+class model_link_benchmark_model(MODEL_LINK_BENCHMARK_BASE):
+    __tablename__ = 'MODEL_LINK_BENCHMARK'
+    id = Column(Int32, primary_key = True)
+    user_id = Column(Int64, unique = True)
+    value = Column(Int64)
+
+MODEL_LINK_BENCHMARK_TABLE = model_link_benchmark_model.__table__
+
+
+def create_model_link_benchmark_type(engine):
+    """
+    Creates a model link type bound to the given engine.
+    
+    Parameters
+    ----------
+    engine : ``KOKOROPoolEngine``
+        The engine to bind the type to.
+    
+    Returns
+    -------
+    model_link_type : `type`
+    """
+    class ModelLinkBenchmark(
+        ModelLink, model = model_link_benchmark_model, table = MODEL_LINK_BENCHMARK_TABLE, engine = engine
+    ):
+        __slots__ = ()
+        
+        def __new__(cls, user_id):
+            self = ModelLink.__new__(cls, user_id)
+            self.user_id = user_id
+            return self
+        
+        user_id = Field(model_link_benchmark_model.user_id, 0, query_key = 'user_id')
+        entry_id = Field(model_link_benchmark_model.id, 0, primary_key = True)
+        value = Field(model_link_benchmark_model.value, 0)
+    
+    return ModelLinkBenchmark
+
+
+async def run_model_link_benchmark(database_url):
+    """
+    Loads model links one by one, concurrently one by one and in batch.
+    
+    This function is a coroutine.
+    
+    Parameters
+    ----------
+    database_url : `str`
+        Database url to connect to.
+    
+    Returns
+    -------
+    results : `list` of `tuple` (`str`, `float`, `int`)
+        The mode's name, the elapsed time and the amount of executed statements.
+    """
+    engine = create_engine(database_url, strategy = KOKORO_POOL_STRATEGY)
+    await KOKORO.run_in_executor(
+        alchemy_incendiary(MODEL_LINK_BENCHMARK_BASE.metadata.create_all, (engine._engine,))
+    )
+    
+    try:
+        instance_count = MODEL_LINK_BENCHMARK_INSTANCE_COUNT
+        
+        # Every mode loads its own user identifiers, so they do not share instances through the identity map.
+        async with engine.connect() as connector:
+            await connector.execute(
+                MODEL_LINK_BENCHMARK_TABLE.insert(),
+                [{'user_id': user_id, 'value': user_id} for user_id in range(instance_count * 3)],
+            )
+        
+        model_link_type = create_model_link_benchmark_type(engine)
+        
+        async def load_sequential(instances):
+            for instance in instances:
+                await instance
+        
+        async def load_concurrent(instances):
+            tasks = [Task(instance.__load_synchronised__(), KOKORO) for instance in instances]
+            await TaskGroup(KOKORO, tasks).wait_all()
+        
+        async def load_batched(instances):
+            await model_link_type.load_many(instances)
+        
+        results = []
+        
+        for index, (name, loader) in enumerate((
+            ('one by one', load_sequential),
+            ('concurrently one by one', load_concurrent),
+            ('batched', load_batched),
+        )):
+            instances = [
+                model_link_type(user_id) for user_id in range(instance_count * index, instance_count * (index + 1))
+            ]
+            
+            query_count_before = sum(shape.count for shape in engine.query_statistics.shapes.values())
+            start = perf_counter()
+            await loader(instances)
+            elapsed = perf_counter() - start
+            query_count = sum(shape.count for shape in engine.query_statistics.shapes.values()) - query_count_before
+            
+            if not all(instance.value == instance.user_id for instance in instances):
+                raise RuntimeError(f'{name!r} loaded wrong values.')
+            
+            results.append((name, elapsed, query_count))
+    
+    finally:
+        await KOKORO.run_in_executor(
+            alchemy_incendiary(MODEL_LINK_BENCHMARK_BASE.metadata.drop_all, (engine._engine,))
+        )
+        engine.dispose()
+    
+    return results
+
+
+@BENCHMARK_COMMANDS
+async def benchmark_model_link(client, message, database_url = None):
+    """
+    Loads model links one by one and in batch.
+    
+    Uses a temporary SQLite database by default. Pass a database url to benchmark against a PostgreSQL stand-in.
+    """
+    await client.typing(message.channel)
+    
+    with TemporaryDirectory() as directory_path:
+        if database_url is None:
+            database_url = 'sqlite:///' + os.path.join(directory_path, 'benchmark.db')
+        
+        results = await run_model_link_benchmark(database_url)
+    
+    description = []
+    for name, elapsed, query_count in results:
+        description.append(
+            f'**{name}**: {elapsed * 1000.0:.2f} ms, {query_count} queries '
+            f'({elapsed / MODEL_LINK_BENCHMARK_INSTANCE_COUNT * 1000000.0:.0f} us / instance)\n'
+        )
+    
+    embed = Embed(
+        'Model link load benchmark',
+        ''.join(description),
+    ).add_footer(
+        f'{MODEL_LINK_BENCHMARK_INSTANCE_COUNT} instances per mode.'
+    )
+    
+    await client.message_create(message.channel, embed = embed)
+
+
+RATE_LIMITER_BENCHMARK_KEY_COUNT = 100000
+RATE_LIMITER_BENCHMARK_RESET = 3600.0
+
+
+def run_timer_per_key_cooldown_benchmark(key_count, reset):
+    """
+    Checks every key once with the previous cooldown implementation, which scheduled a timer to remove each key.
+    
+    Parameters
+    ----------
+    key_count : `int`
+        The amount of keys to check.
+    reset : `float`
+        The cooldown's duration.
+    
+    Returns
+    -------
+    elapsed : `float`
+        The elapsed time.
+    timer_count : `int`
+        By how much the event loop's timer heap grew.
+    """
+    cache = {}
+    handles = []
+    timer_count_before = len(KOKORO._scheduled)
+    
+    start = perf_counter()
+    for key in range(key_count):
+        try:
+            expires_at = cache[key]
+        except KeyError:
+            expires_at = LOOP_TIME() + reset
+            cache[key] = expires_at
+            handles.append(KOKORO.call_at(expires_at, dict.__delitem__, cache, key))
+    
+    elapsed = perf_counter() - start
+    timer_count = len(KOKORO._scheduled) - timer_count_before
+    
+    for handle in handles:
+        handle.cancel()
+    
+    return elapsed, timer_count
+
+
+def run_rate_limiter_benchmark(key_count, reset):
+    """
+    Checks every key once with a ``RateLimiter``.
+    
+    Parameters
+    ----------
+    key_count : `int`
+        The amount of keys to check.
+    reset : `float`
+        The cooldown's duration.
+    
+    Returns
+    -------
+    elapsed : `float`
+        The elapsed time.
+    timer_count : `int`
+        By how much the event loop's timer heap grew.
+    """
+    rate_limiter = RateLimiter(reset)
+    timer_count_before = len(KOKORO._scheduled)
+    
+    start = perf_counter()
+    for key in range(key_count):
+        rate_limiter.consume(key)
+    
+    elapsed = perf_counter() - start
+    timer_count = len(KOKORO._scheduled) - timer_count_before
+    
+    rate_limiter.clear()
+    return elapsed, timer_count
+
+
+@BENCHMARK_COMMANDS
+async def benchmark_rate_limiter(client, message):
+    """
+    Compares the timer per key cooldowns with the lazily expiring rate limiter.
+    """
+    key_count = RATE_LIMITER_BENCHMARK_KEY_COUNT
+    reset = RATE_LIMITER_BENCHMARK_RESET
+    
+    description = []
+    for name, runner in (
+        ('timer per key', run_timer_per_key_cooldown_benchmark),
+        ('rate limiter', run_rate_limiter_benchmark),
+    ):
+        elapsed, timer_count = runner(key_count, reset)
+        description.append(
+            f'**{name}**: {elapsed * 1000.0:.2f} ms, {timer_count} timers '
+            f'({elapsed / key_count * 1000000000.0:.0f} ns / check)\n'
+        )
+    
+    embed = Embed(
+        'Cooldown benchmark',
+        ''.join(description),
+    ).add_footer(
+        f'{key_count} keys.'
+    )
+    
+    await client.message_create(message.channel, embed = embed)
+
+
+BOORU_PARSER_BENCHMARK_POST_COUNT = 100
+BOORU_PARSER_BENCHMARK_TAG_COUNT = 40
+BOORU_PARSER_BENCHMARK_REPEAT = 50
+
+
+def create_booru_benchmark_payloads():
+    """
+    Creates a safebooru and a gelbooru styled page with the same structure as the received ones.
+    
+    Returns
+    -------
+    payloads : `list` of `tuple` (`str`, `bytes`, `FunctionType`, `FunctionType`)
+        The payloads' names with the payloads, their BeautifulSoup post parser and their streaming post parser.
+    """
+    post_count = BOORU_PARSER_BENCHMARK_POST_COUNT
+    tags = [
+        ' '.join(f'tag_{post_index * 7 + tag_index}' for tag_index in range(BOORU_PARSER_BENCHMARK_TAG_COUNT))
+        for post_index in range(post_count)
+    ]
+    
+    safebooru_parts = [f'<?xml version="1.0" encoding="UTF-8"?><posts count="{post_count * 20}" offset="0">']
+    gelbooru_parts = [
+        f'<?xml version="1.0" encoding="UTF-8"?><posts limit="{post_count}" offset="0" count="{post_count * 20}">'
+    ]
+    for post_index in range(post_count):
+        file_url = f'https://example.com/images/{post_index}/{post_index:040x}.jpg'
+        safebooru_parts.append(
+            f'<post height="1200" score="3" file_url="{file_url}" parent_id="" '
+            f'sample_url="{file_url}" sample_width="850" sample_height="1200" '
+            f'preview_url="{file_url}" rating="s" tags=" {tags[post_index]} " id="{post_index}" width="850" '
+            f'change="1600000000" md5="{post_index:032x}" creator_id="1" has_children="false" '
+            f'created_at="Sat Jan 01 00:00:00 +0000 2022" status="active" source="" has_notes="false" '
+            f'has_comments="false" preview_width="106" preview_height="150"/>'
+        )
+        gelbooru_parts.append(
+            f'<post><id>{post_index}</id><created_at>Sat Jan 01 00:00:00 -0500 2022</created_at><score>3</score>'
+            f'<width>850</width><height>1200</height><md5>{post_index:032x}</md5><directory>00/00</directory>'
+            f'<image>{post_index:032x}.jpg</image><rating>general</rating><source></source><change>1600000000'
+            f'</change><owner>danbooru</owner><creator_id>1</creator_id><parent_id>0</parent_id><sample>0</sample>'
+            f'<preview_height>150</preview_height><preview_width>106</preview_width><tags>{tags[post_index]}</tags>'
+            f'<title></title><has_notes>false</has_notes><has_comments>false</has_comments>'
+            f'<file_url>{file_url}</file_url><preview_url>{file_url}</preview_url><sample_url></sample_url>'
+            f'<sample_height>0</sample_height><sample_width>0</sample_width><status>active</status>'
+            f'<post_locked>0</post_locked><has_children>false</has_children></post>'
+        )
+    
+    safebooru_parts.append('</posts>')
+    gelbooru_parts.append('</posts>')
+    
+    return [
+        (
+            'safebooru',
+            ''.join(safebooru_parts).encode(),
+            lambda post: (post.get('file_url'), post.get('tags')),
+            booru_post_parser_generic,
+        ),
+        (
+            'gelbooru',
+            ''.join(gelbooru_parts).encode(),
+            lambda post: (post.find('file_url').string, post.find('tags').string),
+            booru_post_parser_gel,
+        ),
+    ]
+
+
+def parse_booru_posts_beautiful_soup(data, post_parser):
+    """
+    Parses a booru page by building its whole tree with BeautifulSoup. This is how the pages were parsed before.
+    
+    Parameters
+    ----------
+    data : `bytes`
+        The page to parse.
+    post_parser : `FunctionType`
+        Function to parse a post with.
+    
+    Returns
+    -------
+    result : `None`, `tuple` (`int`, `list` of `tuple` (`str`, `str`))
+        The total amount of posts and the page's `file url` - `tags` pairs.
+    """
+    soup = BeautifulSoup(data, 'lxml')
+    posts = soup.find('posts')
+    if posts is None:
+        return None
+    
+    total = int(posts['count'])
+    
+    parsed_posts = []
+    for post in soup.find_all('post'):
+        url, tags = post_parser(post)
+        if (url is not None) and (tags is not None):
+            parsed_posts.append((url, tags))
+    
+    return total, parsed_posts
+
+
+@BENCHMARK_COMMANDS
+async def benchmark_booru_parser(client, message):
+    """
+    Compares parsing booru pages with BeautifulSoup and with the streaming parser.
+    """
+    if BeautifulSoup is None:
+        await client.message_create(message.channel, 'BeautifulSoup is not installed.')
+        return
+    
+    await client.typing(message.channel)
+    
+    repeat = BOORU_PARSER_BENCHMARK_REPEAT
+    
+    description = []
+    for name, data, beautiful_soup_post_parser, streaming_post_parser in create_booru_benchmark_payloads():
+        results = []
+        for parser, post_parser in (
+            (parse_booru_posts_beautiful_soup, beautiful_soup_post_parser),
+            (parse_booru_posts, streaming_post_parser),
+        ):
+            start = perf_counter()
+            for counter in range(repeat):
+                result = parser(data, post_parser)
+            elapsed = perf_counter() - start
+            results.append((elapsed / repeat, result))
+        
+        (beautiful_soup_elapsed, beautiful_soup_result), (streaming_elapsed, streaming_result) = results
+        if beautiful_soup_result != streaming_result:
+            raise RuntimeError(f'{name!r} payload was parsed differently.')
+        
+        description.append(
+            f'**{name}** ({len(data) / 1024.0:.1f} KiB):\n'
+            f'BeautifulSoup: {beautiful_soup_elapsed * 1000.0:.2f} ms / page\n'
+            f'Streaming: {streaming_elapsed * 1000.0:.2f} ms / page '
+            f'({beautiful_soup_elapsed / streaming_elapsed:.1f}x)\n'
+            f'\n'
+        )
+    
+    embed = Embed(
+        'Booru parser benchmark',
+        ''.join(description),
+    ).add_footer(
+        f'{BOORU_PARSER_BENCHMARK_POST_COUNT} posts per page, {repeat} pages per parser.'
+    )
+    
+    await client.message_create(message.channel, embed = embed)
+
+
+TAG_STORAGE_BENCHMARK_POST_COUNT = 20000
+TAG_STORAGE_BENCHMARK_TAG_COUNT = 30
+TAG_STORAGE_BENCHMARK_VOCABULARY_SIZE = 5000
+
+
+def create_tag_storage_benchmark_tag_strings():
+    """
+    Creates the tag strings of the posts of a booru page series. Popular tags are repeated more often.
+    
+    Returns
+    -------
+    tag_strings : `list` of `str`
+    """
+    vocabulary = [
+        f'character_{index}_(series_{index % 97})' for index in range(TAG_STORAGE_BENCHMARK_VOCABULARY_SIZE)
+    ]
+    vocabulary_size = len(vocabulary)
+    
+    tag_strings = []
+    for post_index in range(TAG_STORAGE_BENCHMARK_POST_COUNT):
+        tag_strings.append(' '.join(
+            vocabulary[(post_index * (tag_index + 1) * tag_index) % (vocabulary_size >> (tag_index % 4))]
+            for tag_index in range(TAG_STORAGE_BENCHMARK_TAG_COUNT)
+        ))
+    
+    return tag_strings
+
+
+def measure_tag_storage(tag_strings, builder):
+    """
+    Measures how much memory the tags take after built with the given function.
+    
+    Parameters
+    ----------
+    tag_strings : `list` of `str`
+        The posts' tag strings.
+    builder : `FunctionType`
+        Builds the stored tags from a split tag string.
+    
+    Returns
+    -------
+    size : `int`
+        The allocated memory in bytes.
+    elapsed : `float`
+        The time spent building.
+    """
+    tracemalloc_start()
+    try:
+        start = perf_counter()
+        stored = [builder(tag_string.split()) for tag_string in tag_strings]
+        elapsed = perf_counter() - start
+        size = tracemalloc_get_traced_memory()[0]
+    finally:
+        tracemalloc_stop()
+    
+    del stored
+    return size, elapsed
+
+
+@BENCHMARK_COMMANDS
+async def benchmark_tag_storage(client, message):
+    """
+    Compares the memory used by the cached images' tags stored as sets of strings and as interned identifiers.
+    """
+    await client.typing(message.channel)
+    
+    tag_strings = create_tag_storage_benchmark_tag_strings()
+    tag_interner = TagInterner()
+    
+    description = []
+    for name, builder in (
+        ('frozenset of strings', frozenset),
+        ('interned identifiers', tag_interner.intern_tags),
+    ):
+        size, elapsed = measure_tag_storage(tag_strings, builder)
+        description.append(
+            f'**{name}**: {size / 1048576.0:.2f} MiB, {size / len(tag_strings):.0f} bytes / post, '
+            f'{elapsed * 1000.0:.2f} ms\n'
+        )
+    
+    embed = Embed(
+        'Tag storage benchmark',
+        ''.join(description),
+    ).add_footer(
+        f'{TAG_STORAGE_BENCHMARK_POST_COUNT} posts with {TAG_STORAGE_BENCHMARK_TAG_COUNT} tags each, '
+        f'{len(tag_interner)} distinct tags.'
+    )
+    
+    await client.message_create(message.channel, embed = embed)
+
+
+CHANNEL_INDEX_BENCHMARK_GUILD_COUNT = 200
+CHANNEL_INDEX_BENCHMARK_CHANNEL_COUNT = 200
+CHANNEL_INDEX_BENCHMARK_TAGGED_EVERY = 500
+CHANNEL_INDEX_BENCHMARK_REPEAT = 20
+CHANNEL_INDEX_BENCHMARK_ID_BASE = 1 << 50
+
+CHANNEL_INDEX_BENCHMARK_TAG_RP = re_compile('(?:\\s|^)#touhou-feed(?:\\s|$)', re_multi_line | re_unicode)
+
+
+def is_channel_index_benchmark_channel_tagged(channel):
+    """
+    Returns whether the given benchmark channel is tagged. Matches the touhou feed's channel topic tags.
+    
+    Parameters
+    ----------
+    channel : ``Channel``
+        The channel to check.
+    
+    Returns
+    -------
+    tagged : `bool`
+    """
+    if not channel.is_guild_text():
+        return False
+    
+    topic = channel.topic
+    if topic is None:
+        return False
+    
+    return CHANNEL_INDEX_BENCHMARK_TAG_RP.search(topic) is not None
+
+
+def create_channel_index_benchmark_guilds():
+    """
+    Creates guilds with text channels, from which every `CHANNEL_INDEX_BENCHMARK_TAGGED_EVERY`-th is tagged.
+    
+    Returns
+    -------
+    guilds : `list` of ``Guild``
+    """
+    guilds = []
+    channel_index = 0
+    
+    for guild_index in range(CHANNEL_INDEX_BENCHMARK_GUILD_COUNT):
+        guild_id = CHANNEL_INDEX_BENCHMARK_ID_BASE + guild_index
+        guild = Guild.precreate(guild_id)
+        guild.channels.clear()
+        guild.threads.clear()
+        
+        for index in range(CHANNEL_INDEX_BENCHMARK_CHANNEL_COUNT):
+            if channel_index % CHANNEL_INDEX_BENCHMARK_TAGGED_EVERY:
+                topic = f'Talking about topic {channel_index}. #general'
+            else:
+                topic = f'Touhou images. #touhou-feed #interval:4h'
+            
+            channel = Channel.precreate(
+                CHANNEL_INDEX_BENCHMARK_ID_BASE + (1 << 20) + channel_index,
+                channel_type = ChannelType.guild_text,
+                guild_id = guild_id,
+                topic = topic,
+            )
+            guild.channels[channel.id] = channel
+            channel_index += 1
+        
+        guilds.append(guild)
+    
+    return guilds
+
+
+def run_channel_scan_benchmark(guilds):
+    """
+    Checks every channel of every guild, as resetting did without an index.
+    
+    Parameters
+    ----------
+    guilds : `list` of ``Guild``
+        The guilds to check.
+    
+    Returns
+    -------
+    elapsed : `float`
+        The average time of a reset.
+    visited : `int`
+        How much channels a reset visits.
+    """
+    visited = 0
+    start = perf_counter()
+    
+    for repeat in range(CHANNEL_INDEX_BENCHMARK_REPEAT):
+        visited = 0
+        for guild in guilds:
+            for channel in chain(guild.channels.values(), guild.threads.values()):
+                is_channel_index_benchmark_channel_tagged(channel)
+                visited += 1
+    
+    return (perf_counter() - start) / CHANNEL_INDEX_BENCHMARK_REPEAT, visited
+
+
+def run_channel_index_benchmark(channel_index):
+    """
+    Checks every indexed channel, as resetting does with an index.
+    
+    Parameters
+    ----------
+    channel_index : ``ChannelIndex``
+        The built index.
+    
+    Returns
+    -------
+    elapsed : `float`
+        The average time of a reset.
+    visited : `int`
+        How much channels a reset visits.
+    """
+    visited = 0
+    start = perf_counter()
+    
+    for repeat in range(CHANNEL_INDEX_BENCHMARK_REPEAT):
+        visited = 0
+        for channel in channel_index.iter_channels():
+            channel_index.update(channel)
+            visited += 1
+    
+    return (perf_counter() - start) / CHANNEL_INDEX_BENCHMARK_REPEAT, visited
+
+
+@BENCHMARK_COMMANDS
+async def benchmark_channel_index(client, message):
+    """
+    Compares resetting the touhou feed by scanning every channel with resetting it from a tagged channel index.
+    """
+    await client.typing(message.channel)
+    
+    guilds = create_channel_index_benchmark_guilds()
+    channel_index = ChannelIndex(is_channel_index_benchmark_channel_tagged)
+    
+    start = perf_counter()
+    channel_index.build(guilds)
+    build_elapsed = perf_counter() - start
+    
+    channels = [channel for guild in guilds for channel in guild.channels.values()]
+    start = perf_counter()
+    for channel in channels:
+        channel_index.update(channel)
+    update_elapsed = (perf_counter() - start) / len(channels)
+    
+    description = []
+    for name, runner, argument in (
+        ('full scan', run_channel_scan_benchmark, guilds),
+        ('tagged channel index', run_channel_index_benchmark, channel_index),
+    ):
+        elapsed, visited = runner(argument)
+        description.append(f'**{name}**: {elapsed * 1000.0:.3f} ms / reset, {visited} channels visited\n')
+    
+    description.append(
+        f'\nBuilding the index: {build_elapsed * 1000.0:.2f} ms (once, on ready)\n'
+        f'Updating a channel on event: {update_elapsed * 1000000000.0:.0f} ns'
+    )
+    
+    embed = Embed(
+        'Channel index benchmark',
+        ''.join(description),
+    ).add_footer(
+        f'{CHANNEL_INDEX_BENCHMARK_GUILD_COUNT} guilds with {CHANNEL_INDEX_BENCHMARK_CHANNEL_COUNT} channels each, '
+        f'{len(channel_index)} tagged.'
+    )
+    
+    await client.message_create(message.channel, embed = embed)
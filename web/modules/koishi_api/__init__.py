@@ -4,7 +4,8 @@ from flask import Blueprint, request, abort, Response
 from sqlalchemy.sql import select
 from hata.ext.top_gg import BotVote
 
-from bot_utils.models import DB_ENGINE, user_common_model, USER_COMMON_TABLE, get_create_common_user_expression
+from bot_utils.ledger import get_add_love_expression
+from bot_utils.models import DB_ENGINE, user_common_model
 from bot_utils.daily import VOTE_BASE, VOTE_PER_DAY, calculate_daily_new_only, \
     VOTE_BASE_BONUS_WEEKEND, VOTE_PER_DAY_BONUS_WEEKEND
 from config import KOISHI_TOP_GG_AUTHORIZATION
@@ -47,9 +48,10 @@ def vote():
                 daily_next = now
             
             daily_streak += 1
+            new_daily_streak = daily_streak
         else:
-            entry_id = -1
             daily_streak = 0
+            new_daily_streak = 1
             daily_next = now
         
         base = VOTE_BASE
@@ -62,26 +64,16 @@ def vote():
         
         increase = base + (daily_streak * per_day)
         
-        if (entry_id != -1):
-            connector.execute(
-                USER_COMMON_TABLE.update(
-                    user_common_model.id == entry_id,
-                ).values(
-                    total_love = user_common_model.total_love + increase,
-                    count_top_gg_vote = user_common_model.count_top_gg_vote + 1,
-                    daily_streak = daily_streak,
-                    daily_next = daily_next,
-                )
+        connector.execute(
+            get_add_love_expression(
+                bot_vote.user_id,
+                increase,
+                values = {
+                    'daily_streak': new_daily_streak,
+                    'daily_next': daily_next,
+                },
+                count_top_gg_vote = 1,
             )
-        else:
-            connector.execute(
-                get_create_common_user_expression(
-                    bot_vote.user_id,
-                    total_love = increase,
-                    count_top_gg_vote = 1,
-                    daily_streak = 1,
-                    daily_next = daily_next,
-                )
-            )
-        
+        )
+    
     return Response(status=200)